@@ -3,14 +3,44 @@ Smart Study Buddy - FastAPI Server
 Production-ready API for Smart Study Buddy
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request, Depends, Header, WebSocket, WebSocketDisconnect
+import argparse
+import asyncio
+from contextlib import nullcontext
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
+from fastapi.responses import StreamingResponse, FileResponse, RedirectResponse, Response
+from starlette.background import BackgroundTask
+from pydantic import BaseModel, Field, ValidationError
 from typing import Optional
+import json
+import math
+import os
+import threading
+import time
 import uvicorn
 
 from src.study_buddy import SmartStudyBuddy
-from src.prompts import AUDIENCE_LEVELS, TONES, LENGTHS
+from src.bundle import ExplanationBundle
+from src.store import ExplanationStore
+from src.cache import ExplanationCache, SharedExplanationCache, generated_by, replay_stream
+from src.streaming import acoalesce, StreamStats
+from src.sections import astream_sections, render_sections
+from src.jobs import JobManager
+from src.conversation import Conversation
+from src.curriculum import CurriculumRunner
+from src.deadline import Deadline, DeadlineExceeded
+from src.admission import AdmissionController, Overloaded, INTERACTIVE, BATCH
+from src.tenants import Tenant, QuotaExceeded, registry_from_env
+from src.tiering import policy_from_env, load_shadow_log, shadow_report
+from src.shared_state import shared_state_from_env
+from src.metrics import Metrics
+from src.profiling import Profiler, ProfilingMiddleware
+from src.logs import configure_logging, parse_sample_rates, RequestLogMiddleware
+from src.tracing import TracingMiddleware, add_event, configure_tracing, span
+from src.http_cache import (
+    EncodedBodies, MIN_COMPRESS_BYTES, cache_control, canonical_query, etag_for, if_none_match, negotiate_encoding
+)
+from src.prompts import AUDIENCE_LEVELS, TONES, LENGTHS, PROMPT_VERSION, explanation_key
 
 # Initialize FastAPI
 app = FastAPI(
@@ -55,6 +85,30 @@ class ExplanationRequest(BaseModel):
         default=False,
         description="Stream response"
     )
+    sections: bool = Field(
+        default=False,
+        description="Stream typed section events instead of raw text frames"
+    )
+    max_sections: Optional[int] = Field(
+        None,
+        ge=1,
+        le=4,
+        description="Stop after this many teaching sections (1 = core idea only)",
+        example=1
+    )
+    timeout: Optional[float] = Field(
+        None,
+        gt=0,
+        le=600,
+        description="Seconds before generation is abandoned (defaults to API_REQUEST_TIMEOUT)",
+        example=30
+    )
+    priority: str = Field(
+        default=INTERACTIVE,
+        pattern="^(interactive|batch|background)$",
+        description="Admission class: interactive requests are served before batch and background (warm-up) work",
+        example="interactive"
+    )
 
 
 class ExplanationResponse(BaseModel):
@@ -64,20 +118,296 @@ class ExplanationResponse(BaseModel):
     metadata: dict
 
 
+class BatchJobRequest(BaseModel):
+    topics: list[str] = Field(..., min_length=1, description="Topics to explain", example=["gravity", "DNA"])
+    audience: str = Field(default="beginner", description="Audience level", example="middle_school")
+    tone: Optional[str] = Field(None, description="Explanation tone", example="neutral")
+    length: Optional[str] = Field(None, description="Explanation length", example="short")
+    provider: str = Field(default="openai", description="AI provider to use", example="openai")
+
+
+class SessionRequest(BaseModel):
+    topic: str = Field(..., description="Topic to explain", example="photosynthesis")
+    audience: str = Field(default="beginner", description="Audience level", example="middle_school")
+    tone: Optional[str] = Field(None, description="Tone kept for the whole conversation", example="playful")
+    length: Optional[str] = Field(None, description="Length of the opening explanation", example="short")
+    provider: str = Field(default="openai", description="AI provider to use", example="openai")
+    context_tokens: Optional[int] = Field(
+        None,
+        ge=200,
+        le=32000,
+        description="Token budget for earlier turns sent with each follow-up",
+        example=1500
+    )
+    timeout: Optional[float] = Field(None, gt=0, le=600, description="Seconds before generation is abandoned")
+
+
+class FollowUpRequest(BaseModel):
+    question: str = Field(..., min_length=1, description="Follow-up question", example="Why are leaves green?")
+    timeout: Optional[float] = Field(None, gt=0, le=600, description="Seconds before generation is abandoned")
+
+
+class CurriculumRequest(BaseModel):
+    subject: str = Field(..., description="Subject of the study guide", example="cell biology")
+    audience: str = Field(default="beginner", description="Audience level", example="high_school")
+    tone: Optional[str] = Field(None, description="Explanation tone", example="neutral")
+    length: Optional[str] = Field(None, description="Length of each subtopic", example="short")
+    provider: str = Field(default="openai", description="AI provider to use", example="openai")
+    max_topics: int = Field(default=20, ge=1, le=50, description="Upper bound on planned subtopics")
+
+
 class HealthResponse(BaseModel):
     status: str
     version: str
 
 
+# Cross-process state: every worker process opens the same backend
+# (SQLite on /dev/shm by default, Redis when REDIS_URL is set)
+state = shared_state_from_env()
+metrics = Metrics(state)
+
+# Durable store of every generated explanation (written off the request path)
+store = ExplanationStore(metrics=metrics)
+
+# Completed explanations: a per-process LRU in front of the shared backend
+cache = SharedExplanationCache(
+    state,
+    local=ExplanationCache(max_entries=int(os.getenv("CACHE_MAX_ENTRIES", "4096"))),
+    metrics=metrics
+)
+
+# Optional per-client limit shared by all workers (requests per minute)
+API_RATE_LIMIT = float(os.getenv("API_RATE_LIMIT", "0"))
+API_RATE_BURST = float(os.getenv("API_RATE_BURST", "0")) or API_RATE_LIMIT
+
+# Default per-request generation budget in seconds (0 disables)
+API_REQUEST_TIMEOUT = float(os.getenv("API_REQUEST_TIMEOUT", "120"))
+
+# How often a non-streaming request checks whether its client is still there
+DISCONNECT_POLL_INTERVAL = 0.5
+
+# Admission control for upstream work in this process: bounded in-flight and
+# queued requests, shed with 503 once the expected queue wait exceeds the SLO
+admission = AdmissionController(
+    max_in_flight=int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "32")),
+    max_queue=int(os.getenv("ADMISSION_MAX_QUEUE", "128")),
+    slo=float(os.getenv("ADMISSION_SLO", "5.0")),
+    metrics=metrics
+)
+
+# Tenants identified by API key (TENANTS_FILE); anonymous "public" tenant otherwise
+tenants = registry_from_env(state=state, metrics=metrics)
+
+# Optional model tiering policy (TIERING_POLICY); daily tier budgets are
+# counted in shared metrics so every worker sees the same totals
+policy = policy_from_env(metrics=metrics)
+
+# Conversations live in shared state so any worker can serve the next turn
+SESSION_TTL = float(os.getenv("SESSION_TTL", "3600"))
+
+# Speculative prefetch of likely follow-up variants, on idle capacity only
+PREFETCH = os.getenv("PREFETCH", "0") == "1"
+PREFETCH_TOKENS_PER_HOUR = int(os.getenv("PREFETCH_TOKENS_PER_HOUR", "50000"))
+
+# Opt-in request profiling: requests sent with `X-Profile: 1`, plus a sampled
+# fraction, get a CPU profile and allocation snapshot in PROFILE_DIR. When
+# disabled the middleware is not installed at all.
+profiler = None
+if os.getenv("PROFILING", "0") == "1":
+    profiler = Profiler(
+        directory=os.getenv("PROFILE_DIR", "profiles"),
+        sample_rate=float(os.getenv("PROFILE_SAMPLE_RATE", "0")),
+        metrics=metrics
+    )
+    app.add_middleware(ProfilingMiddleware, profiler=profiler)
+
+# Structured JSON logs on stderr, written by a background thread. Every event
+# carries the request id (X-Request-Id, generated when absent); noisy events
+# can be sampled, e.g. LOG_SAMPLE_RATES="explanation.cached=0.1,request=0.2"
+configure_logging(
+    os.getenv("LOG_LEVEL", "INFO"),
+    sample_rates=parse_sample_rates(os.getenv("LOG_SAMPLE_RATES"))
+)
+app.add_middleware(RequestLogMiddleware)
+
+# Tracing: spans for sampled requests (TRACE_SAMPLE_RATE; requests arriving
+# with a sampled `traceparent` are always kept) go to TRACE_FILE as OTLP/JSON.
+# Every response names its trace in `traceparent` and `X-Trace-Id` headers.
+if os.getenv("TRACING", "0") == "1":
+    configure_tracing(
+        os.getenv("TRACE_FILE", "traces.jsonl"),
+        sample_rate=float(os.getenv("TRACE_SAMPLE_RATE", "0.01")),
+        service_name=os.getenv("TRACE_SERVICE_NAME", "smart-study-buddy")
+    )
+    app.add_middleware(TracingMiddleware)
+
+# WebSocket sessions: concurrent streams per connection, and the frames a
+# stream may send ahead of the client's acknowledgements (flow control)
+WS_MAX_STREAMS = int(os.getenv("WS_MAX_STREAMS", "8"))
+WS_WINDOW = int(os.getenv("WS_WINDOW", "32"))
+# Largest window or credit grant one message may carry (each frame of credit
+# is a semaphore release on the event loop)
+WS_MAX_CREDIT = int(os.getenv("WS_MAX_CREDIT", str(WS_WINDOW * 8)))
+
+# Cache lifetimes for GET /explanations responses: browsers keep them for
+# EXPLANATION_MAX_AGE, shared caches (CDN, reverse proxy) for the longer
+# EXPLANATION_SHARED_MAX_AGE, and both revalidate with the ETag afterwards
+EXPLANATION_MAX_AGE = int(os.getenv("EXPLANATION_MAX_AGE", "3600"))
+EXPLANATION_SHARED_MAX_AGE = int(os.getenv("EXPLANATION_SHARED_MAX_AGE", "86400"))
+EXPLANATION_STALE_WHILE_REVALIDATE = int(os.getenv("EXPLANATION_STALE_WHILE_REVALIDATE", "3600"))
+encoded_bodies = EncodedBodies(max_entries=int(os.getenv("ENCODED_CACHE_MAX_ENTRIES", "1024")))
+
 # Initialize buddy (reused across requests)
 buddy_instances = {}
+_init_lock = threading.Lock()
+
+# Optional pre-generated bundle, served without upstream calls.
+# The file is mmapped read-only, so every worker shares the same pages.
+BUNDLE_PATH = os.getenv("EXPLANATION_BUNDLE")
+bundle = ExplanationBundle(BUNDLE_PATH) if BUNDLE_PATH else None
+
+
+def lookup_bundle(topic: str, audience: str, tone: Optional[str], length: Optional[str]):
+    """Return the bundled explanation text, or None on a miss"""
+    if bundle is None:
+        return None
+    with span("bundle.lookup") as lookup:
+        record = bundle.lookup(topic, audience, tone, length)
+        lookup.set_attribute("hit", record is not None)
+    return record["explanation"] if record else None
+
+
+def _stored_explanation(buddy, topic: str, audience: str, tone: Optional[str], length: Optional[str], model: str):
+    """
+    Already-generated text for a content-addressed request, with its source
+    ("bundle" or "cached"), or (None, None)
+    
+    Records only count if they were generated by ``model`` from the current
+    prompt version, so a URL never serves another model's text.
+    """
+    if bundle is not None:
+        with span("bundle.lookup") as lookup:
+            record = bundle.lookup(topic, audience, tone, length)
+            lookup.set_attribute("hit", record is not None)
+        if record is not None and generated_by(record, model):
+            return record["explanation"], "bundle"
+    if buddy.cache is not None:
+        record = buddy.cache.get(explanation_key(topic, audience, tone, length))
+        if record is not None and generated_by(record, model):
+            return record["explanation"], "cached"
+    return None, None
 
 
 def get_buddy(provider: str = "openai"):
-    """Get or create buddy instance"""
-    if provider not in buddy_instances:
-        buddy_instances[provider] = SmartStudyBuddy(provider=provider)
-    return buddy_instances[provider]
+    """Get or create buddy instance (one per provider per process)"""
+    buddy = buddy_instances.get(provider)
+    if buddy is None:
+        with _init_lock:
+            buddy = buddy_instances.get(provider)
+            if buddy is None:
+                buddy = SmartStudyBuddy(
+                    provider=provider, store=store, cache=cache, metrics=metrics, policy=policy
+                )
+                if PREFETCH:
+                    buddy.enable_prefetch(admission=admission, tokens_per_hour=PREFETCH_TOKENS_PER_HOUR)
+                buddy_instances[provider] = buddy
+    return buddy
+
+
+# Background batch jobs (durable across restarts via a local SQLite table).
+# Started lazily so only serving processes run workers, never the supervisor.
+_jobs = None
+
+
+def get_jobs() -> JobManager:
+    """Get or start this process's job manager"""
+    global _jobs
+    if _jobs is None:
+        with _init_lock:
+            if _jobs is None:
+                _jobs = JobManager(
+                    buddy_factory=lambda provider: get_buddy(provider),
+                    workers=int(os.getenv("JOB_WORKERS", "4")),
+                    admission=admission,
+                    on_result=_record_job_usage
+                )
+    return _jobs
+
+
+def _record_job_usage(params: dict, explanation: str):
+    tenant = tenants.tenants.get(params.get("tenant")) or tenants.public
+    tenants.record(tenant, requests=1, output_tokens=_estimate_tokens(explanation))
+
+
+@app.on_event("startup")
+async def start_jobs():
+    get_jobs()
+
+
+@app.on_event("shutdown")
+async def close_clients():
+    """Close pooled upstream connections, async ones included, on this event loop"""
+    for buddy in list(buddy_instances.values()):
+        await buddy.aclose()
+
+
+def _overloaded(e: Overloaded) -> HTTPException:
+    return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))})
+
+
+def _rate_limit_wait(client) -> float:
+    """Take a token from a client address's shared bucket; seconds to wait if empty"""
+    if API_RATE_LIMIT <= 0:
+        return 0.0
+    host = client.host if client else "unknown"
+    wait = state.take(f"rl:{host}", API_RATE_LIMIT, 60.0, API_RATE_BURST)
+    if wait > 0:
+        metrics.incr("requests.rate_limited")
+    return wait
+
+
+def rate_limit(request: Request):
+    """Shared token bucket per client address; 429 once it is empty"""
+    wait = _rate_limit_wait(request.client)
+    if wait > 0:
+        raise HTTPException(
+            status_code=429,
+            detail="Rate limit exceeded",
+            headers={"Retry-After": str(math.ceil(wait))}
+        )
+
+
+def _estimate_tokens(text: str) -> int:
+    """Rough output token count (about 4 characters per token)"""
+    return len(text) // 4
+
+
+def _resolve_tenant(api_key: Optional[str], authorization: str) -> Optional[Tenant]:
+    """Tenant for an X-API-Key value or an ``Authorization: Bearer`` header"""
+    if api_key is None and authorization.lower().startswith("bearer "):
+        api_key = authorization[7:].strip()
+    return tenants.resolve(api_key)
+
+
+def get_tenant(
+    request: Request,
+    x_api_key: Optional[str] = Header(None, description="Tenant API key (or Authorization: Bearer)")
+) -> Tenant:
+    """Resolve the calling tenant from its API key; 401 for unknown keys"""
+    tenant = _resolve_tenant(x_api_key, request.headers.get("authorization", ""))
+    if tenant is None:
+        raise HTTPException(status_code=401, detail="Missing or unknown API key")
+    return tenant
+
+
+def admit_tenant(tenant: Tenant = Depends(get_tenant)) -> Tenant:
+    """get_tenant() plus the tenant's request and token quotas; 429 when over"""
+    try:
+        tenants.check(tenant)
+    except QuotaExceeded as e:
+        metrics.incr(f"tenant.{tenant.name}.throttled")
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))})
+    return tenant
 
 
 # Routes
@@ -103,8 +433,151 @@ async def get_options():
     }
 
 
-@app.post("/explain", response_model=ExplanationResponse)
-async def explain(request: ExplanationRequest):
+class ClientDisconnected(Exception):
+    """The client went away before the response was ready"""
+
+
+async def _unless_disconnected(http_request: Request, coro):
+    """
+    Await ``coro``, cancelling it (and with it the upstream stream) as soon
+    as the client disconnects
+    """
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL)
+            if done:
+                return task.result()
+            if await http_request.is_disconnected():
+                raise ClientDisconnected()
+    finally:
+        if not task.done():
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, Exception):
+                pass
+
+
+async def _collect(chunks) -> str:
+    return "".join([chunk async for chunk in chunks])
+
+
+async def _list_events(events) -> list:
+    return [event async for event in events]
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """Counters aggregated across every worker process"""
+    return {
+        "pid": os.getpid(),
+        "counters": metrics.snapshot(),
+        "cache": cache.stats(),
+        "admission": admission.stats(),
+        "prefetch": {
+            provider: buddy.prefetcher.stats()
+            for provider, buddy in list(buddy_instances.items())
+            if buddy.prefetcher is not None
+        },
+        "endpoints": {
+            provider: buddy.client.pool.stats()
+            for provider, buddy in list(buddy_instances.items())
+            if getattr(buddy.client, "pool", None) is not None
+        }
+    }
+
+
+def _get_profiler() -> Profiler:
+    if profiler is None:
+        raise HTTPException(status_code=404, detail="Profiling is disabled (set PROFILING=1)")
+    return profiler
+
+
+@app.get("/profiles")
+async def list_profiles(limit: int = Query(50, ge=1, le=500)):
+    """Captured request profiles, newest first, with hot-path timings"""
+    return {"profiles": _get_profiler().index(limit)}
+
+
+@app.get("/profiles/{profile_id}")
+async def get_profile(profile_id: str):
+    """One profile's summary: hot path, top functions and allocation sites"""
+    entry = _get_profiler().get(profile_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return entry
+
+
+@app.get("/profiles/{profile_id}/download")
+async def download_profile(profile_id: str):
+    """Raw cProfile output (open with pstats or snakeviz)"""
+    path = _get_profiler().path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="application/octet-stream", filename=f"{profile_id}.prof")
+
+
+@app.get("/usage")
+async def get_usage(tenant: Tenant = Depends(get_tenant)):
+    """The calling tenant's usage and remaining quota"""
+    return tenants.usage(tenant)
+
+
+@app.get("/tiering")
+async def get_tiering():
+    """Tier usage today and the shadow-test comparison (from the shared log)"""
+    if policy is None:
+        raise HTTPException(404, "No tiering policy configured")
+    try:
+        return {
+            "tiers": {
+                name: {
+                    "provider": tier.provider,
+                    "model": tier.model,
+                    "max_tokens": tier.max_tokens,
+                    "daily_token_budget": tier.daily_token_budget,
+                    "tokens_today": policy.used_today(name)
+                }
+                for name, tier in policy.tiers.items()
+            },
+            "shadow": shadow_report(load_shadow_log(policy.shadow_log))
+        }
+    except Exception as e:
+        raise HTTPException(500, str(e))
+
+
+@app.get("/search")
+async def search(
+    q: str = Query(..., description="Search terms", examples=["photosynthesis"]),
+    audience: Optional[str] = Query(None, description="Audience level filter"),
+    limit: int = Query(10, ge=1, le=100, description="Maximum results")
+):
+    """
+    Search previously generated explanations
+    
+    - **q**: Free-text query matched against topics and explanation text
+    - **audience**: Optional audience filter (shorthands accepted)
+    - **limit**: Maximum number of ranked results
+    """
+    start = time.perf_counter()
+    results = store.search(q, limit=limit, audience=audience)
+    return {
+        "query": q,
+        "results": results,
+        "metadata": {
+            "count": len(results),
+            "took_ms": round((time.perf_counter() - start) * 1000, 2)
+        }
+    }
+
+
+@app.post("/explain", response_model=ExplanationResponse, dependencies=[Depends(rate_limit)])
+async def explain(
+    request: ExplanationRequest,
+    http_request: Request,
+    tenant: Tenant = Depends(admit_tenant)
+):
     """
     Generate an explanation for a topic
     
@@ -112,19 +585,53 @@ async def explain(request: ExplanationRequest):
     - **audience**: Who to explain it to (see /options for choices)
     - **tone**: Optional tone preference
     - **length**: Optional length preference
-    - **provider**: AI provider (openai or anthropic)
+    - **provider**: AI provider (openai, anthropic or openai_compatible)
+    - **stream**: Return a `text/event-stream` of coalesced frames instead of JSON
+    - **timeout**: Generation budget in seconds; 504 (or an SSE `error`) when exceeded
+    - **priority**: `interactive` (default), `batch` or `background`; 503 with
+      `Retry-After` when the server is overloaded
+    
+    Generation stops as soon as the client disconnects or the deadline passes.
+    With tenants configured, send an `X-API-Key` header; upstream capacity is
+    shared fairly between tenants and usage counts against their quotas.
     """
+    add_event("request.validated")
+    metrics.incr("requests.explain")
+    tenants.record(tenant, requests=1)
+    deadline = Deadline.after(request.timeout or API_REQUEST_TIMEOUT)
     try:
-        buddy = get_buddy(request.provider)
+        explanation = lookup_bundle(request.topic, request.audience, request.tone, request.length)
+        source = "bundle"
         
-        explanation = buddy.explain(
-            topic=request.topic,
-            audience=request.audience,
-            tone=request.tone,
-            length=request.length,
-            stream=False  # API doesn't support streaming yet
-        )
+        if request.stream:
+            # Bundle hits never reach upstream, so only generation takes a slot
+            slot = None
+            if explanation is None:
+                slot = await admission.hold(request.priority, tenant=tenant.name, weight=tenant.weight)
+            release = slot.release if slot is not None else None
+            return StreamingResponse(
+                _sse_explanation(request, explanation, deadline, release, tenant),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+                background=BackgroundTask(release) if release is not None else None
+            )
         
+        if explanation is None or request.max_sections:
+            slot = nullcontext()
+            if explanation is None:
+                slot = admission.slot(request.priority, tenant=tenant.name, weight=tenant.weight)
+            async with slot:
+                chunks, source = _explanation_chunks(request, explanation, deadline)
+                if request.max_sections:
+                    sections = astream_sections(chunks, max_sections=request.max_sections)
+                    events = await _unless_disconnected(http_request, _list_events(sections))
+                    explanation = render_sections(events)
+                else:
+                    explanation = await _unless_disconnected(http_request, _collect(chunks))
+            if source == "generated":
+                tenants.record(tenant, output_tokens=_estimate_tokens(explanation))
+        
+        metrics.incr(f"explain.{source}")
         return ExplanationResponse(
             topic=request.topic,
             audience=request.audience,
@@ -132,21 +639,180 @@ async def explain(request: ExplanationRequest):
             metadata={
                 "tone": request.tone,
                 "length": request.length,
-                "provider": request.provider
+                "provider": request.provider,
+                "source": source
             }
         )
     
+    except Overloaded as e:
+        raise _overloaded(e)
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except ClientDisconnected:
+        raise HTTPException(status_code=499, detail="Client disconnected")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/batch")
+@app.get("/explanations", dependencies=[Depends(rate_limit)])
+async def get_explanation(
+    http_request: Request,
+    topic: str = Query(..., description="Topic to explain"),
+    audience: str = Query("beginner", description="Audience level"),
+    tone: Optional[str] = Query(None, description="Explanation tone"),
+    length: Optional[str] = Query(None, description="Explanation length"),
+    provider: str = Query("openai", description="AI provider"),
+    model: Optional[str] = Query(None, description="Model the explanation was generated with"),
+    v: Optional[str] = Query(None, description="Prompt version"),
+    tenant: Tenant = Depends(admit_tenant)
+):
+    """
+    Cacheable read of one explanation, named by its URL
+    
+    Any spelling of a request is redirected (307) to the canonical URL:
+    collapsed whitespace, audience shorthand, fixed field order, the
+    provider's current model and the current prompt version. That URL's
+    response carries a strong ETag, is gzip/brotli-compressed as the client
+    accepts, and answers `If-None-Match` with 304. Text already generated by
+    the URL's model (bundle or cache) is served without an admission slot, so
+    revalidations never wait behind generation; otherwise the explanation is
+    generated with exactly that model, bypassing tiering and derivation.
+    
+    Without tenants the response is `public`, so shared caches can serve
+    popular explanations without reaching a worker. With tenants (API keys
+    required) it is `private` and varies on the credentials.
+    Changing the model or the prompts changes every URL.
+    """
+    metrics.incr("requests.explanations")
+    try:
+        buddy = get_buddy(provider)
+        private = tenants.enabled
+        vary = "Accept-Encoding, Authorization, X-API-Key" if private else "Accept-Encoding"
+        canonical = canonical_query(topic, audience, tone, length, provider, buddy.client.model, PROMPT_VERSION)
+        if http_request.url.query != canonical:
+            return RedirectResponse(
+                f"{http_request.url.path}?{canonical}",
+                status_code=307,
+                headers={"Cache-Control": cache_control(60, 60, private=private), "Vary": vary}
+            )
+        
+        explanation, source = _stored_explanation(buddy, topic, audience, tone, length, model)
+        if explanation is None:
+            deadline = Deadline.after(API_REQUEST_TIMEOUT)
+            async with admission.slot(INTERACTIVE, tenant=tenant.name, weight=tenant.weight):
+                chunks = buddy.astream(topic, audience, tone, length, deadline=deadline, model=model)
+                explanation = await _unless_disconnected(http_request, _collect(chunks))
+            source = "generated"
+        tenants.record(tenant, requests=1)
+        
+        # The body depends only on the URL's fields and the text, so equal
+        # explanations always get equal ETags
+        body = json.dumps({
+            "topic": topic,
+            "audience": audience,
+            "explanation": explanation,
+            "metadata": {"tone": tone, "length": length, "provider": provider, "model": model, "prompt_version": v}
+        }, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        encoding = negotiate_encoding(http_request.headers.get("accept-encoding"))
+        if len(body) < MIN_COMPRESS_BYTES:
+            encoding = None
+        headers = {
+            "ETag": etag_for(body, encoding),
+            "Cache-Control": cache_control(
+                EXPLANATION_MAX_AGE, EXPLANATION_SHARED_MAX_AGE, EXPLANATION_STALE_WHILE_REVALIDATE, private=private
+            ),
+            "Vary": vary,
+            "X-Explanation-Source": source
+        }
+        
+        if if_none_match(http_request.headers.get("if-none-match"), headers["ETag"]):
+            metrics.incr("explanations.not_modified")
+            return Response(status_code=304, headers=headers)
+        
+        metrics.incr(f"explain.{source}")
+        if encoding is not None:
+            headers["Content-Encoding"] = encoding
+        return Response(
+            encoded_bodies.encode(body, headers["ETag"], encoding),
+            media_type="application/json",
+            headers=headers
+        )
+    
+    except Overloaded as e:
+        raise _overloaded(e)
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except ClientDisconnected:
+        raise HTTPException(status_code=499, detail="Client disconnected")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _bundle_chunks(text: str):
+    for chunk in replay_stream(text):
+        yield chunk
+
+
+def _explanation_chunks(request: ExplanationRequest, bundled: Optional[str], deadline: Optional[Deadline] = None):
+    """Async text chunks for a request, from the bundle or live generation"""
+    if bundled is not None:
+        return _bundle_chunks(bundled), "bundle"
+    buddy = get_buddy(request.provider)
+    chunks = buddy.astream(request.topic, request.audience, request.tone, request.length, deadline=deadline)
+    return chunks, "generated"
+
+
+async def _sse_explanation(
+    request: ExplanationRequest,
+    bundled: Optional[str],
+    deadline: Optional[Deadline] = None,
+    release=None,
+    tenant: Optional[Tenant] = None
+):
+    """
+    Server-sent events: one ``frame`` event per coalesced frame, then ``done``.
+    With ``sections``/``max_sections``, frames are replaced by typed
+    ``section_start``/``delta``/``section_end`` events.
+    
+    A client disconnect cancels this generator, which closes the upstream
+    stream; a passed deadline ends it with an ``error`` event. ``release``
+    frees the admission slot as soon as generation ends; streamed output
+    (even if cut short) counts towards ``tenant``'s usage.
+    """
+    chunks, source = _explanation_chunks(request, bundled, deadline)
+    metrics.incr(f"explain.{source}")
+    stats = StreamStats()
+    frames = acoalesce(chunks, stats=stats)
+    try:
+        if request.sections or request.max_sections:
+            async for event in astream_sections(frames, max_sections=request.max_sections):
+                yield _sse_event(event.pop("type"), event)
+        else:
+            async for frame in frames:
+                yield _sse_event("frame", {"text": frame})
+    except Exception as e:
+        yield _sse_event("error", {"detail": str(e)})
+        return
+    finally:
+        if release is not None:
+            release()
+        if tenant is not None and source == "generated":
+            tenants.record(tenant, output_tokens=stats.bytes // 4)
+    yield _sse_event("done", {"source": source, "stats": stats.summary()})
+
+
+@app.post("/batch", dependencies=[Depends(rate_limit)])
 async def batch_explain(
     topics: list[str],
     audience: str = "beginner",
     tone: Optional[str] = None,
     length: Optional[str] = None,
-    provider: str = "openai"
+    provider: str = "openai",
+    tenant: Tenant = Depends(admit_tenant)
 ):
     """
     Explain multiple topics for the same audience
@@ -156,18 +822,25 @@ async def batch_explain(
     - **tone**: Optional tone
     - **length**: Optional length
     - **provider**: AI provider
+    
+    Topics missing from the bundle each take a `batch` admission slot, so
+    interactive requests are served first under load.
     """
+    tenants.record(tenant, requests=len(topics))
     try:
-        buddy = get_buddy(provider)
-        
         results = []
         for topic in topics:
-            explanation = buddy.explain(
-                topic=topic,
-                audience=audience,
-                tone=tone,
-                length=length
-            )
+            explanation = lookup_bundle(topic, audience, tone, length)
+            if explanation is None:
+                async with admission.slot(BATCH, tenant=tenant.name, weight=tenant.weight):
+                    explanation = await asyncio.to_thread(
+                        get_buddy(provider).explain,
+                        topic=topic,
+                        audience=audience,
+                        tone=tone,
+                        length=length
+                    )
+                tenants.record(tenant, output_tokens=_estimate_tokens(explanation))
             
             results.append({
                 "topic": topic,
@@ -185,14 +858,566 @@ async def batch_explain(
             }
         }
     
+    except Overloaded as e:
+        raise _overloaded(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _save_session(conversation: Conversation, provider: str):
+    state.set(f"session:{conversation.session_id}", dict(conversation.to_dict(), provider=provider), ttl=SESSION_TTL)
+
+
+def _load_session(session_id: str, tenant: Tenant):
+    """A conversation owned by ``tenant`` and its provider; others look unknown"""
+    data = state.get(f"session:{session_id}")
+    if data is None or data.get("owner") != tenant.name:
+        raise HTTPException(status_code=404, detail=f"Unknown session: {session_id}")
+    provider = data.pop("provider")
+    return Conversation.from_dict(data), provider
+
+
+def _turn_response(conversation: Conversation) -> dict:
+    turn = conversation.turns[-1]
+    return {
+        "session_id": conversation.session_id,
+        "turn": turn["turn"],
+        "answer": turn["answer"],
+        "context_tokens": turn["context_tokens"],
+        "latency_ms": turn["latency_ms"]
+    }
+
+
+@app.post("/sessions", status_code=201, dependencies=[Depends(rate_limit)])
+async def start_session(request: SessionRequest, tenant: Tenant = Depends(admit_tenant)):
+    """
+    Explain a topic and open a conversation for follow-up questions
+    
+    The response's `answer` is the opening explanation; ask follow-ups with
+    `POST /sessions/{session_id}/follow-ups`. Sessions expire after
+    SESSION_TTL seconds without a new turn.
+    """
+    tenants.record(tenant, requests=1)
+    deadline = Deadline.after(request.timeout or API_REQUEST_TIMEOUT)
+    try:
+        async with admission.slot(INTERACTIVE, tenant=tenant.name, weight=tenant.weight):
+            conversation = await asyncio.to_thread(
+                get_buddy(request.provider).start_conversation,
+                request.topic,
+                request.audience,
+                request.tone,
+                request.length,
+                context_tokens=request.context_tokens,
+                owner=tenant.name,
+                deadline=deadline
+            )
+        tenants.record(tenant, output_tokens=_estimate_tokens(conversation.turns[-1]["answer"]))
+        _save_session(conversation, request.provider)
+        return _turn_response(conversation)
+    
+    except Overloaded as e:
+        raise _overloaded(e)
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/sessions/{session_id}/follow-ups", dependencies=[Depends(rate_limit)])
+async def follow_up(session_id: str, request: FollowUpRequest, tenant: Tenant = Depends(admit_tenant)):
+    """
+    Ask a follow-up question in a conversation
+    
+    Only the latest turns are sent verbatim; older ones are condensed into a
+    summary, so `context_tokens` (the estimated prompt size) stays bounded
+    however long the conversation gets.
+    """
+    conversation, provider = _load_session(session_id, tenant)
+    tenants.record(tenant, requests=1)
+    deadline = Deadline.after(request.timeout or API_REQUEST_TIMEOUT)
+    try:
+        async with admission.slot(INTERACTIVE, tenant=tenant.name, weight=tenant.weight):
+            await asyncio.to_thread(
+                get_buddy(provider).follow_up, conversation, request.question, deadline=deadline
+            )
+        tenants.record(tenant, output_tokens=_estimate_tokens(conversation.turns[-1]["answer"]))
+        _save_session(conversation, provider)
+        return _turn_response(conversation)
+    
+    except Overloaded as e:
+        raise _overloaded(e)
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/sessions/{session_id}")
+async def get_session(session_id: str, tenant: Tenant = Depends(get_tenant)):
+    """A conversation's turns, with per-turn prompt size and latency"""
+    conversation, provider = _load_session(session_id, tenant)
+    return dict(conversation.to_dict(), provider=provider)
+
+
+class StreamError(Exception):
+    """A WebSocket stream failure, reported with the HTTP status it mirrors"""
+
+    def __init__(self, status: int, detail: str, retry_after: Optional[float] = None):
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+def _topic_key(topic: str) -> str:
+    return " ".join(topic.lower().split())
+
+
+class WebSocketSession:
+    """
+    One tutoring connection carrying many concurrent streams, multiplexed by
+    a client-chosen stream ``id``, around one shared conversation
+
+    Client messages:
+        {"type": "explain", "id", <ExplanationRequest fields>, "window"?}
+        {"type": "follow_up", "id", "question", "timeout"?, "window"?}
+        {"type": "cancel", "id"}
+        {"type": "credit", "id", "frames"}: let a stream send more frames
+
+    Server messages name their stream: ``frame`` (or the section events),
+    then ``done``, ``error`` or ``cancelled``. ``session`` announces the
+    shared conversation once the first explanation completes;
+    ``prefetched`` pushes variants of this session's topics as the
+    prefetcher generates them.
+    """
+
+    def __init__(self, websocket: WebSocket, tenant: Tenant, conversation: Optional[Conversation] = None,
+                 provider: str = "openai"):
+        self.websocket = websocket
+        self.tenant = tenant
+        self.conversation = conversation
+        self.provider = provider
+        self.streams = {}
+        self.topics = set()
+        self.outbox = asyncio.Queue()
+        self.loop = asyncio.get_running_loop()
+        self.push_prefetched = True
+        self._unsubscribe = None
+        if conversation is not None:
+            self.topics.add(_topic_key(conversation.topic))
+
+    def send(self, message: dict):
+        """Queue a message; a single writer task owns the socket"""
+        self.outbox.put_nowait(message)
+
+    async def _writer(self):
+        while True:
+            await self.websocket.send_json(await self.outbox.get())
+
+    async def serve(self, push_prefetched: bool = True):
+        """Handle client messages until the connection closes, then cancel its streams"""
+        writer = asyncio.create_task(self._writer())
+        self.push_prefetched = push_prefetched
+        self._subscribe()
+        try:
+            while True:
+                text = await self.websocket.receive_text()
+                try:
+                    message = json.loads(text)
+                    self._dispatch(message if isinstance(message, dict) else {})
+                except ValueError as e:
+                    self.send({"type": "error", "status": 400, "detail": f"Invalid message: {e}"})
+        except WebSocketDisconnect:
+            pass
+        finally:
+            if self._unsubscribe is not None:
+                self._unsubscribe()
+                self._unsubscribe = None
+            tasks = [task for task, _ in self.streams.values()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            writer.cancel()
+            metrics.incr("ws.closed")
+
+    def _use_provider(self, provider: str):
+        """Move the session, and its prefetch listener, to another provider's buddy"""
+        if provider != self.provider:
+            self.provider = provider
+            self._subscribe()
+
+    def _subscribe(self):
+        """Listen for prefetched variants from the session provider's buddy, dropping any earlier listener"""
+        if self._unsubscribe is not None:
+            self._unsubscribe()
+            self._unsubscribe = None
+        prefetcher = get_buddy(self.provider).prefetcher
+        if self.push_prefetched and prefetcher is not None:
+            self._unsubscribe = prefetcher.subscribe(self._on_prefetched)
+
+    def _dispatch(self, message: dict):
+        kind, stream_id = message.get("type"), message.get("id")
+        if kind == "cancel":
+            if stream_id in self.streams:
+                self.streams[stream_id][0].cancel()
+            return
+        if kind == "credit":
+            frames = self._credit(message, "frames", 1)
+            if frames is not None and stream_id in self.streams:
+                credits = self.streams[stream_id][1]
+                for _ in range(frames):
+                    credits.release()
+            return
+        if kind not in ("explain", "follow_up"):
+            raise ValueError(f"unknown type {kind!r}")
+
+        if stream_id is None or stream_id in self.streams:
+            self.send({"type": "error", "id": stream_id, "status": 400, "detail": "Each stream needs a new, unique id"})
+            return
+        if len(self.streams) >= WS_MAX_STREAMS:
+            self.send({"type": "error", "id": stream_id, "status": 429,
+                       "detail": f"At most {WS_MAX_STREAMS} concurrent streams per connection"})
+            return
+        window = self._credit(message, "window", WS_WINDOW)
+        if window is None:
+            return
+        credits = asyncio.Semaphore(window)
+        handler = self._explain if kind == "explain" else self._follow_up
+        task = asyncio.create_task(self._run(stream_id, handler(stream_id, message, credits)))
+        self.streams[stream_id] = (task, credits)
+        metrics.incr(f"ws.{kind}")
+
+    def _credit(self, message: dict, field: str, default: int) -> Optional[int]:
+        """A message's frame count (0..WS_MAX_CREDIT); None after reporting a bad value"""
+        value = message.get(field)
+        try:
+            frames = default if value is None else int(value)
+        except (TypeError, ValueError, OverflowError):
+            frames = -1
+        if not 0 <= frames <= WS_MAX_CREDIT:
+            self.send({"type": "error", "id": message.get("id"), "status": 400,
+                       "detail": f"{field} must be an integer from 0 to {WS_MAX_CREDIT}"})
+            return None
+        return frames
+
+    async def _run(self, stream_id, coro):
+        """Run one stream, turning its failure into an ``error`` message for that stream only"""
+        try:
+            await coro
+        except asyncio.CancelledError:
+            self.send({"type": "cancelled", "id": stream_id})
+        except StreamError as e:
+            error = {"type": "error", "id": stream_id, "status": e.status, "detail": e.detail}
+            if e.retry_after is not None:
+                error["retry_after"] = max(1, math.ceil(e.retry_after))
+            self.send(error)
+        except ValidationError as e:
+            self.send({"type": "error", "id": stream_id, "status": 422,
+                       "detail": json.loads(e.json(include_url=False))})
+        except Overloaded as e:
+            self.send({"type": "error", "id": stream_id, "status": 503, "detail": str(e),
+                       "retry_after": max(1, math.ceil(e.retry_after))})
+        except DeadlineExceeded as e:
+            self.send({"type": "error", "id": stream_id, "status": 504, "detail": str(e)})
+        except Exception as e:
+            self.send({"type": "error", "id": stream_id, "status": 500, "detail": str(e)})
+        finally:
+            self.streams.pop(stream_id, None)
+
+    def _admit(self):
+        """Per-stream rate limit and tenant quota, as for one HTTP request"""
+        wait = _rate_limit_wait(self.websocket.client)
+        if wait > 0:
+            raise StreamError(429, "Rate limit exceeded", wait)
+        try:
+            tenants.check(self.tenant)
+        except QuotaExceeded as e:
+            metrics.incr(f"tenant.{self.tenant.name}.throttled")
+            raise StreamError(429, str(e), e.retry_after)
+        tenants.record(self.tenant, requests=1)
+
+    async def _pump(self, stream_id, chunks, credits: asyncio.Semaphore, sections: bool, max_sections=None) -> tuple:
+        """
+        Send a stream's frames (or section events), one credit per frame
+
+        Returns:
+            (text sent, StreamStats)
+        """
+        stats = StreamStats()
+        frames = acoalesce(chunks, stats=stats)
+        if sections:
+            events = []
+            source = astream_sections(frames, max_sections=max_sections)
+            try:
+                async for event in source:
+                    if event["type"] == "delta":
+                        await credits.acquire()
+                    events.append(dict(event))
+                    self.send(dict(event, id=stream_id))
+            finally:
+                await source.aclose()
+            return render_sections(events), stats
+        parts = []
+        try:
+            async for frame in frames:
+                await credits.acquire()
+                parts.append(frame)
+                self.send({"type": "frame", "id": stream_id, "text": frame})
+        finally:
+            await frames.aclose()
+        return "".join(parts), stats
+
+    async def _explain(self, stream_id, message: dict, credits: asyncio.Semaphore):
+        request = ExplanationRequest(**{k: v for k, v in message.items() if k not in ("type", "id", "window")})
+        self._admit()
+        deadline = Deadline.after(request.timeout or API_REQUEST_TIMEOUT)
+        bundled = lookup_bundle(request.topic, request.audience, request.tone, request.length)
+        slot = None
+        if bundled is None:
+            slot = await admission.hold(request.priority, tenant=self.tenant.name, weight=self.tenant.weight)
+        self.topics.add(_topic_key(request.topic))
+        if self.conversation is None:
+            # Follow the provider the conversation will open on before its prefetches start
+            self._use_provider(request.provider)
+        started = time.perf_counter()
+        chunks, source = _explanation_chunks(request, bundled, deadline)
+        metrics.incr(f"explain.{source}")
+        stats = None
+        try:
+            text, stats = await self._pump(
+                stream_id, chunks, credits, bool(request.sections or request.max_sections), request.max_sections
+            )
+        finally:
+            if slot is not None:
+                slot.release()
+            if source == "generated" and stats is not None:
+                tenants.record(self.tenant, output_tokens=stats.bytes // 4)
+
+        opened = self.conversation is None
+        if opened:
+            self._use_provider(request.provider)
+        buddy = get_buddy(self.provider)
+        if opened:
+            self.conversation = buddy.open_conversation(
+                request.topic, request.audience, request.tone, request.length, owner=self.tenant.name
+            )
+        buddy.add_explanation_turn(
+            self.conversation, request.topic, request.audience, request.tone, request.length, text,
+            latency_ms=round((time.perf_counter() - started) * 1000, 1)
+        )
+        _save_session(self.conversation, self.provider)
+        if opened:
+            self.send({"type": "session", "session_id": self.conversation.session_id})
+        self.send({"type": "done", "id": stream_id, "source": source, "stats": stats.summary()})
+
+    async def _follow_up(self, stream_id, message: dict, credits: asyncio.Semaphore):
+        request = FollowUpRequest(**{k: v for k, v in message.items() if k not in ("type", "id", "window")})
+        if self.conversation is None:
+            raise StreamError(409, "No conversation yet: complete an explain stream first")
+        self._admit()
+        deadline = Deadline.after(request.timeout or API_REQUEST_TIMEOUT)
+        slot = await admission.hold(INTERACTIVE, tenant=self.tenant.name, weight=self.tenant.weight)
+        stats = None
+        try:
+            chunks = get_buddy(self.provider).afollow_up(self.conversation, request.question, deadline=deadline)
+            _, stats = await self._pump(stream_id, chunks, credits, sections=False)
+        finally:
+            slot.release()
+            if stats is not None:
+                tenants.record(self.tenant, output_tokens=stats.bytes // 4)
+        _save_session(self.conversation, self.provider)
+        turn = self.conversation.turns[-1]
+        self.send({
+            "type": "done",
+            "id": stream_id,
+            "turn": turn["turn"],
+            "context_tokens": turn["context_tokens"],
+            "stats": stats.summary()
+        })
+
+    def _on_prefetched(self, topic: str, variant: tuple):
+        """Prefetcher listener (prefetch thread): push variants of this session's topics"""
+        if _topic_key(topic) not in self.topics:
+            return
+        record = cache.get(explanation_key(topic, *variant))
+        if record is None:
+            return
+        audience, tone, length = variant
+        self.loop.call_soon_threadsafe(self.send, {
+            "type": "prefetched",
+            "topic": topic,
+            "audience": audience,
+            "tone": tone,
+            "length": length,
+            "explanation": record["explanation"]
+        })
+
+
+@app.websocket("/ws")
+async def websocket_session(websocket: WebSocket, session_id: Optional[str] = None, push: bool = True):
+    """
+    A tutoring session over one WebSocket: many concurrent explanation and
+    follow-up streams, each with its own id, cancellation and flow control
+    (see WebSocketSession for the message protocol)
+    
+    - **session_id**: Continue a conversation opened with `POST /sessions`
+    - **push**: Push prefetched variants of the session's topics
+    
+    Authenticate with `X-API-Key` / `Authorization: Bearer` (or `?api_key=`
+    for browsers). Each stream is rate limited, admitted and metered like
+    one HTTP request.
+    """
+    tenant = _resolve_tenant(
+        websocket.headers.get("x-api-key") or websocket.query_params.get("api_key"),
+        websocket.headers.get("authorization", "")
+    )
+    if tenant is None:
+        await websocket.close(code=4401, reason="Missing or unknown API key")
+        return
+    conversation, provider = None, "openai"
+    if session_id:
+        try:
+            conversation, provider = _load_session(session_id, tenant)
+        except HTTPException as e:
+            await websocket.close(code=4404, reason=e.detail)
+            return
+    await websocket.accept()
+    metrics.incr("ws.opened")
+    await WebSocketSession(websocket, tenant, conversation, provider).serve(push_prefetched=push)
+
+
+@app.post("/curriculum", dependencies=[Depends(rate_limit)])
+async def curriculum(request: CurriculumRequest, tenant: Tenant = Depends(admit_tenant)):
+    """
+    Plan a prerequisite graph for a subject and explain every subtopic
+    
+    Returns a `text/event-stream`: a `plan` event with the graph and its
+    levels, one `node` event per subtopic as it finishes (independent
+    subtopics run in parallel, cached ones return at once), then `done`.
+    Each generation takes a `batch` admission slot.
+    """
+    tenants.record(tenant, requests=1)
+    runner = CurriculumRunner(
+        get_buddy(request.provider),
+        workers=int(os.getenv("CURRICULUM_WORKERS", "4")),
+        max_topics=request.max_topics,
+        admission=admission,
+        tenant=tenant.name,
+        weight=tenant.weight
+    )
+    
+    def events():
+        try:
+            for event in runner.run(request.subject, request.audience, request.tone, request.length):
+                if event["type"] == "node" and event["status"] == "generated":
+                    tenants.record(tenant, output_tokens=_estimate_tokens(event["explanation"]))
+                yield _sse_event(event["type"], event)
+        except Exception as e:
+            yield _sse_event("error", {"detail": str(e)})
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post("/jobs", status_code=202, dependencies=[Depends(rate_limit)])
+async def submit_job(request: BatchJobRequest, tenant: Tenant = Depends(admit_tenant)):
+    """
+    Submit a batch job; returns a job id immediately
+    
+    Poll `GET /jobs/{job_id}`, page through `GET /jobs/{job_id}/results`
+    or follow `GET /jobs/{job_id}/stream` for completions as they happen.
+    """
+    jobs = get_jobs()
+    job_id = jobs.submit(
+        request.topics,
+        audience=request.audience,
+        tone=request.tone,
+        length=request.length,
+        provider=request.provider,
+        tenant=tenant.name,
+        weight=tenant.weight
+    )
+    return jobs.get(job_id)
+
+
+def _get_job(job_id: str, tenant: Tenant) -> dict:
+    """A job owned by ``tenant``; other tenants' jobs look unknown"""
+    job = get_jobs().get(job_id)
+    if job is None or job["params"].get("tenant") != tenant.name:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return job
+
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str, tenant: Tenant = Depends(get_tenant)):
+    """Job status and progress counts"""
+    return _get_job(job_id, tenant)
+
+
+@app.get("/jobs/{job_id}/results")
+async def job_results(
+    job_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    tenant: Tenant = Depends(get_tenant)
+):
+    """Finished items so far (partial results while the job runs)"""
+    job = _get_job(job_id, tenant)
+    return {"job": job, "results": get_jobs().results(job_id, offset=offset, limit=limit)}
+
+
+@app.get("/jobs/{job_id}/stream")
+async def job_stream(job_id: str, tenant: Tenant = Depends(get_tenant)):
+    """Server-sent ``item`` events as items finish, then ``done`` with final status"""
+    _get_job(job_id, tenant)
+    
+    jobs = get_jobs()
+    
+    async def events():
+        seen, since = set(), 0.0
+        while True:
+            job = jobs.get(job_id)
+            for item in jobs.finished_since(job_id, since):
+                since = max(since, item["finished_at"])
+                if item["idx"] not in seen:
+                    seen.add(item["idx"])
+                    yield _sse_event("item", item)
+            if job["status"] in ("completed", "cancelled"):
+                yield _sse_event("done", job)
+                return
+            await asyncio.sleep(0.5)
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str, tenant: Tenant = Depends(get_tenant)):
+    """Cancel a job; remaining items are never sent upstream"""
+    _get_job(job_id, tenant)
+    get_jobs().cancel(job_id)
+    return _get_job(job_id, tenant)
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the Smart Study Buddy API")
+    parser.add_argument("--host", default=os.getenv("API_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("API_PORT", "8000")))
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.getenv("API_WORKERS", "1")),
+        help="Worker processes (state is shared through STATE_DB / REDIS_URL)"
+    )
+    parser.add_argument("--reload", action="store_true", help="Auto-reload for development (single process)")
+    args = parser.parse_args()
+    
     uvicorn.run(
         "api_server:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True
+        host=args.host,
+        port=args.port,
+        reload=args.reload,
+        workers=None if args.reload else args.workers
     )
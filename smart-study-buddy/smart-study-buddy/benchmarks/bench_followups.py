@@ -0,0 +1,68 @@
+"""
+Smart Study Buddy - Follow-up Latency Benchmark
+Measures prompt size and latency per turn of a long conversation.
+
+Runs the same scripted conversation twice against a real provider: once
+with the bounded, compacted context and once sending every earlier turn
+verbatim, then compares turn 1, turn 2 and the last turn.
+
+Usage:
+    python benchmarks/bench_followups.py --provider openai --turns 20 --context-tokens 1500
+"""
+
+import argparse
+import os
+import statistics
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.study_buddy import SmartStudyBuddy  # noqa: E402
+
+QUESTIONS = [
+    "Why are leaves green?",
+    "What happens to plants at night?",
+    "Where does the oxygen come from?",
+    "Do all plants need sunlight?",
+    "How do cacti survive in deserts?",
+    "What is chlorophyll made of?",
+    "Why do leaves change colour in autumn?",
+    "Can photosynthesis happen under a lamp?",
+    "How do plants get water to their leaves?",
+    "What would happen without photosynthesis?",
+]
+
+
+def run(buddy: SmartStudyBuddy, turns: int, context_tokens: int, recent_turns: int) -> list:
+    conversation = buddy.start_conversation("photosynthesis", "middle_school", context_tokens=context_tokens)
+    conversation.recent_turns = recent_turns
+    for i in range(turns - 1):
+        buddy.follow_up(conversation, QUESTIONS[i % len(QUESTIONS)])
+    return conversation.turns
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--provider", default="openai")
+    parser.add_argument("--model", default=None)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--context-tokens", type=int, default=1500)
+    args = parser.parse_args()
+
+    buddy = SmartStudyBuddy(provider=args.provider, model=args.model)
+    modes = {
+        "bounded": run(buddy, args.turns, args.context_tokens, recent_turns=2),
+        "unbounded": run(buddy, args.turns, 10 ** 9, recent_turns=args.turns),
+    }
+
+    print(f"{'mode':>10} {'turn':>5} {'prompt tok':>11} {'latency ms':>11}")
+    for mode, turns in modes.items():
+        for turn in (turns[0], turns[1], turns[-1]):
+            print(f"{mode:>10} {turn['turn']:>5} {turn['context_tokens']:>11} {turn['latency_ms']:>11.0f}")
+        follow_ups = [t["latency_ms"] for t in turns[1:]]
+        print(f"{mode:>10} {'p50':>5} {'':>11} {statistics.median(follow_ups):>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
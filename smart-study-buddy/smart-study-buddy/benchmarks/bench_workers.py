@@ -0,0 +1,126 @@
+"""
+Smart Study Buddy - Worker Scaling Benchmark
+Measures API throughput for 1..N worker processes.
+
+Each run starts ``api_server.py --workers N`` against a synthetic bundle
+(so no API keys or upstream calls are involved), drives ``POST /explain``
+with concurrent clients and reports requests per second.
+
+Usage:
+    python benchmarks/bench_workers.py --workers 1 2 4 8 --duration 10
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.bundle import build_bundle  # noqa: E402
+
+TOPICS = [f"benchmark topic {i}" for i in range(500)]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_ready(url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{url}/health", timeout=1.0).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server at {url} did not become ready")
+
+
+async def _drive(url: str, duration: float, concurrency: int) -> tuple:
+    """Closed-loop load: each client sends its next request when the last returns"""
+    done, errors = 0, 0
+    deadline = time.monotonic() + duration
+
+    async def client(http: httpx.AsyncClient):
+        nonlocal done, errors
+        while time.monotonic() < deadline:
+            response = await http.post("/explain", json={"topic": random.choice(TOPICS), "audience": "child"})
+            if response.status_code == 200:
+                done += 1
+            else:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30.0) as http:
+        start = time.monotonic()
+        await asyncio.gather(*(client(http) for _ in range(concurrency)))
+        elapsed = time.monotonic() - start
+    return done, errors, elapsed
+
+
+def run(workers: int, workdir: str, bundle_path: str, duration: float, concurrency: int) -> dict:
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}"
+    env = dict(
+        os.environ,
+        EXPLANATION_BUNDLE=bundle_path,
+        STATE_DB=os.path.join(workdir, f"state-{workers}.db"),
+        EXPLANATION_STORE=os.path.join(workdir, f"store-{workers}.db"),
+        JOB_DB=os.path.join(workdir, f"jobs-{workers}.db"),
+        JOB_WORKERS="1",
+        OPENAI_API_KEY=os.getenv("OPENAI_API_KEY", "sk-benchmark")
+    )
+    server = subprocess.Popen(
+        [sys.executable, "api_server.py", "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers)],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    try:
+        _wait_ready(url)
+        asyncio.run(_drive(url, 1.0, concurrency))  # warm up every worker
+        done, errors, elapsed = asyncio.run(_drive(url, duration, concurrency))
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    return {"workers": workers, "requests": done, "errors": errors, "rps": done / elapsed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of load per run")
+    parser.add_argument("--concurrency", type=int, default=64, help="Concurrent clients")
+    args = parser.parse_args()
+
+    print(f"CPUs: {os.cpu_count()}  concurrency: {args.concurrency}  duration: {args.duration}s")
+    with tempfile.TemporaryDirectory() as workdir:
+        bundle_path = os.path.join(workdir, "bench.bundle")
+        build_bundle(
+            ({"topic": t, "audience": "child", "explanation": f"A short explanation of {t}. " * 20} for t in TOPICS),
+            bundle_path
+        )
+
+        baseline = None
+        print(f"{'workers':>8} {'req/s':>10} {'speedup':>8} {'errors':>7}")
+        for workers in args.workers:
+            result = run(workers, workdir, bundle_path, args.duration, args.concurrency)
+            baseline = baseline or result["rps"]
+            print(f"{workers:>8} {result['rps']:>10.1f} {result['rps'] / baseline:>7.2f}x {result['errors']:>7}")
+
+
+if __name__ == "__main__":
+    main()
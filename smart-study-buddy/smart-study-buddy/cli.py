@@ -2,27 +2,60 @@
 Smart Study Buddy - Command Line Interface
 """
 
+import json
+import os
+import time
 import typer
 from typing import Optional
 from rich.console import Console
 from rich.markdown import Markdown
 from rich.panel import Panel
+from rich.table import Table
+from rich.live import Live
+from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TimeRemainingColumn
 from src.study_buddy import SmartStudyBuddy
+from src.ai_client import AIClient
+from src.bundle import build_bundle as compile_bundle
+from src.store import ExplanationStore, DEFAULT_STORE_PATH
+from src.batch import BatchRunner, read_records, count_records
+from src.bulk import BulkRunner
+from src.curriculum import CurriculumRunner, render_markdown
+from src.benchmark import (
+    GridBenchmark, SimulatedClient, ReplayClient, DEFAULT_TOPICS, build_grid, load_recordings,
+    summarize, compare, write_results, load_results, prices_from_policy
+)
+from src.streaming import coalesce, StreamStats
+from src.deadline import Deadline, DeadlineExceeded
+from src.tiering import policy_from_env, load_shadow_log, shadow_report as compare_shadow
+from src.logs import configure_logging, parse_sample_rates
 from src.prompts import AUDIENCE_LEVELS, TONES, LENGTHS
 
 app = typer.Typer(help="🎓 Smart Study Buddy - Adaptive AI Tutor")
 console = Console()
 
 
+@app.callback()
+def main(
+    log_level: Optional[str] = typer.Option(
+        None, "--log-level", envvar="LOG_LEVEL", help="Write JSON event logs to stderr at this level (e.g. INFO)"
+    ),
+):
+    """🎓 Smart Study Buddy - Adaptive AI Tutor"""
+    if log_level:
+        configure_logging(log_level, sample_rates=parse_sample_rates(os.getenv("LOG_SAMPLE_RATES")))
+
+
 @app.command()
 def explain(
     topic: str = typer.Argument(..., help="Topic to explain"),
     audience: str = typer.Option("beginner", "--audience", "-a", help="Audience level"),
     tone: Optional[str] = typer.Option(None, "--tone", "-t", help="Tone (playful/neutral/academic/professional)"),
     length: Optional[str] = typer.Option(None, "--length", "-l", help="Length (short/medium/detailed)"),
-    provider: str = typer.Option("openai", "--provider", "-p", help="AI provider (openai/anthropic)"),
+    provider: str = typer.Option("openai", "--provider", "-p", help="AI provider (openai/anthropic/openai_compatible)"),
     model: Optional[str] = typer.Option(None, "--model", "-m", help="Specific model to use"),
     stream: bool = typer.Option(False, "--stream", "-s", help="Stream the response"),
+    max_sections: Optional[int] = typer.Option(None, "--sections", "-n", help="Stop after N teaching sections (1 = core idea only)"),
+    timeout: Optional[float] = typer.Option(None, "--timeout", help="Give up after this many seconds"),
 ):
     """
     Explain a topic to a specific audience
@@ -40,16 +73,44 @@ def explain(
     console.print()
     
     try:
-        buddy = SmartStudyBuddy(provider=provider, model=model)
+        buddy = SmartStudyBuddy(provider=provider, model=model, store=ExplanationStore(), policy=policy_from_env())
+        deadline = Deadline.after(timeout)
         
-        if stream:
+        if max_sections:
+            parts = []
+            events = buddy.explain_sections(topic, audience, tone, length, max_sections=max_sections, deadline=deadline)
+            try:
+                for event in events:
+                    if event["type"] == "section_start":
+                        title, parts = event["heading"].strip("#* ") or "Intro", []
+                    elif event["type"] == "delta":
+                        parts.append(event["text"])
+                    else:
+                        console.print(Panel(Markdown("".join(parts)), title=title, border_style="green"))
+            finally:
+                # Ctrl-C: close the stream now so the provider stops generating
+                events.close()
+        elif stream:
             console.print("[bold green]Generating explanation (streaming)...[/bold green]\n")
-            for chunk in buddy.explain(topic, audience, tone, length, stream=True):
-                console.print(chunk, end="")
-            console.print("\n")
+            stats = StreamStats()
+            parts = []
+            frames = coalesce(buddy.explain(topic, audience, tone, length, stream=True, deadline=deadline), stats=stats)
+            try:
+                # Live redraws at most refresh_per_second; frames only update the buffer
+                with Live(Markdown(""), console=console, refresh_per_second=8, vertical_overflow="visible") as live:
+                    for frame in frames:
+                        parts.append(frame)
+                        live.update(Markdown("".join(parts)), refresh=False)
+            finally:
+                frames.close()
+            summary = stats.summary()
+            console.print(
+                f"\n[dim]First token {summary['ttft_ms']} ms · "
+                f"{summary['deltas']} deltas in {summary['frames']} frames[/dim]\n"
+            )
         else:
             with console.status("[bold green]Generating explanation..."):
-                explanation = buddy.explain(topic, audience, tone, length)
+                explanation = buddy.explain(topic, audience, tone, length, deadline=deadline)
             
             console.print(Panel(
                 Markdown(explanation),
@@ -57,6 +118,12 @@ def explain(
                 border_style="green"
             ))
     
+    except KeyboardInterrupt:
+        console.print("\n[yellow]Cancelled.[/yellow]")
+        raise typer.Exit(130)
+    except DeadlineExceeded:
+        console.print(f"[bold red]Error:[/bold red] No complete explanation within {timeout:g}s")
+        raise typer.Exit(1)
     except Exception as e:
         console.print(f"[bold red]Error:[/bold red] {str(e)}")
         raise typer.Exit(1)
@@ -66,14 +133,15 @@ def explain(
 def interactive(
     provider: str = typer.Option("openai", "--provider", "-p", help="AI provider"),
     model: Optional[str] = typer.Option(None, "--model", "-m", help="Specific model"),
+    context_tokens: Optional[int] = typer.Option(None, "--context-tokens", help="Token budget for earlier turns sent with each follow-up"),
 ):
     """
-    Start interactive mode with prompts
+    Start interactive mode with prompts and follow-up questions
     """
     console.print("[bold cyan]🎓 Smart Study Buddy - Interactive Mode[/bold cyan]\n")
     
     try:
-        buddy = SmartStudyBuddy(provider=provider, model=model)
+        buddy = SmartStudyBuddy(provider=provider, model=model, store=ExplanationStore())
         
         # Get topic
         topic = typer.prompt("What topic would you like explained?")
@@ -92,19 +160,36 @@ def interactive(
         console.print()
         
         with console.status("[bold green]Generating explanation..."):
-            explanation = buddy.explain(
+            conversation = buddy.start_conversation(
                 topic,
                 audience,
                 tone if tone else None,
-                length if length else None
+                length if length else None,
+                context_tokens=context_tokens
             )
         
         console.print(Panel(
-            Markdown(explanation),
+            Markdown(conversation.turns[0]["answer"]),
             title=f"Explanation: {topic}",
             border_style="green"
         ))
         
+        while True:
+            question = typer.prompt("\nFollow-up question (empty to finish)", default="", show_default=False)
+            if not question.strip():
+                break
+            with console.status("[bold green]Thinking..."):
+                answer = buddy.follow_up(conversation, question)
+            turn = conversation.turns[-1]
+            console.print(Panel(Markdown(answer), title=question, border_style="green"))
+            console.print(
+                f"[dim]Turn {turn['turn']} · ~{turn['context_tokens']} prompt tokens · "
+                f"{turn['latency_ms']:.0f} ms[/dim]"
+            )
+        
+    except KeyboardInterrupt:
+        console.print("\n[yellow]Cancelled.[/yellow]")
+        raise typer.Exit(130)
     except Exception as e:
         console.print(f"[bold red]Error:[/bold red] {str(e)}")
         raise typer.Exit(1)
@@ -112,29 +197,42 @@ def interactive(
 
 @app.command()
 def batch(
-    topics: str = typer.Argument(..., help="Comma-separated topics"),
-    audience: str = typer.Option("beginner", "--audience", "-a", help="Audience level"),
+    topics: Optional[str] = typer.Argument(None, help="Comma-separated topics"),
+    audience: str = typer.Option("beginner", "--audience", "-a", help="Audience level (default for file records)"),
     provider: str = typer.Option("openai", "--provider", "-p", help="AI provider"),
+    model: Optional[str] = typer.Option(None, "--model", "-m", help="Specific model"),
+    input_path: Optional[str] = typer.Option(None, "--input", "-i", help="JSONL or CSV file of records (topic, audience, tone, length)"),
+    output_path: str = typer.Option("batch_results.jsonl", "--output", "-o", help="JSONL results file (used as the resume checkpoint)"),
+    workers: int = typer.Option(4, "--workers", "-w", help="Concurrent requests in file mode"),
+    rpm: Optional[float] = typer.Option(None, "--rpm", help="Maximum requests per minute in file mode"),
 ):
     """
-    Explain multiple topics for the same audience
+    Explain multiple topics for the same audience, or run a file-driven batch
     
     Example:
         python cli.py batch "gravity,photosynthesis,DNA" --audience middle_school
+        python cli.py batch --input topics.csv --output results.jsonl --workers 8 --rpm 500
     """
+    if input_path:
+        _run_batch_file(input_path, output_path, audience, provider, model, workers, rpm)
+        return
+    if not topics:
+        console.print("[bold red]Error:[/bold red] pass comma-separated topics or --input FILE")
+        raise typer.Exit(1)
+    
     topic_list = [t.strip() for t in topics.split(",")]
     
-    console.print(f"\n[bold cyan]🎓 Batch Explanation Mode[/bold cyan]")
+    console.print("\n[bold cyan]🎓 Batch Explanation Mode[/bold cyan]")
     console.print(f"[dim]Topics:[/dim] {len(topic_list)}")
     console.print(f"[dim]Audience:[/dim] {audience}\n")
     
     try:
-        buddy = SmartStudyBuddy(provider=provider)
+        buddy = SmartStudyBuddy(provider=provider, model=model, store=ExplanationStore(), policy=policy_from_env())
         
         for i, topic in enumerate(topic_list, 1):
             console.print(f"[bold yellow]{i}/{len(topic_list)}[/bold yellow] {topic}")
             
-            with console.status(f"[bold green]Generating..."):
+            with console.status("[bold green]Generating..."):
                 explanation = buddy.explain(topic, audience)
             
             console.print(Panel(
@@ -149,6 +247,392 @@ def batch(
         raise typer.Exit(1)
 
 
+def _run_batch_file(input_path, output_path, audience, provider, model, workers, rpm):
+    """Stream records from a file through a resumable BatchRunner with a live summary"""
+    console.print("\n[bold cyan]🎓 Batch File Mode[/bold cyan]")
+    console.print(f"[dim]Input:[/dim] {input_path}")
+    console.print(f"[dim]Output:[/dim] {output_path}\n")
+    
+    try:
+        buddy = SmartStudyBuddy(
+            provider=provider, model=model, store=ExplanationStore(), max_history=1, policy=policy_from_env()
+        )
+        runner = BatchRunner(buddy, output_path, workers=workers, requests_per_minute=rpm)
+        
+        with Progress(
+            SpinnerColumn(),
+            TextColumn("[bold green]{task.completed}/{task.total}"),
+            BarColumn(),
+            TextColumn("{task.fields[rate]:.2f}/s · failed {task.fields[failed]} · resumed {task.fields[skipped]}"),
+            TimeRemainingColumn(),
+            console=console
+        ) as progress:
+            task = progress.add_task("batch", total=count_records(input_path), rate=0.0, failed=0, skipped=0)
+            counts = {"done": 0, "failed": 0, "skipped": 0}
+            started = time.perf_counter()
+            
+            def on_progress(status, record):
+                counts[status] += 1
+                progress.update(
+                    task,
+                    advance=1,
+                    rate=counts["done"] / max(time.perf_counter() - started, 1e-9),
+                    failed=counts["failed"],
+                    skipped=counts["skipped"]
+                )
+            
+            summary = runner.run(read_records(input_path, default_audience=audience), on_progress=on_progress)
+        
+        console.print(
+            f"[bold green]✅ {summary['completed']} completed[/bold green], "
+            f"{summary['failed']} failed, {summary['skipped']} already done "
+            f"in {summary['elapsed_s']:.1f}s"
+        )
+        if summary["failed"]:
+            console.print(f"[yellow]Failures logged to {runner.errors_path}; re-run to retry them.[/yellow]")
+    
+    except Exception as e:
+        console.print(f"[bold red]Error:[/bold red] {str(e)}")
+        raise typer.Exit(1)
+
+
+@app.command()
+def bulk(
+    input_path: Optional[str] = typer.Option(None, "--input", "-i", help="JSONL or CSV file of records to submit"),
+    resume: Optional[str] = typer.Option(None, "--resume", "-r", help="Run id to poll instead of submitting"),
+    audience: str = typer.Option("beginner", "--audience", "-a", help="Default audience for file records"),
+    provider: str = typer.Option("openai", "--provider", "-p", help="AI provider (openai or anthropic)"),
+    model: Optional[str] = typer.Option(None, "--model", "-m", help="Specific model"),
+    directory: str = typer.Option("bulk_jobs", "--dir", "-d", help="Directory for run manifests and results"),
+    wait: bool = typer.Option(True, "--wait/--no-wait", help="Poll until the run completes"),
+    poll_interval: float = typer.Option(60.0, "--poll-interval", help="Seconds between status checks"),
+    max_attempts: int = typer.Option(3, "--max-attempts", help="Submissions per item before giving up"),
+    regenerate: bool = typer.Option(False, "--regenerate", help="Include variants that are already cached"),
+):
+    """
+    Generate explanations through the provider's batch API (nightly jobs)
+    
+    Results arrive within the provider's batch window (up to 24 h) and are
+    ingested into the store. Submit with --no-wait and poll later with --resume.
+    
+    Example:
+        python cli.py bulk --input topics.csv --no-wait
+        python cli.py bulk --resume 20260101-020000-ab12cd
+    """
+    if not input_path and not resume:
+        console.print("[bold red]Error:[/bold red] pass --input FILE or --resume RUN_ID")
+        raise typer.Exit(1)
+    
+    console.print("\n[bold cyan]🎓 Bulk Batch-API Mode[/bold cyan]")
+    
+    try:
+        store = ExplanationStore()
+        buddy = SmartStudyBuddy(provider=provider, model=model, store=store, max_history=1)
+        runner = BulkRunner(buddy, directory=directory, max_attempts=max_attempts, skip_cached=not regenerate)
+        run_id = resume or runner.submit(read_records(input_path, default_audience=audience))
+        console.print(f"[dim]Run:[/dim] {run_id}\n")
+        
+        def on_progress(summary):
+            console.print(
+                f"[dim]{time.strftime('%H:%M:%S')}[/dim] {summary['done']}/{summary['total']} done, "
+                f"{summary['failed']} failed, {summary['pending']} pending ({summary['batches']} batch jobs)"
+            )
+        
+        if wait:
+            summary = runner.wait(run_id, poll_interval=poll_interval, on_progress=on_progress)
+        else:
+            summary = runner.poll(run_id)
+            on_progress(summary)
+        store.flush()
+        
+        if summary["complete"]:
+            console.print(f"[bold green]✅ Run complete: {summary['done']} ingested, {summary['failed']} failed[/bold green]")
+        else:
+            console.print(f"[yellow]Still running; poll again with --resume {run_id}[/yellow]")
+    
+    except Exception as e:
+        console.print(f"[bold red]Error:[/bold red] {str(e)}")
+        raise typer.Exit(1)
+
+
+@app.command()
+def curriculum(
+    subject: str = typer.Argument(..., help="Subject of the study guide"),
+    audience: str = typer.Option("beginner", "--audience", "-a", help="Audience level"),
+    tone: Optional[str] = typer.Option(None, "--tone", "-t", help="Tone"),
+    length: Optional[str] = typer.Option(None, "--length", "-l", help="Length of each subtopic"),
+    provider: str = typer.Option("openai", "--provider", "-p", help="AI provider"),
+    model: Optional[str] = typer.Option(None, "--model", "-m", help="Specific model"),
+    output_path: str = typer.Option("curriculum.jsonl", "--output", "-o", help="JSONL plan and results (used to resume)"),
+    markdown_path: Optional[str] = typer.Option(None, "--markdown", help="Also write the study guide as Markdown"),
+    workers: int = typer.Option(4, "--workers", "-w", help="Subtopics generated concurrently"),
+    max_topics: int = typer.Option(20, "--max-topics", help="Upper bound on planned subtopics"),
+):
+    """
+    Plan a prerequisite graph for a subject and explain every subtopic
+    
+    Example:
+        python cli.py curriculum "cell biology" --audience high_school --markdown cell-biology.md
+    """
+    console.print("\n[bold cyan]🎓 Curriculum Mode[/bold cyan]")
+    console.print(f"[dim]Subject:[/dim] {subject}")
+    console.print(f"[dim]Audience:[/dim] {audience}\n")
+    
+    try:
+        buddy = SmartStudyBuddy(provider=provider, model=model, store=ExplanationStore(), policy=policy_from_env())
+        runner = CurriculumRunner(buddy, output_path, workers=workers, max_topics=max_topics)
+        plan, nodes = None, {}
+        
+        with console.status("[bold green]Planning subtopics...") as status:
+            for event in runner.run(subject, audience, tone, length):
+                if event["type"] == "plan":
+                    plan = event
+                    for i, level in enumerate(plan["levels"]):
+                        console.print(f"[bold yellow]Level {i}[/bold yellow] " + " · ".join(level))
+                    console.print()
+                    status.update("[bold green]Explaining subtopics...")
+                elif event["type"] == "node":
+                    nodes[event["topic"]] = event
+                    style = "red" if event["status"] == "failed" else "green"
+                    detail = event.get("error") or f"{event['status']}" + (
+                        f", {event['latency_s']:.1f}s" if "latency_s" in event else ""
+                    )
+                    console.print(
+                        f"[{style}]{len(nodes)}/{len(plan['graph'])}[/{style}] "
+                        f"[dim]L{event['level']}[/dim] {event['topic']} [dim]({detail})[/dim]"
+                    )
+                else:
+                    console.print(
+                        f"\n[bold green]✅ {event['topics']} subtopics over {event['depth']} levels[/bold green] "
+                        f"in {event['elapsed_s']:.1f}s ({event['generated']} generated, {event['cached']} cached, "
+                        f"{event['resumed']} resumed, {event['failed']} failed)"
+                    )
+        
+        if markdown_path:
+            with open(markdown_path, "w", encoding="utf-8") as f:
+                f.write(render_markdown(plan, nodes))
+            console.print(f"[dim]Study guide written to {markdown_path}[/dim]")
+    
+    except KeyboardInterrupt:
+        console.print(f"\n[yellow]Stopped. Re-run the same command to resume from {output_path}.[/yellow]")
+        raise typer.Exit(130)
+    except Exception as e:
+        console.print(f"[bold red]Error:[/bold red] {str(e)}")
+        raise typer.Exit(1)
+
+
+@app.command()
+def search(
+    query: str = typer.Argument(..., help="Search terms"),
+    audience: Optional[str] = typer.Option(None, "--audience", "-a", help="Audience level filter"),
+    limit: int = typer.Option(10, "--limit", "-n", help="Maximum results"),
+    db: str = typer.Option(DEFAULT_STORE_PATH, "--db", help="Explanation store file"),
+):
+    """
+    Search previously generated explanations
+    
+    Example:
+        python cli.py search "photosynthesis light" --audience middle_school
+    """
+    try:
+        store = ExplanationStore(db)
+        results = store.search(query, limit=limit, audience=audience)
+        store.close()
+        
+        if not results:
+            console.print("[yellow]No stored explanations match.[/yellow]")
+            return
+        
+        for i, result in enumerate(results, 1):
+            details = " · ".join(
+                str(v) for v in (result["audience"], result["tone"], result["length"], result["model"]) if v
+            )
+            console.print(f"[bold yellow]{i}.[/bold yellow] [bold]{result['topic']}[/bold] [dim]{details}[/dim]")
+            console.print(f"   {result['snippet']}\n")
+    
+    except Exception as e:
+        console.print(f"[bold red]Error:[/bold red] {str(e)}")
+        raise typer.Exit(1)
+
+
+@app.command()
+def build_bundle(
+    source: str = typer.Argument(..., help="JSONL file of generated explanations"),
+    output: str = typer.Argument(..., help="Bundle file to write"),
+):
+    """
+    Compile generated explanations into a read-only bundle for the API server
+    
+    Each JSONL line needs topic, audience and explanation (tone/length optional).
+    GET /explanations only serves lines that also carry the model and
+    prompt_version they were generated with, as batch output does.
+    Serve it with: EXPLANATION_BUNDLE=<output> python api_server.py
+    
+    Example:
+        python cli.py build-bundle curriculum.jsonl curriculum.ssb
+    """
+    try:
+        with open(source, encoding="utf-8") as f:
+            records = (json.loads(line) for line in f if line.strip())
+            count = compile_bundle(records, output)
+        console.print(f"[bold green]✅ Wrote {count} explanations to {output}[/bold green]")
+    
+    except Exception as e:
+        console.print(f"[bold red]Error:[/bold red] {str(e)}")
+        raise typer.Exit(1)
+
+
+@app.command()
+def shadow_report(
+    log: str = typer.Argument("shadow_tests.jsonl", help="Shadow-test log written by the tiering policy"),
+):
+    """
+    Compare latency and cost of shadow-tested tiers against the tiers they shadowed
+    
+    Example:
+        python cli.py shadow-report shadow_tests.jsonl
+    """
+    try:
+        rows = compare_shadow(load_shadow_log(log))
+        if not rows:
+            console.print("[yellow]No shadow-test samples yet.[/yellow]")
+            return
+        
+        table = Table(title="Shadow tests")
+        for column in ("Primary → shadow", "Samples", "p50 ms", "p95 ms", "Mean cost", "Cost ×", "Latency ×"):
+            table.add_column(column, justify="left" if column.startswith("Primary") else "right")
+        for row in rows:
+            table.add_row(
+                f"{row['primary']} → {row['shadow']}",
+                str(row["samples"]),
+                f"{row['primary_p50_ms']:.0f} → {row['shadow_p50_ms']:.0f}",
+                f"{row['primary_p95_ms']:.0f} → {row['shadow_p95_ms']:.0f}",
+                f"${row['primary_mean_cost']:.5f} → ${row['shadow_mean_cost']:.5f}",
+                f"{row['cost_ratio']}" if row["cost_ratio"] is not None else "-",
+                f"{row['latency_ratio']}" if row["latency_ratio"] is not None else "-"
+            )
+        console.print(table)
+    
+    except Exception as e:
+        console.print(f"[bold red]Error:[/bold red] {str(e)}")
+        raise typer.Exit(1)
+
+
+def _split(value: Optional[str], default: list) -> list:
+    """Comma-separated option values ("none" for unset tone/length)"""
+    if not value:
+        return default
+    return [None if v.strip().lower() == "none" else v.strip() for v in value.split(",")]
+
+
+@app.command()
+def benchmark(
+    targets: str = typer.Option("openai", "--targets", "-T", help="Comma-separated provider:model targets"),
+    audiences: Optional[str] = typer.Option(None, "--audiences", help="Comma-separated audiences (default: all)"),
+    tones: Optional[str] = typer.Option(None, "--tones", help="Comma-separated tones, 'none' for unset (default: all)"),
+    lengths: Optional[str] = typer.Option(None, "--lengths", help="Comma-separated lengths, 'none' for unset (default: all)"),
+    topics_path: Optional[str] = typer.Option(None, "--topics", help="File with one topic per line (default: built-in set)"),
+    workers: int = typer.Option(4, "--workers", "-w", help="Cells run concurrently"),
+    rpm: Optional[float] = typer.Option(None, "--rpm", help="Maximum requests per minute per target"),
+    prices_path: Optional[str] = typer.Option(None, "--prices", help="JSON of model -> {input, output} $ per 1k tokens"),
+    output_path: str = typer.Option("benchmark_results.json", "--output", "-o", help="JSON results file"),
+    baseline_path: Optional[str] = typer.Option(None, "--baseline", help="Earlier results file to compare against"),
+    by: str = typer.Option("target", "--by", help="Report grouping, e.g. target,length"),
+    simulate: bool = typer.Option(False, "--simulate", help="Use simulated responses (no network)"),
+    replay_path: Optional[str] = typer.Option(None, "--replay", help="Replay responses recorded with --record (no network)"),
+    record_path: Optional[str] = typer.Option(None, "--record", help="Record responses to JSONL for later --replay"),
+    time_scale: float = typer.Option(0.01, "--time-scale", help="Wait scale for --simulate/--replay"),
+    timeout: float = typer.Option(120.0, "--timeout", help="Seconds before a cell is abandoned"),
+):
+    """
+    Benchmark providers/models over audiences, tones and lengths
+    
+    Example:
+        python cli.py benchmark -T openai:gpt-4o,openai:gpt-4o-mini --lengths short --rpm 60
+        python cli.py benchmark -T openai:gpt-4o --simulate --baseline last.json
+    """
+    try:
+        target_list = _split(targets, [])
+        topics = DEFAULT_TOPICS
+        if topics_path:
+            with open(topics_path, encoding="utf-8") as f:
+                topics = [line.strip() for line in f if line.strip()]
+        cells = build_grid(
+            target_list,
+            topics,
+            _split(audiences, list(AUDIENCE_LEVELS)),
+            _split(tones, TONES),
+            _split(lengths, LENGTHS)
+        )
+        
+        prices = prices_from_policy(policy_from_env())
+        if prices_path:
+            with open(prices_path, encoding="utf-8") as f:
+                prices.update(json.load(f))
+        
+        if replay_path:
+            recordings = load_recordings(replay_path)
+            mode, factory = "replay", lambda p, m: ReplayClient(p, m, recordings, time_scale)
+        elif simulate:
+            mode, factory = "simulate", lambda p, m: SimulatedClient(p, m, time_scale)
+        else:
+            mode, factory, time_scale = "live", AIClient, 1.0
+        
+        console.print(f"\n[bold cyan]📊 Benchmark[/bold cyan] [dim]({mode})[/dim]")
+        console.print(f"[dim]Cells:[/dim] {len(cells)} = {len(target_list)} target(s) × {len(topics)} topics × grid\n")
+        
+        bench = GridBenchmark(
+            factory, workers=workers, requests_per_minute=rpm, prices=prices, time_scale=time_scale, timeout=timeout
+        )
+        results = []
+        with Progress(
+            SpinnerColumn(),
+            TextColumn("[bold green]{task.completed}/{task.total}"),
+            BarColumn(),
+            TextColumn("failed {task.fields[failed]}"),
+            TimeRemainingColumn(),
+            console=console
+        ) as progress:
+            task = progress.add_task("benchmark", total=len(cells), failed=0)
+            for result in bench.run(cells, record_path=record_path):
+                results.append(result)
+                progress.update(task, advance=1, failed=sum(r["error"] is not None for r in results))
+        
+        write_results(output_path, {
+            "mode": mode,
+            "targets": target_list,
+            "topics": topics,
+            "workers": workers,
+            "rpm": rpm,
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S")
+        }, results)
+        
+        group = tuple(k.strip() for k in by.split(","))
+        table = Table(title="Benchmark by " + ", ".join(group))
+        columns = [*group, "cells", "errors", "p50_ms", "p95_ms", "ttft_p50_ms", "tokens_per_s", "mean_output_tokens", "total_cost"]
+        for column in columns:
+            table.add_column(column, justify="left" if column in group else "right")
+        for row in summarize(results, by=group):
+            table.add_row(*("-" if row[c] is None else str(row[c]) for c in columns))
+        console.print(table)
+        
+        if baseline_path:
+            changes = compare(load_results(baseline_path)["summary"], summarize(results))
+            delta = Table(title=f"Change vs {baseline_path} (%)")
+            metrics_columns = ["p50_ms", "p95_ms", "ttft_p50_ms", "tokens_per_s", "mean_output_tokens", "total_cost"]
+            for column in ["target", *metrics_columns]:
+                delta.add_column(column, justify="left" if column == "target" else "right")
+            for row in changes:
+                delta.add_row(row["target"], *("-" if row[c] is None else f"{row[c]:+.1f}" for c in metrics_columns))
+            console.print(delta)
+        
+        console.print(f"[bold green]✅ Results written to {output_path}[/bold green]")
+    
+    except Exception as e:
+        console.print(f"[bold red]Error:[/bold red] {str(e)}")
+        raise typer.Exit(1)
+
+
 @app.command()
 def list_options():
     """Show available audiences, tones, and lengths"""
@@ -0,0 +1,335 @@
+"""
+Smart Study Buddy - Admission Control
+Bounded in-flight work with priority queueing, weighted fair sharing
+between tenants and SLO-based load shedding
+"""
+
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Optional, Dict, Any
+
+from src.tracing import span
+
+# Priority classes, most urgent first
+INTERACTIVE = "interactive"
+BATCH = "batch"
+BACKGROUND = "background"
+PRIORITIES = {INTERACTIVE: 0, BATCH: 1, BACKGROUND: 2}
+
+
+class Overloaded(Exception):
+    """Raised when a request is shed instead of queued"""
+
+    def __init__(self, retry_after: float, reason: str = "overloaded"):
+        super().__init__(f"Server {reason}; retry in {retry_after:.1f}s")
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+class _Waiter:
+    """A queued request; woken by grant() or shed()"""
+
+    def __init__(
+        self,
+        priority: str,
+        loop: Optional[asyncio.AbstractEventLoop],
+        sheddable: bool,
+        tenant: str = "",
+        start_tag: float = 0.0
+    ):
+        self.priority = priority
+        self.sheddable = sheddable
+        self.tenant = tenant
+        self.start_tag = start_tag
+        self.loop = loop
+        self.future = loop.create_future() if loop is not None else None
+        self.event = threading.Event() if loop is None else None
+        self.error = None
+        self.done = False
+
+    def _wake(self):
+        if self.future is not None:
+            self.loop.call_soon_threadsafe(self._resolve)
+        else:
+            self.event.set()
+
+    def _resolve(self):
+        if not self.future.done():
+            self.future.set_result(None)
+
+    def grant(self):
+        self.done = True
+        self._wake()
+
+    def shed(self, error: Overloaded):
+        self.done = True
+        self.error = error
+        self._wake()
+
+
+class AdmissionController:
+    """
+    Admits at most ``max_in_flight`` requests at once. The rest wait in a
+    priority queue (interactive before batch before background). Within a
+    class, tenants share slots by weighted fair queueing (start-time fair
+    queueing on virtual finish tags), so a tenant with a deep backlog only
+    delays its own requests. A request is shed with Overloaded as soon as
+    its expected queue wait would exceed the SLO, or when it is pushed out
+    of a full queue by more urgent work.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = 32,
+        max_queue: int = 128,
+        slo: float = 5.0,
+        initial_service_time: float = 2.0,
+        metrics=None
+    ):
+        """
+        Initialize admission control
+
+        Args:
+            max_in_flight: Requests allowed to run concurrently
+            max_queue: Sheddable requests allowed to wait
+            slo: Longest acceptable queue wait in seconds
+            initial_service_time: Service time estimate before any request finishes
+            metrics: Optional Metrics receiving admitted/shed counts per class
+        """
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.slo = slo
+        self.service_time = initial_service_time
+        self.metrics = metrics
+        self.in_flight = 0
+        self.shed_counts = {name: 0 for name in PRIORITIES}
+        self._queue = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        # Weighted fair queueing state: system virtual time and each
+        # tenant's last finish tag
+        self._virtual_time = 0.0
+        self._finish_tags = {}
+
+    def _count(self, name: str):
+        if self.metrics is not None:
+            self.metrics.incr(name)
+
+    def _expected_wait(self, ahead: int) -> float:
+        """Seconds until ``ahead`` queued requests (plus this one) get a slot"""
+        return (ahead + 1) * self.service_time / self.max_in_flight
+
+    def _tags(self, tenant: str, weight: float):
+        """Start and finish tags for one more request from ``tenant``"""
+        start = max(self._virtual_time, self._finish_tags.get(tenant, 0.0))
+        finish = start + 1.0 / max(weight, 1e-6)
+        self._finish_tags[tenant] = finish
+        return start, finish
+
+    def _enqueue(self, priority: str, loop, sheddable: bool, tenant: str, weight: float) -> Optional[_Waiter]:
+        """Admit immediately (returns None), queue (returns the waiter) or raise Overloaded"""
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority class: {priority}")
+        rank = PRIORITIES[priority]
+        with self._lock:
+            live = [entry for entry in self._queue if not entry[-1].done]
+            if self.in_flight < self.max_in_flight and not live:
+                self.in_flight += 1
+                self._virtual_time = self._tags(tenant, weight)[0]
+                self._count(f"admission.admitted.{priority}")
+                return None
+
+            start, finish = self._tags(tenant, weight)
+            key = (rank, finish)
+            if sheddable:
+                ahead = sum(1 for entry in live if entry[:2] <= key)
+                expected = self._expected_wait(ahead)
+                if expected > self.slo:
+                    self._finish_tags[tenant] -= finish - start
+                    self._shed_locked(priority, expected, "over latency SLO")
+                queued = [entry for entry in live if entry[-1].sheddable]
+                if len(queued) >= self.max_queue:
+                    # Full: push out the least urgent waiter if it ranks below us
+                    victim = max(queued, key=lambda entry: entry[:3])
+                    if victim[:2] <= key:
+                        self._finish_tags[tenant] -= finish - start
+                        self._shed_locked(priority, expected, "queue full")
+                    victim[-1].shed(Overloaded(self._expected_wait(len(queued)), "queue full"))
+                    self.shed_counts[victim[-1].priority] += 1
+                    self._count(f"admission.shed.{victim[-1].priority}")
+
+            waiter = _Waiter(priority, loop, sheddable, tenant, start)
+            heapq.heappush(self._queue, (rank, finish, next(self._seq), waiter))
+            return waiter
+
+    def _shed_locked(self, priority: str, expected: float, reason: str):
+        self.shed_counts[priority] += 1
+        self._count(f"admission.shed.{priority}")
+        raise Overloaded(expected, reason)
+
+    def _abandon(self, waiter: _Waiter) -> bool:
+        """
+        Leave the queue after a timeout or cancellation
+
+        Returns:
+            False if the waiter left cleanly, True if it was granted or shed
+            concurrently (check waiter.error)
+        """
+        with self._lock:
+            if not waiter.done:
+                waiter.done = True
+                return False
+        return True
+
+    def _timed_out(self, priority: str):
+        """Queue wait ran past the SLO even though the estimate allowed it"""
+        with self._lock:
+            self._shed_locked(priority, self.service_time, "over latency SLO")
+
+    async def acquire(
+        self,
+        priority: str = INTERACTIVE,
+        sheddable: bool = True,
+        tenant: str = "",
+        weight: float = 1.0
+    ):
+        """
+        Wait for a slot (async callers)
+
+        Args:
+            priority: Priority class (interactive, batch or background)
+            sheddable: Whether the request may be refused instead of waiting
+            tenant: Tenant whose fair share the request counts against
+            weight: Tenant's relative share of the slots
+        """
+        waiter = self._enqueue(priority, asyncio.get_running_loop(), sheddable, tenant, weight)
+        if waiter is None:
+            return
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self.slo if sheddable else None)
+        except asyncio.TimeoutError:
+            if not self._abandon(waiter):
+                self._timed_out(priority)
+        except asyncio.CancelledError:
+            if self._abandon(waiter) and waiter.error is None:
+                self.release()
+            raise
+        if waiter.error is not None:
+            raise waiter.error
+
+    def acquire_sync(
+        self,
+        priority: str = BACKGROUND,
+        sheddable: bool = False,
+        tenant: str = "",
+        weight: float = 1.0
+    ):
+        """Wait for a slot (worker threads)"""
+        waiter = self._enqueue(priority, None, sheddable, tenant, weight)
+        if waiter is None:
+            return
+        if not waiter.event.wait(self.slo if sheddable else None):
+            if not self._abandon(waiter):
+                self._timed_out(priority)
+        if waiter.error is not None:
+            raise waiter.error
+
+    def release(self, held_for: Optional[float] = None):
+        """
+        Free a slot and pass it to the most urgent waiter
+
+        Args:
+            held_for: Seconds the slot was held (updates the service time estimate)
+        """
+        with self._lock:
+            if held_for is not None:
+                self.service_time = 0.8 * self.service_time + 0.2 * held_for
+            while self._queue:
+                waiter = heapq.heappop(self._queue)[-1]
+                if not waiter.done:
+                    self._virtual_time = waiter.start_tag
+                    self._count(f"admission.admitted.{waiter.priority}")
+                    waiter.grant()
+                    return
+            self.in_flight -= 1
+
+    async def hold(
+        self,
+        priority: str = INTERACTIVE,
+        sheddable: bool = True,
+        tenant: str = "",
+        weight: float = 1.0
+    ) -> "Slot":
+        """Acquire a slot to release later (e.g. when a streamed response ends)"""
+        with span("admission.queue", priority=priority, tenant=tenant or None):
+            await self.acquire(priority, sheddable, tenant, weight)
+        return Slot(self)
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        priority: str = INTERACTIVE,
+        sheddable: bool = True,
+        tenant: str = "",
+        weight: float = 1.0
+    ):
+        """``async with admission.slot("interactive"):`` around upstream work"""
+        held = await self.hold(priority, sheddable, tenant, weight)
+        try:
+            yield
+        finally:
+            held.release()
+
+    @contextmanager
+    def slot_sync(
+        self,
+        priority: str = BACKGROUND,
+        sheddable: bool = False,
+        tenant: str = "",
+        weight: float = 1.0
+    ):
+        """Thread counterpart of slot()"""
+        self.acquire_sync(priority, sheddable, tenant, weight)
+        held = Slot(self)
+        try:
+            yield
+        finally:
+            held.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """In-flight count, queue depth per class, shed counts and service time"""
+        with self._lock:
+            depth = {name: 0 for name in PRIORITIES}
+            by_tenant = {}
+            for entry in self._queue:
+                waiter = entry[-1]
+                if not waiter.done:
+                    depth[waiter.priority] += 1
+                    if waiter.tenant:
+                        by_tenant[waiter.tenant] = by_tenant.get(waiter.tenant, 0) + 1
+            return {
+                "in_flight": self.in_flight,
+                "max_in_flight": self.max_in_flight,
+                "queued": depth,
+                "queued_by_tenant": by_tenant,
+                "shed": dict(self.shed_counts),
+                "service_time_ms": round(self.service_time * 1000, 1)
+            }
+
+
+class Slot:
+    """An admitted request's slot; release() is idempotent"""
+
+    def __init__(self, controller: AdmissionController):
+        self.controller = controller
+        self.start = time.monotonic()
+        self.released = False
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            self.controller.release(time.monotonic() - self.start)
@@ -4,57 +4,124 @@ Supports both OpenAI and Anthropic APIs
 """
 
 import os
+import threading
+from contextlib import contextmanager
 from typing import Optional, Dict, Any
 from dotenv import load_dotenv
+from src.deadline import DeadlineExceeded, call_timeout
+from src.logs import get_logger, log_event
+from src.tracing import CLIENT, add_event, atraced_iter, span, traced_iter
 
 # Load environment variables
 load_dotenv()
 
+logger = get_logger("ai_client")
+
+
+def _raise_if_expired(deadline, error: Exception):
+    """Report an SDK timeout caused by the request deadline as DeadlineExceeded"""
+    if deadline is not None and deadline.expired:
+        raise DeadlineExceeded(f"Deadline of {deadline.budget:g}s exceeded") from error
+
+
+def _messages(user_prompt: str, kwargs: dict) -> list:
+    """Earlier turns (the ``history`` kwarg, alternating user/assistant) plus the new prompt"""
+    return list(kwargs.get("history") or []) + [{"role": "user", "content": user_prompt}]
+
+
+# Self-hosted inference servers speaking the OpenAI wire protocol
+OPENAI_COMPATIBLE = "openai_compatible"
+
 
 class AIClient:
-    """Unified client for OpenAI and Anthropic APIs"""
+    """Unified client for OpenAI, Anthropic and OpenAI-compatible APIs"""
     
     def __init__(self, provider: str = "openai", model: str = None):
         """
         Initialize AI client
         
         Args:
-            provider: "openai" or "anthropic"
+            provider: "openai", "anthropic" or "openai_compatible" (self-hosted
+                replicas listed in OPENAI_COMPATIBLE_ENDPOINTS)
             model: Model name (optional, uses env default)
         """
         self.provider = provider.lower()
         self.model = model or os.getenv("DEFAULT_MODEL", "gpt-4o")
         self.max_tokens = int(os.getenv("MAX_TOKENS", "2000"))
         self.temperature = float(os.getenv("TEMPERATURE", "0.7"))
+        # Default per-call timeout; a request deadline shortens it further
+        self.timeout = float(os.getenv("REQUEST_TIMEOUT", "120"))
+        self._local = threading.local()
+        self.pool = None
+        self._openai_label = "OpenAI"
         
         if self.provider == "openai":
             self._init_openai()
         elif self.provider == "anthropic":
             self._init_anthropic()
+        elif self.provider == OPENAI_COMPATIBLE:
+            self._init_openai_compatible(model)
         else:
             raise ValueError(f"Unsupported provider: {provider}")
     
+    async def aclose(self):
+        """Close pooled replica connections (sync and async) of an openai_compatible client"""
+        if self.pool is not None:
+            await self.pool.aclose()
+    
+    @property
+    def last_usage(self) -> Optional[Dict[str, int]]:
+        """Token usage of this thread's most recent non-streaming call"""
+        return getattr(self._local, "usage", None)
+    
     def _init_openai(self):
         """Initialize OpenAI client"""
         try:
-            from openai import OpenAI
+            from openai import OpenAI, AsyncOpenAI
             api_key = os.getenv("OPENAI_API_KEY")
             if not api_key:
                 raise ValueError("OPENAI_API_KEY not found in environment")
-            self.client = OpenAI(api_key=api_key)
-            print(f"✅ OpenAI client initialized with model: {self.model}")
+            self.client = OpenAI(api_key=api_key, timeout=self.timeout)
+            self.async_client = AsyncOpenAI(api_key=api_key, timeout=self.timeout)
+            log_event(logger, "client.initialized", provider="openai", model=self.model)
         except ImportError:
             raise ImportError("OpenAI package not installed. Run: pip install openai")
     
+    def _init_openai_compatible(self, model: Optional[str]):
+        """Initialize the pooled, load-balanced self-hosted endpoints"""
+        try:
+            import openai  # noqa: F401
+        except ImportError:
+            raise ImportError("OpenAI package not installed. Run: pip install openai")
+        from src.endpoints import EndpointPool, HTTP2_AVAILABLE
+        self.pool = EndpointPool.from_env(timeout=self.timeout)
+        self.model = model or os.getenv("OPENAI_COMPATIBLE_MODEL", self.model)
+        self._openai_label = "OpenAI-compatible endpoint"
+        protocol = "HTTP/2" if HTTP2_AVAILABLE else "HTTP/1.1 keep-alive"
+        log_event(
+            logger, "client.initialized",
+            provider=self.provider, model=self.model, endpoints=len(self.pool.endpoints), protocol=protocol
+        )
+    
+    @contextmanager
+    def _openai_endpoint(self, use_async: bool = False):
+        """OpenAI-protocol client for one call: a leased replica when pooled"""
+        if self.pool is None:
+            yield self.async_client if use_async else self.client
+            return
+        with self.pool.lease() as endpoint:
+            yield endpoint.async_client if use_async else endpoint.client
+    
     def _init_anthropic(self):
         """Initialize Anthropic client"""
         try:
-            from anthropic import Anthropic
+            from anthropic import Anthropic, AsyncAnthropic
             api_key = os.getenv("ANTHROPIC_API_KEY")
             if not api_key:
                 raise ValueError("ANTHROPIC_API_KEY not found in environment")
-            self.client = Anthropic(api_key=api_key)
-            print(f"✅ Anthropic client initialized with model: {self.model}")
+            self.client = Anthropic(api_key=api_key, timeout=self.timeout)
+            self.async_client = AsyncAnthropic(api_key=api_key, timeout=self.timeout)
+            log_event(logger, "client.initialized", provider="anthropic", model=self.model)
         except ImportError:
             raise ImportError("Anthropic package not installed. Run: pip install anthropic")
     
@@ -70,46 +137,69 @@ class AIClient:
         Args:
             system_prompt: System instructions
             user_prompt: User query
-            **kwargs: Additional parameters
+            **kwargs: Additional parameters (max_tokens, temperature,
+                history: earlier user/assistant messages of a conversation,
+                and deadline: a Deadline bounding the call and, when
+                streaming, every chunk)
         
         Returns:
             Generated explanation text
         """
-        if self.provider == "openai":
-            return self._generate_openai(system_prompt, user_prompt, **kwargs)
-        elif self.provider == "anthropic":
-            return self._generate_anthropic(system_prompt, user_prompt, **kwargs)
+        with span("llm.generate", CLIENT, provider=self.provider, model=self.model) as call:
+            if self.provider in ("openai", OPENAI_COMPATIBLE):
+                text = self._generate_openai(system_prompt, user_prompt, **kwargs)
+            elif self.provider == "anthropic":
+                text = self._generate_anthropic(system_prompt, user_prompt, **kwargs)
+            usage = self.last_usage or {}
+            call.set_attribute("input_tokens", usage.get("input_tokens"))
+            call.set_attribute("output_tokens", usage.get("output_tokens"))
+            return text
     
     def _generate_openai(self, system_prompt: str, user_prompt: str, **kwargs) -> str:
         """Generate using OpenAI API"""
+        deadline = kwargs.get("deadline")
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                max_tokens=kwargs.get("max_tokens", self.max_tokens),
-                temperature=kwargs.get("temperature", self.temperature)
-            )
-            return response.choices[0].message.content
+            with self._openai_endpoint() as client:
+                response = client.chat.completions.create(
+                    model=self.model,
+                    messages=[{"role": "system", "content": system_prompt}] + _messages(user_prompt, kwargs),
+                    max_tokens=kwargs.get("max_tokens", self.max_tokens),
+                    temperature=kwargs.get("temperature", self.temperature),
+                    timeout=call_timeout(deadline, self.timeout)
+                )
+                if response.usage:
+                    self._local.usage = {
+                        "input_tokens": response.usage.prompt_tokens,
+                        "output_tokens": response.usage.completion_tokens
+                    }
+                return response.choices[0].message.content
+        except DeadlineExceeded:
+            raise
         except Exception as e:
-            raise Exception(f"OpenAI API error: {str(e)}")
+            _raise_if_expired(deadline, e)
+            raise Exception(f"{self._openai_label} API error: {str(e)}")
     
     def _generate_anthropic(self, system_prompt: str, user_prompt: str, **kwargs) -> str:
         """Generate using Anthropic API"""
+        deadline = kwargs.get("deadline")
         try:
             response = self.client.messages.create(
                 model=self.model,
                 system=system_prompt,
-                messages=[
-                    {"role": "user", "content": user_prompt}
-                ],
+                messages=_messages(user_prompt, kwargs),
                 max_tokens=kwargs.get("max_tokens", self.max_tokens),
-                temperature=kwargs.get("temperature", self.temperature)
+                temperature=kwargs.get("temperature", self.temperature),
+                timeout=call_timeout(deadline, self.timeout)
             )
+            self._local.usage = {
+                "input_tokens": response.usage.input_tokens,
+                "output_tokens": response.usage.output_tokens
+            }
             return response.content[0].text
+        except DeadlineExceeded:
+            raise
         except Exception as e:
+            _raise_if_expired(deadline, e)
             raise Exception(f"Anthropic API error: {str(e)}")
     
     def stream_explanation(
@@ -124,49 +214,154 @@ class AIClient:
         Args:
             system_prompt: System instructions
             user_prompt: User query
-            **kwargs: Additional parameters
+            **kwargs: Additional parameters (max_tokens, temperature,
+                history: earlier user/assistant messages of a conversation,
+                and deadline: a Deadline bounding the call and, when
+                streaming, every chunk)
         
         Yields:
             Text chunks
         """
-        if self.provider == "openai":
-            yield from self._stream_openai(system_prompt, user_prompt, **kwargs)
+        if self.provider in ("openai", OPENAI_COMPATIBLE):
+            chunks = self._stream_openai(system_prompt, user_prompt, **kwargs)
         elif self.provider == "anthropic":
-            yield from self._stream_anthropic(system_prompt, user_prompt, **kwargs)
+            chunks = self._stream_anthropic(system_prompt, user_prompt, **kwargs)
+        yield from traced_iter("llm.stream", chunks, CLIENT, provider=self.provider, model=self.model)
     
     def _stream_openai(self, system_prompt: str, user_prompt: str, **kwargs):
         """Stream using OpenAI API"""
+        deadline = kwargs.get("deadline")
         try:
-            stream = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                max_tokens=kwargs.get("max_tokens", self.max_tokens),
-                temperature=kwargs.get("temperature", self.temperature),
-                stream=True
-            )
+            with self._openai_endpoint() as client:
+                stream = client.chat.completions.create(
+                    model=self.model,
+                    messages=[{"role": "system", "content": system_prompt}] + _messages(user_prompt, kwargs),
+                    max_tokens=kwargs.get("max_tokens", self.max_tokens),
+                    temperature=kwargs.get("temperature", self.temperature),
+                    timeout=call_timeout(deadline, self.timeout),
+                    stream=True
+                )
+                add_event("upstream.connected")
             
-            for chunk in stream:
-                if chunk.choices[0].delta.content:
-                    yield chunk.choices[0].delta.content
+                try:
+                    for chunk in stream:
+                        if deadline is not None:
+                            deadline.check()
+                        if chunk.choices[0].delta.content:
+                            yield chunk.choices[0].delta.content
+                finally:
+                    # Closing early (consumer stopped) drops the connection so
+                    # the provider stops generating
+                    stream.close()
+        except DeadlineExceeded:
+            raise
         except Exception as e:
-            raise Exception(f"OpenAI streaming error: {str(e)}")
+            _raise_if_expired(deadline, e)
+            raise Exception(f"{self._openai_label} streaming error: {str(e)}")
     
     def _stream_anthropic(self, system_prompt: str, user_prompt: str, **kwargs):
         """Stream using Anthropic API"""
+        deadline = kwargs.get("deadline")
         try:
             with self.client.messages.stream(
                 model=self.model,
                 system=system_prompt,
-                messages=[
-                    {"role": "user", "content": user_prompt}
-                ],
+                messages=_messages(user_prompt, kwargs),
                 max_tokens=kwargs.get("max_tokens", self.max_tokens),
-                temperature=kwargs.get("temperature", self.temperature)
+                temperature=kwargs.get("temperature", self.temperature),
+                timeout=call_timeout(deadline, self.timeout)
             ) as stream:
+                add_event("upstream.connected")
                 for text in stream.text_stream:
+                    if deadline is not None:
+                        deadline.check()
+                    yield text
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            _raise_if_expired(deadline, e)
+            raise Exception(f"Anthropic streaming error: {str(e)}")
+    
+    async def astream_explanation(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        **kwargs
+    ):
+        """
+        Stream explanation without blocking the event loop (async generator)
+        
+        Args:
+            system_prompt: System instructions
+            user_prompt: User query
+            **kwargs: Additional parameters (max_tokens, temperature,
+                history: earlier user/assistant messages of a conversation,
+                and deadline: a Deadline bounding the call and, when
+                streaming, every chunk)
+        
+        Yields:
+            Text chunks
+        """
+        if self.provider in ("openai", OPENAI_COMPATIBLE):
+            chunks = self._astream_openai(system_prompt, user_prompt, **kwargs)
+        elif self.provider == "anthropic":
+            chunks = self._astream_anthropic(system_prompt, user_prompt, **kwargs)
+        traced = atraced_iter("llm.stream", chunks, CLIENT, provider=self.provider, model=self.model)
+        try:
+            async for chunk in traced:
+                yield chunk
+        finally:
+            # Close now (not at garbage collection) so the upstream stream stops
+            await traced.aclose()
+    
+    async def _astream_openai(self, system_prompt: str, user_prompt: str, **kwargs):
+        """Async stream using OpenAI API"""
+        deadline = kwargs.get("deadline")
+        try:
+            with self._openai_endpoint(use_async=True) as client:
+                stream = await client.chat.completions.create(
+                    model=self.model,
+                    messages=[{"role": "system", "content": system_prompt}] + _messages(user_prompt, kwargs),
+                    max_tokens=kwargs.get("max_tokens", self.max_tokens),
+                    temperature=kwargs.get("temperature", self.temperature),
+                    timeout=call_timeout(deadline, self.timeout),
+                    stream=True
+                )
+                add_event("upstream.connected")
+            
+                try:
+                    async for chunk in stream:
+                        if deadline is not None:
+                            deadline.check()
+                        if chunk.choices and chunk.choices[0].delta.content:
+                            yield chunk.choices[0].delta.content
+                finally:
+                    await stream.close()
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            _raise_if_expired(deadline, e)
+            raise Exception(f"{self._openai_label} streaming error: {str(e)}")
+    
+    async def _astream_anthropic(self, system_prompt: str, user_prompt: str, **kwargs):
+        """Async stream using Anthropic API"""
+        deadline = kwargs.get("deadline")
+        try:
+            async with self.async_client.messages.stream(
+                model=self.model,
+                system=system_prompt,
+                messages=_messages(user_prompt, kwargs),
+                max_tokens=kwargs.get("max_tokens", self.max_tokens),
+                temperature=kwargs.get("temperature", self.temperature),
+                timeout=call_timeout(deadline, self.timeout)
+            ) as stream:
+                add_event("upstream.connected")
+                async for text in stream.text_stream:
+                    if deadline is not None:
+                        deadline.check()
                     yield text
+        except DeadlineExceeded:
+            raise
         except Exception as e:
+            _raise_if_expired(deadline, e)
             raise Exception(f"Anthropic streaming error: {str(e)}")
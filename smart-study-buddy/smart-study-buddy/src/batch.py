@@ -0,0 +1,229 @@
+"""
+Smart Study Buddy - Batch Runner
+Resumable, concurrent, file-driven batch generation
+"""
+
+import csv
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Iterator, Dict, Any, Optional, Callable, Set
+
+from src.prompts import PROMPT_VERSION, explanation_key
+from src.ratelimit import RateLimiter
+
+
+def read_records(path: str, default_audience: str = "beginner") -> Iterator[Dict[str, Any]]:
+    """
+    Stream input records from a JSONL or CSV file
+
+    Args:
+        path: ``.jsonl``/``.ndjson`` or ``.csv`` file with a ``topic`` field
+        default_audience: Audience used when a record has none
+
+    Yields:
+        Dicts with topic, audience, tone and length. A malformed JSONL line
+        yields ``{"topic": None, "line": n, "error": ...}`` instead of
+        aborting the read, so runners can record it as a failed row.
+    """
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.endswith(".csv"):
+            rows = csv.DictReader(f)
+        else:
+            rows = _jsonl_rows(f)
+
+        for row in rows:
+            if row.get("error") and row.get("topic") is None:
+                yield row
+                continue
+            topic = (row.get("topic") or "").strip()
+            if not topic:
+                continue
+            yield {
+                "topic": topic,
+                "audience": row.get("audience") or default_audience,
+                "tone": row.get("tone") or None,
+                "length": row.get("length") or None
+            }
+
+
+def _jsonl_rows(f) -> Iterator[Dict[str, Any]]:
+    for number, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield {"topic": None, "line": number, "error": f"invalid JSON: {e}"}
+            continue
+        if not isinstance(row, dict):
+            yield {"topic": None, "line": number, "error": "expected a JSON object"}
+            continue
+        yield row
+
+
+def count_records(path: str) -> int:
+    """Cheap line count used for progress/ETA (CSV header excluded)"""
+    with open(path, "rb") as f:
+        lines = sum(1 for line in f if line.strip())
+    return max(0, lines - 1) if path.endswith(".csv") else lines
+
+
+def record_key(record: Dict[str, Any]) -> str:
+    return explanation_key(record["topic"], record["audience"], record.get("tone"), record.get("length"))
+
+
+def load_checkpoint(output_path: str) -> Set[str]:
+    """
+    Collect keys already written to an output file
+
+    A torn final line left by a crash is truncated so the file stays valid JSONL.
+    """
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+
+    good_end = 0
+    with open(output_path, "rb+") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            done.add(record_key(record))
+            good_end += len(line)
+        f.truncate(good_end)
+    return done
+
+
+class BatchRunner:
+    """Runs explanation records through a buddy with bounded concurrency"""
+
+    def __init__(
+        self,
+        buddy,
+        output_path: str,
+        workers: int = 4,
+        requests_per_minute: Optional[float] = None,
+        max_retries: int = 2
+    ):
+        """
+        Initialize the runner
+
+        Args:
+            buddy: SmartStudyBuddy used for generation
+            output_path: JSONL file results are appended to (also the checkpoint)
+            workers: Concurrent upstream requests
+            requests_per_minute: Optional upstream rate limit
+            max_retries: Retries per record on failure (with backoff)
+        """
+        self.buddy = buddy
+        self.output_path = output_path
+        self.errors_path = f"{os.path.splitext(output_path)[0]}.errors.jsonl"
+        self.workers = workers
+        self.limiter = RateLimiter(requests_per_minute) if requests_per_minute else None
+        self.max_retries = max_retries
+
+    def _generate(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        for attempt in range(self.max_retries + 1):
+            if self.limiter:
+                self.limiter.acquire()
+            start = time.perf_counter()
+            try:
+                explanation = self.buddy.explain(
+                    record["topic"], record["audience"], record["tone"], record["length"]
+                )
+            except Exception:
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(2 ** attempt)
+                continue
+
+            # The client that answered (a tier or derivation model, or the
+            # cache) and its usage, for this thread's call only
+            call = self.buddy.last_call or {}
+            return {
+                **record,
+                "explanation": explanation,
+                "provider": call.get("provider") or self.buddy.client.provider,
+                "model": call.get("model") or self.buddy.client.model,
+                "input_tokens": call.get("input_tokens"),
+                "output_tokens": call.get("output_tokens"),
+                # Bundles built from this output are served by GET /explanations
+                # only for the model and prompt version that produced them
+                "prompt_version": PROMPT_VERSION,
+                "latency_s": round(time.perf_counter() - start, 3)
+            }
+
+    @staticmethod
+    def _append(f, result: Dict[str, Any]):
+        # Only the coordinating thread writes, one flushed line per result
+        f.write(json.dumps(result, ensure_ascii=False) + "\n")
+        f.flush()
+
+    def run(
+        self,
+        records: Iterator[Dict[str, Any]],
+        on_progress: Optional[Callable[[str, Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        Process records, skipping any already present in the output file
+        and repeats of a record earlier in the input (same explanation_key)
+
+        Only ``workers * 2`` records are in flight at once, so memory stays
+        flat however large the input is. Malformed input rows (see
+        read_records) are written to the errors file as failures.
+
+        Args:
+            records: Iterable of input records (see read_records)
+            on_progress: Called with ("done"|"failed"|"skipped", record)
+
+        Returns:
+            Summary counts and elapsed time
+        """
+        done_keys = load_checkpoint(self.output_path)
+        summary = {"completed": 0, "failed": 0, "skipped": 0}
+        notify = on_progress or (lambda status, record: None)
+        start = time.perf_counter()
+
+        with open(self.output_path, "a", encoding="utf-8") as out, \
+                open(self.errors_path, "a", encoding="utf-8") as errors, \
+                ThreadPoolExecutor(max_workers=self.workers) as pool:
+            pending = {}
+
+            def drain():
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    record = pending.pop(future)
+                    try:
+                        self._append(out, future.result())
+                        summary["completed"] += 1
+                        notify("done", record)
+                    except Exception as e:
+                        self._append(errors, {**record, "error": str(e)})
+                        summary["failed"] += 1
+                        notify("failed", record)
+
+            for record in records:
+                if record.get("error"):
+                    self._append(errors, record)
+                    summary["failed"] += 1
+                    notify("failed", record)
+                    continue
+                key = record_key(record)
+                if key in done_keys:
+                    summary["skipped"] += 1
+                    notify("skipped", record)
+                    continue
+                # Checkpointed keys and keys dispatched in this run share one set
+                done_keys.add(key)
+                while len(pending) >= self.workers * 2:
+                    drain()
+                pending[pool.submit(self._generate, record)] = record
+
+            while pending:
+                drain()
+
+        summary["elapsed_s"] = round(time.perf_counter() - start, 3)
+        return summary
@@ -0,0 +1,354 @@
+"""
+Smart Study Buddy - Model Benchmark Grid
+Runs a fixed prompt set over provider/model x audience x tone x length and
+compares latency, time to first token, throughput, output size and cost
+
+Cells run concurrently, paced per target by a rate limit. Responses come
+from the real providers, from a recording of an earlier run, or from a
+deterministic simulation, so the grid also runs with no network.
+"""
+
+import hashlib
+import json
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Any
+
+from src.deadline import Deadline
+from src.prompts import SYSTEM_PROMPT, AUDIENCE_LEVELS, create_user_prompt
+from src.ratelimit import RateLimiter
+
+# Fixed prompt set: a spread of subjects so results compare like with like
+DEFAULT_TOPICS = [
+    "photosynthesis",
+    "black holes",
+    "the French Revolution",
+    "compound interest",
+    "how vaccines work",
+]
+
+# Output size the simulation aims for, in tokens, per requested length
+SIMULATED_TOKENS = {"short": 150, "medium": 400, "detailed": 800, None: 400}
+
+
+def parse_target(spec: str) -> Tuple[str, Optional[str]]:
+    """``"provider:model"`` (or just ``"provider"`` for its default model)"""
+    provider, _, model = spec.partition(":")
+    return provider.strip(), model.strip() or None
+
+
+def target_name(provider: str, model: Optional[str]) -> str:
+    return f"{provider}:{model}" if model else provider
+
+
+def build_grid(
+    targets: List[str],
+    topics: List[str],
+    audiences: List[str],
+    tones: List[Optional[str]],
+    lengths: List[Optional[str]]
+) -> List[Dict[str, Any]]:
+    """Every combination, as cells with a stable id (used to diff runs)"""
+    cells = []
+    for target in targets:
+        for topic in topics:
+            for audience in audiences:
+                for tone in tones:
+                    for length in lengths:
+                        cells.append({
+                            "id": f"{target}|{topic}|{audience}|{tone or '-'}|{length or '-'}",
+                            "target": target,
+                            "topic": topic,
+                            "audience": audience,
+                            "tone": tone,
+                            "length": length
+                        })
+    return cells
+
+
+def _prompt_hash(user_prompt: str) -> str:
+    return hashlib.sha1(user_prompt.encode("utf-8")).hexdigest()[:16]
+
+
+def _estimate_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token)"""
+    return len(text) // 4
+
+
+class SimulatedClient:
+    """
+    Deterministic stand-in for a provider: each model gets its own time to
+    first token and decode speed, and output size follows the requested
+    length. Waits are multiplied by ``time_scale`` so a grid runs fast.
+    """
+
+    def __init__(self, provider: str, model: Optional[str], time_scale: float = 0.01):
+        self.provider = provider
+        self.model = model or "simulated"
+        self.time_scale = time_scale
+        seed = int(hashlib.sha1(f"{provider}:{self.model}".encode()).hexdigest(), 16)
+        self.ttft = 0.2 + (seed % 60) / 100
+        self.tokens_per_second = 30 + (seed >> 8) % 90
+
+    def stream_explanation(self, system_prompt: str, user_prompt: str, **kwargs):
+        length = next((name for name in ("short", "medium", "detailed") if f"Length: {name}" in user_prompt), None)
+        jitter = int(_prompt_hash(user_prompt), 16) % 40 - 20
+        tokens = max(20, SIMULATED_TOKENS[length] * (100 + jitter) // 100)
+        time.sleep(self.ttft * self.time_scale)
+        chunk_tokens = 10
+        for i in range(0, tokens, chunk_tokens):
+            n = min(chunk_tokens, tokens - i)
+            time.sleep(n / self.tokens_per_second * self.time_scale)
+            yield "word " * n
+
+
+class ReplayClient:
+    """Replays a recorded run's responses with their recorded timing (scaled by ``time_scale``)"""
+
+    def __init__(self, provider: str, model: Optional[str], recordings: Dict[str, Dict], time_scale: float = 0.01):
+        self.provider = provider
+        self.model = model
+        self.recordings = recordings
+        self.time_scale = time_scale
+
+    def stream_explanation(self, system_prompt: str, user_prompt: str, **kwargs):
+        key = f"{target_name(self.provider, self.model)}|{_prompt_hash(user_prompt)}"
+        record = self.recordings.get(key)
+        if record is None:
+            raise KeyError(f"No recording for {key}")
+        text = record["text"]
+        chunks = [text[i:i + 40] for i in range(0, len(text), 40)] or [""]
+        decode = max(0.0, record["latency_ms"] - record["ttft_ms"]) / 1000
+        time.sleep(record["ttft_ms"] / 1000 * self.time_scale)
+        for i, chunk in enumerate(chunks):
+            if i:
+                time.sleep(decode / max(1, len(chunks) - 1) * self.time_scale)
+            yield chunk
+
+
+def load_recordings(path: str) -> Dict[str, Dict]:
+    """Recorded responses (from ``run(record_path=...)``), keyed by target and prompt"""
+    recordings = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                recordings[f"{record['target']}|{record['prompt_hash']}"] = record
+    return recordings
+
+
+class GridBenchmark:
+    """Runs benchmark cells concurrently and measures each streamed response"""
+
+    def __init__(
+        self,
+        client_factory: Callable[[str, Optional[str]], Any],
+        workers: int = 4,
+        requests_per_minute: Optional[float] = None,
+        prices: Optional[Dict[str, Dict[str, float]]] = None,
+        time_scale: float = 1.0,
+        timeout: float = 120.0,
+        system_prompt: str = SYSTEM_PROMPT
+    ):
+        """
+        Initialize the benchmark
+
+        Args:
+            client_factory: (provider, model) -> client with stream_explanation()
+            workers: Cells run concurrently
+            requests_per_minute: Optional pace per target (each has its own bucket)
+            prices: Target or model -> {"input": $/1k tokens, "output": $/1k tokens}
+            time_scale: Factor the clients' waits are scaled by (simulation and
+                replay); measured times are divided by it
+            timeout: Seconds before a cell is abandoned
+            system_prompt: System prompt sent with every cell
+        """
+        self.client_factory = client_factory
+        self.workers = workers
+        self.requests_per_minute = requests_per_minute
+        self.prices = prices or {}
+        self.time_scale = time_scale
+        self.timeout = timeout
+        self.system_prompt = system_prompt
+        self._clients = {}
+        self._limiters = {}
+
+    def _setup(self, cells: List[Dict[str, Any]]):
+        # Clients are created up front so construction time isn't measured
+        for target in dict.fromkeys(cell["target"] for cell in cells):
+            self._clients[target] = self.client_factory(*parse_target(target))
+            if self.requests_per_minute:
+                self._limiters[target] = RateLimiter(self.requests_per_minute, 60.0, burst=1)
+
+    def price(self, target: str) -> Optional[Dict[str, float]]:
+        provider, model = parse_target(target)
+        model = model or self._clients[target].model
+        return self.prices.get(target) or self.prices.get(model)
+
+    def run(self, cells: List[Dict[str, Any]], record_path: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Measure every cell
+
+        Args:
+            cells: From build_grid()
+            record_path: Optional JSONL file receiving each response's text
+                and timing, for replaying the run offline later
+
+        Yields:
+            One result per cell as it finishes
+        """
+        self._setup(cells)
+        record = open(record_path, "w", encoding="utf-8") if record_path else None
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                futures = [pool.submit(self._measure, cell) for cell in cells]
+                for future in as_completed(futures):
+                    result, text = future.result()
+                    if record is not None and result["error"] is None:
+                        record.write(json.dumps({
+                            "target": result["target"],
+                            "prompt_hash": result["prompt_hash"],
+                            "ttft_ms": result["ttft_ms"],
+                            "latency_ms": result["latency_ms"],
+                            "text": text
+                        }, ensure_ascii=False) + "\n")
+                    yield result
+        finally:
+            if record is not None:
+                record.close()
+
+    def _measure(self, cell: Dict[str, Any]) -> Tuple[Dict[str, Any], str]:
+        target = cell["target"]
+        client = self._clients[target]
+        limiter = self._limiters.get(target)
+        if limiter is not None:
+            limiter.acquire()
+
+        audience = AUDIENCE_LEVELS.get(cell["audience"], cell["audience"])
+        user_prompt = create_user_prompt(cell["topic"], audience, cell["tone"], cell["length"])
+        result = dict(cell, model=client.model, prompt_hash=_prompt_hash(user_prompt), error=None)
+        result["input_tokens"] = _estimate_tokens(self.system_prompt) + _estimate_tokens(user_prompt)
+
+        parts, first = [], None
+        started = time.perf_counter()
+        try:
+            deadline = Deadline.after(self.timeout)
+            for chunk in client.stream_explanation(self.system_prompt, user_prompt, deadline=deadline):
+                if first is None and chunk:
+                    first = time.perf_counter()
+                parts.append(chunk)
+        except Exception as e:
+            result["error"] = str(e)
+        elapsed = time.perf_counter() - started
+
+        text = "".join(parts)
+        scale = 1000 / self.time_scale
+        result["latency_ms"] = round(elapsed * scale, 1)
+        result["ttft_ms"] = round((first - started) * scale, 1) if first is not None else None
+        result["output_chars"] = len(text)
+        result["output_tokens"] = _estimate_tokens(text)
+        decode = elapsed - (first - started) if first is not None else 0
+        result["tokens_per_s"] = round(result["output_tokens"] / (decode / self.time_scale), 1) if decode > 0 else None
+        price = self.price(target)
+        result["cost"] = None
+        if price is not None:
+            result["cost"] = round(
+                (result["input_tokens"] * price.get("input", 0) + result["output_tokens"] * price.get("output", 0)) / 1000,
+                6
+            )
+        return result, text
+
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(q * len(values)))], 1)
+
+
+def summarize(results: List[Dict[str, Any]], by: Tuple[str, ...] = ("target",)) -> List[Dict[str, Any]]:
+    """
+    One row per group (by default per target) with latency percentiles,
+    mean time to first token, throughput, output size and total cost
+    """
+    groups = {}
+    for result in results:
+        groups.setdefault(tuple(result[key] for key in by), []).append(result)
+
+    rows = []
+    for key in sorted(groups, key=lambda k: tuple(str(v) for v in k)):
+        items = groups[key]
+        ok = [r for r in items if r["error"] is None]
+        costs = [r["cost"] for r in ok if r["cost"] is not None]
+        ttfts = [r["ttft_ms"] for r in ok if r["ttft_ms"] is not None]
+        speeds = [r["tokens_per_s"] for r in ok if r["tokens_per_s"] is not None]
+        row = dict(zip(by, key))
+        row.update({
+            "cells": len(items),
+            "errors": len(items) - len(ok),
+            "p50_ms": _percentile([r["latency_ms"] for r in ok], 0.5),
+            "p95_ms": _percentile([r["latency_ms"] for r in ok], 0.95),
+            "ttft_p50_ms": _percentile(ttfts, 0.5),
+            "tokens_per_s": round(statistics.mean(speeds), 1) if speeds else None,
+            "mean_output_tokens": round(statistics.mean(r["output_tokens"] for r in ok), 1) if ok else None,
+            "total_cost": round(sum(costs), 6) if costs else None
+        })
+        rows.append(row)
+    return rows
+
+
+def compare(baseline: List[Dict[str, Any]], current: List[Dict[str, Any]], key: str = "target") -> List[Dict[str, Any]]:
+    """
+    Relative change of each summary metric against a baseline run's summary
+
+    Returns:
+        Rows of {key, metric: percent change (None when either side is missing)}
+    """
+    previous = {row[key]: row for row in baseline}
+    rows = []
+    for row in current:
+        before = previous.get(row[key])
+        if before is None:
+            continue
+        change = {key: row[key]}
+        for metric in ("p50_ms", "p95_ms", "ttft_p50_ms", "tokens_per_s", "mean_output_tokens", "total_cost"):
+            old, new = before.get(metric), row.get(metric)
+            change[metric] = round((new - old) / old * 100, 1) if old and new is not None else None
+        rows.append(change)
+    return rows
+
+
+def write_results(path: str, config: Dict[str, Any], results: List[Dict[str, Any]]):
+    """
+    Save a run as JSON that diffs cleanly: cells sorted by id, keys sorted,
+    and wall-clock details kept in ``config`` only
+    """
+    data = {
+        "config": config,
+        "summary": summarize(results),
+        "cells": sorted(results, key=lambda r: r["id"])
+    }
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, sort_keys=True, ensure_ascii=False)
+        f.write("\n")
+
+
+def load_results(path: str) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def prices_from_policy(policy) -> Dict[str, Dict[str, float]]:
+    """Per-model prices from a tiering policy's tiers (when they declare them)"""
+    prices = {}
+    if policy is None:
+        return prices
+    for tier in policy.tiers.values():
+        if tier.model and (tier.cost_per_1k_input or tier.cost_per_1k_output):
+            prices[tier.model] = {"input": tier.cost_per_1k_input, "output": tier.cost_per_1k_output}
+    return prices
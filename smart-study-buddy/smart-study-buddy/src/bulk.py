@@ -0,0 +1,366 @@
+"""
+Smart Study Buddy - Bulk Generation
+Non-interactive workloads (nightly regeneration, cache warm-up) sent through
+the providers' asynchronous batch APIs instead of real-time calls
+
+Requests are written as a provider batch file and submitted. Later polls
+ingest the finished results into the store/cache, and failed items are
+resubmitted. Each run's manifest lives on disk, so polling can resume after
+a restart.
+"""
+
+import hashlib
+import io
+import json
+import os
+import time
+import uuid
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.prompts import AUDIENCE_LEVELS, create_user_prompt, explanation_key
+
+# (custom id, explanation text or None, usage or None, error or None)
+BatchResult = Tuple[str, Optional[str], Optional[Dict[str, int]], Optional[str]]
+
+
+def custom_id(key: str) -> str:
+    """Provider-safe request id for an explanation key (letters, digits, dashes; <= 64 chars)"""
+    return "x-" + hashlib.sha1(key.encode("utf-8")).hexdigest()[:32]
+
+
+class OpenAIBatchBackend:
+    """OpenAI Batch API: a JSONL file of chat-completion requests, 24 h window"""
+
+    ENDED = ("completed", "failed", "expired", "cancelled")
+
+    def __init__(self, client, model: str, max_tokens: int = 2000, temperature: float = 0.7):
+        """
+        Args:
+            client: openai.OpenAI client (its base_url may point at a stand-in)
+            model: Model for every request
+            max_tokens: Output cap per request
+            temperature: Sampling temperature
+        """
+        self.client = client
+        self.model = model
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+
+    def write(self, requests: List[Tuple[str, str, str]], path: str):
+        """Write (custom id, system prompt, user prompt) triples as a batch input file"""
+        with open(path, "w", encoding="utf-8") as f:
+            for request_id, system_prompt, user_prompt in requests:
+                f.write(json.dumps({
+                    "custom_id": request_id,
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": {
+                        "model": self.model,
+                        "messages": [
+                            {"role": "system", "content": system_prompt},
+                            {"role": "user", "content": user_prompt}
+                        ],
+                        "max_tokens": self.max_tokens,
+                        "temperature": self.temperature
+                    }
+                }, ensure_ascii=False) + "\n")
+
+    def submit(self, path: str) -> str:
+        with open(path, "rb") as f:
+            uploaded = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=uploaded.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+        return batch.id
+
+    def status(self, batch_id: str) -> Tuple[bool, str]:
+        """(ended, provider status)"""
+        batch = self.client.batches.retrieve(batch_id)
+        return batch.status in self.ENDED, batch.status
+
+    def results(self, batch_id: str) -> Iterator[BatchResult]:
+        batch = self.client.batches.retrieve(batch_id)
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            for line in io.StringIO(self.client.files.content(file_id).text):
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                response = record.get("response") or {}
+                body = response.get("body") or {}
+                if response.get("status_code") == 200 and body.get("choices"):
+                    usage = body.get("usage") or {}
+                    yield record["custom_id"], body["choices"][0]["message"]["content"], {
+                        "input_tokens": usage.get("prompt_tokens"),
+                        "output_tokens": usage.get("completion_tokens")
+                    }, None
+                else:
+                    error = record.get("error") or body.get("error") or f"status {response.get('status_code')}"
+                    yield record["custom_id"], None, None, str(error.get("message", error) if isinstance(error, dict) else error)
+
+
+class AnthropicBatchBackend:
+    """Anthropic Message Batches API (requests are kept on disk as JSONL too)"""
+
+    def __init__(self, client, model: str, max_tokens: int = 2000, temperature: float = 0.7):
+        self.client = client
+        self.model = model
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+
+    def write(self, requests: List[Tuple[str, str, str]], path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            for request_id, system_prompt, user_prompt in requests:
+                f.write(json.dumps({
+                    "custom_id": request_id,
+                    "params": {
+                        "model": self.model,
+                        "system": system_prompt,
+                        "messages": [{"role": "user", "content": user_prompt}],
+                        "max_tokens": self.max_tokens,
+                        "temperature": self.temperature
+                    }
+                }, ensure_ascii=False) + "\n")
+
+    def submit(self, path: str) -> str:
+        with open(path, encoding="utf-8") as f:
+            requests = [json.loads(line) for line in f if line.strip()]
+        return self.client.messages.batches.create(requests=requests).id
+
+    def status(self, batch_id: str) -> Tuple[bool, str]:
+        batch = self.client.messages.batches.retrieve(batch_id)
+        return batch.processing_status == "ended", batch.processing_status
+
+    def results(self, batch_id: str) -> Iterator[BatchResult]:
+        for entry in self.client.messages.batches.results(batch_id):
+            result = entry.result
+            if result.type == "succeeded":
+                message = result.message
+                text = "".join(block.text for block in message.content if block.type == "text")
+                yield entry.custom_id, text, {
+                    "input_tokens": message.usage.input_tokens,
+                    "output_tokens": message.usage.output_tokens
+                }, None
+            else:
+                error = getattr(result, "error", None)
+                yield entry.custom_id, None, None, f"{result.type}: {error}" if error else result.type
+
+
+def backend_for(client) -> Any:
+    """Batch backend for an AIClient's provider and model"""
+    if client.provider == "openai":
+        return OpenAIBatchBackend(client.client, client.model, client.max_tokens, client.temperature)
+    if client.provider == "anthropic":
+        return AnthropicBatchBackend(client.client, client.model, client.max_tokens, client.temperature)
+    raise ValueError(f"Bulk mode needs a provider batch API (openai or anthropic), not {client.provider}")
+
+
+class BulkRunner:
+    """Submits explanation requests as provider batch jobs and ingests their results"""
+
+    def __init__(
+        self,
+        buddy,
+        backend=None,
+        directory: str = "bulk_jobs",
+        max_attempts: int = 3,
+        max_batch_size: int = 10000,
+        skip_cached: bool = True
+    ):
+        """
+        Initialize the runner
+
+        Args:
+            buddy: SmartStudyBuddy whose store/cache receive the results
+            backend: Batch backend (default: from the buddy's client)
+            directory: Where run manifests, request files and results live
+            max_attempts: Submissions per item before it is given up on
+            max_batch_size: Requests per provider batch job
+            skip_cached: Leave out variants already in the cache (warm-up);
+                turn off to regenerate everything
+        """
+        self.buddy = buddy
+        self.backend = backend if backend is not None else backend_for(buddy.client)
+        self.directory = directory
+        self.max_attempts = max_attempts
+        self.max_batch_size = max_batch_size
+        self.skip_cached = skip_cached
+
+    def _run_dir(self, run_id: str) -> str:
+        return os.path.join(self.directory, run_id)
+
+    def _load(self, run_id: str) -> Dict[str, Any]:
+        with open(os.path.join(self._run_dir(run_id), "manifest.json"), encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save(self, manifest: Dict[str, Any]):
+        path = os.path.join(self._run_dir(manifest["run_id"]), "manifest.json")
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(path + ".tmp", path)
+
+    def submit(self, records: Iterable[Dict[str, Any]]) -> str:
+        """
+        Queue records (topic, audience, tone, length) as a new run and
+        submit its first batch job(s)
+
+        Returns:
+            Run id for poll()/wait()
+        """
+        run_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        os.makedirs(self._run_dir(run_id), exist_ok=True)
+        cache = self.buddy.cache
+        items = {}
+        for record in records:
+            if record.get("error"):
+                # Malformed input row (see read_records); nothing to submit
+                continue
+            audience = AUDIENCE_LEVELS.get(record["audience"], record["audience"])
+            key = explanation_key(record["topic"], audience, record.get("tone"), record.get("length"))
+            if self.skip_cached and cache is not None and key in cache:
+                continue
+            items.setdefault(custom_id(key), {
+                "topic": record["topic"],
+                "audience": audience,
+                "tone": record.get("tone"),
+                "length": record.get("length"),
+                "status": "queued",
+                "attempts": 0,
+                "error": None
+            })
+        manifest = {
+            "run_id": run_id,
+            "provider": self.buddy.client.provider,
+            "model": self.buddy.client.model,
+            "created": time.time(),
+            "items": items,
+            "batches": []
+        }
+        self._submit_queued(manifest)
+        self._save(manifest)
+        return run_id
+
+    def _submit_queued(self, manifest: Dict[str, Any]):
+        queued = [cid for cid, item in manifest["items"].items() if item["status"] == "queued"]
+        for start in range(0, len(queued), self.max_batch_size):
+            ids = queued[start:start + self.max_batch_size]
+            requests = []
+            for cid in ids:
+                item = manifest["items"][cid]
+                prompt = create_user_prompt(item["topic"], item["audience"], item["tone"], item["length"])
+                requests.append((cid, self.buddy.system_prompt, prompt))
+            path = os.path.join(self._run_dir(manifest["run_id"]), f"batch-{len(manifest['batches']) + 1}.jsonl")
+            self.backend.write(requests, path)
+            batch_id = self.backend.submit(path)
+            manifest["batches"].append({
+                "id": batch_id,
+                "file": os.path.basename(path),
+                "custom_ids": ids,
+                "status": "submitted",
+                "ingested": False,
+                "submitted": time.time()
+            })
+            for cid in ids:
+                manifest["items"][cid]["status"] = "submitted"
+                manifest["items"][cid]["attempts"] += 1
+
+    def poll(self, run_id: str) -> Dict[str, Any]:
+        """
+        Check the run's open batch jobs once: ingest the results of ended
+        jobs and resubmit failed items that have attempts left
+
+        Returns:
+            Run summary (see summary())
+        """
+        manifest = self._load(run_id)
+        items = manifest["items"]
+        for batch in manifest["batches"]:
+            if batch["ingested"]:
+                continue
+            ended, batch["status"] = self.backend.status(batch["id"])
+            if not ended:
+                continue
+            returned = set()
+            for cid, text, usage, error in self.backend.results(batch["id"]):
+                item = items.get(cid)
+                if item is None:
+                    continue
+                returned.add(cid)
+                if text is not None:
+                    self._ingest(manifest, item, text, usage)
+                else:
+                    item.update(status="failed", error=error)
+            for cid in set(batch["custom_ids"]) - returned:
+                items[cid].update(status="failed", error=f"no result (batch {batch['status']})")
+            batch["ingested"] = True
+            self._save(manifest)
+
+        if all(batch["ingested"] for batch in manifest["batches"]):
+            for item in items.values():
+                if item["status"] == "failed" and item["attempts"] < self.max_attempts:
+                    item["status"] = "queued"
+            self._submit_queued(manifest)
+        self._save(manifest)
+        return self.summary(manifest)
+
+    def _ingest(self, manifest: Dict[str, Any], item: Dict[str, Any], text: str, usage: Optional[Dict[str, int]]):
+        self.buddy.ingest(
+            item["topic"], item["audience"], item["tone"], item["length"], text,
+            usage=usage, provider=manifest["provider"], model=manifest["model"]
+        )
+        item.update(status="done", error=None)
+        with open(os.path.join(self._run_dir(manifest["run_id"]), "results.jsonl"), "a", encoding="utf-8") as f:
+            f.write(json.dumps({
+                "topic": item["topic"],
+                "audience": item["audience"],
+                "tone": item["tone"],
+                "length": item["length"],
+                "explanation": text
+            }, ensure_ascii=False) + "\n")
+
+    def wait(
+        self,
+        run_id: str,
+        poll_interval: float = 60.0,
+        timeout: Optional[float] = None,
+        on_progress: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
+        """Poll until every item is done or out of attempts (or ``timeout`` passes)"""
+        end = time.monotonic() + timeout if timeout else None
+        while True:
+            summary = self.poll(run_id)
+            if on_progress is not None:
+                on_progress(summary)
+            if summary["complete"] or (end is not None and time.monotonic() >= end):
+                return summary
+            time.sleep(poll_interval)
+
+    def summary(self, manifest: Dict[str, Any]) -> Dict[str, Any]:
+        counts = {"done": 0, "failed": 0, "pending": 0}
+        for item in manifest["items"].values():
+            if item["status"] == "done":
+                counts["done"] += 1
+            elif item["status"] == "failed" and item["attempts"] >= self.max_attempts:
+                counts["failed"] += 1
+            else:
+                counts["pending"] += 1
+        return {
+            "run_id": manifest["run_id"],
+            "provider": manifest["provider"],
+            "model": manifest["model"],
+            "total": len(manifest["items"]),
+            **counts,
+            "batches": len(manifest["batches"]),
+            "complete": counts["pending"] == 0
+        }
+
+    def explanations(self, run_id: str) -> List[Dict[str, Any]]:
+        """Results ingested so far for a run"""
+        path = os.path.join(self._run_dir(run_id), "results.jsonl")
+        if not os.path.exists(path):
+            return []
+        with open(path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
@@ -0,0 +1,155 @@
+"""
+Smart Study Buddy - Explanation Bundles
+Read-only, memory-mapped files of pre-generated explanations
+"""
+
+import json
+import mmap
+import os
+import struct
+import zlib
+from typing import Iterable, Optional, Dict, Any
+
+from src.prompts import explanation_key
+
+# File layout (all integers little-endian):
+#   header  : magic, entry count, index offset, keys offset, bodies offset
+#   index   : one fixed-size entry per key, sorted by key bytes
+#   keys    : concatenated UTF-8 keys
+#   bodies  : concatenated zlib-compressed JSON records
+MAGIC = b"SSBUNDL1"
+_HEADER = struct.Struct("<8sQQQQ")
+_ENTRY = struct.Struct("<QIQI")  # key offset, key length, body offset, body length
+
+
+def build_bundle(records: Iterable[Dict[str, Any]], path: str, level: int = 9) -> int:
+    """
+    Compile explanation records into an immutable bundle file
+
+    Args:
+        records: Dicts with topic, audience, explanation and optional tone/length
+        path: Output file path (written atomically)
+        level: zlib compression level
+
+    Returns:
+        Number of entries written
+    """
+    entries = {}
+    for record in records:
+        key = explanation_key(
+            record["topic"],
+            record["audience"],
+            record.get("tone"),
+            record.get("length")
+        )
+        body = {k: v for k, v in record.items() if v is not None}
+        entries[key.encode("utf-8")] = zlib.compress(
+            json.dumps(body, ensure_ascii=False).encode("utf-8"), level
+        )
+
+    keys = sorted(entries)
+    index_offset = _HEADER.size
+    keys_offset = index_offset + _ENTRY.size * len(keys)
+    bodies_offset = keys_offset + sum(len(k) for k in keys)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, len(keys), index_offset, keys_offset, bodies_offset))
+
+        key_pos, body_pos = keys_offset, bodies_offset
+        for key in keys:
+            body_len = len(entries[key])
+            f.write(_ENTRY.pack(key_pos, len(key), body_pos, body_len))
+            key_pos += len(key)
+            body_pos += body_len
+
+        for key in keys:
+            f.write(key)
+        for key in keys:
+            f.write(entries[key])
+
+    os.replace(tmp_path, path)
+    return len(keys)
+
+
+class ExplanationBundle:
+    """Memory-mapped, read-only view of a bundle file"""
+
+    def __init__(self, path: str):
+        """
+        Open a bundle
+
+        Args:
+            path: Bundle file produced by build_bundle()
+        """
+        self.path = path
+        self._file = open(path, "rb")
+        # File-backed read-only maps share the page cache across processes
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self._count, self._index_offset, _, _ = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"Not an explanation bundle: {path}")
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, key: str) -> bool:
+        return self._find(key.encode("utf-8")) is not None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _entry(self, i: int):
+        return _ENTRY.unpack_from(self._mm, self._index_offset + i * _ENTRY.size)
+
+    def _find(self, target: bytes):
+        """Binary search the sorted index; touches O(log n) pages"""
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            entry = self._entry(mid)
+            key = self._mm[entry[0]:entry[0] + entry[1]]
+            if key < target:
+                lo = mid + 1
+            elif key > target:
+                hi = mid
+            else:
+                return entry
+        return None
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a record by canonical key
+
+        Args:
+            key: Key from explanation_key()
+
+        Returns:
+            Stored record dict, or None on a miss
+        """
+        entry = self._find(key.encode("utf-8"))
+        if entry is None:
+            return None
+        _, _, body_offset, body_len = entry
+        return json.loads(zlib.decompress(self._mm[body_offset:body_offset + body_len]))
+
+    def lookup(
+        self,
+        topic: str,
+        audience: str,
+        tone: Optional[str] = None,
+        length: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Look up a record by explanation parameters"""
+        return self.get(explanation_key(topic, audience, tone, length))
+
+    def close(self):
+        """Release the mapping and file handle"""
+        if not self._mm.closed:
+            self._mm.close()
+        self._file.close()
@@ -0,0 +1,172 @@
+"""
+Smart Study Buddy - Explanation Cache
+In-memory LRU cache of completed explanations and stream replay
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Iterator
+
+from src.prompts import PROMPT_VERSION
+
+# Word plus trailing whitespace, roughly the granularity providers stream at
+_TOKEN_RE = re.compile(r"\S+\s*|\s+")
+
+
+class ExplanationCache:
+    """Thread-safe LRU cache keyed by explanation_key()"""
+
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = None):
+        """
+        Initialize the cache
+
+        Args:
+            max_entries: Entries kept before least-recently-used eviction
+            ttl: Optional time-to-live in seconds
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached entry for a key, or None"""
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None and self.ttl is not None and time.monotonic() - item[0] > self.ttl:
+                del self._entries[key]
+                item = None
+            if item is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key: str, entry: Dict[str, Any]):
+        """Store an entry (must contain "explanation")"""
+        with self._lock:
+            self._entries[key] = (time.monotonic(), entry)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters"""
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0
+        }
+
+
+class SharedExplanationCache:
+    """
+    Two-level cache: a per-process LRU in front of a SharedState backend,
+    so an explanation generated by one worker process is a hit in all of them
+    """
+
+    def __init__(
+        self,
+        state,
+        ttl: Optional[float] = 7 * 24 * 3600,
+        local: Optional[ExplanationCache] = None,
+        metrics=None
+    ):
+        """
+        Initialize the cache
+
+        Args:
+            state: SharedState backend (see src.shared_state)
+            ttl: Time-to-live in the shared backend (None keeps entries forever)
+            local: Optional process-local LRU checked first
+            metrics: Optional Metrics receiving cache.hits / cache.misses
+        """
+        self.state = state
+        self.ttl = ttl
+        self.local = local if local is not None else ExplanationCache(max_entries=1024, ttl=ttl)
+        self.metrics = metrics
+
+    def _count(self, name: str):
+        if self.metrics is not None:
+            self.metrics.incr(name)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self.local.get(key)
+        if entry is None:
+            entry = self.state.get("explanation:" + key)
+            if entry is not None:
+                self.local.set(key, entry)
+        self._count("cache.hits" if entry is not None else "cache.misses")
+        return entry
+
+    def set(self, key: str, entry: Dict[str, Any]):
+        self.local.set(key, entry)
+        self.state.set("explanation:" + key, entry, ttl=self.ttl)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.local or self.state.get("explanation:" + key) is not None
+
+    def __len__(self) -> int:
+        return len(self.local)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters (aggregated across processes when metrics are shared)"""
+        if self.metrics is None:
+            return self.local.stats()
+        counters = self.metrics.snapshot("cache.")
+        hits, misses = counters.get("cache.hits", 0), counters.get("cache.misses", 0)
+        total = hits + misses
+        return {
+            "local_entries": len(self.local),
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / total if total else 0.0
+        }
+
+
+def generated_by(record: Dict[str, Any], model: str, version: str = PROMPT_VERSION) -> bool:
+    """True when a cached or bundled record was generated by ``model`` from prompt ``version``"""
+    return record.get("model") == model and record.get("prompt_version") == version
+
+
+def replay_stream(text: str, words_per_chunk: int = 1, delay: float = 0.0) -> Iterator[str]:
+    """
+    Replay a completed explanation through the streaming interface
+
+    Args:
+        text: Full explanation text
+        words_per_chunk: Words emitted per chunk
+        delay: Seconds to sleep between chunks (0 replays at full speed)
+
+    Yields:
+        Text chunks that concatenate back to ``text``
+    """
+    if delay <= 0 and words_per_chunk <= 0:
+        yield text
+        return
+
+    tokens = _TOKEN_RE.findall(text)
+    step = max(1, words_per_chunk)
+    for i in range(0, len(tokens), step):
+        if delay > 0 and i:
+            time.sleep(delay)
+        yield "".join(tokens[i:i + step])
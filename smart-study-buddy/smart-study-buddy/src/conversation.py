@@ -0,0 +1,163 @@
+"""
+Smart Study Buddy - Conversations
+Session-scoped follow-up history with a bounded context: the latest turns
+are sent verbatim, older ones are compacted to their core idea and folded
+into the system prompt, and the oldest are dropped once over budget
+"""
+
+import uuid
+from typing import Optional, Dict, Any, List, Tuple
+
+from src.sections import stream_sections
+
+
+def _tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token)"""
+    return len(text) // 4
+
+
+def core_idea(answer: str, max_words: int = 60) -> str:
+    """
+    The part of an answer worth keeping once it is no longer recent: its
+    Core Idea section (or its first section), capped at ``max_words``
+    """
+    sections = {}
+    for event in stream_sections([answer]):
+        if event["type"] == "delta":
+            sections.setdefault(event["section"], []).append(event["text"])
+    text = "".join(sections.get("core_idea") or next(iter(sections.values()), []))
+    words = text.split()
+    return " ".join(words[:max_words]) + (" …" if len(words) > max_words else "")
+
+
+class Conversation:
+    """One learner's follow-up thread about a topic"""
+
+    def __init__(
+        self,
+        topic: str,
+        audience: str,
+        tone: Optional[str] = None,
+        length: Optional[str] = None,
+        context_tokens: int = 1500,
+        recent_turns: int = 2,
+        session_id: Optional[str] = None,
+        owner: Optional[str] = None,
+        turns: Optional[List[Dict[str, Any]]] = None
+    ):
+        """
+        Initialize a conversation
+
+        Args:
+            topic: Topic of the opening explanation
+            audience: Resolved audience description
+            tone: Optional tone kept for every turn
+            length: Optional length of the opening explanation
+            context_tokens: Budget for earlier turns sent with each follow-up
+            recent_turns: Latest turns sent verbatim (older ones are compacted)
+            session_id: Id (generated when omitted)
+            owner: Optional owner (e.g. tenant) for access checks
+            turns: Existing turns when restoring a saved conversation
+        """
+        self.topic = topic
+        self.audience = audience
+        self.tone = tone
+        self.length = length
+        self.context_tokens = context_tokens
+        self.recent_turns = recent_turns
+        self.session_id = session_id or uuid.uuid4().hex
+        self.owner = owner
+        self.turns = turns or []
+
+    def add_turn(
+        self,
+        question: str,
+        prompt: str,
+        answer: str,
+        latency_ms: Optional[float] = None,
+        context_tokens: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Record a completed turn
+
+        Args:
+            question: What the learner asked (used in compacted summaries)
+            prompt: The user message actually sent
+            answer: The model's answer
+            latency_ms: Time to the full answer
+            context_tokens: Estimated prompt tokens sent for this turn
+        """
+        turn = {
+            "turn": len(self.turns) + 1,
+            "question": question,
+            "prompt": prompt,
+            "answer": answer,
+            "latency_ms": latency_ms,
+            "context_tokens": context_tokens
+        }
+        self.turns.append(turn)
+        return turn
+
+    def context(self) -> Tuple[str, List[Dict[str, str]]]:
+        """
+        Earlier turns to send with the next follow-up, within the budget
+
+        Returns:
+            (summary of older turns for the system prompt (may be empty),
+            alternating user/assistant messages of the recent turns)
+        """
+        budget = self.context_tokens
+        recent = self.turns[-self.recent_turns:] if self.recent_turns else []
+        older = self.turns[:len(self.turns) - len(recent)]
+
+        messages = []
+        for turn in reversed(recent):
+            answer = turn["answer"]
+            # A recent turn that alone overflows the budget is trimmed too
+            if _tokens(turn["prompt"]) + _tokens(answer) > budget:
+                answer = core_idea(answer)
+            cost = _tokens(turn["prompt"]) + _tokens(answer)
+            if cost > budget:
+                older.append(turn)
+                continue
+            budget -= cost
+            messages[:0] = [
+                {"role": "user", "content": turn["prompt"]},
+                {"role": "assistant", "content": answer}
+            ]
+
+        lines, dropped = [], 0
+        for turn in sorted(older, key=lambda t: t["turn"], reverse=True):
+            line = f"- Turn {turn['turn']}: {turn['question']} → {core_idea(turn['answer'])}"
+            if _tokens(line) > budget:
+                dropped += 1
+                continue
+            budget -= _tokens(line)
+            lines.insert(0, line)
+        if dropped:
+            lines.insert(0, f"- ({dropped} earlier turn(s) omitted)")
+
+        summary = ""
+        if lines:
+            summary = (
+                f"## Conversation so far\n\nYou are continuing a conversation about {self.topic} "
+                f"with a {self.audience}. Earlier turns, condensed:\n" + "\n".join(lines)
+            )
+        return summary, messages
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.session_id,
+            "topic": self.topic,
+            "audience": self.audience,
+            "tone": self.tone,
+            "length": self.length,
+            "context_tokens": self.context_tokens,
+            "recent_turns": self.recent_turns,
+            "owner": self.owner,
+            "turns": self.turns
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Conversation":
+        return cls(**data)
@@ -0,0 +1,258 @@
+"""
+Smart Study Buddy - Curriculum Generator
+Plans a prerequisite graph of subtopics, then explains them in dependency
+order with independent subtopics in parallel, streaming nodes as they finish
+"""
+
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from contextlib import nullcontext
+from typing import Dict, List, Optional, Iterator, Any
+
+from src.conversation import core_idea
+from src.tracing import in_context
+from src.prompts import CURRICULUM_PLAN_PROMPT, create_curriculum_prompt, explanation_key, AUDIENCE_LEVELS
+
+
+def parse_plan(text: str, max_topics: int = 20) -> Dict[str, List[str]]:
+    """
+    Turn the planner's reply into a prerequisite graph
+
+    Unknown or self prerequisites are dropped, so the graph only refers to
+    its own subtopics.
+
+    Args:
+        text: Model reply containing {"topics": [{"topic", "prerequisites"}]}
+        max_topics: Keep at most this many subtopics
+
+    Returns:
+        Subtopic -> prerequisite subtopics, in the planner's order
+    """
+    match = re.search(r"\{.*\}", text, re.DOTALL)
+    if not match:
+        raise ValueError("Curriculum plan is not JSON")
+    items = json.loads(match.group(0)).get("topics", [])
+
+    graph = {}
+    for item in items[:max_topics]:
+        topic = str(item.get("topic", "")).strip()
+        if topic and topic not in graph:
+            graph[topic] = [str(p).strip() for p in item.get("prerequisites") or []]
+    for topic, prerequisites in graph.items():
+        graph[topic] = [p for p in dict.fromkeys(prerequisites) if p in graph and p != topic]
+    if not graph:
+        raise ValueError("Curriculum plan has no topics")
+    return graph
+
+
+def levels(graph: Dict[str, List[str]]) -> List[List[str]]:
+    """
+    Group subtopics by depth: level 0 has no prerequisites, level n depends
+    only on earlier levels. A cycle is broken by dropping the unresolved
+    prerequisites of the node closest to being ready.
+    """
+    placed, result = set(), []
+    while len(placed) < len(graph):
+        ready = [t for t in graph if t not in placed and all(p in placed for p in graph[t])]
+        if not ready:
+            remaining = [t for t in graph if t not in placed]
+            victim = min(remaining, key=lambda t: sum(p not in placed for p in graph[t]))
+            graph[victim] = [p for p in graph[victim] if p in placed]
+            continue
+        result.append(ready)
+        placed.update(ready)
+    return result
+
+
+def _load_run(path: str):
+    """Plan and finished nodes from an earlier run's output (torn last line dropped)"""
+    plan, nodes, good_end = None, {}, 0
+    with open(path, "rb+") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            if record["type"] == "plan":
+                plan = record
+            elif record["type"] == "node" and record["status"] != "failed":
+                nodes[record["topic"]] = record
+            good_end += len(line)
+        f.truncate(good_end)
+    return plan, nodes
+
+
+class CurriculumRunner:
+    """Generates a study guide over a prerequisite DAG"""
+
+    def __init__(
+        self,
+        buddy,
+        output_path: Optional[str] = None,
+        workers: int = 4,
+        max_topics: int = 20,
+        admission=None,
+        tenant: str = "",
+        weight: float = 1.0
+    ):
+        """
+        Initialize the runner
+
+        Args:
+            buddy: SmartStudyBuddy used for planning and generation
+            output_path: Optional JSONL file of the plan and finished nodes;
+                re-running with the same subject and audience resumes it
+            workers: Subtopics generated concurrently
+            max_topics: Upper bound on planned subtopics
+            admission: Optional AdmissionController; each node takes a batch slot
+            tenant: Tenant the slots are charged to
+            weight: Tenant scheduling weight
+        """
+        self.buddy = buddy
+        self.output_path = output_path
+        self.workers = workers
+        self.max_topics = max_topics
+        self.admission = admission
+        self.tenant = tenant
+        self.weight = weight
+
+    def plan(self, subject: str, audience: str) -> Dict[str, List[str]]:
+        """Ask the model for the subject's prerequisite graph"""
+        audience = AUDIENCE_LEVELS.get(audience, audience)
+        with self._slot():
+            reply = self.buddy.client.generate_explanation(
+                CURRICULUM_PLAN_PROMPT, create_curriculum_prompt(subject, audience, self.max_topics)
+            )
+        return parse_plan(reply, self.max_topics)
+
+    def _slot(self):
+        if self.admission is None:
+            return nullcontext()
+        return self.admission.slot_sync("batch", tenant=self.tenant, weight=self.weight)
+
+    def _generate(self, topic: str, audience: str, tone, length, context: Optional[str]) -> Dict[str, Any]:
+        cache = self.buddy.cache
+        cached = cache is not None and (
+            explanation_key(topic, audience, tone, length, context) in cache
+            or explanation_key(topic, audience, tone, length) in cache
+        )
+        start = time.perf_counter()
+        with nullcontext() if cached else self._slot():
+            explanation = self.buddy.explain(topic, audience, tone, length, context=context)
+        return {
+            "explanation": explanation,
+            "status": "cached" if cached else "generated",
+            "latency_s": round(time.perf_counter() - start, 3)
+        }
+
+    def run(
+        self,
+        subject: str,
+        audience: str,
+        tone: Optional[str] = None,
+        length: Optional[str] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Plan (or resume) a curriculum and explain every subtopic
+
+        A subtopic starts as soon as all its prerequisites are done, with
+        their core ideas as context, so wall time follows the depth of the
+        graph rather than its size.
+
+        Yields:
+            {"type": "plan"} first, then one {"type": "node"} per subtopic
+            as it finishes (resumed ones first), then {"type": "done"}
+        """
+        start = time.perf_counter()
+        plan, finished = None, {}
+        if self.output_path and os.path.exists(self.output_path):
+            plan, finished = _load_run(self.output_path)
+            if plan is not None and (plan["subject"], plan["audience"]) != (subject, audience):
+                raise ValueError(f"{self.output_path} holds a curriculum for {plan['subject']!r}; use another file")
+
+        if plan is None:
+            graph = self.plan(subject, audience)
+            depth = levels(graph)
+            plan = {"type": "plan", "subject": subject, "audience": audience, "graph": graph, "levels": depth}
+            self._write(plan, truncate=True)
+        graph, depth = plan["graph"], plan["levels"]
+        level_of = {topic: i for i, level in enumerate(depth) for topic in level}
+        yield plan
+
+        summary = {"generated": 0, "cached": 0, "resumed": 0, "failed": 0}
+        done = {}
+        for topic, record in finished.items():
+            done[topic] = record["explanation"]
+            summary["resumed"] += 1
+            yield dict(record, status="resumed")
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            pending = {}
+
+            def submit_ready():
+                for topic in graph:
+                    if topic in done or topic in pending.values():
+                        continue
+                    if all(p in done for p in graph[topic]):
+                        context = "\n".join(
+                            f"- {p}: {core_idea(done[p], max_words=40)}" for p in graph[topic] if done[p]
+                        )
+                        future = pool.submit(in_context(self._generate), topic, audience, tone, length, context or None)
+                        pending[future] = topic
+
+            submit_ready()
+            while pending:
+                completed, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in completed:
+                    topic = pending.pop(future)
+                    record = {
+                        "type": "node",
+                        "topic": topic,
+                        "level": level_of[topic],
+                        "prerequisites": graph[topic]
+                    }
+                    try:
+                        record.update(future.result())
+                    except Exception as e:
+                        # Dependents still run, just without this summary
+                        record.update({"status": "failed", "explanation": "", "error": str(e)})
+                    done[topic] = record["explanation"]
+                    summary[record["status"]] += 1
+                    self._write(record)
+                    yield record
+                submit_ready()
+
+        yield {
+            "type": "done",
+            "topics": len(graph),
+            "depth": len(depth),
+            **summary,
+            "elapsed_s": round(time.perf_counter() - start, 3)
+        }
+
+    def _write(self, record: Dict[str, Any], truncate: bool = False):
+        # Only the coordinating generator writes, one flushed line per record
+        if not self.output_path:
+            return
+        with open(self.output_path, "w" if truncate else "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def render_markdown(plan: Dict[str, Any], nodes: Dict[str, Dict[str, Any]]) -> str:
+    """Study guide in prerequisite order from a plan and its finished nodes"""
+    parts = [f"# {plan['subject']}\n\n*For: {AUDIENCE_LEVELS.get(plan['audience'], plan['audience'])}*\n"]
+    for i, level in enumerate(plan["levels"], 1):
+        for topic in level:
+            node = nodes.get(topic)
+            if node is None or not node.get("explanation"):
+                continue
+            prerequisites = ", ".join(plan["graph"][topic])
+            parts.append(f"\n## {topic}\n")
+            if prerequisites:
+                parts.append(f"*Builds on: {prerequisites}*\n")
+            # Demote the explanation's own headings below the subtopic heading
+            parts.append("\n" + re.sub(r"^(#{1,5}) ", r"#\1 ", node["explanation"], flags=re.MULTILINE).strip() + "\n")
+    return "".join(parts)
@@ -0,0 +1,64 @@
+"""
+Smart Study Buddy - Request Deadlines
+Time budgets that flow from the API/CLI down to the provider SDK calls
+"""
+
+import time
+from typing import Optional
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a request runs past its deadline"""
+
+
+class Deadline:
+    """An absolute point in time after which a request is abandoned"""
+
+    def __init__(self, seconds: float):
+        """
+        Start a deadline
+
+        Args:
+            seconds: Budget from now
+        """
+        self.budget = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    @classmethod
+    def after(cls, seconds: Optional[float]) -> Optional["Deadline"]:
+        """A Deadline, or None when no (positive) budget is given"""
+        return cls(seconds) if seconds and seconds > 0 else None
+
+    def remaining(self) -> float:
+        """Seconds left (never negative)"""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def check(self):
+        """Raise DeadlineExceeded once the budget is spent"""
+        if self.expired:
+            raise DeadlineExceeded(f"Deadline of {self.budget:g}s exceeded")
+
+    def timeout(self, cap: Optional[float] = None) -> float:
+        """
+        SDK timeout for a call started now
+
+        Args:
+            cap: Upper bound (e.g. the client's default timeout)
+
+        Returns:
+            Remaining budget, capped, raising if nothing is left
+        """
+        self.check()
+        remaining = self.remaining()
+        return min(remaining, cap) if cap else remaining
+
+
+def call_timeout(deadline: Optional[Deadline], default: Optional[float]) -> Optional[float]:
+    """Timeout for one SDK call: the remaining budget, or the client default"""
+    if deadline is None:
+        return default
+    return deadline.timeout(cap=default)
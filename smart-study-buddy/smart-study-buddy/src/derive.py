@@ -0,0 +1,79 @@
+"""
+Smart Study Buddy - Variant Derivation
+Find an already generated variant of a topic that a requested variant can be
+rewritten from (shortened, re-toned or re-levelled) instead of generated cold
+"""
+
+from typing import Optional, List, Tuple
+
+from src.prompts import AUDIENCE_LEVELS, TONES, LENGTHS
+
+_AUDIENCES = list(AUDIENCE_LEVELS.values())
+
+# Rewriting can condense but not invent detail, so sources must be at least
+# as long as the target; an unset length means the model's default (medium)
+_LENGTH_RANK = {"short": 0, "medium": 1, None: 1, "detailed": 2}
+
+Variant = Tuple[str, Optional[str], Optional[str]]
+
+
+def related_variants(
+    audience: str,
+    tone: Optional[str] = None,
+    length: Optional[str] = None,
+    max_level_distance: int = 2,
+    limit: int = 30
+) -> List[Variant]:
+    """
+    Variants a requested one can be derived from, most similar first
+
+    Args:
+        audience: Resolved target audience description
+        tone: Target tone
+        length: Target length
+        max_level_distance: How many predefined audience levels away a
+            source may be (free-form audiences only vary tone and length)
+        limit: Maximum candidates to return
+
+    Returns:
+        (audience, tone, length) tuples, excluding the target itself
+    """
+    target_rank = _LENGTH_RANK.get(length, 1)
+    lengths = sorted(
+        (l for l in [None] + LENGTHS if _LENGTH_RANK[l] >= target_rank),
+        key=lambda l: (_LENGTH_RANK[l] - target_rank, l is not None)
+    )
+    tones = [tone] + [t for t in [None] + TONES if t != tone]
+    if audience in _AUDIENCES:
+        index = _AUDIENCES.index(audience)
+        audiences = sorted(
+            (a for i, a in enumerate(_AUDIENCES) if abs(i - index) <= max_level_distance),
+            key=lambda a: abs(_AUDIENCES.index(a) - index)
+        )
+    else:
+        audiences = [audience]
+
+    candidates = [
+        (a, t, l)
+        for a in audiences
+        for t in tones
+        for l in lengths
+        if (a, t, l) != (audience, tone, length)
+    ]
+    candidates.sort(key=lambda v: (
+        v[0] != audience, v[1] != tone, _LENGTH_RANK[v[2]] - target_rank
+    ))
+    return candidates[:limit]
+
+
+def describe_changes(source: Variant, target: Variant) -> List[str]:
+    """Rewrite instructions turning the source variant into the target"""
+    (source_audience, source_tone, source_length), (audience, tone, length) = source, target
+    changes = []
+    if _LENGTH_RANK.get(length, 1) < _LENGTH_RANK.get(source_length, 1):
+        changes.append(f"Shorten it to a {length or 'medium'}-length explanation, keeping the core idea")
+    if tone != source_tone:
+        changes.append(f"Change the tone to {tone or 'neutral'}")
+    if audience != source_audience:
+        changes.append(f"It was written for {source_audience}; re-level vocabulary, depth and examples for {audience}")
+    return changes
@@ -0,0 +1,191 @@
+"""
+Smart Study Buddy - Endpoint Pool
+Client-side load balancing over self-hosted OpenAI-compatible replicas
+"""
+
+import importlib.util
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Optional, Dict, Any
+
+import httpx
+
+# HTTP/2 multiplexes concurrent streams over one connection per replica;
+# it needs the optional "h2" package (pip install "httpx[http2]")
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+class Endpoint:
+    """One replica: pooled keep-alive clients plus health and load state"""
+
+    def __init__(self, base_url: str, api_key: str, timeout: float, limits: httpx.Limits):
+        from openai import OpenAI, AsyncOpenAI
+
+        self.base_url = base_url.rstrip("/")
+        self.http = httpx.Client(http2=HTTP2_AVAILABLE, limits=limits, timeout=timeout)
+        self.async_http = httpx.AsyncClient(http2=HTTP2_AVAILABLE, limits=limits, timeout=timeout)
+        self.client = OpenAI(base_url=self.base_url, api_key=api_key, timeout=timeout, http_client=self.http)
+        self.async_client = AsyncOpenAI(
+            base_url=self.base_url, api_key=api_key, timeout=timeout, http_client=self.async_http
+        )
+        self.api_key = api_key
+        self.healthy = True
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+        self.last_error = None
+        self.checked_at = None
+
+    def mark_down(self, error: Exception):
+        self.healthy = False
+        self.failures += 1
+        self.last_error = str(error)
+
+    def check(self, timeout: float = 2.0) -> bool:
+        """Active health check: GET /models must answer 200"""
+        try:
+            response = self.http.get(
+                f"{self.base_url}/models",
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                timeout=timeout
+            )
+            self.healthy = response.status_code == 200
+            self.last_error = None if self.healthy else f"HTTP {response.status_code}"
+        except httpx.HTTPError as e:
+            self.healthy = False
+            self.last_error = str(e)
+        self.checked_at = time.time()
+        return self.healthy
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "base_url": self.base_url,
+            "healthy": self.healthy,
+            "in_flight": self.in_flight,
+            "requests": self.requests,
+            "failures": self.failures,
+            "last_error": self.last_error
+        }
+
+
+class EndpointPool:
+    """
+    Picks the healthy replica with the fewest in-flight requests (ties
+    broken round-robin). Replicas failing with connection errors are taken
+    out immediately and return once a background health check passes.
+    """
+
+    def __init__(
+        self,
+        urls: List[str],
+        api_key: str = "not-needed",
+        timeout: float = 120.0,
+        max_connections: int = 100,
+        health_interval: Optional[float] = 10.0
+    ):
+        """
+        Initialize the pool
+
+        Args:
+            urls: Base URLs of the replicas (e.g. http://10.0.0.5:8000/v1)
+            api_key: Key sent to every replica
+            timeout: Default per-request timeout
+            max_connections: Connection pool size per replica
+            health_interval: Seconds between active health checks (None disables)
+        """
+        if not urls:
+            raise ValueError("At least one endpoint URL is required")
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=60.0
+        )
+        self.endpoints = [Endpoint(url, api_key, timeout, limits) for url in urls]
+        self.health_interval = health_interval
+        self._rr = itertools.count()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+        if health_interval:
+            self._thread = threading.Thread(target=self._health_loop, name="endpoint-health", daemon=True)
+            self._thread.start()
+
+    @classmethod
+    def from_env(cls, timeout: float = 120.0) -> "EndpointPool":
+        """Pool from OPENAI_COMPATIBLE_ENDPOINTS (comma-separated base URLs)"""
+        urls = [url.strip() for url in os.getenv("OPENAI_COMPATIBLE_ENDPOINTS", "").split(",") if url.strip()]
+        if not urls:
+            raise ValueError("OPENAI_COMPATIBLE_ENDPOINTS not found in environment")
+        return cls(
+            urls,
+            api_key=os.getenv("OPENAI_COMPATIBLE_API_KEY", "not-needed"),
+            timeout=timeout,
+            max_connections=int(os.getenv("OPENAI_COMPATIBLE_MAX_CONNECTIONS", "100")),
+            health_interval=float(os.getenv("OPENAI_COMPATIBLE_HEALTH_INTERVAL", "10"))
+        )
+
+    def check_all(self):
+        """Run one health check round"""
+        for endpoint in self.endpoints:
+            endpoint.check()
+
+    def _health_loop(self):
+        while True:
+            self.check_all()
+            if self._stop.wait(self.health_interval):
+                return
+
+    def pick(self) -> Endpoint:
+        """Least-loaded healthy replica (all replicas if none is healthy)"""
+        with self._lock:
+            candidates = [e for e in self.endpoints if e.healthy] or self.endpoints
+            offset = next(self._rr) % len(candidates)
+            rotated = candidates[offset:] + candidates[:offset]
+            endpoint = min(rotated, key=lambda e: e.in_flight)
+            endpoint.in_flight += 1
+            endpoint.requests += 1
+            return endpoint
+
+    def _done(self, endpoint: Endpoint):
+        with self._lock:
+            endpoint.in_flight -= 1
+
+    @contextmanager
+    def lease(self):
+        """
+        Hold a replica for one request (or one whole stream); connection
+        failures take it out of rotation until its next health check
+        """
+        from openai import APIConnectionError, APITimeoutError
+
+        endpoint = self.pick()
+        try:
+            yield endpoint
+        except (APIConnectionError, httpx.TransportError) as e:
+            # A timeout may just be a short request deadline, not a dead replica
+            if not isinstance(e, (APITimeoutError, httpx.TimeoutException)):
+                endpoint.mark_down(e)
+            raise
+        finally:
+            self._done(endpoint)
+
+    def close(self):
+        """
+        Stop health checks and close the synchronous clients' pooled
+        connections (the async clients need aclose())
+        """
+        self._stop.set()
+        for endpoint in self.endpoints:
+            endpoint.http.close()
+
+    async def aclose(self):
+        """close() plus the async clients, from the event loop that used them"""
+        self.close()
+        for endpoint in self.endpoints:
+            await endpoint.async_http.aclose()
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [endpoint.stats() for endpoint in self.endpoints]
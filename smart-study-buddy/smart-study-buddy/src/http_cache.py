@@ -0,0 +1,165 @@
+"""
+Smart Study Buddy - HTTP Caching
+Strong ETags, conditional requests, Cache-Control and negotiated compression
+for content-addressed explanation URLs
+
+A URL names one explanation (topic, audience, tone, length, provider, model,
+prompt version). Browsers and shared caches (CDNs, reverse proxies) can then
+keep the response and revalidate it with If-None-Match, so repeated reads of
+popular explanations are answered before they reach a worker.
+"""
+
+import gzip
+import hashlib
+from typing import Optional
+from urllib.parse import urlencode
+
+from src.cache import ExplanationCache
+from src.prompts import AUDIENCE_LEVELS, PROMPT_VERSION
+
+# Brotli compresses JSON text noticeably better than gzip; it needs the
+# optional "brotli" package (pip install brotli), otherwise gzip is used
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    brotli = None
+    BROTLI_AVAILABLE = False
+
+# Bodies smaller than this are sent as-is (compression would not pay off)
+MIN_COMPRESS_BYTES = 512
+
+_AUDIENCE_SHORTHANDS = {description: name for name, description in AUDIENCE_LEVELS.items()}
+
+
+def canonical_query(
+    topic: str,
+    audience: str,
+    tone: Optional[str],
+    length: Optional[str],
+    provider: str,
+    model: str,
+    version: str = PROMPT_VERSION
+) -> str:
+    """
+    The one query string that names an explanation
+
+    Fields come in a fixed order, the topic's whitespace is collapsed and
+    audiences use their shorthand, so equivalent spellings share one URL.
+    The topic keeps its case: it is what the model is prompted with
+    ("Python" the language, not "python" the snake).
+    """
+    audience = _AUDIENCE_SHORTHANDS.get(audience, audience)
+    fields = [("topic", " ".join(topic.split())), ("audience", audience)]
+    if tone:
+        fields.append(("tone", tone))
+    if length:
+        fields.append(("length", length))
+    fields += [("provider", provider), ("model", model), ("v", version)]
+    return urlencode(fields)
+
+
+def etag_for(body: bytes, encoding: Optional[str] = None) -> str:
+    """
+    Strong ETag for a response body
+
+    Compressed representations get their own tag (RFC 9110 requires strong
+    validators to differ per content-coding). They share a prefix with the
+    uncompressed tag so if_none_match() accepts any of them.
+    """
+    tag = hashlib.sha256(body).hexdigest()[:32]
+    return f'"{tag}-{encoding}"' if encoding else f'"{tag}"'
+
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    return tag.strip('"').split("-", 1)[0]
+
+
+def if_none_match(header: Optional[str], etag: str) -> bool:
+    """True when an If-None-Match header matches ``etag`` (so a 304 will do)"""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    wanted = _opaque(etag)
+    return any(_opaque(tag) == wanted for tag in header.split(","))
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Pick "br" or "gzip" from an Accept-Encoding header (None = identity)
+
+    q-values are honoured (q=0 refuses a coding). On a tie brotli wins when
+    it is available.
+    """
+    if not accept_encoding:
+        return None
+    weights = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[name.strip().lower()] = q
+    star = weights.get("*", 0.0)
+    candidates = (["br"] if BROTLI_AVAILABLE else []) + ["gzip"]
+    best, best_q = None, 0.0
+    for coding in candidates:
+        q = weights.get(coding, star)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress(body: bytes, encoding: Optional[str]) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=6, mtime=0)
+    return body
+
+
+def cache_control(
+    max_age: int,
+    shared_max_age: int,
+    stale_while_revalidate: int = 0,
+    private: bool = False
+) -> str:
+    """
+    Cache-Control value for a revalidatable response
+
+    ``private`` responses (ones that needed credentials) may only be kept by
+    the client's own cache, so shared caches never hand them to other users.
+    """
+    if private:
+        value = f"private, max-age={max_age}"
+    else:
+        value = f"public, max-age={max_age}, s-maxage={shared_max_age}"
+    if stale_while_revalidate:
+        value += f", stale-while-revalidate={stale_while_revalidate}"
+    return value
+
+
+class EncodedBodies:
+    """LRU of compressed bodies by ETag, so popular explanations are compressed once per worker"""
+
+    def __init__(self, max_entries: int = 1024):
+        self._cache = ExplanationCache(max_entries=max_entries)
+
+    def encode(self, body: bytes, etag: str, encoding: Optional[str]) -> bytes:
+        if encoding is None:
+            return body
+        key = f"{etag}:{encoding}"
+        entry = self._cache.get(key)
+        if entry is None:
+            entry = {"body": compress(body, encoding)}
+            self._cache.set(key, entry)
+        return entry["body"]
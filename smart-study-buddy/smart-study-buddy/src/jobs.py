@@ -0,0 +1,353 @@
+"""
+Smart Study Buddy - Batch Jobs
+Durable SQLite job table processed by a bounded background worker pool
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import nullcontext
+from typing import Callable, Optional, Dict, Any, List
+
+DEFAULT_JOB_DB = os.getenv("JOB_DB", "jobs.db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    params TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS job_items (
+    job_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    topic TEXT NOT NULL,
+    status TEXT NOT NULL,
+    explanation TEXT,
+    error TEXT,
+    owner TEXT,
+    claimed_at REAL,
+    finished_at REAL,
+    PRIMARY KEY (job_id, idx)
+);
+CREATE INDEX IF NOT EXISTS idx_job_items_status ON job_items(status, claimed_at);
+"""
+
+# Item states: pending -> running -> done | failed | cancelled
+TERMINAL = ("done", "failed", "cancelled")
+
+
+class JobCancelled(Exception):
+    """Raised inside a worker when its job is cancelled mid-generation"""
+
+
+class JobManager:
+    """Submits, runs, tracks and cancels batch explanation jobs"""
+
+    def __init__(
+        self,
+        buddy_factory: Callable[[str], Any],
+        path: str = DEFAULT_JOB_DB,
+        workers: int = 4,
+        lease_seconds: float = 600.0,
+        poll_interval: float = 1.0,
+        admission=None,
+        on_result: Optional[Callable[[Dict[str, Any], str], None]] = None
+    ):
+        """
+        Open the job table and start the worker pool
+
+        Args:
+            buddy_factory: Returns a SmartStudyBuddy for a provider name
+            path: SQLite database file (shared by every process on the host)
+            workers: Background worker threads in this process
+            lease_seconds: Running items not finished within this time are
+                treated as abandoned and picked up again
+            poll_interval: Seconds idle workers wait before re-checking the table
+            admission: Optional AdmissionController; items then wait behind
+                interactive requests for upstream capacity
+            on_result: Optional callback(job params, explanation) run for
+                every completed item (e.g. tenant usage accounting)
+        """
+        self.buddy_factory = buddy_factory
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.admission = admission
+        self.on_result = on_result
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._local = threading.local()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._cancel_checked = {}
+
+        conn = self._conn()
+        conn.executescript(_SCHEMA)
+        conn.commit()
+        self._release_orphans()
+
+        self._threads = [
+            threading.Thread(target=self._work_loop, name=f"job-worker-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _release_orphans(self):
+        """Return items claimed by dead processes on this host to the queue"""
+        host = socket.gethostname()
+        rows = self._conn().execute(
+            "SELECT DISTINCT owner FROM job_items WHERE status = 'running'"
+        ).fetchall()
+        for (owner,) in rows:
+            owner_host, _, pid = (owner or "").rpartition(":")
+            if owner_host != host or not pid.isdigit():
+                continue
+            try:
+                os.kill(int(pid), 0)
+                continue
+            except ProcessLookupError:
+                pass
+            except PermissionError:
+                continue
+            self._conn().execute(
+                "UPDATE job_items SET status = 'pending', owner = NULL WHERE status = 'running' AND owner = ?",
+                (owner,)
+            )
+
+    def submit(
+        self,
+        topics: List[str],
+        audience: str,
+        tone: Optional[str] = None,
+        length: Optional[str] = None,
+        provider: str = "openai",
+        tenant: str = "",
+        weight: float = 1.0
+    ) -> str:
+        """
+        Queue a batch job and return immediately
+
+        Args:
+            tenant: Owning tenant; only it can read or cancel the job, and its
+                items queue under this tenant's fair share
+            weight: The tenant's admission weight
+
+        Returns:
+            Job id
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        params = {
+            "audience": audience,
+            "tone": tone,
+            "length": length,
+            "provider": provider,
+            "tenant": tenant,
+            "weight": weight
+        }
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN")
+            conn.execute(
+                "INSERT INTO jobs (id, status, params, total, created_at, updated_at) VALUES (?, 'queued', ?, ?, ?, ?)",
+                (job_id, json.dumps(params), len(topics), now, now)
+            )
+            conn.executemany(
+                "INSERT INTO job_items (job_id, idx, topic, status) VALUES (?, ?, ?, 'pending')",
+                [(job_id, i, topic) for i, topic in enumerate(topics)]
+            )
+        self._wake.set()
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Job status with per-state item counts, or None if unknown"""
+        job = self._conn().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if job is None:
+            return None
+        counts = dict(self._conn().execute(
+            "SELECT status, COUNT(*) FROM job_items WHERE job_id = ? GROUP BY status", (job_id,)
+        ).fetchall())
+        return {
+            "job_id": job_id,
+            "status": job["status"],
+            "params": json.loads(job["params"]),
+            "total": job["total"],
+            "counts": {state: counts.get(state, 0) for state in ("pending", "running") + TERMINAL},
+            "created_at": job["created_at"],
+            "updated_at": job["updated_at"]
+        }
+
+    def results(self, job_id: str, offset: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        """Finished items (done or failed) in input order"""
+        rows = self._conn().execute(
+            """SELECT idx, topic, status, explanation, error FROM job_items
+               WHERE job_id = ? AND status IN ('done', 'failed')
+               ORDER BY idx LIMIT ? OFFSET ?""",
+            (job_id, limit, offset)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def finished_since(self, job_id: str, since: float) -> List[Dict[str, Any]]:
+        """Items that reached a terminal state at or after ``since`` (for streaming)"""
+        rows = self._conn().execute(
+            """SELECT idx, topic, status, explanation, error, finished_at FROM job_items
+               WHERE job_id = ? AND finished_at >= ? ORDER BY finished_at""",
+            (job_id, since)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a job: pending items are dropped, in-flight streams are closed"""
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN")
+            updated = conn.execute(
+                "UPDATE jobs SET status = 'cancelled', updated_at = ? WHERE id = ? AND status IN ('queued', 'running')",
+                (now, job_id)
+            ).rowcount
+            conn.execute(
+                "UPDATE job_items SET status = 'cancelled', finished_at = ? WHERE job_id = ? AND status = 'pending'",
+                (now, job_id)
+            )
+        self._cancel_checked.pop(job_id, None)
+        return bool(updated)
+
+    def shutdown(self):
+        """Stop workers after their current item"""
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join()
+
+    def _claim(self) -> Optional[sqlite3.Row]:
+        """Atomically take the oldest pending (or abandoned) item"""
+        now = time.time()
+        return self._conn().execute(
+            """UPDATE job_items SET status = 'running', owner = ?, claimed_at = ?
+               WHERE rowid = (
+                   SELECT rowid FROM job_items
+                   WHERE status = 'pending' OR (status = 'running' AND claimed_at < ?)
+                   ORDER BY claimed_at IS NOT NULL, rowid LIMIT 1
+               )
+               RETURNING job_id, idx, topic, claimed_at""",
+            (self.owner, now, now - self.lease_seconds)
+        ).fetchone()
+
+    def _renew(self, job_id: str, idx: int, claimed_at: float) -> bool:
+        """
+        Restart an item's lease, unless it expired and another worker
+        re-claimed the item meanwhile (False: leave the item to that worker)
+        """
+        return self._conn().execute(
+            """UPDATE job_items SET claimed_at = ?
+               WHERE job_id = ? AND idx = ? AND status = 'running' AND claimed_at = ?""",
+            (time.time(), job_id, idx, claimed_at)
+        ).rowcount == 1
+
+    def _is_cancelled(self, job_id: str, fresh: bool = False) -> bool:
+        """Job status check, throttled to one query per second per job unless ``fresh``"""
+        checked = self._cancel_checked.get(job_id)
+        now = time.monotonic()
+        if fresh or checked is None or now - checked[0] > 1.0:
+            row = self._conn().execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            checked = (now, row is None or row["status"] == "cancelled")
+            self._cancel_checked[job_id] = checked
+        return checked[1]
+
+    def _work_loop(self):
+        while not self._stop.is_set():
+            item = self._claim()
+            if item is None:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+                continue
+            self._process(item["job_id"], item["idx"], item["topic"], item["claimed_at"])
+
+    def _process(self, job_id: str, idx: int, topic: str, claimed_at: float):
+        conn = self._conn()
+        job = conn.execute("SELECT status, params FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if job is None or job["status"] == "cancelled":
+            self._finish(job_id, idx, "cancelled")
+            return
+        if job["status"] == "queued":
+            conn.execute(
+                "UPDATE jobs SET status = 'running', updated_at = ? WHERE id = ? AND status = 'queued'",
+                (time.time(), job_id)
+            )
+
+        params = json.loads(job["params"])
+        try:
+            buddy = self.buddy_factory(params["provider"])
+            parts = []
+            slot = nullcontext()
+            if self.admission is not None:
+                slot = self.admission.slot_sync("batch", tenant=params.get("tenant", ""), weight=params.get("weight", 1.0))
+            with slot:
+                # Waiting for a batch slot can take a while: the job may have
+                # been cancelled, or the lease may have run out, meanwhile
+                if not self._renew(job_id, idx, claimed_at):
+                    return
+                if self._is_cancelled(job_id, fresh=True):
+                    raise JobCancelled()
+                chunks = buddy.explain(topic, params["audience"], params["tone"], params["length"], stream=True)
+                try:
+                    for chunk in chunks:
+                        if self._is_cancelled(job_id):
+                            raise JobCancelled()
+                        parts.append(chunk)
+                finally:
+                    chunks.close()
+        except JobCancelled:
+            self._finish(job_id, idx, "cancelled")
+            return
+        except Exception as e:
+            self._finish(job_id, idx, "failed", error=str(e))
+            return
+        
+        explanation = "".join(parts)
+        self._finish(job_id, idx, "done", explanation=explanation)
+        if self.on_result is not None:
+            try:
+                self.on_result(params, explanation)
+            except Exception:
+                # Accounting must never take a worker down
+                pass
+
+    def _finish(self, job_id: str, idx: int, status: str, explanation: str = None, error: str = None):
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN")
+            conn.execute(
+                """UPDATE job_items SET status = ?, explanation = ?, error = ?, finished_at = ?
+                   WHERE job_id = ? AND idx = ?""",
+                (status, explanation, error, now, job_id, idx)
+            )
+            open_items = conn.execute(
+                "SELECT COUNT(*) FROM job_items WHERE job_id = ? AND status IN ('pending', 'running')",
+                (job_id,)
+            ).fetchone()[0]
+            if open_items == 0:
+                conn.execute(
+                    "UPDATE jobs SET status = 'completed', updated_at = ? WHERE id = ? AND status IN ('queued', 'running')",
+                    (now, job_id)
+                )
+            else:
+                conn.execute("UPDATE jobs SET updated_at = ? WHERE id = ?", (now, job_id))
@@ -0,0 +1,207 @@
+"""
+Smart Study Buddy - Structured Logging
+JSON event logs written by a background thread, with per-event sampling
+
+Library modules only emit through ``log_event``; nothing is written until an
+application calls ``configure_logging`` (the package logger has a
+NullHandler, so it is silent by default).
+"""
+
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Optional, Dict
+
+LOGGER_NAME = "smart_study_buddy"
+
+logging.getLogger(LOGGER_NAME).addHandler(logging.NullHandler())
+
+# Id of the request being served, attached to every event it logs
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# Event name -> fraction of events kept (high-volume events only)
+_sample_rates: Dict[str, float] = {}
+_listener: Optional[logging.handlers.QueueListener] = None
+
+# LogRecord attributes that are not user fields
+_RESERVED = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger under the package namespace (e.g. ``get_logger("ai_client")``)"""
+    return logging.getLogger(f"{LOGGER_NAME}.{name}")
+
+
+def log_event(logger: logging.Logger, event: str, level: int = logging.INFO, **fields):
+    """
+    Emit a structured event
+
+    Returns immediately when the level is disabled or the event is sampled
+    out, so callers need not guard it.
+
+    Args:
+        logger: Logger from get_logger
+        event: Dotted event name, e.g. "explanation.generated"
+        level: Logging level
+        **fields: JSON-serialisable fields (provider, model, latency_ms, ...)
+    """
+    if not logger.isEnabledFor(level):
+        return
+    rate = _sample_rates.get(event)
+    if rate is not None:
+        if random.random() >= rate:
+            return
+        fields["sample_rate"] = rate
+    logger.log(level, event, extra=fields)
+
+
+class _RequestIdFilter(logging.Filter):
+    """Stamps records with the current request id on the emitting thread"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "request_id"):
+            record.request_id = request_id_var.get()
+        return True
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Queues records as-is (pre-rendering only the message and traceback)"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.message = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.error = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, event and its fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "event": record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED and value is not None:
+                data[key] = value
+        if record.exc_info:
+            data["error"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+def parse_sample_rates(spec: Optional[str]) -> Dict[str, float]:
+    """Parse "event=rate,event=rate" (e.g. from LOG_SAMPLE_RATES)"""
+    rates = {}
+    for item in (spec or "").split(","):
+        if "=" in item:
+            event, rate = item.split("=", 1)
+            rates[event.strip()] = float(rate)
+    return rates
+
+
+def configure_logging(
+    level: str = "INFO",
+    stream=None,
+    sample_rates: Optional[Dict[str, float]] = None
+) -> logging.handlers.QueueListener:
+    """
+    Send the package's events to ``stream`` as JSON lines
+
+    Emitting threads only put records on an in-memory queue; a listener
+    thread formats and writes them. Calling this again replaces the
+    previous configuration.
+
+    Args:
+        level: Minimum level ("DEBUG", "INFO", ...)
+        stream: Output stream (stderr by default)
+        sample_rates: Event name -> fraction kept, for high-volume events
+
+    Returns:
+        The running QueueListener (stopped automatically at exit)
+    """
+    global _listener
+    logger = logging.getLogger(LOGGER_NAME)
+    if _listener is not None:
+        _listener.stop()
+    for handler in list(logger.handlers):
+        if isinstance(handler, _QueueHandler):
+            logger.removeHandler(handler)
+
+    records = queue.SimpleQueue()
+    handler = _QueueHandler(records)
+    handler.addFilter(_RequestIdFilter())
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(JsonFormatter())
+    _listener = logging.handlers.QueueListener(records, output)
+    _listener.start()
+
+    logger.addHandler(handler)
+    logger.setLevel(level.upper() if isinstance(level, str) else level)
+    # Events go to our handler only, not to whatever the root logger does
+    logger.propagate = False
+    _sample_rates.clear()
+    _sample_rates.update(sample_rates or {})
+    return _listener
+
+
+@atexit.register
+def _flush():
+    if _listener is not None:
+        _listener.stop()
+
+
+class RequestLogMiddleware:
+    """
+    ASGI middleware giving each request an id (from ``X-Request-Id`` or a new
+    one), echoing it in the response and logging a ``request`` event with
+    method, path, status and latency once the response has been sent
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.logger = get_logger("api")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_id = next(
+            (v.decode() for k, v in scope["headers"] if k == b"x-request-id"), None
+        ) or uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", [])) + [(b"x-request-id", request_id.encode())]
+                message = dict(message, headers=headers)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            log_event(
+                self.logger, "request",
+                method=scope["method"],
+                path=scope["path"],
+                status=status,
+                latency_ms=round((time.perf_counter() - started) * 1000, 2)
+            )
+            request_id_var.reset(token)
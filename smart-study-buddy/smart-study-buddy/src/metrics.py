@@ -0,0 +1,71 @@
+"""
+Smart Study Buddy - Metrics
+Process-local counters, periodically folded into shared state
+"""
+
+import atexit
+import threading
+from collections import defaultdict
+from typing import Dict
+
+
+class Metrics:
+    """
+    Counters incremented in memory on the hot path and flushed to a
+    SharedState backend in the background, so every worker process reports
+    into the same totals without a shared write per request
+    """
+
+    def __init__(self, state=None, flush_interval: float = 1.0):
+        """
+        Initialize metrics
+
+        Args:
+            state: Optional SharedState; without one, counters stay process-local
+            flush_interval: Seconds between background flushes
+        """
+        self.state = state
+        self.flush_interval = flush_interval
+        self._pending = defaultdict(float)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+        if state is not None:
+            self._thread = threading.Thread(target=self._flush_loop, name="metrics-flush", daemon=True)
+            self._thread.start()
+            atexit.register(self.flush)
+
+    def incr(self, name: str, amount: float = 1):
+        """Add to a counter (cheap: a dict update under a lock)"""
+        with self._lock:
+            self._pending[name] += amount
+
+    def flush(self):
+        """Push pending increments to shared state"""
+        if self.state is None:
+            return
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(float)
+        for name, amount in pending.items():
+            self.state.incr(name, amount)
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                # Shared state briefly unavailable; keep counting locally
+                pass
+
+    def snapshot(self, prefix: str = "") -> Dict[str, float]:
+        """Totals (shared plus this process's unflushed increments)"""
+        totals = dict(self.state.counters(prefix)) if self.state is not None else {}
+        with self._lock:
+            for name, amount in self._pending.items():
+                if name.startswith(prefix):
+                    totals[name] = totals.get(name, 0) + amount
+        return totals
+
+    def get(self, name: str) -> float:
+        return self.snapshot(name).get(name, 0)
+
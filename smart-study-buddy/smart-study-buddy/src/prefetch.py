@@ -0,0 +1,261 @@
+"""
+Smart Study Buddy - Speculative Prefetch
+Learns which variant of a topic tends to be requested next (one audience
+level up or down, another length or tone) and generates the likeliest
+follow-ups into the cache in the background while there is spare capacity
+"""
+
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, List, Tuple, Callable
+
+from src.admission import BACKGROUND, Overloaded
+from src.logs import get_logger, log_event
+from src.metrics import Metrics
+from src.prompts import AUDIENCE_LEVELS, TONES, LENGTHS
+
+logger = get_logger("prefetch")
+
+_LEVELS = list(AUDIENCE_LEVELS.values())
+
+Variant = Tuple[str, Optional[str], Optional[str]]
+
+# Starting counts before any traffic is observed: neighbouring levels first,
+# then a length change (the pattern demo.py walks through)
+PRIOR_TRANSITIONS = {
+    "level_up": 3,
+    "level_down": 3,
+    "length:short": 1,
+    "length:detailed": 1,
+}
+
+
+def transition(previous: Variant, current: Variant) -> Optional[str]:
+    """
+    Name the single change between two requests for the same topic
+
+    Returns:
+        "level_up", "level_down", "length:<value>", "tone:<value>" or None
+        when nothing or more than one thing changed
+    """
+    changed = [i for i in range(3) if previous[i] != current[i]]
+    if len(changed) != 1:
+        return None
+    if changed == [0]:
+        if previous[0] not in _LEVELS or current[0] not in _LEVELS:
+            return None
+        step = _LEVELS.index(current[0]) - _LEVELS.index(previous[0])
+        return {1: "level_up", -1: "level_down"}.get(step)
+    field = "tone" if changed == [1] else "length"
+    return f"{field}:{current[changed[0]] or ''}"
+
+
+def apply_transition(name: str, variant: Variant) -> Optional[Variant]:
+    """The variant a transition leads to from ``variant`` (None if it cannot apply)"""
+    audience, tone, length = variant
+    if name in ("level_up", "level_down"):
+        if audience not in _LEVELS:
+            return None
+        index = _LEVELS.index(audience) + (1 if name == "level_up" else -1)
+        if not 0 <= index < len(_LEVELS):
+            return None
+        return _LEVELS[index], tone, length
+    field, _, value = name.partition(":")
+    value = value or None
+    if field == "tone" and value != tone and (value is None or value in TONES):
+        return audience, value, length
+    if field == "length" and value != length and (value is None or value in LENGTHS):
+        return audience, tone, value
+    return None
+
+
+class Prefetcher:
+    """
+    Background generator of likely follow-up variants
+
+    Transition counts live in Metrics (``prefetch.transition.*``), so with
+    shared metrics every worker learns from all traffic. Prefetched cache
+    entries are flagged, and their first real hit counts towards the hit
+    rate reported by stats().
+    """
+
+    def __init__(
+        self,
+        generate: Callable[[str, str, Optional[str], Optional[str]], int],
+        metrics=None,
+        admission=None,
+        tokens_per_hour: int = 50000,
+        max_candidates: int = 2,
+        min_probability: float = 0.2,
+        max_pending: int = 32,
+        remember_topics: int = 10000
+    ):
+        """
+        Initialize the prefetcher
+
+        Args:
+            generate: Generates one variant into the cache and returns the
+                output tokens it spent (0 if it was already cached)
+            metrics: Metrics for transition counts and prefetch counters
+            admission: Optional AdmissionController; prefetches only start
+                while it is at most half busy with nothing queued, and run in
+                sheddable background slots
+            tokens_per_hour: Spend budget for speculative generations
+            max_candidates: Follow-ups prefetched per explanation
+            min_probability: Skip follow-ups less likely than this
+            max_pending: Queued prefetches beyond this are dropped
+            remember_topics: Topics whose last variant is kept to learn from
+        """
+        self.generate = generate
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.admission = admission
+        self.tokens_per_hour = tokens_per_hour
+        self.max_candidates = max_candidates
+        self.min_probability = min_probability
+        self._last = OrderedDict()
+        self._remember_topics = remember_topics
+        self._lock = threading.Lock()
+        self._spent = 0
+        self._window_start = time.monotonic()
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._listeners = []
+        self._thread = threading.Thread(target=self._worker, name="prefetch", daemon=True)
+        self._thread.start()
+
+    def observe(self, topic: str, variant: Variant):
+        """Learn from a request: count the change from this topic's previous variant"""
+        topic = " ".join(topic.lower().split())
+        with self._lock:
+            previous = self._last.pop(topic, None)
+            self._last[topic] = variant
+            if len(self._last) > self._remember_topics:
+                self._last.popitem(last=False)
+        name = transition(previous, variant) if previous is not None else None
+        if name is not None:
+            self.metrics.incr(f"prefetch.transition.{name}")
+
+    def schedule(self, topic: str, variant: Variant):
+        """Queue follow-ups of a served explanation (never blocks the request)"""
+        try:
+            self._queue.put_nowait((topic, variant))
+        except queue.Full:
+            self.metrics.incr("prefetch.skipped.queue_full")
+
+    def predict(self, variant: Variant) -> List[Tuple[Variant, float]]:
+        """Likeliest next variants with their estimated probabilities"""
+        counts = dict(PRIOR_TRANSITIONS)
+        prefix = "prefetch.transition."
+        for name, count in self.metrics.snapshot(prefix).items():
+            counts[name[len(prefix):]] = counts.get(name[len(prefix):], 0) + count
+
+        options = []
+        for name, count in counts.items():
+            target = apply_transition(name, variant)
+            if target is not None:
+                options.append((target, count))
+        total = sum(count for _, count in options)
+        ranked = sorted(((target, count / total) for target, count in options), key=lambda o: -o[1])
+        return [o for o in ranked if o[1] >= self.min_probability][:self.max_candidates]
+
+    def idle(self) -> bool:
+        """Whether there is spare capacity for speculative work"""
+        if self.admission is None:
+            return True
+        stats = self.admission.stats()
+        return stats["in_flight"] <= stats["max_in_flight"] // 2 and not any(stats["queued"].values())
+
+    def _within_budget(self) -> bool:
+        with self._lock:
+            if time.monotonic() - self._window_start >= 3600:
+                self._window_start, self._spent = time.monotonic(), 0
+            return self._spent < self.tokens_per_hour
+
+    def _worker(self):
+        while True:
+            topic, variant = self._queue.get()
+            try:
+                self._prefetch(topic, variant)
+            except Exception as e:
+                # A shared-state hiccup (SQLite/Redis) must not end the only prefetch thread
+                self.metrics.incr("prefetch.errors")
+                log_event(logger, "prefetch.failed", logging.WARNING, topic=topic, error=f"{type(e).__name__}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def subscribe(self, listener: Callable[[str, Variant], None]) -> Callable[[], None]:
+        """
+        Call ``listener(topic, variant)`` (on the prefetch thread) after each
+        newly prefetched variant, e.g. to push it to connected clients
+
+        Returns:
+            A function that removes the listener
+        """
+        with self._lock:
+            self._listeners.append(listener)
+
+        def unsubscribe():
+            with self._lock:
+                if listener in self._listeners:
+                    self._listeners.remove(listener)
+        return unsubscribe
+
+    def _prefetch(self, topic: str, variant: Variant):
+        for target, _ in self.predict(variant):
+            if not self._within_budget():
+                self.metrics.incr("prefetch.skipped.budget")
+                continue
+            if not self.idle():
+                self.metrics.incr("prefetch.skipped.busy")
+                continue
+            try:
+                if self.admission is not None:
+                    with self.admission.slot_sync(BACKGROUND, sheddable=True):
+                        spent = self.generate(topic, *target)
+                else:
+                    spent = self.generate(topic, *target)
+            except Overloaded:
+                self.metrics.incr("prefetch.skipped.busy")
+                continue
+            except Exception:
+                self.metrics.incr("prefetch.errors")
+                continue
+            if spent:
+                with self._lock:
+                    self._spent += spent
+                self.metrics.incr("prefetch.generated")
+                self.metrics.incr("prefetch.tokens", spent)
+                with self._lock:
+                    listeners = list(self._listeners)
+                for listener in listeners:
+                    try:
+                        listener(topic, target)
+                    except Exception:
+                        self.metrics.incr("prefetch.listener_errors")
+
+    def drain(self, timeout: float = 10.0) -> bool:
+        """Wait until queued prefetches have been picked up and finished (tests, shutdown)"""
+        end = time.monotonic() + timeout
+        while time.monotonic() < end:
+            if self._queue.unfinished_tasks == 0:
+                return True
+            time.sleep(0.01)
+        return False
+
+    def stats(self) -> Dict[str, float]:
+        """Prefetch counters and hit rate (used prefetches / generated)"""
+        counters = self.metrics.snapshot("prefetch.")
+        generated = counters.get("prefetch.generated", 0)
+        used = counters.get("prefetch.hits", 0)
+        return {
+            "generated": generated,
+            "hits": used,
+            "hit_rate": round(used / generated, 3) if generated else 0.0,
+            "tokens": counters.get("prefetch.tokens", 0),
+            "skipped_budget": counters.get("prefetch.skipped.budget", 0),
+            "skipped_busy": counters.get("prefetch.skipped.busy", 0),
+            "errors": counters.get("prefetch.errors", 0),
+            "tokens_spent_this_hour": self._spent
+        }
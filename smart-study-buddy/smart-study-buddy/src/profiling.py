@@ -0,0 +1,307 @@
+"""
+Smart Study Buddy - Request Profiling
+Opt-in, sampled CPU and allocation profiles of individual API requests,
+written to a local directory for offline inspection
+"""
+
+import asyncio
+import cProfile
+import json
+import os
+import pstats
+import random
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import asynccontextmanager, contextmanager
+from typing import Optional, Dict, Any, List
+
+# Functions of the generation hot path summarised in each profile's index entry
+HOT_PATH = (
+    "explain", "astream", "_prepare", "_route", "_commit", "_tee_stream",
+    "create_user_prompt", "stream_explanation", "astream_explanation",
+    "_stream_openai", "_astream_openai", "_stream_anthropic", "_astream_anthropic"
+)
+
+# Source directory of this package, used to tell our hot path from same-named library functions
+_SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+_ROOT_DIR = os.path.dirname(_SRC_DIR)
+
+
+def _function_label(key) -> str:
+    filename, line, name = key
+    if filename.startswith(_ROOT_DIR):
+        filename = os.path.relpath(filename, _ROOT_DIR)
+    return f"{filename}:{line}({name})"
+
+
+class Profiler:
+    """
+    Captures a cProfile and a tracemalloc snapshot around selected requests
+
+    A request is profiled when it asks for it (``X-Profile: 1``) or is picked
+    by the sample rate. Only one capture runs at a time and requests arriving
+    meanwhile run unprofiled. cProfile records everything the capturing
+    thread executes, though, and an API worker's thread is its event loop:
+    other requests' coroutines interleaved with the profiled one are counted
+    too, and tracemalloc sees every thread's allocations. Each index entry
+    therefore records its ``scope`` and, from the middleware, how many other
+    requests overlapped it.
+    """
+
+    def __init__(
+        self,
+        directory: str = "profiles",
+        sample_rate: float = 0.0,
+        max_profiles: int = 200,
+        top: int = 25,
+        metrics=None
+    ):
+        """
+        Initialize the profiler
+
+        Args:
+            directory: Where profiles and their index entries are written
+            sample_rate: Fraction of requests profiled without being asked (0-1)
+            max_profiles: Oldest profiles are deleted beyond this many
+            top: Functions and allocation sites kept in each index entry
+            metrics: Optional Metrics for captured/busy counters
+        """
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.max_profiles = max_profiles
+        self.top = top
+        self.metrics = metrics
+        self._busy = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def wanted(self, requested: bool = False) -> bool:
+        """Whether to profile a request (asked for explicitly, or sampled)"""
+        return requested or (self.sample_rate > 0 and random.random() < self.sample_rate)
+
+    @contextmanager
+    def capture(self, label: str, notes: Optional[Dict[str, Any]] = None):
+        """
+        Profile the enclosed block, writing the profile before returning
+
+        Args:
+            label: Shown in the index (e.g. "POST /explain")
+            notes: Optional dict merged into the index entry; the caller may
+                fill it in until the block exits
+
+        Yields:
+            The new profile id, or None when another capture is running
+        """
+        state = self._start(label, notes)
+        if state is None:
+            yield None
+            return
+        try:
+            yield state["id"]
+        finally:
+            self._finish(self._stop(state))
+
+    @asynccontextmanager
+    async def acapture(self, label: str, notes: Optional[Dict[str, Any]] = None):
+        """
+        capture() for the event loop: the snapshot, pstats summary and file
+        writes run in a worker thread instead of stalling other requests
+        """
+        state = self._start(label, notes)
+        if state is None:
+            yield None
+            return
+        try:
+            yield state["id"]
+        finally:
+            await asyncio.to_thread(self._finish, self._stop(state))
+
+    def _start(self, label: str, notes: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Begin a capture on the calling thread (None when one is already running)"""
+        if not self._busy.acquire(blocking=False):
+            if self.metrics is not None:
+                self.metrics.incr("profiling.busy")
+            return None
+
+        now = time.time()
+        # Sortable by capture time, unique across worker processes
+        profile_id = (
+            f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(now))}"
+            f"-{int(now * 1e6) % 10 ** 6:06d}-{uuid.uuid4().hex[:6]}"
+        )
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        profile = cProfile.Profile()
+        state = {
+            "id": profile_id,
+            "label": label,
+            "notes": notes if notes is not None else {},
+            "profile": profile,
+            "started_tracing": started_tracing,
+            "started": now,
+            "cpu_started": time.process_time(),
+            "wall_started": time.perf_counter()
+        }
+        profile.enable()
+        return state
+
+    def _stop(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Stop profiling; must run on the thread that called _start()"""
+        state["profile"].disable()
+        state["wall_ms"] = (time.perf_counter() - state["wall_started"]) * 1000
+        state["cpu_ms"] = (time.process_time() - state["cpu_started"]) * 1000
+        _, state["peak"] = tracemalloc.get_traced_memory()
+        return state
+
+    def _finish(self, state: Dict[str, Any]):
+        """Snapshot allocations, write the capture and free the profiler (any thread)"""
+        try:
+            snapshot = tracemalloc.take_snapshot()
+            if state["started_tracing"]:
+                tracemalloc.stop()
+            self._write(state["id"], state["label"], state["profile"], snapshot, {
+                "scope": "thread",
+                **state["notes"],
+                "started": state["started"],
+                "wall_ms": round(state["wall_ms"], 2),
+                "cpu_ms": round(state["cpu_ms"], 2),
+                "peak_alloc_kb": round(state["peak"] / 1024, 1)
+            })
+        finally:
+            self._busy.release()
+
+    def _write(self, profile_id: str, label: str, profile: cProfile.Profile, snapshot, timings: Dict[str, Any]):
+        """Dump the raw profile and an index entry summarising it"""
+        prof_path = os.path.join(self.directory, f"{profile_id}.prof")
+        profile.dump_stats(prof_path)
+        stats = pstats.Stats(profile).stats
+
+        hot_path = {}
+        for key, (_, calls, tottime, cumtime, _) in stats.items():
+            if key[2] in HOT_PATH and key[0].startswith(_SRC_DIR):
+                hot_path[_function_label(key)] = {
+                    "calls": calls,
+                    "self_ms": round(tottime * 1000, 3),
+                    "cumulative_ms": round(cumtime * 1000, 3)
+                }
+        by_self_time = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)[:self.top]
+        allocations = snapshot.filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, cProfile.__file__)
+        ]).statistics("lineno")[:self.top]
+
+        entry = {
+            "id": profile_id,
+            "label": label,
+            **timings,
+            "hot_path": hot_path,
+            "top_functions": [
+                {"function": _function_label(key), "calls": calls, "self_ms": round(tottime * 1000, 3)}
+                for key, (_, calls, tottime, _, _) in by_self_time
+            ],
+            "top_allocations": [
+                {"site": str(stat.traceback[0]), "kb": round(stat.size / 1024, 1), "count": stat.count}
+                for stat in allocations
+            ],
+            "profile_file": os.path.basename(prof_path)
+        }
+        with open(os.path.join(self.directory, f"{profile_id}.json"), "w", encoding="utf-8") as f:
+            json.dump(entry, f, indent=2)
+        if self.metrics is not None:
+            self.metrics.incr("profiling.captured")
+        self._prune()
+
+    def _prune(self):
+        ids = sorted(name[:-5] for name in os.listdir(self.directory) if name.endswith(".json"))
+        for profile_id in ids[:max(0, len(ids) - self.max_profiles)]:
+            for suffix in (".json", ".prof"):
+                try:
+                    os.remove(os.path.join(self.directory, profile_id + suffix))
+                except FileNotFoundError:
+                    pass
+
+    def index(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Captured profiles, newest first (without their function/allocation tables)"""
+        ids = sorted((name[:-5] for name in os.listdir(self.directory) if name.endswith(".json")), reverse=True)
+        entries = []
+        for profile_id in ids[:limit]:
+            entry = self.get(profile_id)
+            if entry is not None:
+                entries.append({k: v for k, v in entry.items() if k not in ("top_functions", "top_allocations")})
+        return entries
+
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        """Full index entry for a profile, or None"""
+        path = self.path(profile_id, ".json")
+        if path is None:
+            return None
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def path(self, profile_id: str, suffix: str = ".prof") -> Optional[str]:
+        """File of a profile (ids are never treated as paths)"""
+        if os.path.basename(profile_id) != profile_id or profile_id.startswith("."):
+            return None
+        path = os.path.join(self.directory, profile_id + suffix)
+        return path if os.path.exists(path) else None
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware profiling sampled requests from the first byte received
+    to the last byte sent, so streamed responses are covered end to end.
+    Profiled responses carry an ``X-Profile-Id`` header.
+
+    The capture covers the whole event loop while the request runs; its
+    index entry counts the other requests that overlapped it
+    (``overlapping_requests``), so a profile taken under load can be told
+    apart from one of the request alone.
+    """
+
+    def __init__(self, app, profiler: Profiler, header: str = "x-profile"):
+        self.app = app
+        self.profiler = profiler
+        self.header = header.lower().encode()
+        self._in_flight = 0
+        self._started = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        self._in_flight += 1
+        self._started += 1
+        try:
+            await self._handle(scope, receive, send)
+        finally:
+            self._in_flight -= 1
+
+    async def _handle(self, scope, receive, send):
+        requested = any(k == self.header and v.strip() in (b"1", b"true") for k, v in scope["headers"])
+        if not self.profiler.wanted(requested):
+            await self.app(scope, receive, send)
+            return
+
+        notes = {"scope": "event loop"}
+        already_running, started = self._in_flight - 1, self._started
+        async with self.profiler.acapture(f"{scope['method']} {scope['path']}", notes) as profile_id:
+            if profile_id is None:
+                await self.app(scope, receive, send)
+                return
+
+            async def send_with_id(message):
+                if message["type"] == "http.response.start":
+                    headers = list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode())]
+                    message = dict(message, headers=headers)
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_id)
+            finally:
+                notes["overlapping_requests"] = already_running + self._started - started
@@ -3,6 +3,13 @@ Smart Study Buddy - System Prompt Definition
 This module contains the core system prompt that defines the AI tutor's behavior.
 """
 
+import hashlib
+
+# Bump whenever SYSTEM_PROMPT or create_user_prompt() changes what gets
+# generated: it is part of every explanation URL, so HTTP caches holding
+# output of the old prompts stop being used
+PROMPT_VERSION = "1"
+
 SYSTEM_PROMPT = """You are Smart Study Buddy, an adaptive AI tutor designed to explain any topic in a way that perfectly matches the learner's age, level, and background.
 
 Your goal is clarity first, confidence always. You make complex ideas feel simple, friendly, and approachable—without losing accuracy.
@@ -65,7 +72,13 @@ Smart Study Buddy exists to:
 * Adapt instantly to any learner"""
 
 
-def create_user_prompt(topic: str, audience: str, tone: str = None, length: str = None) -> str:
+def create_user_prompt(
+    topic: str,
+    audience: str,
+    tone: str = None,
+    length: str = None,
+    context: str = None
+) -> str:
     """
     Create a formatted user prompt for the Smart Study Buddy.
     
@@ -74,6 +87,8 @@ def create_user_prompt(topic: str, audience: str, tone: str = None, length: str
         audience: Age or experience level
         tone: Optional tone (playful, neutral, academic, professional)
         length: Optional length (short, medium, detailed)
+        context: Optional material the learner has already covered (e.g.
+            prerequisite summaries in a curriculum)
     
     Returns:
         Formatted prompt string
@@ -89,11 +104,112 @@ def create_user_prompt(topic: str, audience: str, tone: str = None, length: str
     if length:
         prompt_parts.append(f"Length: {length}")
     
+    if context:
+        prompt_parts.append(f"\nThe learner has already covered:\n{context}\nBuild on this rather than repeating it.")
+    
     prompt_parts.append("\nPlease explain this topic according to the guidelines above.")
+    prompt_parts.append(SECTION_INSTRUCTIONS)
+    
+    return "\n".join(prompt_parts)
+
+
+def create_follow_up_prompt(question: str, audience: str, tone: str = None) -> str:
+    """
+    Create the user prompt for a follow-up question in a conversation.
+    
+    Args:
+        question: The learner's follow-up question
+        audience: Age or experience level of the conversation
+        tone: Optional tone of the conversation
+    
+    Returns:
+        Formatted prompt string
+    """
+    prompt_parts = [
+        f"Follow-up question: {question}",
+        f"Audience: {audience}"
+    ]
+    
+    if tone:
+        prompt_parts.append(f"Tone: {tone}")
+    
+    prompt_parts.append(
+        "\nAnswer the question directly, building on the conversation so far. "
+        "Use the full teaching structure only if the question needs a new explanation."
+    )
+    
+    return "\n".join(prompt_parts)
+
+
+# Cheaper rewrite instructions for deriving a variant from an existing
+# explanation (see src/derive.py) instead of generating it from scratch
+DERIVE_SYSTEM_PROMPT = """You are Smart Study Buddy's editor. You rewrite an existing explanation into a new variant of it.
+
+* Keep every fact accurate and do not introduce new claims
+* Keep the original's Markdown section headings and order
+* Change only what you are asked to change (length, tone and/or audience)
+* Reply with the rewritten explanation only"""
+
+
+def create_derive_prompt(source: str, audience: str, tone: str = None, length: str = None, changes=()) -> str:
+    """
+    Create the user prompt for rewriting an existing explanation.
+    
+    Args:
+        source: The existing explanation text
+        audience: Target age or experience level
+        tone: Optional target tone
+        length: Optional target length
+        changes: Instructions describing what differs from the source
+    
+    Returns:
+        Formatted prompt string
+    """
+    prompt_parts = [f"Rewrite the explanation below for: {audience}"]
+    
+    if tone:
+        prompt_parts.append(f"Tone: {tone}")
+    
+    if length:
+        prompt_parts.append(f"Length: {length}")
+    
+    prompt_parts.extend(f"* {change}" for change in changes)
+    prompt_parts.append(f"\nExplanation:\n{source}")
     
     return "\n".join(prompt_parts)
 
 
+# Planning step of a curriculum: a prerequisite graph of subtopics
+CURRICULUM_PLAN_PROMPT = """You are Smart Study Buddy's curriculum planner. Break a subject into the subtopics a learner needs, and say which subtopics must be learned before which.
+
+Reply with JSON only, in this shape:
+{"topics": [{"topic": "Cell membrane", "prerequisites": []}, {"topic": "Osmosis", "prerequisites": ["Cell membrane"]}]}
+
+* Use short, specific subtopic names
+* Prerequisites must be other subtopics from the same list
+* Do not create circular prerequisites
+* Keep the list focused on what the audience needs"""
+
+
+def create_curriculum_prompt(subject: str, audience: str, max_topics: int = 20) -> str:
+    """
+    Create the user prompt for planning a curriculum.
+    
+    Args:
+        subject: What the study guide covers
+        audience: Age or experience level
+        max_topics: Upper bound on the number of subtopics
+    
+    Returns:
+        Formatted prompt string
+    """
+    return "\n".join([
+        f"Subject: {subject}",
+        f"Audience: {audience}",
+        f"List at most {max_topics} subtopics."
+    ])
+
+
 # Predefined audience levels for easy selection
 AUDIENCE_LEVELS = {
     "child": "5-year-old child",
@@ -111,3 +227,51 @@ TONES = ["playful", "neutral", "academic", "professional"]
 
 # Predefined lengths
 LENGTHS = ["short", "medium", "detailed"]
+
+# Teaching-structure sections (id, Markdown heading), in the order the
+# system prompt requires; the headings let clients parse streams by section
+SECTIONS = [
+    ("core_idea", "Core Idea"),
+    ("explanation", "Explanation"),
+    ("example", "Example"),
+    ("deeper_insight", "Deeper Insight"),
+]
+
+SECTION_INSTRUCTIONS = (
+    "Start each part of the teaching structure with its Markdown heading: "
+    + ", ".join(f"## {heading}" for _, heading in SECTIONS)
+    + " (leave out Deeper Insight if it is not appropriate)."
+)
+
+
+def explanation_key(
+    topic: str,
+    audience: str,
+    tone: str = None,
+    length: str = None,
+    context: str = None
+) -> str:
+    """
+    Build the canonical lookup key for an explanation.
+
+    Audience shorthands are resolved through AUDIENCE_LEVELS and the topic is
+    case- and whitespace-normalised, so "Gravity"/"child" and
+    "gravity"/"5-year-old child" map to the same key.
+
+    Args:
+        topic: The subject to explain
+        audience: Audience shorthand or free-form description
+        tone: Optional tone
+        length: Optional length
+        context: Optional material the prompt built on (see
+            create_user_prompt); text shaped by it is keyed apart from the
+            plain explanation by a hash of the context
+
+    Returns:
+        Key string with fields separated by the ASCII unit separator
+    """
+    audience = AUDIENCE_LEVELS.get(audience, audience)
+    parts = [" ".join(topic.lower().split()), audience, tone or "", length or ""]
+    if context:
+        parts.append("ctx:" + hashlib.sha256(context.encode("utf-8")).hexdigest()[:16])
+    return "\x1f".join(parts)
@@ -0,0 +1,52 @@
+"""
+Smart Study Buddy - Rate Limiting
+Thread-safe token bucket for pacing upstream calls
+"""
+
+import threading
+import time
+from typing import Optional
+
+
+class RateLimiter:
+    """Token bucket: ``rate`` tokens every ``per`` seconds, bursting to ``burst``"""
+
+    def __init__(self, rate: float, per: float = 60.0, burst: Optional[float] = None):
+        """
+        Initialize the bucket (starts full)
+
+        Args:
+            rate: Tokens added per period
+            per: Period length in seconds
+            burst: Bucket capacity (defaults to one second's worth, at least 1)
+        """
+        self.fill_rate = rate / per
+        self.capacity = burst if burst is not None else max(1.0, self.fill_rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.fill_rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        """Take tokens if available without waiting"""
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens: float = 1):
+        """Block until tokens are available, then take them"""
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.fill_rate
+            time.sleep(wait)
@@ -0,0 +1,192 @@
+"""
+Smart Study Buddy - Section-aware Streaming
+Incrementally splits an explanation stream into teaching-structure sections
+"""
+
+import re
+from typing import Iterable, AsyncIterable, Iterator, AsyncIterator, List, Dict, Any, Optional
+
+from src.prompts import SECTIONS
+
+PREAMBLE = "preamble"
+
+# Heading text -> section id; a few synonyms models tend to use
+_ALIASES = {
+    "core idea": "core_idea",
+    "simple core idea": "core_idea",
+    "the core idea": "core_idea",
+    "explanation": "explanation",
+    "detailed explanation": "explanation",
+    "example": "example",
+    "analogy": "example",
+    "example or analogy": "example",
+    "example and analogy": "example",
+    "deeper insight": "deeper_insight",
+    "optional deeper insight": "deeper_insight",
+    "going deeper": "deeper_insight",
+}
+_ALIASES.update({heading.lower(): section for section, heading in SECTIONS})
+
+# "## Core Idea", "### 1. Example:", "**Deeper Insight**"
+_HEADING_RE = re.compile(
+    r"^\s{0,3}(?:#{1,6}\s*|\*\*)(?:\d+[.)]\s*)?([A-Za-z ]+?)\s*:?\s*(?:\*\*)?\s*:?\s*$"
+)
+
+
+def _heading_section(line: str) -> Optional[str]:
+    match = _HEADING_RE.match(line)
+    if not match:
+        return None
+    return _ALIASES.get(match.group(1).strip().lower())
+
+
+def _may_be_heading(partial: str) -> bool:
+    """Could this unfinished line still turn into a heading?"""
+    stripped = partial.lstrip(" ")
+    return stripped == "" or stripped[0] in "#*"
+
+
+class SectionParser:
+    """
+    Feed text chunks, get typed events back:
+
+    - ``{"type": "section_start", "section": id, "heading": line}``
+    - ``{"type": "delta", "section": id, "text": text}``
+    - ``{"type": "section_end", "section": id}``
+
+    Heading lines are reported in ``section_start`` and not repeated as
+    deltas. Text before the first heading belongs to the ``preamble`` section.
+    Only lines that might be headings are held back until their newline.
+    """
+
+    def __init__(self):
+        self.section = None
+        self._line = ""  # held-back start of the current line
+        self._at_line_start = True
+
+    def _start(self, section: str, heading: str, events: List[Dict[str, Any]]):
+        if self.section is not None:
+            events.append({"type": "section_end", "section": self.section})
+        self.section = section
+        events.append({"type": "section_start", "section": section, "heading": heading})
+
+    def _delta(self, text: str, events: List[Dict[str, Any]]):
+        if not text:
+            return
+        if self.section is None:
+            if not text.strip():
+                return
+            self._start(PREAMBLE, "", events)
+        if events and events[-1]["type"] == "delta":
+            events[-1]["text"] += text
+        else:
+            events.append({"type": "delta", "section": self.section, "text": text})
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """Consume a chunk and return the events it completes"""
+        events = []
+        text = self._line + chunk
+        self._line = ""
+
+        while text:
+            newline = text.find("\n")
+            if newline == -1:
+                if self._at_line_start and _may_be_heading(text):
+                    self._line = text
+                else:
+                    self._delta(text, events)
+                    self._at_line_start = False
+                break
+
+            line, text = text[:newline + 1], text[newline + 1:]
+            section = _heading_section(line.rstrip("\n")) if self._at_line_start else None
+            if section is not None:
+                self._start(section, line.strip(), events)
+            else:
+                self._delta(line, events)
+            self._at_line_start = True
+
+        return events
+
+    def close(self) -> List[Dict[str, Any]]:
+        """Flush held-back text and end the open section"""
+        events = []
+        if self._line:
+            section = _heading_section(self._line)
+            if section is not None:
+                self._start(section, self._line.strip(), events)
+            else:
+                self._delta(self._line, events)
+            self._line = ""
+        if self.section is not None:
+            events.append({"type": "section_end", "section": self.section})
+            self.section = None
+        return events
+
+
+def _count_completed(event: Dict[str, Any], completed: int) -> int:
+    if event["type"] == "section_end" and event["section"] != PREAMBLE:
+        completed += 1
+    return completed
+
+
+def stream_sections(chunks: Iterable[str], max_sections: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Parse a text stream into section events
+
+    Args:
+        chunks: Text chunks (e.g. from SmartStudyBuddy.explain(stream=True))
+        max_sections: Stop after this many teaching sections have ended;
+            closing the source cancels the upstream request
+
+    Yields:
+        Section events (see SectionParser)
+    """
+    parser = SectionParser()
+    completed = 0
+    try:
+        for chunk in chunks:
+            for event in parser.feed(chunk):
+                yield event
+                completed = _count_completed(event, completed)
+                if max_sections and completed >= max_sections:
+                    return
+        for event in parser.close():
+            yield event
+    finally:
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+
+
+async def astream_sections(
+    chunks: AsyncIterable[str],
+    max_sections: Optional[int] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """Async stream_sections()"""
+    parser = SectionParser()
+    completed = 0
+    try:
+        async for chunk in chunks:
+            for event in parser.feed(chunk):
+                yield event
+                completed = _count_completed(event, completed)
+                if max_sections and completed >= max_sections:
+                    return
+        for event in parser.close():
+            yield event
+    finally:
+        aclose = getattr(chunks, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+
+def render_sections(events: Iterable[Dict[str, Any]]) -> str:
+    """Rebuild Markdown text (headings included) from section events"""
+    parts = []
+    for event in events:
+        if event["type"] == "section_start" and event["heading"]:
+            parts.append(event["heading"] + "\n")
+        elif event["type"] == "delta":
+            parts.append(event["text"])
+    return "".join(parts)
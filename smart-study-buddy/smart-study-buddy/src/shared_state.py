@@ -0,0 +1,230 @@
+"""
+Smart Study Buddy - Shared State
+Cross-process key/value cache, counters and rate-limit buckets.
+
+Every API worker process opens the same backend, so caches, limits and
+counters are shared instead of multiplied per process. SQLite (placed on
+/dev/shm when available) is the local default; Redis is a drop-in swap for
+multi-host deployments.
+"""
+
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Optional, Dict, Any
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    expires_at REAL
+);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS buckets (
+    name TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+def _default_state_path() -> str:
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(base, "smart-study-buddy-state.db")
+
+
+class SharedState(ABC):
+    """
+    Interface implemented by the shared-state backends (a backend missing a
+    method fails when it is constructed, not mid-request)
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        """Return a JSON value, or None if missing/expired"""
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """Store a JSON-serialisable value"""
+
+    @abstractmethod
+    def incr(self, name: str, amount: float = 1) -> float:
+        """Atomically add to a counter and return the new value"""
+
+    @abstractmethod
+    def counters(self, prefix: str = "") -> Dict[str, float]:
+        """All counters whose name starts with ``prefix``"""
+
+    @abstractmethod
+    def take(self, bucket: str, rate: float, per: float, burst: float, tokens: float = 1) -> float:
+        """
+        Token-bucket admission shared by all processes
+
+        Args:
+            bucket: Bucket name (e.g. "rl:<client>")
+            rate: Tokens added per period
+            per: Period in seconds
+            burst: Bucket capacity
+            tokens: Tokens to take
+
+        Returns:
+            0 if the tokens were taken, otherwise seconds until they would be
+        """
+
+
+class SQLiteSharedState(SharedState):
+    """Shared state in a local SQLite file (WAL, one connection per thread)"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or _default_state_path()
+        self._local = threading.local()
+        conn = self._conn()
+        conn.executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Any]:
+        row = self._conn().execute(
+            "SELECT value, expires_at FROM kv WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or (row[1] is not None and row[1] < time.time()):
+            return None
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value, ensure_ascii=False), now + ttl if ttl else None)
+        )
+        # Occasionally sweep expired entries so the file does not grow forever
+        if random.random() < 0.01:
+            conn.execute("DELETE FROM kv WHERE expires_at < ?", (now,))
+
+    def incr(self, name: str, amount: float = 1) -> float:
+        return self._conn().execute(
+            """INSERT INTO counters (name, value) VALUES (?, ?)
+               ON CONFLICT(name) DO UPDATE SET value = value + excluded.value
+               RETURNING value""",
+            (name, amount)
+        ).fetchone()[0]
+
+    def counters(self, prefix: str = "") -> Dict[str, float]:
+        rows = self._conn().execute(
+            "SELECT name, value FROM counters WHERE name LIKE ? ESCAPE '\\'",
+            (prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%",)
+        ).fetchall()
+        return dict(rows)
+
+    def take(self, bucket: str, rate: float, per: float, burst: float, tokens: float = 1) -> float:
+        fill_rate = rate / per
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            row = conn.execute(
+                "SELECT tokens, updated_at FROM buckets WHERE name = ?", (bucket,)
+            ).fetchone()
+            available = burst if row is None else min(burst, row[0] + (now - row[1]) * fill_rate)
+            wait = 0.0
+            if available >= tokens:
+                available -= tokens
+            else:
+                wait = (tokens - available) / fill_rate
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (name, tokens, updated_at) VALUES (?, ?, ?)",
+                (bucket, available, now)
+            )
+            conn.execute("COMMIT")
+            return wait
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+
+# Refill-and-take in one atomic step on the Redis server
+_REDIS_TAKE = """
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local now = tonumber(ARGV[1])
+local fill_rate = tonumber(ARGV[2])
+local burst = tonumber(ARGV[3])
+local tokens = tonumber(ARGV[4])
+local available = burst
+if bucket[1] then
+    available = math.min(burst, tonumber(bucket[1]) + (now - tonumber(bucket[2])) * fill_rate)
+end
+local wait = 0
+if available >= tokens then
+    available = available - tokens
+else
+    wait = (tokens - available) / fill_rate
+end
+redis.call('HSET', KEYS[1], 'tokens', available, 'updated_at', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / fill_rate) + 1)
+return tostring(wait)
+"""
+
+
+class RedisSharedState(SharedState):
+    """Shared state in Redis, for deployments spanning several hosts"""
+
+    def __init__(self, url: str, namespace: str = "ssb:"):
+        try:
+            import redis
+        except ImportError:
+            raise ImportError("Redis package not installed. Run: pip install redis")
+        self.redis = redis.Redis.from_url(url)
+        self.namespace = namespace
+        self._take = self.redis.register_script(_REDIS_TAKE)
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.redis.get(self.namespace + "kv:" + key)
+        return None if value is None else json.loads(value)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        self.redis.set(
+            self.namespace + "kv:" + key,
+            json.dumps(value, ensure_ascii=False),
+            px=int(ttl * 1000) if ttl else None
+        )
+
+    def incr(self, name: str, amount: float = 1) -> float:
+        return float(self.redis.hincrbyfloat(self.namespace + "counters", name, amount))
+
+    def counters(self, prefix: str = "") -> Dict[str, float]:
+        values = self.redis.hgetall(self.namespace + "counters")
+        return {
+            name.decode(): float(value)
+            for name, value in values.items()
+            if name.decode().startswith(prefix)
+        }
+
+    def take(self, bucket: str, rate: float, per: float, burst: float, tokens: float = 1) -> float:
+        return float(self._take(
+            keys=[self.namespace + "bucket:" + bucket],
+            args=[time.time(), rate / per, burst, tokens]
+        ))
+
+
+def shared_state_from_env() -> SharedState:
+    """Redis when REDIS_URL is set, otherwise SQLite at STATE_DB (or /dev/shm)"""
+    redis_url = os.getenv("REDIS_URL")
+    if redis_url:
+        return RedisSharedState(redis_url)
+    return SQLiteSharedState(os.getenv("STATE_DB"))
@@ -0,0 +1,244 @@
+"""
+Smart Study Buddy - Explanation Store
+Durable SQLite store of generated explanations with full-text search
+"""
+
+import atexit
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Optional, Dict, Any, List
+
+from src.logs import get_logger, log_event
+from src.prompts import explanation_key, AUDIENCE_LEVELS
+
+logger = get_logger("store")
+
+DEFAULT_STORE_PATH = os.getenv("EXPLANATION_STORE", "explanations.db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS explanations (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    audience TEXT NOT NULL,
+    tone TEXT,
+    length TEXT,
+    provider TEXT,
+    model TEXT,
+    input_tokens INTEGER,
+    output_tokens INTEGER,
+    explanation TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    derived_from TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_explanations_key ON explanations(key, created_at);
+CREATE VIRTUAL TABLE IF NOT EXISTS explanations_fts USING fts5(
+    topic, explanation, content='explanations', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS explanations_ai AFTER INSERT ON explanations BEGIN
+    INSERT INTO explanations_fts(rowid, topic, explanation)
+    VALUES (new.id, new.topic, new.explanation);
+END;
+"""
+
+_COLUMNS = (
+    "key", "topic", "audience", "tone", "length", "provider", "model",
+    "input_tokens", "output_tokens", "explanation", "created_at", "derived_from"
+)
+
+_STOP = object()
+
+
+def _fts_query(text: str) -> str:
+    """Quote each term so user input is never parsed as FTS syntax"""
+    terms = ['"' + term.replace('"', '""') + '"' for term in text.split()]
+    return " ".join(terms)
+
+
+class ExplanationStore:
+    """SQLite/FTS5 store with a background batch writer"""
+
+    def __init__(
+        self,
+        path: str = DEFAULT_STORE_PATH,
+        batch_size: int = 64,
+        flush_interval: float = 0.5,
+        metrics=None
+    ):
+        """
+        Open (or create) a store
+
+        Args:
+            path: SQLite database file
+            batch_size: Maximum records per write transaction
+            flush_interval: Seconds to wait for more records before committing
+            metrics: Optional Metrics for write error and dropped row counters
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.metrics = metrics
+        self._local = threading.local()
+        self._queue = queue.Queue()
+
+        conn = self._connect()
+        conn.executescript(_SCHEMA)
+        # Stores created before derived variants existed lack the lineage column
+        if "derived_from" not in {row["name"] for row in conn.execute("PRAGMA table_info(explanations)")}:
+            conn.execute("ALTER TABLE explanations ADD COLUMN derived_from TEXT")
+        conn.commit()
+
+        self._writer = threading.Thread(target=self._write_loop, name="explanation-store", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _reader(self) -> sqlite3.Connection:
+        """Per-thread read connection (WAL lets readers run beside the writer)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def add(self, record: Dict[str, Any]):
+        """
+        Queue a generated explanation for persistence (non-blocking)
+
+        Args:
+            record: Dict with topic, audience, explanation and optional
+                tone, length, provider, model, input_tokens, output_tokens
+                and derived_from (key of the variant it was rewritten from)
+        """
+        row = dict(record)
+        row.setdefault("key", explanation_key(
+            row["topic"], row["audience"], row.get("tone"), row.get("length")
+        ))
+        row.setdefault("created_at", time.time())
+        self._queue.put(tuple(row.get(column) for column in _COLUMNS))
+
+    def _write_loop(self):
+        conn = self._connect()
+        insert = f"INSERT INTO explanations ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})"
+        while True:
+            item = self._queue.get()
+            batch, done = [], []
+            while item is not _STOP:
+                if isinstance(item, threading.Event):
+                    done.append(item)
+                    break
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    break
+
+            if batch:
+                self._insert(conn, insert, batch)
+            for event in done:
+                event.set()
+            if item is _STOP:
+                conn.close()
+                return
+
+    def _insert(self, conn: sqlite3.Connection, insert: str, batch: List[tuple]):
+        """
+        Commit a batch; a failure never stops the writer thread
+
+        A failed batch (a locked database past the busy timeout, one bad row)
+        is retried row by row, so only the rows that fail again are dropped.
+        Failures are logged and counted in ``store.write_errors`` and
+        ``store.rows_dropped``.
+        """
+        try:
+            with conn:
+                conn.executemany(insert, batch)
+            return
+        except Exception as e:
+            error = e
+        dropped = 0
+        for row in batch:
+            try:
+                with conn:
+                    conn.execute(insert, row)
+            except Exception as e:
+                error = e
+                dropped += 1
+        log_event(
+            logger, "store.write_failed", logging.ERROR,
+            rows=len(batch), dropped=dropped, error=f"{type(error).__name__}: {error}"
+        )
+        if self.metrics is not None:
+            self.metrics.incr("store.write_errors")
+            if dropped:
+                self.metrics.incr("store.rows_dropped", dropped)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until everything queued so far has been committed"""
+        if not self._writer.is_alive():
+            return self._queue.empty()
+        event = threading.Event()
+        self._queue.put(event)
+        return event.wait(timeout)
+
+    def close(self):
+        """Commit pending records and stop the writer thread"""
+        if self._writer.is_alive():
+            self._queue.put(_STOP)
+            self._writer.join()
+
+    def search(
+        self,
+        query: str,
+        limit: int = 10,
+        audience: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Full-text search over stored explanations
+
+        Args:
+            query: Free-text search terms
+            limit: Maximum number of results
+            audience: Optional audience filter (shorthands are resolved)
+
+        Returns:
+            Result dicts ranked best-first (topic matches weigh more)
+        """
+        match = _fts_query(query)
+        if not match:
+            return []
+
+        sql = """
+            SELECT e.*, bm25(explanations_fts, 10.0, 1.0) AS score,
+                   snippet(explanations_fts, 1, '[', ']', '…', 16) AS snippet
+            FROM explanations_fts
+            JOIN explanations e ON e.id = explanations_fts.rowid
+            WHERE explanations_fts MATCH ?
+        """
+        params = [match]
+        if audience:
+            sql += " AND e.audience = ?"
+            params.append(AUDIENCE_LEVELS.get(audience, audience))
+        sql += " ORDER BY score LIMIT ?"
+        params.append(limit)
+
+        return [dict(row) for row in self._reader().execute(sql, params)]
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the most recent explanation stored under a canonical key"""
+        row = self._reader().execute(
+            "SELECT * FROM explanations WHERE key = ? ORDER BY created_at DESC LIMIT 1",
+            (key,)
+        ).fetchone()
+        return dict(row) if row else None
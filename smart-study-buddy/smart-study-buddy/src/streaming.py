@@ -0,0 +1,191 @@
+"""
+Smart Study Buddy - Streaming Pipeline
+Coalesces small provider deltas into frames and measures stream timing
+"""
+
+import asyncio
+import time
+from typing import Iterable, AsyncIterable, Iterator, AsyncIterator, Optional, Dict, Any
+
+# Defaults shared by the CLI, API and web consumers
+DEFAULT_MAX_LATENCY = 0.05  # seconds a delta may wait in the buffer
+DEFAULT_MAX_BYTES = 1024    # buffered bytes that force a flush
+
+
+class StreamStats:
+    """Time-to-first-token and inter-frame timing for one stream"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.first_frame_at = None
+        self.last_frame_at = None
+        self.deltas = 0
+        self.frames = 0
+        self.bytes = 0
+        self.max_gap = 0.0
+
+    def record_frame(self, size: int):
+        now = time.perf_counter()
+        if self.first_frame_at is None:
+            self.first_frame_at = now
+        else:
+            self.max_gap = max(self.max_gap, now - self.last_frame_at)
+        self.last_frame_at = now
+        self.frames += 1
+        self.bytes += size
+
+    @property
+    def ttft(self) -> Optional[float]:
+        """Seconds from stream start to the first frame"""
+        return None if self.first_frame_at is None else self.first_frame_at - self.started
+
+    def summary(self) -> Dict[str, Any]:
+        """Timing summary in milliseconds"""
+        gaps = self.frames - 1
+        mean_gap = (self.last_frame_at - self.first_frame_at) / gaps if gaps > 0 else 0.0
+        return {
+            "ttft_ms": round(self.ttft * 1000, 1) if self.ttft is not None else None,
+            "deltas": self.deltas,
+            "frames": self.frames,
+            "bytes": self.bytes,
+            "mean_frame_gap_ms": round(mean_gap * 1000, 1),
+            "max_frame_gap_ms": round(self.max_gap * 1000, 1)
+        }
+
+
+class _Coalescer:
+    """Buffer and flush rules shared by the sync and async stages"""
+
+    def __init__(self, max_latency, max_bytes, scale_bytes, flush_first, stats):
+        self.max_latency = max_latency
+        self.max_bytes = max_bytes
+        self.scale_bytes = scale_bytes
+        self.flush_first = flush_first
+        self.stats = stats if stats is not None else StreamStats()
+        self.parts = []
+        self.size = 0
+        self.emitted = 0
+        self.opened_at = None
+
+    def add(self, chunk: str):
+        if not self.parts:
+            self.opened_at = time.monotonic()
+        self.parts.append(chunk)
+        self.size += len(chunk.encode("utf-8"))
+        self.stats.deltas += 1
+
+    def latency_budget(self) -> float:
+        if self.scale_bytes:
+            return self.max_latency * max(1.0, self.emitted / self.scale_bytes)
+        return self.max_latency
+
+    def due(self) -> bool:
+        if not self.parts:
+            return False
+        if self.flush_first and self.stats.frames == 0:
+            return True
+        if self.max_bytes is not None and self.size >= self.max_bytes:
+            return True
+        return time.monotonic() - self.opened_at >= self.latency_budget()
+
+    def remaining(self) -> Optional[float]:
+        """Seconds until the open buffer must be flushed (None if empty)"""
+        if not self.parts:
+            return None
+        return max(0.0, self.opened_at + self.latency_budget() - time.monotonic())
+
+    def flush(self) -> str:
+        frame = "".join(self.parts)
+        self.stats.record_frame(self.size)
+        self.emitted += self.size
+        self.parts, self.size = [], 0
+        return frame
+
+
+def coalesce(
+    chunks: Iterable[str],
+    max_latency: float = DEFAULT_MAX_LATENCY,
+    max_bytes: Optional[int] = DEFAULT_MAX_BYTES,
+    scale_bytes: Optional[int] = None,
+    flush_first: bool = True,
+    stats: Optional[StreamStats] = None
+) -> Iterator[str]:
+    """
+    Coalesce small deltas into larger frames
+
+    A frame is emitted once ``max_bytes`` are buffered or the oldest buffered
+    delta is ``max_latency`` seconds old. The sync stage can only check the
+    clock when a delta arrives; acoalesce() also flushes on a timer.
+
+    Args:
+        chunks: Text deltas, e.g. from AIClient.stream_explanation
+        max_latency: Maximum seconds a delta is held back
+        max_bytes: Buffered UTF-8 bytes that force a flush (None disables)
+        scale_bytes: If set, the latency budget grows by one ``max_latency``
+            per ``scale_bytes`` already emitted, for consumers that redraw
+            the whole text on every frame
+        flush_first: Emit the first delta immediately to keep time-to-first-token
+        stats: Optional StreamStats to fill in
+
+    Yields:
+        Frames whose concatenation equals the input
+    """
+    state = _Coalescer(max_latency, max_bytes, scale_bytes, flush_first, stats)
+    try:
+        for chunk in chunks:
+            state.add(chunk)
+            if state.due():
+                yield state.flush()
+        if state.parts:
+            yield state.flush()
+    finally:
+        # An early close (e.g. Ctrl-C in the CLI) must reach the provider stream
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+
+
+async def acoalesce(
+    chunks: AsyncIterable[str],
+    max_latency: float = DEFAULT_MAX_LATENCY,
+    max_bytes: Optional[int] = DEFAULT_MAX_BYTES,
+    scale_bytes: Optional[int] = None,
+    flush_first: bool = True,
+    stats: Optional[StreamStats] = None
+) -> AsyncIterator[str]:
+    """
+    Async coalesce(): same flush rules, plus a timer so a buffered frame
+    goes out on time even when the provider stalls between deltas
+    """
+    state = _Coalescer(max_latency, max_bytes, scale_bytes, flush_first, stats)
+    source = chunks.__aiter__()
+    next_chunk = None
+    try:
+        while True:
+            if next_chunk is None:
+                next_chunk = asyncio.ensure_future(source.__anext__())
+            done, _ = await asyncio.wait({next_chunk}, timeout=state.remaining())
+            if not done:
+                yield state.flush()
+                continue
+
+            task, next_chunk = next_chunk, None
+            try:
+                state.add(task.result())
+            except StopAsyncIteration:
+                break
+            if state.due():
+                yield state.flush()
+
+        if state.parts:
+            yield state.flush()
+    finally:
+        if next_chunk is not None:
+            next_chunk.cancel()
+            try:
+                await next_chunk
+            except (asyncio.CancelledError, Exception):
+                pass
+        aclose = getattr(source, "aclose", None)
+        if aclose is not None:
+            await aclose()
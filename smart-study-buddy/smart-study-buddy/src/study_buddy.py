@@ -2,25 +2,108 @@
 Smart Study Buddy - Main Application Class
 """
 
-from typing import Optional, Generator
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Generator, Callable
 from src.ai_client import AIClient
-from src.prompts import SYSTEM_PROMPT, create_user_prompt, AUDIENCE_LEVELS
+from src.store import ExplanationStore
+from src.cache import ExplanationCache, generated_by, replay_stream
+from src.sections import stream_sections, astream_sections
+from src.deadline import Deadline, DeadlineExceeded
+from src.tiering import TieringPolicy, Tier, shadow_report
+from src.conversation import Conversation
+from src.derive import related_variants, describe_changes
+from src.prefetch import Prefetcher
+from src.bulk import BulkRunner
+from src.logs import get_logger, log_event
+from src.tracing import add_event, atraced_iter, current_span, in_context, span, traced_iter
+from src.prompts import (
+    SYSTEM_PROMPT, DERIVE_SYSTEM_PROMPT, create_user_prompt, create_derive_prompt, create_follow_up_prompt,
+    explanation_key, AUDIENCE_LEVELS, PROMPT_VERSION
+)
+
+logger = get_logger("study_buddy")
 
 
 class SmartStudyBuddy:
     """Main Smart Study Buddy application class"""
     
-    def __init__(self, provider: str = "openai", model: str = None):
+    def __init__(
+        self,
+        provider: str = "openai",
+        model: str = None,
+        store: Optional[ExplanationStore] = None,
+        cache: Optional[ExplanationCache] = None,
+        replay_delay: float = 0.0,
+        max_history: Optional[int] = None,
+        metrics=None,
+        policy: Optional[TieringPolicy] = None,
+        client_factory: Optional[Callable] = None,
+        derive_model: Optional[str] = None,
+        derive_provider: Optional[str] = None
+    ):
         """
         Initialize Smart Study Buddy
         
         Args:
             provider: "openai" or "anthropic"
             model: Specific model to use (optional)
+            store: Optional durable store that receives every generated explanation
+            cache: Optional cache consulted before generating
+            replay_delay: Seconds between chunks when replaying a cached
+                explanation as a stream (0 replays at full speed)
+            max_history: Keep only the most recent N history entries
+                (unbounded by default; set for long-running batch jobs)
+            metrics: Optional Metrics receiving cancellation counts and
+                estimated output tokens saved by cancelling
+            policy: Optional TieringPolicy choosing provider, model and token
+                cap per request (provider/model above are used without one)
+            client_factory: Builds the client for a tier from (provider, model);
+                defaults to AIClient
+            derive_model: Smaller model that rewrites a cached variant of the
+                same topic (shorter, other tone, nearby audience level) on a
+                cache miss instead of generating cold (env DERIVE_MODEL;
+                unset disables derivation)
+            derive_provider: Provider for derive_model (env DERIVE_PROVIDER,
+                defaults to provider)
         """
         self.client = AIClient(provider=provider, model=model)
+        self.policy = policy
+        self.client_factory = client_factory or (lambda provider, model: AIClient(provider=provider, model=model))
+        self._tier_clients = {}
+        self._tier_lock = threading.Lock()
+        self._shadow_executor = None
+        self.shadow_results = deque(maxlen=1000)
+        self.derive_model = derive_model or os.getenv("DERIVE_MODEL")
+        self.derive_provider = derive_provider or os.getenv("DERIVE_PROVIDER", provider)
+        self.prefetcher = None
         self.system_prompt = SYSTEM_PROMPT
-        self.conversation_history = []
+        self.max_history = max_history
+        self.conversation_history = self._new_history()
+        self.store = store
+        self.cache = cache
+        self.replay_delay = replay_delay
+        self.metrics = metrics
+        # Running mean of completed output sizes, used to estimate what a
+        # cancelled generation would have cost
+        self._completed_tokens = 0
+        self._completed_count = 0
+        self._local = threading.local()
+    
+    @property
+    def last_call(self) -> Optional[dict]:
+        """
+        Provider, model and token usage of this thread's most recent
+        explanation (tiering and derivation mean it need not be self.client;
+        usage is None for cache hits)
+        """
+        return getattr(self._local, "call", None)
     
     def explain(
         self,
@@ -28,7 +111,9 @@ class SmartStudyBuddy:
         audience: str,
         tone: Optional[str] = None,
         length: Optional[str] = None,
-        stream: bool = False
+        stream: bool = False,
+        deadline: Optional[Deadline] = None,
+        context: Optional[str] = None
     ) -> str | Generator:
         """
         Generate an explanation for a topic
@@ -39,32 +124,705 @@ class SmartStudyBuddy:
             tone: Optional tone preference
             length: Optional length preference
             stream: Whether to stream the response
+            deadline: Optional Deadline; the upstream call is abandoned with
+                DeadlineExceeded once it passes
+            context: Optional material already covered (e.g. prerequisite
+                summaries). Text generated with it is cached and stored under
+                its own key; a plain cached explanation still serves it
         
         Returns:
-            Explanation text or generator for streaming
+            Explanation text or generator for streaming (the work starts
+            when the generator is first advanced, like astream())
+        """
+        if stream:
+            # The span lasts until the stream ends, not until it is returned
+            chunks = self._explain_stream(topic, audience, tone, length, deadline, context)
+            return traced_iter("buddy.explain", chunks, topic=topic, audience=audience, stream=True)
+        
+        with span("buddy.explain", topic=topic, audience=audience, stream=False):
+            entry, key, cached = self._prepare(topic, audience, tone, length, context)
+            if cached is not None:
+                return cached
+        
+            # Generate explanation
+            client, system_prompt, user_prompt, options = self._route(entry)
+            prompt_tokens = _estimate_tokens([system_prompt, user_prompt])
+            started = time.perf_counter()
+            try:
+                explanation = client.generate_explanation(
+                    system_prompt, user_prompt, deadline=deadline, **options
+                )
+            except DeadlineExceeded:
+                self._record_cancel("deadline", 0)
+                raise
+            self._commit(entry, key, explanation, client.last_usage, started, prompt_tokens)
+            return explanation
+    
+    def _explain_stream(
+        self,
+        topic: str,
+        audience: str,
+        tone: Optional[str],
+        length: Optional[str],
+        deadline: Optional[Deadline],
+        context: Optional[str]
+    ):
+        entry, key, cached = self._prepare(topic, audience, tone, length, context)
+        if cached is not None:
+            yield from replay_stream(cached, delay=self.replay_delay)
+            return
+        
+        client, system_prompt, user_prompt, options = self._route(entry)
+        prompt_tokens = _estimate_tokens([system_prompt, user_prompt])
+        started = time.perf_counter()
+        chunks = client.stream_explanation(system_prompt, user_prompt, deadline=deadline, **options)
+        yield from self._tee_stream(chunks, entry, key, started, prompt_tokens)
+    
+    
+    def astream(
+        self,
+        topic: str,
+        audience: str,
+        tone: Optional[str] = None,
+        length: Optional[str] = None,
+        deadline: Optional[Deadline] = None,
+        model: Optional[str] = None
+    ):
+        """
+        Async counterpart of explain(stream=True) for event-loop servers.
+        Cancelling the consuming task (e.g. on client disconnect) closes the
+        upstream stream.
+        
+        Args:
+            model: Pin generation to this model of the buddy's provider
+                (bypassing tiering and derivation); a cached explanation is
+                only used if it came from this model and the current
+                PROMPT_VERSION
+        
+        Yields:
+            Text chunks (cache hits are replayed as chunks too)
+        """
+        chunks = self._astream(topic, audience, tone, length, deadline, model)
+        return atraced_iter("buddy.astream", chunks, topic=topic, audience=audience, model=model)
+    
+    async def _astream(
+        self,
+        topic: str,
+        audience: str,
+        tone: Optional[str],
+        length: Optional[str],
+        deadline: Optional[Deadline],
+        model: Optional[str] = None
+    ):
+        entry, key, cached = self._prepare(topic, audience, tone, length, model=model)
+        if cached is not None:
+            for i, chunk in enumerate(replay_stream(cached)):
+                if i and self.replay_delay > 0:
+                    await asyncio.sleep(self.replay_delay)
+                yield chunk
+            return
+        
+        parts, cancelled = [], "closed"
+        client, system_prompt, user_prompt, options = self._route(entry, model)
+        prompt_tokens = _estimate_tokens([system_prompt, user_prompt])
+        started = time.perf_counter()
+        chunks = client.astream_explanation(system_prompt, user_prompt, deadline=deadline, **options)
+        try:
+            async for chunk in chunks:
+                parts.append(chunk)
+                yield chunk
+            cancelled = None
+        except DeadlineExceeded:
+            cancelled = "deadline"
+            raise
+        except Exception:
+            cancelled = None
+            raise
+        finally:
+            await chunks.aclose()
+            if cancelled:
+                self._record_cancel(cancelled, _estimate_tokens(parts))
+        self._commit(entry, key, "".join(parts), started=started, prompt_tokens=prompt_tokens)
+    
+    def explain_sections(
+        self,
+        topic: str,
+        audience: str,
+        tone: Optional[str] = None,
+        length: Optional[str] = None,
+        max_sections: Optional[int] = None,
+        deadline: Optional[Deadline] = None
+    ):
+        """
+        Stream an explanation as teaching-structure section events
+        
+        Args:
+            topic: What to explain
+            audience: Who to explain it to (age/level)
+            tone: Optional tone preference
+            length: Optional length preference
+            max_sections: Stop (and cancel the upstream call) after N sections,
+                e.g. 1 for just the core idea
+            deadline: Optional Deadline for the upstream call
+        
+        Yields:
+            section_start / delta / section_end event dicts
+        """
+        chunks = self.explain(topic, audience, tone, length, stream=True, deadline=deadline)
+        return stream_sections(chunks, max_sections=max_sections)
+    
+    def astream_sections(
+        self,
+        topic: str,
+        audience: str,
+        tone: Optional[str] = None,
+        length: Optional[str] = None,
+        max_sections: Optional[int] = None,
+        deadline: Optional[Deadline] = None
+    ):
+        """Async counterpart of explain_sections()"""
+        chunks = self.astream(topic, audience, tone, length, deadline=deadline)
+        return astream_sections(chunks, max_sections=max_sections)
+    
+    def start_conversation(
+        self,
+        topic: str,
+        audience: str,
+        tone: Optional[str] = None,
+        length: Optional[str] = None,
+        context_tokens: Optional[int] = None,
+        owner: Optional[str] = None,
+        deadline: Optional[Deadline] = None
+    ) -> Conversation:
+        """
+        Explain a topic and open a conversation for follow-up questions
+        
+        Args:
+            topic: What to explain
+            audience: Who to explain it to (age/level)
+            tone: Optional tone preference (kept for follow-ups)
+            length: Optional length preference
+            context_tokens: Token budget for earlier turns sent with each
+                follow-up (env CONVERSATION_CONTEXT_TOKENS, default 1500)
+            owner: Optional owner recorded on the conversation
+            deadline: Optional Deadline for the opening explanation
+        
+        Returns:
+            Conversation whose first turn is the explanation
+        """
+        started = time.perf_counter()
+        explanation = self.explain(topic, audience, tone, length, deadline=deadline)
+        conversation = self.open_conversation(topic, audience, tone, length, context_tokens, owner)
+        self.add_explanation_turn(
+            conversation, topic, audience, tone, length, explanation,
+            latency_ms=round((time.perf_counter() - started) * 1000, 1)
+        )
+        return conversation
+    
+    def open_conversation(
+        self,
+        topic: str,
+        audience: str,
+        tone: Optional[str] = None,
+        length: Optional[str] = None,
+        context_tokens: Optional[int] = None,
+        owner: Optional[str] = None
+    ) -> Conversation:
+        """An empty conversation about a topic (see start_conversation for the arguments)"""
+        return Conversation(
+            topic, AUDIENCE_LEVELS.get(audience, audience), tone, length,
+            context_tokens=context_tokens or int(os.getenv("CONVERSATION_CONTEXT_TOKENS", "1500")),
+            owner=owner
+        )
+    
+    def add_explanation_turn(
+        self,
+        conversation: Conversation,
+        topic: str,
+        audience: str,
+        tone: Optional[str],
+        length: Optional[str],
+        explanation: str,
+        latency_ms: Optional[float] = None
+    ) -> dict:
+        """Record an explanation generated elsewhere (e.g. streamed) as a conversation turn"""
+        prompt = create_user_prompt(topic, AUDIENCE_LEVELS.get(audience, audience), tone, length)
+        return conversation.add_turn(
+            f"Explain {topic}", prompt, explanation,
+            latency_ms=latency_ms,
+            context_tokens=_estimate_tokens([self.system_prompt, prompt])
+        )
+    
+    def follow_up(
+        self,
+        conversation: Conversation,
+        question: str,
+        stream: bool = False,
+        deadline: Optional[Deadline] = None
+    ) -> str | Generator:
+        """
+        Answer a follow-up question with the conversation's bounded context
+        
+        Args:
+            conversation: Conversation from start_conversation()
+            question: The learner's question
+            stream: Whether to stream the answer
+            deadline: Optional Deadline for the upstream call
+        
+        Returns:
+            Answer text or generator for streaming; the turn is added to the
+            conversation once the answer is complete
+        """
+        client, system_prompt, prompt, history, options, finish = self._follow_up_call(conversation, question)
+        if stream:
+            return self._stream_follow_up(
+                client.stream_explanation(
+                    system_prompt, prompt, history=history, deadline=deadline, **options
+                ),
+                finish
+            )
+        answer = client.generate_explanation(system_prompt, prompt, history=history, deadline=deadline, **options)
+        finish(answer)
+        return answer
+    
+    async def afollow_up(
+        self,
+        conversation: Conversation,
+        question: str,
+        deadline: Optional[Deadline] = None
+    ):
+        """
+        Async counterpart of follow_up(stream=True) for event-loop servers
+        
+        Yields:
+            Text chunks; the turn is added once the answer is complete
+        """
+        client, system_prompt, prompt, history, options, finish = self._follow_up_call(conversation, question)
+        chunks = client.astream_explanation(system_prompt, prompt, history=history, deadline=deadline, **options)
+        parts = []
+        try:
+            async for chunk in chunks:
+                parts.append(chunk)
+                yield chunk
+        finally:
+            await chunks.aclose()
+        finish("".join(parts))
+    
+    def _follow_up_call(self, conversation: Conversation, question: str):
+        """
+        Client, prompts and bounded history for a follow-up, plus the
+        callback recording the finished turn
+        
+        Returns:
+            (client, system prompt, user prompt, history messages, call
+            options, finish(answer))
+        """
+        summary, history = conversation.context()
+        system_prompt = f"{self.system_prompt}\n\n{summary}" if summary else self.system_prompt
+        prompt = create_follow_up_prompt(question, conversation.audience, conversation.tone)
+        context_tokens = _estimate_tokens([system_prompt, prompt] + [m["content"] for m in history])
+        
+        client, options = self.client, {}
+        if self.policy is not None:
+            tier = self.policy.route(conversation.topic, conversation.audience, conversation.tone)
+            client = self._tier_client(tier)
+            options = {"max_tokens": tier.max_tokens} if tier.max_tokens else {}
+        
+        started = time.perf_counter()
+        
+        def finish(answer: str):
+            latency_ms = round((time.perf_counter() - started) * 1000, 1)
+            conversation.add_turn(question, prompt, answer, latency_ms=latency_ms, context_tokens=context_tokens)
+            if self.metrics is not None:
+                self.metrics.incr("conversation.turns")
+                self.metrics.incr("conversation.context_tokens", context_tokens)
+        
+        return client, system_prompt, prompt, history, options, finish
+    
+    def _stream_follow_up(self, chunks, finish):
+        """Pass a follow-up answer through, recording the turn only if it completes"""
+        parts = []
+        try:
+            for chunk in chunks:
+                parts.append(chunk)
+                yield chunk
+        finally:
+            chunks.close()
+        finish("".join(parts))
+    
+    def _prepare(
+        self,
+        topic: str,
+        audience: str,
+        tone: Optional[str],
+        length: Optional[str],
+        context: Optional[str] = None,
+        model: Optional[str] = None
+    ):
+        """
+        Resolve the audience, build the prompt, record a history entry and
+        check the cache
+        
+        With ``model`` set, a cached explanation only counts as a hit if it
+        was generated by that model with the current PROMPT_VERSION.
+        
+        Returns:
+            (history entry, cache key, cached explanation text or None)
         """
         # Resolve audience shorthand
         audience = AUDIENCE_LEVELS.get(audience, audience)
+        add_event("audience.resolved")
         
         # Create user prompt
-        user_prompt = create_user_prompt(topic, audience, tone, length)
+        user_prompt = create_user_prompt(topic, audience, tone, length, context)
+        add_event("prompt.built")
         
         # Store in conversation history
-        self.conversation_history.append({
+        entry = {
             "topic": topic,
             "audience": audience,
             "tone": tone,
             "length": length,
             "prompt": user_prompt
-        })
+        }
+        self.conversation_history.append(entry)
+        if self.prefetcher is not None:
+            self.prefetcher.observe(topic, (audience, tone, length))
         
-        # Generate explanation
-        if stream:
-            return self.client.stream_explanation(self.system_prompt, user_prompt)
+        # Serve from cache when possible. Context-shaped text never lands
+        # under the plain key, but a plain explanation is a fine answer
+        key = explanation_key(topic, audience, tone, length, context)
+        hit_key = key
+        with span("cache.lookup") as lookup:
+            cached = self.cache.get(key) if self.cache is not None else None
+            if cached is None and context and self.cache is not None:
+                hit_key = explanation_key(topic, audience, tone, length)
+                cached = self.cache.get(hit_key)
+            if cached is not None and model is not None and not generated_by(cached, model):
+                cached = None
+            lookup.set_attribute("hit", cached is not None)
+        if cached is None:
+            self._local.call = None
+            return entry, key, None
+        entry["explanation"] = cached["explanation"]
+        entry["cached"] = True
+        self._local.call = {
+            "provider": cached.get("provider"),
+            "model": cached.get("model"),
+            "input_tokens": None,
+            "output_tokens": None,
+            "cached": True
+        }
+        log_event(
+            logger, "explanation.cached",
+            topic=topic, audience=audience, provider=cached.get("provider"), model=cached.get("model")
+        )
+        if self.prefetcher is not None:
+            if cached.get("prefetched"):
+                # First real request for a prefetched variant: count it once
+                self.prefetcher.metrics.incr("prefetch.hits")
+                self.cache.set(hit_key, dict(cached, prefetched=False))
+            self.prefetcher.schedule(topic, (audience, tone, length))
+        return entry, key, cached["explanation"]
+    
+    def _tee_stream(
+        self,
+        chunks,
+        entry: dict,
+        key: str,
+        started: Optional[float] = None,
+        prompt_tokens: int = 0
+    ):
+        """
+        Pass chunks through while collecting them, committing the full text
+        only if the stream runs to completion (errors and early close skip it)
+        """
+        parts, cancelled = [], "closed"
+        try:
+            for chunk in chunks:
+                parts.append(chunk)
+                yield chunk
+            cancelled = None
+        except DeadlineExceeded:
+            cancelled = "deadline"
+            raise
+        except Exception:
+            cancelled = None
+            raise
+        finally:
+            # Propagate an early close upstream so the provider call is cancelled
+            chunks.close()
+            if cancelled:
+                self._record_cancel(cancelled, _estimate_tokens(parts))
+        self._commit(entry, key, "".join(parts), started=started, prompt_tokens=prompt_tokens)
+    
+    def _route(self, entry: dict, model: Optional[str] = None):
+        """
+        Pick the client and prompts for a history entry, tagging the entry
+        with the provider/model (and tier or derivation source) answering it
+        
+        Args:
+            entry: History entry from _prepare()
+            model: Pin the call to this model of the buddy's provider,
+                skipping derivation and tiering
+        
+        Returns:
+            (client, system prompt, user prompt, extra call options such as
+            the tier's max_tokens)
+        """
+        if model is not None:
+            client = self.client if model == self.client.model else self._client_for(self.client.provider, model)
+            entry["provider"] = client.provider
+            entry["model"] = client.model
+            return client, self.system_prompt, entry["prompt"], {}
+        
+        source = None
+        if self.derive_model:
+            with span("derive.find_source"):
+                source = self._find_source(entry)
+        if source is not None:
+            source_key, variant, text = source
+            target = (entry["audience"], entry["tone"], entry["length"])
+            client = self._client_for(self.derive_provider, self.derive_model)
+            user_prompt = create_derive_prompt(text, *target, changes=describe_changes(variant, target))
+            entry["derived_from"] = source_key
+            current_span().set_attribute("derived_from", source_key)
+            entry["provider"] = client.provider
+            entry["model"] = client.model
+            # A rewrite is never longer than its source (plus some slack)
+            options = {"max_tokens": min(client.max_tokens, max(256, _estimate_tokens([text]) * 3 // 2))}
+            return client, DERIVE_SYSTEM_PROMPT, user_prompt, options
+        
+        if self.policy is None:
+            client, options = self.client, {}
         else:
-            explanation = self.client.generate_explanation(self.system_prompt, user_prompt)
-            self.conversation_history[-1]["explanation"] = explanation
-            return explanation
+            tier = self.policy.route(entry["topic"], entry["audience"], entry["tone"], entry["length"])
+            client = self._tier_client(tier)
+            options = {"max_tokens": tier.max_tokens} if tier.max_tokens else {}
+            entry["tier"] = tier.name
+        entry["provider"] = client.provider
+        entry["model"] = client.model
+        current_span().set_attribute("tier", entry.get("tier"))
+        return client, self.system_prompt, entry["prompt"], options
+    
+    def enable_prefetch(self, admission=None, **options) -> Prefetcher:
+        """
+        Speculatively generate likely follow-up variants into the cache
+        after each explanation (needs a cache)
+        
+        Args:
+            admission: Optional AdmissionController gating prefetches on idle capacity
+            **options: Prefetcher options (tokens_per_hour, max_candidates, ...)
+        
+        Returns:
+            The running Prefetcher (see its stats() for the hit rate)
+        """
+        if self.cache is None:
+            raise ValueError("Prefetching needs a cache to prefetch into")
+        self.prefetcher = Prefetcher(self._prefetch_variant, metrics=self.metrics, admission=admission, **options)
+        return self.prefetcher
+    
+    def _prefetch_variant(self, topic: str, audience: str, tone: Optional[str], length: Optional[str]) -> int:
+        """
+        Generate one variant into the cache without touching history
+        
+        Returns:
+            Output tokens spent (0 if the variant was already cached)
+        """
+        key = explanation_key(topic, audience, tone, length)
+        if key in self.cache:
+            return 0
+        entry = {
+            "topic": topic,
+            "audience": audience,
+            "tone": tone,
+            "length": length,
+            "prompt": create_user_prompt(topic, audience, tone, length)
+        }
+        client, system_prompt, user_prompt, options = self._route(entry)
+        explanation = client.generate_explanation(system_prompt, user_prompt, **options)
+        usage = client.last_usage
+        self._commit(entry, key, explanation, usage, prefetched=True)
+        return (usage or {}).get("output_tokens") or _estimate_tokens([explanation])
+    
+    def _find_source(self, entry: dict):
+        """
+        Most similar cold-generated variant of the entry's topic already in
+        the cache (or store), to derive the requested variant from
+        
+        Returns:
+            (source key, (audience, tone, length), explanation text) or None
+        """
+        for variant in related_variants(entry["audience"], entry["tone"], entry["length"]):
+            key = explanation_key(entry["topic"], *variant)
+            record = None
+            if self.cache is not None and key in self.cache:
+                record = self.cache.get(key)
+            elif self.store is not None:
+                record = self.store.get(key)
+            # Only derive from originals so rewrites don't drift over generations
+            if record is not None and not record.get("derived_from"):
+                return key, variant, record["explanation"]
+        return None
+    
+    def _tier_client(self, tier: Tier):
+        """Client for a tier, created on first use and shared by tiers on the same model"""
+        return self._client_for(tier.provider, tier.model)
+    
+    def _client_for(self, provider: str, model: Optional[str]):
+        """Client for a provider/model pair, created on first use"""
+        key = (provider, model)
+        client = self._tier_clients.get(key)
+        if client is None:
+            with self._tier_lock:
+                client = self._tier_clients.get(key)
+                if client is None:
+                    client = self.client_factory(provider, model)
+                    self._tier_clients[key] = client
+        return client
+    
+    async def aclose(self):
+        """Close the connections of the buddy's client and tier clients (from the serving event loop)"""
+        clients = {id(client): client for client in [self.client, *self._tier_clients.values()]}
+        for client in clients.values():
+            await client.aclose()
+    
+    def _maybe_shadow(self, entry: dict, latency: float, usage: dict):
+        """Replay a sampled request against the policy's shadow tier, off the request path"""
+        primary = self.policy.tiers[entry["tier"]]
+        candidate = self.policy.shadow_tier(primary)
+        if candidate is None:
+            return
+        if self._shadow_executor is None:
+            with self._tier_lock:
+                if self._shadow_executor is None:
+                    self._shadow_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="shadow")
+        input_tokens = usage.get("input_tokens") or _estimate_tokens([self.system_prompt, entry["prompt"]])
+        record = {
+            "time": time.time(),
+            "topic": entry["topic"],
+            "audience": entry["audience"],
+            "primary": _tier_result(primary, entry, latency, input_tokens, usage["output_tokens"])
+        }
+        self._shadow_executor.submit(in_context(self._run_shadow), record, candidate, entry["prompt"])
+    
+    def _run_shadow(self, record: dict, tier: Tier, prompt: str):
+        """Generate with the shadow tier and log the comparison (output is discarded)"""
+        client = self._tier_client(tier)
+        options = {"max_tokens": tier.max_tokens} if tier.max_tokens else {}
+        started = time.perf_counter()
+        try:
+            text = client.generate_explanation(self.system_prompt, prompt, **options)
+            usage = client.last_usage or {}
+            input_tokens = usage.get("input_tokens") or record["primary"]["input_tokens"]
+            output_tokens = usage.get("output_tokens") or _estimate_tokens([text])
+            shadow = {"provider": client.provider, "model": client.model}
+            shadow.update(_tier_result(tier, shadow, time.perf_counter() - started, input_tokens, output_tokens))
+        except Exception as e:
+            shadow = {"tier": tier.name, "error": str(e)}
+        record["shadow"] = shadow
+        self.shadow_results.append(record)
+        if self.metrics is not None:
+            self.metrics.incr("shadow.errors" if "error" in shadow else "shadow.runs")
+        with self._tier_lock:
+            with open(self.policy.shadow_log, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+    
+    def _record_cancel(self, reason: str, received_tokens: int):
+        """
+        Count a generation abandoned before completion
+        
+        Args:
+            reason: "deadline" or "closed" (consumer went away)
+            received_tokens: Estimated output tokens already streamed
+        """
+        log_event(logger, "explanation.cancelled", reason=reason, output_tokens=received_tokens)
+        if self.metrics is None:
+            return
+        self.metrics.incr(f"requests.cancelled.{reason}")
+        if self._completed_count:
+            typical = self._completed_tokens / self._completed_count
+            self.metrics.incr("tokens.saved", max(0, round(typical - received_tokens)))
+    
+    def _commit(
+        self,
+        entry: dict,
+        key: str,
+        explanation: str,
+        usage: Optional[dict] = None,
+        started: Optional[float] = None,
+        prompt_tokens: int = 0,
+        prefetched: bool = False,
+        schedule: bool = True
+    ):
+        """Record a completed explanation in history, cache and store"""
+        entry["explanation"] = explanation
+        output_tokens = (usage or {}).get("output_tokens") or _estimate_tokens([explanation])
+        self._completed_tokens += output_tokens
+        self._completed_count += 1
+        self._local.call = {
+            "provider": entry.get("provider", self.client.provider),
+            "model": entry.get("model", self.client.model),
+            "input_tokens": (usage or {}).get("input_tokens"),
+            "output_tokens": (usage or {}).get("output_tokens"),
+            "cached": False
+        }
+        log_event(
+            logger, "explanation.generated",
+            topic=entry["topic"],
+            provider=entry.get("provider", self.client.provider),
+            model=entry.get("model", self.client.model),
+            tier=entry.get("tier"),
+            derived_from=entry.get("derived_from"),
+            prefetched=prefetched or None,
+            latency_ms=round((time.perf_counter() - started) * 1000, 2) if started is not None else None,
+            input_tokens=(usage or {}).get("input_tokens") or prompt_tokens or None,
+            output_tokens=output_tokens
+        )
+        if self.cache is not None:
+            with span("cache.store"):
+                self.cache.set(key, {
+                    "explanation": explanation,
+                    "provider": entry.get("provider", self.client.provider),
+                    "model": entry.get("model", self.client.model),
+                    "derived_from": entry.get("derived_from"),
+                    "prompt_version": PROMPT_VERSION,
+                    "prefetched": prefetched
+                })
+        self._persist(entry, key, usage)
+        if self.prefetcher is not None and schedule and not prefetched:
+            self.prefetcher.schedule(entry["topic"], (entry["audience"], entry["tone"], entry["length"]))
+        if self.metrics is not None and started is not None:
+            # Cold vs derived totals, for comparing the cost and speed of both paths
+            kind = "derived" if entry.get("derived_from") else "cold"
+            self.metrics.incr(f"generation.{kind}.requests")
+            self.metrics.incr(f"generation.{kind}.input_tokens", (usage or {}).get("input_tokens") or prompt_tokens)
+            self.metrics.incr(f"generation.{kind}.output_tokens", output_tokens)
+            self.metrics.incr(f"generation.{kind}.latency_ms", (time.perf_counter() - started) * 1000)
+        if "tier" in entry:
+            self.policy.record(entry["tier"], output_tokens)
+            if started is not None:
+                usage = dict(usage or {}, output_tokens=output_tokens)
+                self._maybe_shadow(entry, time.perf_counter() - started, usage)
+    
+    def _persist(self, entry: dict, key: str, usage: Optional[dict] = None):
+        """Hand a completed history entry to the store (queued, off the request path)"""
+        if self.store is None:
+            return
+        usage = usage or {}
+        self.store.add({
+            "key": key,
+            "topic": entry["topic"],
+            "audience": entry["audience"],
+            "tone": entry["tone"],
+            "length": entry["length"],
+            "provider": entry.get("provider", self.client.provider),
+            "model": entry.get("model", self.client.model),
+            "input_tokens": usage.get("input_tokens"),
+            "output_tokens": usage.get("output_tokens"),
+            "explanation": entry["explanation"],
+            "derived_from": entry.get("derived_from")
+        })
     
     def explain_interactive(self, topic: str):
         """
@@ -91,44 +849,137 @@ class SmartStudyBuddy:
         print("Generating explanation...\n")
         
         # Generate and display
-        explanation = self.explain(topic, audience, tone, length)
-        print(explanation)
+        conversation = self.start_conversation(topic, audience, tone, length)
+        print(conversation.turns[0]["answer"])
         
         print(f"\n{'=' * 60}\n")
         
-        # Offer follow-up
-        follow_up = input("Would you like to ask a follow-up question? (yes/no): ").strip().lower()
-        if follow_up in ['yes', 'y']:
-            question = input("What's your question? ")
-            # This would continue the conversation (simplified for now)
-            print("\n✨ Follow-up feature coming soon!")
+        # Follow-up questions until the learner is done
+        while True:
+            question = input("Follow-up question (leave empty to finish): ").strip()
+            if not question:
+                break
+            print()
+            print(self.follow_up(conversation, question))
+            print(f"\n{'=' * 60}\n")
     
-    def batch_explain(self, topics: list, audience: str, **kwargs):
+    def ingest(
+        self,
+        topic: str,
+        audience: str,
+        tone: Optional[str],
+        length: Optional[str],
+        explanation: str,
+        usage: Optional[dict] = None,
+        provider: Optional[str] = None,
+        model: Optional[str] = None
+    ):
+        """
+        Record an explanation generated elsewhere (a provider batch job) in
+        cache and store, as if it had just been generated here
+        
+        Nothing is added to the conversation history and no prefetch is
+        scheduled, since no learner asked for it.
+        """
+        audience = AUDIENCE_LEVELS.get(audience, audience)
+        entry = {
+            "topic": topic,
+            "audience": audience,
+            "tone": tone,
+            "length": length,
+            "provider": provider or self.client.provider,
+            "model": model or self.client.model
+        }
+        self._commit(entry, explanation_key(topic, audience, tone, length), explanation, usage, schedule=False)
+    
+    def batch_explain(
+        self,
+        topics: list,
+        audience: str,
+        bulk: bool = False,
+        poll_interval: float = 60.0,
+        timeout: Optional[float] = None,
+        **kwargs
+    ):
         """
         Explain multiple topics for the same audience
         
         Args:
             topics: List of topics to explain
             audience: Audience level
+            bulk: Send the topics as a provider batch job (cheaper, but results
+                can take up to 24 h) and wait for it instead of calling the
+                model once per topic; see src.bulk.BulkRunner
+            poll_interval: Seconds between batch status checks (bulk only)
+            timeout: Stop waiting after this many seconds (bulk only); topics
+                without a result by then map to None
             **kwargs: Additional parameters (tone, length)
         
         Returns:
             Dictionary mapping topics to explanations
         """
+        if bulk:
+            runner = BulkRunner(self, skip_cached=False)
+            run_id = runner.submit({"topic": topic, "audience": audience, **kwargs} for topic in topics)
+            runner.wait(run_id, poll_interval=poll_interval, timeout=timeout)
+            results = {topic: None for topic in topics}
+            results.update((r["topic"], r["explanation"]) for r in runner.explanations(run_id))
+            return results
         results = {}
         for topic in topics:
-            print(f"Explaining: {topic}...")
+            log_event(logger, "batch.item", logging.DEBUG, topic=topic, audience=audience)
             results[topic] = self.explain(topic, audience, **kwargs)
         return results
     
+    def _new_history(self):
+        return deque(maxlen=self.max_history) if self.max_history else []
+    
     def get_history(self):
         """Get conversation history"""
         return self.conversation_history
     
+    def search(self, query: str, limit: int = 10, audience: Optional[str] = None):
+        """
+        Search previously generated explanations
+        
+        Args:
+            query: Free-text search terms
+            limit: Maximum number of results
+            audience: Optional audience filter
+        
+        Returns:
+            Ranked list of stored explanations (empty without a store)
+        """
+        if self.store is None:
+            return []
+        return self.store.search(query, limit=limit, audience=audience)
+    
+    def shadow_report(self):
+        """Latency and cost comparison of this process's shadow-test samples"""
+        return shadow_report(list(self.shadow_results))
+    
     def clear_history(self):
         """Clear conversation history"""
-        self.conversation_history = []
-        print("📝 Conversation history cleared")
+        self.conversation_history = self._new_history()
+        log_event(logger, "history.cleared", logging.DEBUG)
+
+
+def _estimate_tokens(parts) -> int:
+    """Rough output token count of streamed text (about 4 characters per token)"""
+    return sum(len(part) for part in parts) // 4
+
+
+def _tier_result(tier: Tier, source: dict, latency: float, input_tokens: int, output_tokens: int) -> dict:
+    """One side of a shadow-test record"""
+    return {
+        "tier": tier.name,
+        "provider": source["provider"],
+        "model": source["model"],
+        "latency_ms": round(latency * 1000, 1),
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "cost": tier.cost(input_tokens, output_tokens)
+    }
 
 
 # Quick usage functions
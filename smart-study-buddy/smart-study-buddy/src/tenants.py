@@ -0,0 +1,174 @@
+"""
+Smart Study Buddy - Tenants
+API-key tenant identification, quotas and per-tenant usage accounting.
+
+Tenants are configured in a JSON file (TENANTS_FILE):
+
+    {
+        "tenants": {
+            "acme": {
+                "api_keys": ["sk-acme-1"],
+                "weight": 2,
+                "requests_per_minute": 120,
+                "tokens_per_day": 500000
+            }
+        }
+    }
+
+Without a file every request belongs to the anonymous "public" tenant and
+no key is required.
+"""
+
+import json
+import os
+import time
+from typing import Optional, Dict, Any, List
+
+PUBLIC = "public"
+
+
+class QuotaExceeded(Exception):
+    """Raised when a tenant is over its request or token quota"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class Tenant:
+    """One customer: fair-share weight and optional quotas"""
+
+    def __init__(
+        self,
+        name: str,
+        weight: float = 1.0,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_day: Optional[int] = None,
+        api_keys: Optional[List[str]] = None
+    ):
+        """
+        Initialize a tenant
+
+        Args:
+            name: Tenant id (used in metrics and scheduling)
+            weight: Relative share of upstream concurrency
+            requests_per_minute: Request quota (None = unlimited)
+            tokens_per_day: Output token quota per UTC day (None = unlimited)
+            api_keys: Keys that identify this tenant
+        """
+        self.name = name
+        self.weight = weight
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_day = tokens_per_day
+        self.api_keys = api_keys or []
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "tenant": self.name,
+            "weight": self.weight,
+            "requests_per_minute": self.requests_per_minute,
+            "tokens_per_day": self.tokens_per_day
+        }
+
+
+def _day() -> str:
+    return time.strftime("%Y-%m-%d", time.gmtime())
+
+
+def _seconds_until_midnight_utc() -> float:
+    return 86400 - time.time() % 86400
+
+
+class TenantRegistry:
+    """Resolves API keys to tenants and enforces their quotas"""
+
+    def __init__(self, tenants: Optional[List[Tenant]] = None, state=None, metrics=None):
+        """
+        Initialize the registry
+
+        Args:
+            tenants: Configured tenants (empty = anonymous mode)
+            state: SharedState for request buckets shared across workers
+            metrics: Metrics receiving per-tenant usage counters
+        """
+        self.tenants = {tenant.name: tenant for tenant in tenants or []}
+        self._by_key = {key: tenant for tenant in self.tenants.values() for key in tenant.api_keys}
+        self.state = state
+        self.metrics = metrics
+        self.public = Tenant(PUBLIC)
+
+    @classmethod
+    def from_file(cls, path: Optional[str], state=None, metrics=None) -> "TenantRegistry":
+        """Load tenants from a JSON file (missing path = anonymous mode)"""
+        if not path:
+            return cls(state=state, metrics=metrics)
+        with open(path, encoding="utf-8") as f:
+            config = json.load(f)
+        tenants = [Tenant(name, **options) for name, options in config.get("tenants", {}).items()]
+        return cls(tenants, state=state, metrics=metrics)
+
+    @property
+    def enabled(self) -> bool:
+        """Whether API keys are required"""
+        return bool(self._by_key)
+
+    def resolve(self, api_key: Optional[str]) -> Optional[Tenant]:
+        """Tenant for an API key, the public tenant in anonymous mode, else None"""
+        if not self.enabled:
+            return self.public
+        return self._by_key.get(api_key) if api_key else None
+
+    def tokens_today(self, tenant: Tenant) -> float:
+        if self.metrics is None:
+            return 0
+        return self.metrics.get(f"tenant.{tenant.name}.tokens.{_day()}")
+
+    def check(self, tenant: Tenant):
+        """
+        Take one request from the tenant's quota
+
+        Raises:
+            QuotaExceeded: Over the request rate or today's token budget
+        """
+        if tenant.tokens_per_day is not None and self.tokens_today(tenant) >= tenant.tokens_per_day:
+            raise QuotaExceeded(
+                f"Tenant {tenant.name} used its {tenant.tokens_per_day} tokens for today",
+                _seconds_until_midnight_utc()
+            )
+        if tenant.requests_per_minute and self.state is not None:
+            wait = self.state.take(
+                f"tenant:{tenant.name}", tenant.requests_per_minute, 60.0, tenant.requests_per_minute
+            )
+            if wait > 0:
+                raise QuotaExceeded(
+                    f"Tenant {tenant.name} is over {tenant.requests_per_minute:g} requests/minute", wait
+                )
+
+    def record(self, tenant: Tenant, requests: int = 0, output_tokens: int = 0):
+        """Add to a tenant's usage counters"""
+        if self.metrics is None:
+            return
+        if requests:
+            self.metrics.incr(f"tenant.{tenant.name}.requests", requests)
+        if output_tokens:
+            self.metrics.incr(f"tenant.{tenant.name}.output_tokens", output_tokens)
+            self.metrics.incr(f"tenant.{tenant.name}.tokens.{_day()}", output_tokens)
+
+    def usage(self, tenant: Tenant) -> Dict[str, Any]:
+        """Totals, today's token use and remaining quota for a tenant"""
+        counters = self.metrics.snapshot(f"tenant.{tenant.name}.") if self.metrics is not None else {}
+        today = counters.get(f"tenant.{tenant.name}.tokens.{_day()}", 0)
+        return {
+            **tenant.to_dict(),
+            "requests": counters.get(f"tenant.{tenant.name}.requests", 0),
+            "output_tokens": counters.get(f"tenant.{tenant.name}.output_tokens", 0),
+            "tokens_today": today,
+            "tokens_remaining_today": (
+                max(0, tenant.tokens_per_day - today) if tenant.tokens_per_day is not None else None
+            )
+        }
+
+
+def registry_from_env(state=None, metrics=None) -> TenantRegistry:
+    """Tenants from TENANTS_FILE, or anonymous mode when unset"""
+    return TenantRegistry.from_file(os.getenv("TENANTS_FILE"), state=state, metrics=metrics)
@@ -0,0 +1,230 @@
+"""
+Smart Study Buddy - Model Tiering
+Declarative routing of requests to providers/models, per-tier token
+budgets and shadow testing of candidate tiers.
+
+A policy is a JSON file (TIERING_POLICY):
+
+    {
+        "tiers": {
+            "small": {"provider": "openai", "model": "gpt-4o-mini", "max_tokens": 800,
+                      "cost_per_1k_input": 0.00015, "cost_per_1k_output": 0.0006},
+            "large": {"provider": "openai", "model": "gpt-4o", "max_tokens": 2000,
+                      "daily_token_budget": 2000000, "fallback": "small",
+                      "cost_per_1k_input": 0.0025, "cost_per_1k_output": 0.01}
+        },
+        "rules": [
+            {"when": {"audience": ["child", "elementary"], "length": ["short", null]}, "tier": "small"},
+            {"when": {"topic": "(?i)quantum|relativity"}, "tier": "large"},
+            {"when": {"audience": ["expert", "advanced"]}, "tier": "large"}
+        ],
+        "default": "small",
+        "shadow": {"tier": "large", "sample": 0.05, "for": ["small"], "log": "shadow.jsonl"}
+    }
+
+Rules are checked in order; the first whose conditions all match wins. A
+condition lists allowed values (``null`` matches an unset tone/length);
+``topic`` is a regular expression.
+"""
+
+import json
+import os
+import random
+import re
+import statistics
+import time
+from typing import Optional, Dict, Any, List, Iterable
+
+from src.metrics import Metrics
+from src.prompts import AUDIENCE_LEVELS
+
+_AUDIENCE_KEYS = {description: key for key, description in AUDIENCE_LEVELS.items()}
+
+
+class Tier:
+    """A provider/model pair with its request budget and prices"""
+
+    def __init__(
+        self,
+        name: str,
+        provider: str = "openai",
+        model: Optional[str] = None,
+        max_tokens: Optional[int] = None,
+        daily_token_budget: Optional[int] = None,
+        fallback: Optional[str] = None,
+        cost_per_1k_input: float = 0.0,
+        cost_per_1k_output: float = 0.0
+    ):
+        """
+        Initialize a tier
+
+        Args:
+            name: Tier name used by rules
+            provider: AIClient provider
+            model: Model name (None = provider default)
+            max_tokens: Output token cap per request
+            daily_token_budget: Output tokens per UTC day before requests
+                overflow to ``fallback``
+            fallback: Tier used once the daily budget is spent
+            cost_per_1k_input: Price per 1000 input tokens (for reports)
+            cost_per_1k_output: Price per 1000 output tokens (for reports)
+        """
+        self.name = name
+        self.provider = provider
+        self.model = model
+        self.max_tokens = max_tokens
+        self.daily_token_budget = daily_token_budget
+        self.fallback = fallback
+        self.cost_per_1k_input = cost_per_1k_input
+        self.cost_per_1k_output = cost_per_1k_output
+
+    def cost(self, input_tokens: int, output_tokens: int) -> float:
+        return (input_tokens * self.cost_per_1k_input + output_tokens * self.cost_per_1k_output) / 1000
+
+
+class TieringPolicy:
+    """Maps (topic, audience, tone, length) to a Tier"""
+
+    def __init__(
+        self,
+        tiers: Dict[str, Dict[str, Any]],
+        rules: Optional[List[Dict[str, Any]]] = None,
+        default: Optional[str] = None,
+        shadow: Optional[Dict[str, Any]] = None,
+        metrics=None
+    ):
+        """
+        Initialize the policy
+
+        Args:
+            tiers: Tier name -> Tier options
+            rules: Ordered {"when": {...}, "tier": name} rules
+            default: Tier for requests no rule matches (first tier if unset)
+            shadow: Optional {"tier", "sample", "for", "log"} shadow test
+            metrics: Metrics holding per-tier daily token counts (shared
+                across workers when backed by shared state)
+        """
+        self.tiers = {name: Tier(name, **options) for name, options in tiers.items()}
+        if not self.tiers:
+            raise ValueError("A tiering policy needs at least one tier")
+        self.rules = []
+        for rule in rules or []:
+            when = dict(rule.get("when", {}))
+            topic = when.pop("topic", None)
+            self.rules.append((re.compile(topic) if topic else None, when, self._tier(rule["tier"])))
+        self.default = self._tier(default or next(iter(self.tiers)))
+        self.shadow = shadow
+        if shadow:
+            self._tier(shadow["tier"])
+        self.shadow_log = (shadow or {}).get("log") or os.getenv("SHADOW_LOG", "shadow_tests.jsonl")
+        self.metrics = metrics if metrics is not None else Metrics()
+
+    def _tier(self, name: str) -> Tier:
+        if name not in self.tiers:
+            raise ValueError(f"Unknown tier: {name}")
+        return self.tiers[name]
+
+    @classmethod
+    def from_file(cls, path: str, metrics=None) -> "TieringPolicy":
+        with open(path, encoding="utf-8") as f:
+            return cls(**json.load(f), metrics=metrics)
+
+    def route(self, topic: str, audience: str, tone: Optional[str] = None, length: Optional[str] = None) -> Tier:
+        """Tier for a request (after daily budget overflow)"""
+        fields = {"audience": _AUDIENCE_KEYS.get(audience, audience), "tone": tone, "length": length}
+        tier = self.default
+        for pattern, when, rule_tier in self.rules:
+            if pattern is not None and not pattern.search(topic):
+                continue
+            if all(fields.get(name) in allowed for name, allowed in when.items()):
+                tier = rule_tier
+                break
+        return self._within_budget(tier)
+
+    def _within_budget(self, tier: Tier) -> Tier:
+        seen = set()
+        while tier.daily_token_budget is not None and tier.fallback and tier.name not in seen:
+            if self.used_today(tier.name) < tier.daily_token_budget:
+                break
+            seen.add(tier.name)
+            tier = self._tier(tier.fallback)
+        return tier
+
+    def used_today(self, tier_name: str) -> float:
+        return self.metrics.get(f"tier.{tier_name}.tokens.{_day()}")
+
+    def record(self, tier_name: str, output_tokens: int):
+        """Count output tokens against a tier's daily budget"""
+        self.metrics.incr(f"tier.{tier_name}.requests")
+        self.metrics.incr(f"tier.{tier_name}.tokens.{_day()}", output_tokens)
+
+    def shadow_tier(self, primary: Tier) -> Optional[Tier]:
+        """Candidate tier to shadow this request with, if it is sampled"""
+        if not self.shadow or primary.name == self.shadow["tier"]:
+            return None
+        targets = self.shadow.get("for")
+        if targets and primary.name not in targets:
+            return None
+        if random.random() >= self.shadow.get("sample", 0.0):
+            return None
+        return self.tiers[self.shadow["tier"]]
+
+
+def _day() -> str:
+    return time.strftime("%Y-%m-%d", time.gmtime())
+
+
+def policy_from_env(metrics=None) -> Optional[TieringPolicy]:
+    """Policy from TIERING_POLICY, or None to use the buddy's single model"""
+    path = os.getenv("TIERING_POLICY")
+    return TieringPolicy.from_file(path, metrics=metrics) if path else None
+
+
+def load_shadow_log(path: str) -> List[Dict[str, Any]]:
+    """Shadow-test records appended by SmartStudyBuddy (empty if none yet)"""
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def shadow_report(records: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Compare primary and shadow tiers from shadow-test records
+
+    Args:
+        records: Dicts with "primary" and "shadow" results (see SmartStudyBuddy)
+
+    Returns:
+        One row per (primary, shadow) pair with latency and cost figures
+    """
+    pairs = {}
+    for record in records:
+        if record.get("shadow", {}).get("error"):
+            continue
+        key = (record["primary"]["tier"], record["shadow"]["tier"])
+        pairs.setdefault(key, []).append(record)
+
+    rows = []
+    for (primary, shadow), items in sorted(pairs.items()):
+        row = {"primary": primary, "shadow": shadow, "samples": len(items)}
+        for side in ("primary", "shadow"):
+            latencies = [item[side]["latency_ms"] for item in items]
+            row[f"{side}_p50_ms"] = round(statistics.median(latencies), 1)
+            row[f"{side}_p95_ms"] = round(_percentile(latencies, 0.95), 1)
+            row[f"{side}_mean_cost"] = sum(item[side]["cost"] for item in items) / len(items)
+            row[f"{side}_mean_output_tokens"] = round(
+                sum(item[side]["output_tokens"] for item in items) / len(items), 1
+            )
+        primary_cost = row["primary_mean_cost"]
+        row["cost_ratio"] = round(row["shadow_mean_cost"] / primary_cost, 3) if primary_cost else None
+        row["latency_ratio"] = (
+            round(row["shadow_p50_ms"] / row["primary_p50_ms"], 3) if row["primary_p50_ms"] else None
+        )
+        rows.append(row)
+    return rows
@@ -0,0 +1,442 @@
+"""
+Smart Study Buddy - Tracing
+Lightweight spans with W3C trace context, exported to a local file as
+OTLP/JSON lines (the format the OpenTelemetry Collector's file exporter
+writes and its ``otlpjsonfile`` receiver reads)
+
+The current span lives in a ContextVar. Asyncio tasks inherit it on their
+own; work handed to another thread keeps it when wrapped with
+``in_context``. Streams are traced with ``traced_iter``/``atraced_iter``,
+which make their span current only while the stream is advancing.
+
+Nothing is recorded until ``configure_tracing`` is called, and unsampled
+requests only carry ids, so tracing can stay on in production at a low
+sample rate.
+"""
+
+import asyncio
+import atexit
+import contextvars
+import json
+import os
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# OTLP span kinds
+INTERNAL, SERVER, CLIENT = 1, 2, 3
+
+_STATUS_OK, _STATUS_ERROR = 1, 2
+
+
+class Span:
+    """One timed operation within a trace"""
+
+    __slots__ = (
+        "name", "trace_id", "span_id", "parent_id", "kind", "sampled",
+        "start_ns", "end_ns", "attributes", "events", "status", "message"
+    )
+
+    def __init__(
+        self,
+        name: str,
+        trace_id: str,
+        parent_id: Optional[str] = None,
+        kind: int = INTERNAL,
+        sampled: bool = True,
+        attributes: Optional[Dict[str, Any]] = None
+    ):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.kind = kind
+        self.sampled = sampled
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = {k: v for k, v in (attributes or {}).items() if v is not None}
+        self.events = []
+        self.status = _STATUS_OK
+        self.message = None
+
+    def set_attribute(self, key: str, value: Any):
+        if value is not None:
+            self.attributes[key] = value
+
+    def add_event(self, name: str, **attributes):
+        self.events.append((time.time_ns(), name, attributes))
+
+    def record_exception(self, error: BaseException):
+        self.status = _STATUS_ERROR
+        self.message = f"{type(error).__name__}: {error}"
+        self.add_event("exception", **{"exception.type": type(error).__name__, "exception.message": str(error)})
+
+    @property
+    def traceparent(self) -> str:
+        """W3C ``traceparent`` header value naming this span"""
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def end(self):
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            if self.sampled and _exporter is not None:
+                _exporter.export(self)
+
+    def to_otlp(self) -> Dict[str, Any]:
+        data = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": _otlp_attributes(self.attributes),
+            "events": [
+                {"timeUnixNano": str(ts), "name": name, "attributes": _otlp_attributes(attrs)}
+                for ts, name, attrs in self.events
+            ],
+            "status": {"code": self.status, "message": self.message} if self.message else {"code": self.status}
+        }
+        if self.parent_id:
+            data["parentSpanId"] = self.parent_id
+        return data
+
+
+class _NoopSpan(Span):
+    """Stand-in when tracing is off or the trace is not sampled"""
+
+    def __init__(self):
+        self.trace_id = self.span_id = None
+        self.sampled = False
+
+    def set_attribute(self, key, value):
+        pass
+
+    def add_event(self, name, **attributes):
+        pass
+
+    def record_exception(self, error):
+        pass
+
+    def end(self):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+_current: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("span", default=None)
+_exporter = None
+_sample_rate = 0.0
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> list:
+    values = []
+    for key, value in attributes.items():
+        if isinstance(value, bool):
+            value = {"boolValue": value}
+        elif isinstance(value, int):
+            value = {"intValue": str(value)}
+        elif isinstance(value, float):
+            value = {"doubleValue": value}
+        else:
+            value = {"stringValue": str(value)}
+        values.append({"key": key, "value": value})
+    return values
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[Tuple[str, str, bool]]:
+    """(trace id, parent span id, sampled) from a W3C traceparent header, or None if invalid"""
+    parts = (header or "").strip().lower().split("-")
+    if len(parts) < 4 or len(parts[0]) != 2 or parts[0] == "ff":
+        return None
+    version, trace_id, parent_id, flags = parts[:4]
+    try:
+        int(trace_id, 16), int(parent_id, 16), int(flags, 16)
+    except ValueError:
+        return None
+    if len(trace_id) != 32 or len(parent_id) != 16 or len(flags) != 2:
+        return None
+    if trace_id == "0" * 32 or parent_id == "0" * 16:
+        return None
+    return trace_id, parent_id, bool(int(flags, 16) & 1)
+
+
+def current_span() -> Span:
+    """The active span (a no-op span outside any trace)"""
+    return _current.get() or NOOP_SPAN
+
+
+def add_event(name: str, **attributes):
+    """Timestamped event on the active span (no-op outside a sampled trace)"""
+    span = _current.get()
+    if span is not None and span.sampled:
+        span.add_event(name, **attributes)
+
+
+def start_span(name: str, kind: int = INTERNAL, **attributes) -> Span:
+    """
+    Child of the active span, not made current; the caller ends it.
+    Outside a sampled trace this is NOOP_SPAN.
+    """
+    parent = _current.get()
+    if parent is None or not parent.sampled:
+        return NOOP_SPAN
+    return Span(name, parent.trace_id, parent.span_id, kind, attributes=attributes)
+
+
+@contextmanager
+def span(name: str, kind: int = INTERNAL, **attributes):
+    """``with span("cache.lookup") as s:`` times a block as a child of the active span"""
+    child = start_span(name, kind, **attributes)
+    if child is NOOP_SPAN:
+        yield child
+        return
+    token = _current.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.record_exception(e)
+        raise
+    finally:
+        _current.reset(token)
+        child.end()
+
+
+@contextmanager
+def start_trace(name: str, traceparent: Optional[str] = None, kind: int = SERVER, **attributes):
+    """
+    Root span of a request: continues the caller's trace when ``traceparent``
+    is valid (keeping its sampling decision), otherwise starts a new one
+    sampled at the configured rate. Unsampled traces still get ids, so they
+    can be returned to the caller.
+    """
+    parent = parse_traceparent(traceparent)
+    if parent is not None:
+        trace_id, parent_id, sampled = parent
+    else:
+        trace_id, parent_id = os.urandom(16).hex(), None
+        sampled = _sample_rate > 0 and random.random() < _sample_rate
+    root = Span(name, trace_id, parent_id, kind, sampled=sampled and _exporter is not None, attributes=attributes)
+    token = _current.set(root)
+    try:
+        yield root
+    except BaseException as e:
+        root.record_exception(e)
+        raise
+    finally:
+        _current.reset(token)
+        root.end()
+
+
+def in_context(fn: Callable) -> Callable:
+    """
+    Bind ``fn`` to the caller's context (active span included) for running
+    on another thread. Wrap once per submission: a context can only be
+    entered by one thread at a time.
+    """
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.run(fn, *args, **kwargs)
+
+
+def _finish_stream(child: Span, error: Optional[BaseException], chunks: int):
+    child.set_attribute("chunks", chunks)
+    if isinstance(error, (GeneratorExit, asyncio.CancelledError)):
+        child.set_attribute("cancelled", True)
+    elif error is not None:
+        child.record_exception(error)
+    child.end()
+
+
+def traced_iter(name: str, chunks, kind: int = INTERNAL, **attributes):
+    """
+    Pass a generator's chunks through a span that lasts until the stream
+    ends, with a ``first_token`` event. The span is current only while the
+    generator runs, so it never leaks into the consumer between chunks.
+    """
+    child = start_span(name, kind, **attributes)
+    if child is NOOP_SPAN:
+        yield from chunks
+        return
+    count, error = 0, None
+    try:
+        while True:
+            token = _current.set(child)
+            try:
+                chunk = next(chunks)
+            except StopIteration:
+                break
+            finally:
+                _current.reset(token)
+            if not count:
+                child.add_event("first_token")
+            count += 1
+            yield chunk
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        token = _current.set(child)
+        try:
+            chunks.close()
+        finally:
+            _current.reset(token)
+            _finish_stream(child, error, count)
+
+
+async def atraced_iter(name: str, chunks, kind: int = INTERNAL, **attributes):
+    """Async counterpart of traced_iter"""
+    child = start_span(name, kind, **attributes)
+    if child is NOOP_SPAN:
+        try:
+            async for chunk in chunks:
+                yield chunk
+        finally:
+            await chunks.aclose()
+        return
+    count, error = 0, None
+    try:
+        while True:
+            token = _current.set(child)
+            try:
+                chunk = await chunks.__anext__()
+            except StopAsyncIteration:
+                break
+            finally:
+                _current.reset(token)
+            if not count:
+                child.add_event("first_token")
+            count += 1
+            yield chunk
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        token = _current.set(child)
+        try:
+            await chunks.aclose()
+        finally:
+            _current.reset(token)
+            _finish_stream(child, error, count)
+
+
+class FileExporter:
+    """
+    Appends finished spans to a file as OTLP/JSON, one export request per
+    line, from a background thread (spans are only queued on the hot path)
+    """
+
+    def __init__(self, path: str, service_name: str = "smart-study-buddy", batch_size: int = 256,
+                 flush_interval: float = 1.0):
+        """
+        Args:
+            path: Output file (appended to)
+            service_name: ``service.name`` resource attribute
+            batch_size: Maximum spans per line
+            flush_interval: Seconds a span may wait for more to batch with
+        """
+        self.path = path
+        self.service_name = service_name
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._write_loop, name="trace-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, span: Span):
+        self._queue.put(span)
+
+    def _write_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while batch[-1] is not None and len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            stop = batch[-1] is None
+            spans = [s for s in batch if s is not None]
+            if spans:
+                self._write(spans)
+            for _ in batch:
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _write(self, spans):
+        line = json.dumps({"resourceSpans": [{
+            "resource": {"attributes": _otlp_attributes({"service.name": self.service_name})},
+            "scopeSpans": [{"scope": {"name": "smart_study_buddy"}, "spans": [s.to_otlp() for s in spans]}]
+        }]}, ensure_ascii=False, default=str)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+    def flush(self):
+        """Block until every span exported so far is written"""
+        self._queue.join()
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+
+def configure_tracing(
+    path: str = "traces.jsonl",
+    sample_rate: float = 1.0,
+    service_name: str = "smart-study-buddy"
+) -> FileExporter:
+    """
+    Start recording sampled traces to ``path``. Calling this again replaces
+    the previous configuration.
+
+    Args:
+        path: OTLP/JSON lines file
+        sample_rate: Fraction of new traces recorded (incoming traceparent
+            headers keep the caller's decision)
+        service_name: ``service.name`` resource attribute
+
+    Returns:
+        The exporter (closed automatically at exit)
+    """
+    global _exporter, _sample_rate
+    if _exporter is not None:
+        _exporter.close()
+    _exporter = FileExporter(path, service_name)
+    _sample_rate = sample_rate
+    atexit.register(_exporter.close)
+    return _exporter
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware opening a server span per HTTP request. It continues an
+    incoming ``traceparent`` header and returns ``traceparent`` and
+    ``X-Trace-Id`` headers naming the request's trace.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        headers = dict(scope.get("headers") or [])
+        traceparent = headers.get(b"traceparent", b"").decode("latin-1") or None
+        name = f"{scope['method']} {scope['path']}"
+        with start_trace(name, traceparent, **{"http.method": scope["method"], "http.target": scope["path"]}) as root:
+            async def send_with_trace(message):
+                if message["type"] == "http.response.start":
+                    root.set_attribute("http.status_code", message["status"])
+                    if message["status"] >= 500:
+                        root.status = _STATUS_ERROR
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"traceparent", root.traceparent.encode()),
+                        (b"x-trace-id", root.trace_id.encode())
+                    ]
+                await send(message)
+
+            await self.app(scope, receive, send_with_trace)
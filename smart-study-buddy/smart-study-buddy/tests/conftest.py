@@ -0,0 +1,66 @@
+"""
+Smart Study Buddy - Shared test fixtures
+"""
+
+import atexit
+import os
+import shutil
+import tempfile
+
+# Module-level state in src.store, src.jobs and api_server is opened at import
+# time, so point it at a throwaway directory before anything imports them.
+# Otherwise tests write explanations.db into the project and share the
+# /dev/shm state (cache, counters) across runs.
+_STATE_DIR = tempfile.mkdtemp(prefix="smart-study-buddy-tests-")
+atexit.register(shutil.rmtree, _STATE_DIR, ignore_errors=True)
+os.environ["EXPLANATION_STORE"] = os.path.join(_STATE_DIR, "explanations.db")
+os.environ["STATE_DB"] = os.path.join(_STATE_DIR, "state.db")
+os.environ["JOB_DB"] = os.path.join(_STATE_DIR, "jobs.db")
+os.environ.pop("REDIS_URL", None)
+
+import pytest  # noqa: E402
+from src.study_buddy import SmartStudyBuddy  # noqa: E402
+
+
+class FakeClient:
+    """Stand-in for AIClient that never touches the network"""
+
+    def __init__(self, text="Core idea. Plants turn sunlight into food."):
+        self.provider = "openai"
+        self.model = "fake-model"
+        self.max_tokens = 2000
+        self.text = text
+        self.calls = 0
+        self.last_usage = {"input_tokens": 10, "output_tokens": 20}
+
+    def generate_explanation(self, system_prompt, user_prompt, **kwargs):
+        self.calls += 1
+        return self.text
+
+    def stream_explanation(self, system_prompt, user_prompt, **kwargs):
+        self.calls += 1
+        words = self.text.split(" ")
+        for i, word in enumerate(words):
+            yield word if i == len(words) - 1 else word + " "
+
+    async def astream_explanation(self, system_prompt, user_prompt, **kwargs):
+        for chunk in self.stream_explanation(system_prompt, user_prompt, **kwargs):
+            yield chunk
+
+
+@pytest.fixture
+def fake_client():
+    return FakeClient()
+
+
+@pytest.fixture
+def make_buddy(monkeypatch, fake_client):
+    """Build a SmartStudyBuddy whose AI client is a FakeClient"""
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+
+    def factory(**kwargs):
+        buddy = SmartStudyBuddy(provider="openai", **kwargs)
+        buddy.client = fake_client
+        return buddy
+
+    return factory
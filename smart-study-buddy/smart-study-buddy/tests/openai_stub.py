@@ -0,0 +1,199 @@
+"""
+Smart Study Buddy - Local OpenAI-compatible stand-in server for tests
+"""
+
+import json
+import threading
+import time
+import uuid
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def _json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.endswith("/models"):
+            if not self.server.healthy:
+                return self._json(503, {"error": "unhealthy"})
+            return self._json(200, {"object": "list", "data": [{"id": "stub-model", "object": "model"}]})
+        if "/batches/" in self.path:
+            batch = self.server.batches.get(self.path.rsplit("/", 1)[1])
+            if batch is None:
+                return self._json(404, {"error": "not found"})
+            return self._json(200, self.server.advance(batch))
+        if self.path.endswith("/content"):
+            data = self.server.files.get(self.path.split("/")[-2])
+            if data is None:
+                return self._json(404, {"error": "not found"})
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            return
+        self._json(404, {"error": "not found"})
+
+    def do_POST(self):
+        raw = self.rfile.read(int(self.headers["Content-Length"]))
+        if self.path.endswith("/files"):
+            return self._upload(raw)
+        body = json.loads(raw)
+        if self.path.endswith("/batches"):
+            return self._json(200, self.server.create_batch(body))
+        if not self.path.endswith("/chat/completions"):
+            return self._json(404, {"error": "not found"})
+        with self.server.lock:
+            self.server.requests.append(body)
+        words = [w + " " for w in self.server.text.split(" ")]
+        words[-1] = words[-1].rstrip()
+
+        if not body.get("stream"):
+            return self._json(200, self.server.completion(body))
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for word in words:
+            chunk = {
+                "id": "cmpl-stub",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body["model"],
+                "choices": [{"index": 0, "delta": {"content": word}, "finish_reason": None}]
+            }
+            self._chunk(f"data: {json.dumps(chunk)}\n\n")
+            time.sleep(self.server.delay)
+        self._chunk("data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _upload(self, raw):
+        message = BytesParser().parsebytes(
+            f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + raw
+        )
+        parts = {part.get_param("name", header="content-disposition"): part for part in message.get_payload()}
+        file_id = f"file-{uuid.uuid4().hex[:12]}"
+        data = parts["file"].get_payload(decode=True)
+        self.server.files[file_id] = data
+        self._json(200, {
+            "id": file_id,
+            "object": "file",
+            "bytes": len(data),
+            "created_at": int(time.time()),
+            "filename": parts["file"].get_filename(),
+            "purpose": parts["purpose"].get_payload()
+        })
+
+    def _chunk(self, text):
+        data = text.encode()
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+
+class StubServer(ThreadingHTTPServer):
+    """
+    OpenAI chat-completions (and Batch API) stand-in that records the
+    requests it served
+
+    A batch reports in_progress for ``batch_polls`` retrievals, then
+    completes. Requests whose custom_id is in ``fail_once`` land in the error
+    file the first time they are seen.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, text="Core idea. Plants turn sunlight into food.", delay=0.0):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.text = text
+        self.delay = delay
+        self.healthy = True
+        self.requests = []
+        self.connections = 0
+        self.files = {}
+        self.batches = {}
+        self.batch_polls = 1
+        self.fail_once = set()
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+
+    def completion(self, body):
+        words = len(self.text.split(" "))
+        return {
+            "id": "cmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body["model"],
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": self.text},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": 10, "completion_tokens": words, "total_tokens": 10 + words}
+        }
+
+    def create_batch(self, body):
+        batch = {
+            "id": f"batch-{uuid.uuid4().hex[:12]}",
+            "object": "batch",
+            "endpoint": body["endpoint"],
+            "input_file_id": body["input_file_id"],
+            "completion_window": body["completion_window"],
+            "status": "in_progress",
+            "created_at": int(time.time()),
+            "output_file_id": None,
+            "error_file_id": None,
+            "polls": 0
+        }
+        with self.lock:
+            self.batches[batch["id"]] = batch
+        return {k: v for k, v in batch.items() if k != "polls"}
+
+    def advance(self, batch):
+        with self.lock:
+            batch["polls"] += 1
+            if batch["status"] == "in_progress" and batch["polls"] > self.batch_polls:
+                output, errors = [], []
+                for line in self.files[batch["input_file_id"]].decode().splitlines():
+                    request = json.loads(line)
+                    self.requests.append(request["body"])
+                    if request["custom_id"] in self.fail_once:
+                        self.fail_once.discard(request["custom_id"])
+                        errors.append({"id": "r", "custom_id": request["custom_id"], "response": None,
+                                       "error": {"code": "server_error", "message": "stub failure"}})
+                    else:
+                        output.append({"id": "r", "custom_id": request["custom_id"], "error": None,
+                                       "response": {"status_code": 200, "body": self.completion(request["body"])}})
+                for kind, lines in (("output_file_id", output), ("error_file_id", errors)):
+                    if lines:
+                        file_id = f"file-{uuid.uuid4().hex[:12]}"
+                        self.files[file_id] = "".join(json.dumps(line) + "\n" for line in lines).encode()
+                        batch[kind] = file_id
+                batch["status"] = "completed"
+            return {k: v for k, v in batch.items() if k != "polls"}
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
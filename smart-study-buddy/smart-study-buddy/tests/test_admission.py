@@ -0,0 +1,70 @@
+"""
+Smart Study Buddy - Admission Control Tests
+"""
+
+import asyncio
+
+import pytest
+
+from src.admission import AdmissionController, Overloaded
+
+
+def test_interactive_goes_ahead_of_batch():
+    """Test a freed slot goes to the most urgent waiter, not the oldest"""
+    admission = AdmissionController(max_in_flight=1, slo=10, initial_service_time=0.1)
+    order = []
+
+    async def request(priority):
+        async with admission.slot(priority):
+            order.append(priority)
+
+    async def main():
+        held = await admission.hold("interactive")
+        waiting = [asyncio.ensure_future(request(p)) for p in ("background", "batch", "interactive")]
+        await asyncio.sleep(0.01)
+        assert admission.stats()["queued"] == {"interactive": 1, "batch": 1, "background": 1}
+        held.release()
+        await asyncio.gather(*waiting)
+
+    asyncio.run(main())
+    assert order == ["interactive", "batch", "background"]
+    assert admission.stats()["in_flight"] == 0
+
+
+def test_sheds_when_wait_exceeds_slo():
+    """Test requests are refused immediately once the expected wait passes the SLO"""
+    admission = AdmissionController(max_in_flight=1, slo=1.0, initial_service_time=5.0)
+
+    async def main():
+        await admission.hold("interactive")
+        with pytest.raises(Overloaded) as raised:
+            await admission.acquire("interactive")
+        return raised.value
+
+    error = asyncio.run(main())
+    assert error.retry_after == pytest.approx(5.0)
+    assert admission.stats()["shed"]["interactive"] == 1
+
+
+def test_full_queue_evicts_lower_priority():
+    """Test interactive work displaces queued batch work when the queue is full"""
+    admission = AdmissionController(max_in_flight=1, max_queue=1, slo=10, initial_service_time=0.1)
+
+    async def main():
+        held = await admission.hold("interactive")
+        batch = asyncio.ensure_future(admission.acquire("batch"))
+        await asyncio.sleep(0.01)
+        interactive = asyncio.ensure_future(admission.acquire("interactive"))
+        await asyncio.sleep(0.01)
+
+        with pytest.raises(Overloaded):
+            await batch
+        with pytest.raises(Overloaded):
+            await admission.acquire("batch")
+
+        held.release()
+        await interactive
+
+    asyncio.run(main())
+    assert admission.stats()["shed"] == {"interactive": 0, "batch": 2, "background": 0}
+    assert admission.stats()["in_flight"] == 1
@@ -0,0 +1,123 @@
+"""
+Smart Study Buddy - API Server Tests
+"""
+
+import asyncio
+import json
+import pytest
+from fastapi.testclient import TestClient
+
+api_server = pytest.importorskip("api_server")
+
+
+@pytest.fixture
+def client(monkeypatch, make_buddy):
+    buddy = make_buddy()
+    monkeypatch.setattr(api_server, "get_buddy", lambda provider="openai": buddy)
+    return TestClient(api_server.app)
+
+
+def _events(body: str):
+    for block in body.strip().split("\n\n"):
+        event, data = block.split("\n", 1)
+        yield event.removeprefix("event: "), json.loads(data.removeprefix("data: "))
+
+
+def test_explain_json(client, fake_client):
+    """Test the non-streaming explain endpoint"""
+    response = client.post("/explain", json={"topic": "gravity", "audience": "child"})
+    assert response.status_code == 200
+    assert response.json()["explanation"] == fake_client.text
+    assert response.json()["metadata"]["source"] == "generated"
+
+
+def test_explain_sse_stream(client, fake_client):
+    """Test that stream=True returns coalesced SSE frames and a done event"""
+    response = client.post("/explain", json={"topic": "DNA", "audience": "child", "stream": True})
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    events = list(_events(response.text))
+    assert events[-1][0] == "done"
+    assert events[-1][1]["stats"]["frames"] == len(events) - 1
+    text = "".join(data["text"] for event, data in events if event == "frame")
+    assert text.strip() == fake_client.text
+
+
+def test_explain_max_sections(client, fake_client):
+    """Test that max_sections returns only the requested sections"""
+    fake_client.text = "## Core Idea\nGravity pulls.\n## Explanation\nMass bends space.\n"
+    response = client.post("/explain", json={"topic": "gravity", "audience": "expert", "max_sections": 1})
+    assert response.json()["explanation"].strip() == "## Core Idea\nGravity pulls."
+
+
+def test_explain_deadline_returns_504(client, fake_client):
+    """Test a generation that outlives its timeout is abandoned with 504"""
+    async def stalled(system_prompt, user_prompt, deadline=None, **kwargs):
+        yield "Core "
+        await asyncio.sleep(0.3)
+        deadline.check()
+        yield "idea."
+
+    fake_client.astream_explanation = stalled
+    response = client.post("/explain", json={"topic": "volcanoes", "audience": "child", "timeout": 0.1})
+    assert response.status_code == 504
+
+
+def test_explain_sheds_with_retry_after(client, monkeypatch):
+    """Test an overloaded server answers 503 with Retry-After instead of queueing"""
+    from src.admission import AdmissionController
+
+    admission = AdmissionController(max_in_flight=1, slo=1.0, initial_service_time=3.0)
+    admission.in_flight = 1
+    monkeypatch.setattr(api_server, "admission", admission)
+
+    response = client.post("/explain", json={"topic": "tides", "audience": "child"})
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "3"
+
+
+def test_tenant_keys_and_usage(client, monkeypatch, fake_client):
+    """Test configured tenants need a key and see their own usage"""
+    from src.metrics import Metrics
+    from src.tenants import Tenant, TenantRegistry
+
+    registry = TenantRegistry([Tenant("acme", api_keys=["k1"])], metrics=Metrics())
+    monkeypatch.setattr(api_server, "tenants", registry)
+
+    assert client.post("/explain", json={"topic": "tides"}).status_code == 401
+    response = client.post("/explain", json={"topic": "tides"}, headers={"X-API-Key": "k1"})
+    assert response.status_code == 200
+
+    usage = client.get("/usage", headers={"Authorization": "Bearer k1"}).json()
+    assert usage["tenant"] == "acme"
+    assert usage["requests"] == 1
+    assert usage["output_tokens"] == len(fake_client.text) // 4
+
+
+def test_jobs_are_private_to_their_tenant(client, monkeypatch, make_buddy, tmp_path):
+    """Test POST/GET/DELETE /jobs record the owning tenant and hide jobs from other tenants"""
+    from src.jobs import JobManager
+    from src.metrics import Metrics
+    from src.tenants import Tenant, TenantRegistry
+
+    registry = TenantRegistry([Tenant("acme", api_keys=["k1"], weight=2.0), Tenant("globex", api_keys=["k2"])],
+                              metrics=Metrics())
+    monkeypatch.setattr(api_server, "tenants", registry)
+    buddy = make_buddy()
+    jobs = JobManager(lambda provider: buddy, path=str(tmp_path / "jobs.db"), workers=0)
+    monkeypatch.setattr(api_server, "_jobs", jobs)
+
+    response = client.post("/jobs", json={"topics": ["gravity", "DNA"]}, headers={"X-API-Key": "k1"})
+    assert response.status_code == 202
+    job = response.json()
+    assert job["params"]["tenant"] == "acme" and job["params"]["weight"] == 2.0
+
+    url = f"/jobs/{job['job_id']}"
+    assert client.get(url, headers={"X-API-Key": "k1"}).status_code == 200
+    assert client.get(url, headers={"X-API-Key": "k2"}).status_code == 404
+    assert client.get(f"{url}/results", headers={"X-API-Key": "k2"}).status_code == 404
+    assert client.delete(url, headers={"X-API-Key": "k2"}).status_code == 404
+    assert client.get(url, headers={"X-API-Key": "k1"}).json()["status"] == "queued"
+
+    response = client.delete(url, headers={"X-API-Key": "k1"})
+    assert response.status_code == 200 and response.json()["status"] == "cancelled"
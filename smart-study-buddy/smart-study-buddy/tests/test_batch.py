@@ -0,0 +1,89 @@
+"""
+Smart Study Buddy - Batch Runner Tests
+"""
+
+import json
+from src.batch import BatchRunner, read_records, count_records, load_checkpoint
+
+
+def test_read_csv_records(tmp_path):
+    """Test CSV input with defaults for missing columns"""
+    path = tmp_path / "topics.csv"
+    path.write_text("topic,audience,tone\ngravity,child,playful\nDNA,,\n,expert,\n")
+
+    records = list(read_records(str(path)))
+    assert records == [
+        {"topic": "gravity", "audience": "child", "tone": "playful", "length": None},
+        {"topic": "DNA", "audience": "beginner", "tone": None, "length": None},
+    ]
+    assert count_records(str(path)) == 3
+
+
+def test_batch_resumes_after_crash(tmp_path, make_buddy, fake_client):
+    """Test that completed records are skipped and a torn line is dropped"""
+    output = tmp_path / "out.jsonl"
+    first = {"topic": "gravity", "audience": "child", "tone": None, "length": None, "explanation": "x"}
+    output.write_text(json.dumps(first) + "\n" + '{"topic": "DN')
+
+    assert len(load_checkpoint(str(output))) == 1
+    assert output.read_text().count("\n") == 1
+
+    records = [{"topic": t, "audience": "child", "tone": None, "length": None}
+               for t in ("gravity", "DNA", "atoms", "cells")]
+    runner = BatchRunner(make_buddy(max_history=1), str(output), workers=2)
+    summary = runner.run(iter(records))
+
+    assert summary["completed"] == 3
+    assert summary["skipped"] == 1
+    assert fake_client.calls == 3
+    lines = [json.loads(line) for line in output.read_text().splitlines()]
+    assert sorted(r["topic"] for r in lines) == ["DNA", "atoms", "cells", "gravity"]
+    assert lines[-1]["output_tokens"] == 20
+
+
+def test_malformed_lines_fail_and_duplicates_run_once(tmp_path, make_buddy, fake_client):
+    """Test a bad JSONL line becomes a failed row and repeated records are generated once"""
+    path = tmp_path / "topics.jsonl"
+    path.write_text('{"topic": "gravity", "audience": "child"}\n{"topic": "DN\n[1, 2]\n'
+                    '{"topic": "Gravity", "audience": "5-year-old child"}\n{"topic": "atoms"}\n')
+    output = tmp_path / "out.jsonl"
+    runner = BatchRunner(make_buddy(max_history=1), str(output), workers=2)
+    summary = runner.run(read_records(str(path)))
+
+    assert summary["completed"] == 2 and summary["failed"] == 2 and summary["skipped"] == 1
+    assert fake_client.calls == 2
+    errors = [json.loads(line) for line in open(runner.errors_path)]
+    assert [e["line"] for e in errors] == [2, 3]
+    assert "invalid JSON" in errors[0]["error"]
+
+
+def test_rows_record_the_client_that_answered(tmp_path, make_buddy):
+    """Test tiered rows carry the routed model and its own usage, and cache hits carry no usage"""
+    from src.cache import ExplanationCache
+    from src.tiering import TieringPolicy
+    from tests.conftest import FakeClient
+
+    def factory(provider, model):
+        client = FakeClient()
+        client.model = model
+        client.last_usage = {"input_tokens": 7, "output_tokens": 70 if model == "large-model" else 30}
+        return client
+
+    policy = TieringPolicy(
+        tiers={"small": {"provider": "openai", "model": "small-model"},
+               "large": {"provider": "openai", "model": "large-model"}},
+        rules=[{"when": {"audience": ["expert"]}, "tier": "large"}],
+        default="small"
+    )
+    buddy = make_buddy(max_history=1, policy=policy, client_factory=factory, cache=ExplanationCache())
+    output = tmp_path / "out.jsonl"
+    records = [{"topic": "gravity", "audience": a, "tone": None, "length": None} for a in ("child", "expert")]
+    BatchRunner(buddy, str(output), workers=2).run(iter(records))
+    rows = {r["audience"]: r for r in map(json.loads, output.read_text().splitlines())}
+    assert (rows["child"]["model"], rows["child"]["output_tokens"]) == ("small-model", 30)
+    assert (rows["expert"]["model"], rows["expert"]["output_tokens"]) == ("large-model", 70)
+
+    output.unlink()
+    BatchRunner(buddy, str(output)).run(iter(records[:1]))
+    [row] = map(json.loads, output.read_text().splitlines())
+    assert row["model"] == "small-model" and row["output_tokens"] is None
@@ -0,0 +1,58 @@
+"""
+Smart Study Buddy - Benchmark Grid Tests
+"""
+
+import json
+
+from src.benchmark import (
+    GridBenchmark, SimulatedClient, ReplayClient, build_grid, load_recordings, summarize, compare, write_results
+)
+
+PRICES = {"fast": {"input": 0.001, "output": 0.002}}
+
+
+def _grid():
+    return build_grid(["sim:fast", "sim:slow"], ["gravity", "DNA"], ["child", "expert"], [None], ["short", "detailed"])
+
+
+def test_simulated_grid_measures_every_cell(tmp_path):
+    """Test each cell gets latency, TTFT, throughput and (where priced) cost"""
+    bench = GridBenchmark(lambda p, m: SimulatedClient(p, m, time_scale=0.001), workers=8,
+                          prices=PRICES, time_scale=0.001)
+    results = list(bench.run(_grid(), record_path=str(tmp_path / "rec.jsonl")))
+    assert len(results) == 16 and not any(r["error"] for r in results)
+    for r in results:
+        assert 0 < r["ttft_ms"] < r["latency_ms"]
+        assert r["tokens_per_s"] > 0
+        assert (r["cost"] is not None) == (r["model"] == "fast")
+
+    rows = {row["length"]: row for row in summarize(results, by=("length",))}
+    assert rows["detailed"]["mean_output_tokens"] > rows["short"]["mean_output_tokens"]
+    [fast, slow] = summarize(results)
+    assert fast["target"] == "sim:fast" and fast["total_cost"] > 0 and slow["total_cost"] is None
+
+    path = tmp_path / "results.json"
+    write_results(str(path), {"mode": "simulate"}, results)
+    saved = json.loads(path.read_text())
+    assert [c["id"] for c in saved["cells"]] == sorted(c["id"] for c in results)
+
+
+def test_replay_reproduces_a_recorded_run(tmp_path):
+    """Test a recorded run can be replayed offline with similar timings"""
+    record = str(tmp_path / "rec.jsonl")
+    live = list(GridBenchmark(lambda p, m: SimulatedClient(p, m, time_scale=0.001), workers=8,
+                              time_scale=0.001).run(_grid(), record_path=record))
+    recordings = load_recordings(record)
+    replayed = list(GridBenchmark(lambda p, m: ReplayClient(p, m, recordings, time_scale=0.001), workers=8,
+                                  time_scale=0.001).run(_grid()))
+
+    by_id = {r["id"]: r for r in live}
+    for r in replayed:
+        assert r["output_chars"] == by_id[r["id"]]["output_chars"]
+
+    changes = compare(summarize(live), summarize(replayed))
+    assert [c["target"] for c in changes] == ["sim:fast", "sim:slow"]
+    assert all(c["mean_output_tokens"] == 0 for c in changes)
+
+    missing = list(GridBenchmark(lambda p, m: ReplayClient(p, m, {}), time_scale=0.001).run(_grid()[:1]))
+    assert "No recording" in missing[0]["error"]
@@ -0,0 +1,72 @@
+"""
+Smart Study Buddy - Bulk Batch-API Tests (against a local stand-in server)
+"""
+
+import json
+
+import pytest
+
+from src.bulk import BulkRunner, custom_id
+from src.cache import ExplanationCache
+from src.prompts import AUDIENCE_LEVELS, explanation_key
+from src.store import ExplanationStore
+from src.study_buddy import SmartStudyBuddy
+from tests.openai_stub import StubServer
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    server = StubServer()
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+    yield server
+    server.stop()
+
+
+def _key(topic, audience):
+    return explanation_key(topic, AUDIENCE_LEVELS[audience], None, "short")
+
+
+def test_submit_poll_ingest_and_retry(stub, tmp_path):
+    """Test a run is submitted as one batch file, ingested, and its failed item resubmitted"""
+    store = ExplanationStore(str(tmp_path / "store.db"))
+    buddy = SmartStudyBuddy(model="stub-model", store=store, cache=ExplanationCache())
+    buddy.cache.set(_key("gravity", "child"), {"explanation": "cached"})
+    runner = BulkRunner(buddy, directory=str(tmp_path / "bulk"))
+    stub.fail_once = {custom_id(_key("DNA", "child"))}
+
+    records = [{"topic": t, "audience": "child", "length": "short"} for t in ("gravity", "DNA", "tides")]
+    run_id = runner.submit(records)
+    lines = (tmp_path / "bulk" / run_id / "batch-1.jsonl").read_text().splitlines()
+    assert [json.loads(line)["body"]["model"] for line in lines] == ["stub-model", "stub-model"]
+
+    summary = runner.poll(run_id)
+    assert (summary["done"], summary["pending"]) == (0, 2)
+
+    summary = runner.poll(run_id)
+    assert (summary["done"], summary["pending"], summary["batches"]) == (1, 1, 2)
+
+    summary = runner.wait(run_id, poll_interval=0, timeout=5)
+    assert summary["complete"] and summary["done"] == 2 and summary["failed"] == 0
+    assert sorted(r["topic"] for r in runner.explanations(run_id)) == ["DNA", "tides"]
+    assert buddy.cache.get(_key("DNA", "child"))["explanation"] == stub.text
+    assert buddy.conversation_history == []
+
+    store.flush()
+    assert store.get(_key("tides", "child"))["model"] == "stub-model"
+    store.close()
+
+
+def test_gives_up_after_max_attempts_and_batch_explain(stub, tmp_path, monkeypatch):
+    """Test items that keep failing stop being retried; batch_explain(bulk=True) maps topics"""
+    buddy = SmartStudyBuddy(model="stub-model")
+    runner = BulkRunner(buddy, directory=str(tmp_path / "bulk"), max_attempts=1)
+    stub.batch_polls = 0
+    stub.fail_once = {custom_id(_key("DNA", "child"))}
+    run_id = runner.submit([{"topic": "DNA", "audience": "child", "length": "short"}])
+    summary = runner.wait(run_id, poll_interval=0, timeout=5)
+    assert summary["complete"] and summary["failed"] == 1
+
+    monkeypatch.chdir(tmp_path)
+    results = buddy.batch_explain(["gravity", "tides"], "child", bulk=True, poll_interval=0, length="short")
+    assert results == {"gravity": stub.text, "tides": stub.text}
@@ -0,0 +1,40 @@
+"""
+Smart Study Buddy - Bundle Tests
+"""
+
+import pytest
+from src.bundle import build_bundle, ExplanationBundle
+from src.prompts import explanation_key
+
+
+def test_explanation_key_normalises():
+    """Test that audience shorthands and topic spacing share one key"""
+    assert explanation_key("  Gravity ", "child") == explanation_key("gravity", "5-year-old child")
+    assert explanation_key("gravity", "child", "playful") != explanation_key("gravity", "child")
+
+
+def test_bundle_roundtrip(tmp_path):
+    """Test building and reading a bundle"""
+    path = str(tmp_path / "curriculum.ssb")
+    records = [
+        {"topic": f"topic {i}", "audience": "beginner", "explanation": f"text {i}"}
+        for i in range(50)
+    ]
+    records.append({"topic": "DNA", "audience": "child", "tone": "playful", "explanation": "fun"})
+
+    assert build_bundle(records, path) == 51
+
+    with ExplanationBundle(path) as bundle:
+        assert len(bundle) == 51
+        assert bundle.lookup("topic 17", "beginner")["explanation"] == "text 17"
+        assert bundle.lookup("dna", "5-year-old child", "playful")["explanation"] == "fun"
+        assert bundle.lookup("dna", "child") is None
+        assert bundle.lookup("missing", "beginner") is None
+
+
+def test_bundle_rejects_other_files(tmp_path):
+    """Test that non-bundle files are refused"""
+    path = tmp_path / "bogus.ssb"
+    path.write_bytes(b"x" * 64)
+    with pytest.raises(ValueError):
+        ExplanationBundle(str(path))
@@ -0,0 +1,46 @@
+"""
+Smart Study Buddy - Cache and Streaming Tee Tests
+"""
+
+from src.cache import ExplanationCache, replay_stream
+
+
+def test_cache_lru_eviction():
+    """Test least-recently-used eviction"""
+    cache = ExplanationCache(max_entries=2)
+    cache.set("a", {"explanation": "A"})
+    cache.set("b", {"explanation": "B"})
+    cache.get("a")
+    cache.set("c", {"explanation": "C"})
+    assert "b" not in cache
+    assert cache.get("a")["explanation"] == "A"
+
+
+def test_replay_stream_roundtrip():
+    """Test that replayed chunks reassemble the original text"""
+    text = "Gravity pulls  things\ndown.\n"
+    assert "".join(replay_stream(text)) == text
+    assert len(list(replay_stream(text, words_per_chunk=2))) == 2
+
+
+def test_stream_commits_on_completion(make_buddy, fake_client):
+    """Test that a completed stream lands in history and cache"""
+    buddy = make_buddy(cache=ExplanationCache())
+    streamed = "".join(buddy.explain("photosynthesis", "child", stream=True))
+
+    assert buddy.get_history()[-1]["explanation"] == streamed
+    assert "".join(buddy.explain("photosynthesis", "child", stream=True)) == streamed
+    assert buddy.explain("Photosynthesis", "5-year-old child") == streamed
+    assert fake_client.calls == 1
+
+
+def test_abandoned_stream_is_not_cached(make_buddy, fake_client):
+    """Test that a stream closed early is never committed"""
+    cache = ExplanationCache()
+    buddy = make_buddy(cache=cache)
+    stream = buddy.explain("gravity", "expert", stream=True)
+    next(stream)
+    stream.close()
+
+    assert len(cache) == 0
+    assert "explanation" not in buddy.get_history()[-1]
@@ -0,0 +1,87 @@
+"""
+Smart Study Buddy - Conversation Tests
+"""
+
+import pytest
+
+from src.conversation import Conversation, core_idea
+from src.prompts import SYSTEM_PROMPT
+
+ANSWER = (
+    "## Core Idea\nLeaves are green because chlorophyll reflects green light.\n"
+    "## Explanation\n" + "Chlorophyll absorbs red and blue light to power photosynthesis. " * 20 +
+    "\n## Example\nA leaf under a red lamp looks dark.\n"
+)
+
+
+def test_core_idea_keeps_first_section():
+    """Test compaction keeps only the core idea"""
+    assert core_idea(ANSWER) == "Leaves are green because chlorophyll reflects green light."
+    assert core_idea("No headings at all here", max_words=3) == "No headings at …"
+
+
+def test_context_stays_within_budget():
+    """Test recent turns are verbatim and older ones are condensed or dropped"""
+    conversation = Conversation("photosynthesis", "5-year-old child", context_tokens=600, recent_turns=2)
+    for i in range(20):
+        conversation.add_turn(f"Question {i}?", f"Question {i}?", ANSWER)
+
+    summary, messages = conversation.context()
+    assert [m["role"] for m in messages] == ["user", "assistant"] * 2
+    assert messages[-2]["content"] == "Question 19?"
+    assert "Turn 18: Question 17?" in summary
+    assert "earlier turn(s) omitted" in summary
+    assert (len(summary) + sum(len(m["content"]) for m in messages)) // 4 <= 600 + 50
+
+
+def test_follow_ups_send_bounded_history(make_buddy, fake_client):
+    """Test prompt size stays flat from turn 2 to turn 20"""
+    seen = []
+
+    def generate(system_prompt, user_prompt, history=None, **kwargs):
+        seen.append((system_prompt, history))
+        return ANSWER
+
+    fake_client.text = ANSWER
+    buddy = make_buddy()
+    conversation = buddy.start_conversation("photosynthesis", "child", context_tokens=800)
+    fake_client.generate_explanation = generate
+    for i in range(19):
+        buddy.follow_up(conversation, f"Question {i}?")
+
+    assert len(conversation.turns) == 20
+    assert seen[0][1][0]["role"] == "user" and seen[0][1][1]["content"] == ANSWER
+    # Without compaction turn 20 would carry ~19 full answers (~6,500 tokens)
+    sizes = [turn["context_tokens"] for turn in conversation.turns[1:]]
+    assert max(sizes) <= len(SYSTEM_PROMPT) // 4 + 800 + 100
+
+
+def test_streamed_follow_up_records_turn(make_buddy):
+    """Test a streamed answer is added to the conversation once complete"""
+    buddy = make_buddy()
+    conversation = buddy.start_conversation("gravity", "child")
+    answer = "".join(buddy.follow_up(conversation, "Why do apples fall?", stream=True))
+    assert conversation.turns[-1]["answer"] == answer
+    assert conversation.turns[-1]["turn"] == 2
+
+
+def test_session_api(monkeypatch, make_buddy):
+    """Test sessions can be opened, continued and read back, per tenant"""
+    api_server = pytest.importorskip("api_server")
+    from fastapi.testclient import TestClient
+
+    buddy = make_buddy()
+    monkeypatch.setattr(api_server, "get_buddy", lambda provider="openai": buddy)
+    client = TestClient(api_server.app)
+
+    opened = client.post("/sessions", json={"topic": "gravity", "audience": "child"})
+    assert opened.status_code == 201
+    session_id = opened.json()["session_id"]
+
+    reply = client.post(f"/sessions/{session_id}/follow-ups", json={"question": "Why do apples fall?"})
+    assert reply.status_code == 200
+    assert reply.json()["turn"] == 2
+
+    turns = client.get(f"/sessions/{session_id}").json()["turns"]
+    assert [t["question"] for t in turns] == ["Explain gravity", "Why do apples fall?"]
+    assert client.get("/sessions/unknown").status_code == 404
@@ -0,0 +1,126 @@
+"""
+Smart Study Buddy - Curriculum Tests
+"""
+
+import json
+import threading
+import time
+
+import pytest
+
+from src.cache import ExplanationCache
+from src.curriculum import CurriculumRunner, parse_plan, levels, render_markdown
+from src.prompts import CURRICULUM_PLAN_PROMPT
+from tests.conftest import FakeClient
+
+PLAN = {"topics": [
+    {"topic": "Cells", "prerequisites": []},
+    {"topic": "Membranes", "prerequisites": ["Cells"]},
+    {"topic": "Organelles", "prerequisites": ["Cells"]},
+    {"topic": "Osmosis", "prerequisites": ["Membranes", "Water"]},
+    {"topic": "Water", "prerequisites": []},
+]}
+
+
+class CurriculumClient(FakeClient):
+    """Plans PLAN and answers each subtopic slowly, tracking concurrency"""
+
+    def __init__(self):
+        super().__init__()
+        self.prompts = {}
+        self.active = self.peak = 0
+        self.lock = threading.Lock()
+
+    def generate_explanation(self, system_prompt, user_prompt, **kwargs):
+        if system_prompt == CURRICULUM_PLAN_PROMPT:
+            return "```json\n" + json.dumps(PLAN) + "\n```"
+        topic = user_prompt.split("\n")[0].removeprefix("Topic: ")
+        with self.lock:
+            self.calls += 1
+            self.prompts[topic] = user_prompt
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(0.1)
+        with self.lock:
+            self.active -= 1
+        return f"## Core Idea\n{topic} core idea.\n## Explanation\nMore about {topic}.\n"
+
+
+def test_plan_parsing_and_levels():
+    """Test unknown prerequisites are dropped and cycles broken"""
+    graph = parse_plan('Here you go: {"topics": [{"topic": "A", "prerequisites": ["B", "Z"]},'
+                       ' {"topic": "B", "prerequisites": ["A"]}, {"topic": "C", "prerequisites": ["A"]}]}')
+    assert graph["A"] == ["B"]
+    depth = levels(graph)
+    assert depth == [["A"], ["B", "C"]]
+    with pytest.raises(ValueError):
+        parse_plan("no json here")
+
+
+def test_runs_by_level_in_parallel_with_prerequisite_context(make_buddy, tmp_path):
+    """Test independent subtopics overlap and dependents see prerequisite summaries"""
+    client = CurriculumClient()
+    buddy = make_buddy()
+    buddy.client = client
+    runner = CurriculumRunner(buddy, str(tmp_path / "run.jsonl"), workers=4)
+
+    start = time.perf_counter()
+    events = list(runner.run("cell biology", "high_school"))
+    elapsed = time.perf_counter() - start
+
+    assert events[0]["levels"] == [["Cells", "Water"], ["Membranes", "Organelles"], ["Osmosis"]]
+    nodes = [e for e in events if e["type"] == "node"]
+    order = [n["topic"] for n in nodes]
+    assert order.index("Cells") < order.index("Membranes") < order.index("Osmosis")
+    assert "- Membranes: Membranes core idea." in client.prompts["Osmosis"]
+    assert "- Water: Water core idea." in client.prompts["Osmosis"]
+    assert client.peak >= 2
+    assert elapsed < 0.45  # ~depth 3 x 0.1s, not 5 serial calls
+    assert events[-1]["generated"] == 5 and events[-1]["depth"] == 3
+
+    guide = render_markdown(events[0], {n["topic"]: n for n in nodes})
+    assert guide.index("## Cells") < guide.index("## Osmosis")
+    assert "### Core Idea" in guide
+
+
+def test_resume_and_cache_reuse(make_buddy, tmp_path):
+    """Test a re-run resumes finished nodes and regenerates nothing"""
+    output = tmp_path / "run.jsonl"
+    client = CurriculumClient()
+    buddy = make_buddy(cache=ExplanationCache())
+    buddy.client = client
+
+    events = CurriculumRunner(buddy, str(output)).run("cell biology", "high_school")
+    for event in events:
+        if event["type"] == "node":
+            break
+    events.close()
+    with open(output, "a") as f:
+        f.write('{"type": "node", "topic": "Tor')  # torn line from a crash
+
+    calls = client.calls
+    resumed = list(CurriculumRunner(buddy, str(output)).run("cell biology", "high_school"))
+    done = resumed[-1]
+    assert done["resumed"] >= 1
+    assert done["resumed"] + done["generated"] + done["cached"] == 5
+    assert client.calls - calls == done["generated"]
+
+    again = list(CurriculumRunner(buddy, None).run("cell biology", "high_school"))
+    assert again[-1]["cached"] == 5
+
+
+def test_context_shaped_text_is_keyed_apart(make_buddy, tmp_path):
+    """Test subtopics written with prerequisite context never answer plain requests"""
+    from src.prompts import explanation_key
+
+    client = CurriculumClient()
+    buddy = make_buddy(cache=ExplanationCache())
+    buddy.client = client
+    list(CurriculumRunner(buddy, None).run("cell biology", "high_school"))
+
+    assert explanation_key("Cells", "high_school") in buddy.cache  # no prerequisites, no context
+    assert explanation_key("Osmosis", "high_school") not in buddy.cache
+    calls = client.calls
+    buddy.explain("Osmosis", "high_school")
+    assert client.calls == calls + 1
+    assert "Membranes core idea" not in client.prompts["Osmosis"]
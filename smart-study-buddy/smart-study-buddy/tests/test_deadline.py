@@ -0,0 +1,125 @@
+"""
+Smart Study Buddy - Deadline and Cancellation Tests
+"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from src.ai_client import AIClient
+from src.deadline import Deadline, DeadlineExceeded, call_timeout
+from src.metrics import Metrics
+
+
+class FakeStream:
+    """OpenAI-style chunk stream that records whether it was closed"""
+
+    def __init__(self, words, delay=0.0):
+        self.words = words
+        self.delay = delay
+        self.closed = False
+
+    def __iter__(self):
+        for word in self.words:
+            time.sleep(self.delay)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=word))])
+
+    def close(self):
+        self.closed = True
+
+
+def _openai_client(monkeypatch, stream):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    client = AIClient(provider="openai")
+    calls = []
+
+    def create(**kwargs):
+        calls.append(kwargs)
+        return stream
+
+    client.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    return client, calls
+
+
+def test_deadline_budget():
+    """Test remaining budget, expiry and per-call timeouts"""
+    assert Deadline.after(None) is None
+    assert Deadline.after(0) is None
+    assert call_timeout(None, 120) == 120
+
+    deadline = Deadline(5)
+    assert 4 < deadline.remaining() <= 5
+    assert call_timeout(deadline, 2) == 2
+    assert 4 < call_timeout(deadline, 120) <= 5
+
+    expired = Deadline(0.01)
+    time.sleep(0.02)
+    assert expired.expired
+    with pytest.raises(DeadlineExceeded):
+        call_timeout(expired, 120)
+
+
+def test_stream_timeout_and_cancel_on_deadline(monkeypatch):
+    """Test the SDK call gets the remaining budget and the stream is closed once it passes"""
+    stream = FakeStream(["a ", "b ", "c ", "d "], delay=0.05)
+    client, calls = _openai_client(monkeypatch, stream)
+
+    received = []
+    with pytest.raises(DeadlineExceeded):
+        for chunk in client.stream_explanation("system", "user", deadline=Deadline(0.12)):
+            received.append(chunk)
+
+    assert calls[0]["timeout"] <= 0.12
+    assert 0 < len(received) < 4
+    assert stream.closed
+
+
+def test_buddy_counts_cancelled_streams(make_buddy, fake_client):
+    """Test closing a stream early is counted with an estimate of tokens saved"""
+    fake_client.text = " ".join(["word"] * 200)
+    fake_client.last_usage = {"input_tokens": 10, "output_tokens": 300}
+    metrics = Metrics()
+    buddy = make_buddy(metrics=metrics)
+
+    assert len(buddy.explain("gravity", "child")) == len(fake_client.text)
+
+    chunks = buddy.explain("magnets", "child", stream=True)
+    next(chunks)
+    chunks.close()
+
+    assert metrics.get("requests.cancelled.closed") == 1
+    assert metrics.get("tokens.saved") == 299
+    assert "explanation" not in buddy.conversation_history[-1]
+
+
+def test_async_cancel_closes_upstream(make_buddy, fake_client):
+    """Test cancelling the consumer (client disconnect) closes the provider stream"""
+    closed = []
+
+    async def slow_stream(system_prompt, user_prompt, **kwargs):
+        try:
+            for word in ["one ", "two ", "three "]:
+                await asyncio.sleep(0.05)
+                yield word
+        finally:
+            closed.append(True)
+
+    fake_client.astream_explanation = slow_stream
+    metrics = Metrics()
+    buddy = make_buddy(metrics=metrics)
+
+    async def consume():
+        return [chunk async for chunk in buddy.astream("tides", "child")]
+
+    async def main():
+        task = asyncio.ensure_future(consume())
+        await asyncio.sleep(0.07)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    assert closed == [True]
+    assert metrics.get("requests.cancelled.closed") == 1
@@ -0,0 +1,81 @@
+"""
+Smart Study Buddy - Derived Variant Tests
+"""
+
+from src.cache import ExplanationCache
+from src.derive import related_variants, describe_changes
+from src.metrics import Metrics
+from src.prompts import AUDIENCE_LEVELS, SYSTEM_PROMPT, DERIVE_SYSTEM_PROMPT, explanation_key
+from src.store import ExplanationStore
+from tests.conftest import FakeClient
+
+CHILD = AUDIENCE_LEVELS["child"]
+ELEMENTARY = AUDIENCE_LEVELS["elementary"]
+
+
+def test_related_variants_prefer_closest_longer_sources():
+    """Test candidates keep the audience first and never come from shorter variants"""
+    candidates = related_variants(CHILD, "playful", "short")
+    assert candidates[0] == (CHILD, "playful", None)
+    assert (CHILD, "playful", "short") not in candidates
+    assert related_variants(CHILD, None, "detailed")[0] == (CHILD, "playful", "detailed")
+    assert all(length == "detailed" for _, _, length in related_variants(CHILD, None, "detailed"))
+
+    changes = describe_changes((ELEMENTARY, None, "detailed"), (CHILD, "playful", "short"))
+    assert len(changes) == 3
+
+
+def test_cache_miss_derives_from_related_variant(make_buddy, fake_client):
+    """Test a missing variant is rewritten from a cached one by the derive model"""
+    derive = FakeClient(text="Short version.")
+    derive.model = "small-model"
+    prompts = []
+
+    def generate(system_prompt, user_prompt, **kwargs):
+        prompts.append((system_prompt, user_prompt, kwargs))
+        return derive.text
+
+    derive.generate_explanation = generate
+    metrics = Metrics()
+    buddy = make_buddy(
+        cache=ExplanationCache(), metrics=metrics,
+        derive_model="small-model", client_factory=lambda provider, model: derive
+    )
+
+    buddy.explain("gravity", "child", length="detailed")
+    assert fake_client.calls == 1
+
+    assert buddy.explain("Gravity", "child", length="short") == "Short version."
+    system_prompt, user_prompt, kwargs = prompts[0]
+    assert system_prompt == DERIVE_SYSTEM_PROMPT and len(system_prompt) < len(SYSTEM_PROMPT)
+    assert fake_client.text in user_prompt
+    assert kwargs["max_tokens"] < 2000
+    assert fake_client.calls == 1
+
+    entry = buddy.get_history()[-1]
+    assert entry["derived_from"] == explanation_key("gravity", "child", None, "detailed")
+    assert entry["model"] == "small-model"
+    assert buddy.cache.get(explanation_key("gravity", "child", None, "short"))["derived_from"]
+    assert metrics.get("generation.cold.requests") == 1
+    assert metrics.get("generation.derived.requests") == 1
+
+    # Rewrites are never used as sources themselves
+    buddy.explain("gravity", "child", tone="playful", length="short")
+    assert buddy.get_history()[-1]["derived_from"] == entry["derived_from"]
+    assert fake_client.text in prompts[1][1]
+
+
+def test_store_records_lineage(make_buddy, tmp_path):
+    """Test the store keeps the source key of derived explanations"""
+    store = ExplanationStore(str(tmp_path / "store.db"), flush_interval=0.01)
+    derive = FakeClient(text="Playful version.")
+    buddy = make_buddy(store=store, derive_model="small-model", client_factory=lambda provider, model: derive)
+
+    store.add({"topic": "gravity", "audience": CHILD, "explanation": "Things fall down."})
+    assert store.flush(timeout=5)
+
+    buddy.explain("gravity", "child", tone="playful")
+    assert store.flush(timeout=5)
+    record = store.get(explanation_key("gravity", "child", "playful"))
+    assert record["derived_from"] == explanation_key("gravity", "child")
+    store.close()
@@ -0,0 +1,93 @@
+"""
+Smart Study Buddy - Self-hosted Endpoint Tests (against local stand-in servers)
+"""
+
+import asyncio
+import socket
+
+import pytest
+
+from src.ai_client import AIClient
+from src.endpoints import EndpointPool
+from tests.openai_stub import StubServer
+
+
+@pytest.fixture
+def replicas():
+    servers = [StubServer(), StubServer()]
+    yield servers
+    for server in servers:
+        server.stop()
+
+
+def _dead_url():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return f"http://127.0.0.1:{sock.getsockname()[1]}/v1"
+
+
+@pytest.fixture
+def compat_client(monkeypatch, replicas):
+    monkeypatch.setenv("OPENAI_COMPATIBLE_ENDPOINTS", ",".join(s.base_url for s in replicas))
+    monkeypatch.setenv("OPENAI_COMPATIBLE_MODEL", "stub-model")
+    monkeypatch.setenv("OPENAI_COMPATIBLE_HEALTH_INTERVAL", "0")
+    client = AIClient(provider="openai_compatible")
+    yield client
+    client.pool.close()
+
+
+def test_generate_and_stream(compat_client, replicas):
+    """Test both call styles work against the stand-in and use the configured model"""
+    text = replicas[0].text
+    assert compat_client.generate_explanation("system", "user") == text
+    assert compat_client.last_usage["input_tokens"] == 10
+    assert "".join(compat_client.stream_explanation("system", "user")) == text
+
+    async def collect():
+        try:
+            return "".join([c async for c in compat_client.astream_explanation("system", "user")])
+        finally:
+            await compat_client.aclose()
+
+    assert asyncio.run(collect()) == text
+    assert all(r["model"] == "stub-model" for s in replicas for r in s.requests)
+    assert all(e.async_http.is_closed and e.http.is_closed for e in compat_client.pool.endpoints)
+
+
+def test_balances_and_keeps_connections_alive(compat_client, replicas):
+    """Test requests spread over replicas and reuse pooled connections"""
+    for _ in range(10):
+        compat_client.generate_explanation("system", "user")
+
+    assert [len(s.requests) for s in replicas] == [5, 5]
+    assert sum(s.connections for s in replicas) <= 2
+
+
+def test_failed_replica_leaves_rotation(replicas):
+    """Test health checks and connection failures steer traffic to live replicas"""
+    pool = EndpointPool([_dead_url(), replicas[0].base_url, replicas[1].base_url], health_interval=None)
+    replicas[1].healthy = False
+    pool.check_all()
+    assert [e.healthy for e in pool.endpoints] == [False, True, False]
+
+    for _ in range(4):
+        with pool.lease() as endpoint:
+            endpoint.client.chat.completions.create(
+                model="stub-model", messages=[{"role": "user", "content": "hi"}]
+            )
+    assert len(replicas[0].requests) == 4
+
+    pool.close()
+
+
+def test_connection_error_ejects_replica():
+    """Test a replica that refuses connections is taken out without waiting for a health check"""
+    pool = EndpointPool([_dead_url()], health_interval=None)
+    with pytest.raises(Exception):
+        with pool.lease() as endpoint:
+            endpoint.client.with_options(max_retries=0).chat.completions.create(
+                model="stub-model", messages=[{"role": "user", "content": "hi"}]
+            )
+    assert not pool.endpoints[0].healthy
+    assert pool.endpoints[0].in_flight == 0
+    pool.close()
@@ -0,0 +1,128 @@
+"""
+Smart Study Buddy - HTTP Caching Tests
+"""
+
+import pytest
+
+from src.cache import ExplanationCache
+from src.http_cache import canonical_query, etag_for, if_none_match, negotiate_encoding
+from src.prompts import PROMPT_VERSION
+
+api_server = pytest.importorskip("api_server")
+from fastapi.testclient import TestClient  # noqa: E402
+
+ANSWER = "## Core Idea\nGravity pulls things together.\n## Explanation\n" + "Mass attracts mass. " * 40
+
+
+@pytest.fixture
+def client(monkeypatch, make_buddy, fake_client):
+    fake_client.text = ANSWER
+    buddy = make_buddy(cache=ExplanationCache())
+    monkeypatch.setattr(api_server, "get_buddy", lambda provider="openai": buddy)
+    return TestClient(api_server.app)
+
+
+def test_negotiation_and_validators():
+    """Test Accept-Encoding q-values, strong ETags per coding and If-None-Match matching"""
+    assert negotiate_encoding("gzip, deflate") == "gzip"
+    assert negotiate_encoding("gzip;q=0, identity") is None
+    assert negotiate_encoding("*") in ("br", "gzip")
+    assert negotiate_encoding(None) is None
+
+    plain, zipped = etag_for(b"body"), etag_for(b"body", "gzip")
+    assert plain != zipped
+    assert if_none_match(f'"other", {zipped}', plain)
+    assert if_none_match(f"W/{plain}", zipped)
+    assert not if_none_match('"other"', plain)
+    assert if_none_match("*", plain)
+
+    assert canonical_query("  Black  Holes", "5-year-old child", None, "short", "openai", "m") == (
+        f"topic=Black+Holes&audience=child&length=short&provider=openai&model=m&v={PROMPT_VERSION}"
+    )
+
+
+def test_get_redirects_then_serves_compressed_with_etag(client, fake_client):
+    """Test a loose URL redirects to the canonical one, which compresses and answers 304s"""
+    response = client.get("/explanations", params={"topic": "Gravity", "audience": "child"},
+                          headers={"Accept-Encoding": "gzip"}, follow_redirects=False)
+    assert response.status_code == 307
+    url = response.headers["location"]
+    assert url == f"/explanations?topic=Gravity&audience=child&provider=openai&model=fake-model&v={PROMPT_VERSION}"
+
+    response = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"] and "X-API-Key" not in response.headers["vary"]
+    assert "public" in response.headers["cache-control"] and "s-maxage" in response.headers["cache-control"]
+    assert response.json()["explanation"] == ANSWER
+    etag = response.headers["etag"]
+
+    calls = fake_client.calls
+    response = client.get(url, headers={"If-None-Match": etag, "Accept-Encoding": "identity"})
+    assert response.status_code == 304 and response.content == b""
+    assert "content-encoding" not in response.headers
+    assert response.headers["x-explanation-source"] == "cached"
+    assert fake_client.calls == calls  # served from the explanation cache
+
+    response = client.get(url, headers={"Accept-Encoding": "identity"})
+    assert response.headers["etag"] != etag and "content-encoding" not in response.headers
+    assert response.json()["explanation"] == ANSWER
+
+
+def test_get_only_serves_the_urls_model(monkeypatch, make_buddy, fake_client):
+    """Test cached text from another model or prompt version is regenerated with the URL's model"""
+    from src.prompts import explanation_key
+
+    fake_client.text = ANSWER
+    buddy = make_buddy(cache=ExplanationCache())
+    buddy.cache.set(explanation_key("Gravity", "child"), {"explanation": "stale", "model": "other-model",
+                                                          "prompt_version": PROMPT_VERSION})
+    monkeypatch.setattr(api_server, "get_buddy", lambda provider="openai": buddy)
+    client = TestClient(api_server.app)
+    url = f"/explanations?topic=Gravity&audience=child&provider=openai&model=fake-model&v={PROMPT_VERSION}"
+
+    response = client.get(url)
+    assert response.json()["explanation"] == ANSWER
+    assert response.headers["x-explanation-source"] == "generated"
+    assert buddy.conversation_history[-1]["topic"] == "Gravity"  # prompted with the original casing
+    assert buddy.cache.get(explanation_key("gravity", "child"))["model"] == "fake-model"
+
+
+def test_get_is_private_when_keys_are_required(monkeypatch, client):
+    """Test responses that needed an API key are never marked cacheable by shared caches"""
+    from src.metrics import Metrics
+    from src.tenants import Tenant, TenantRegistry
+
+    monkeypatch.setattr(api_server, "tenants", TenantRegistry([Tenant("acme", api_keys=["k1"])], metrics=Metrics()))
+    url = f"/explanations?topic=Gravity&audience=child&provider=openai&model=fake-model&v={PROMPT_VERSION}"
+    response = client.get(url, headers={"X-API-Key": "k1"})
+    assert response.status_code == 200
+    assert response.headers["cache-control"].startswith("private") and "s-maxage" not in response.headers["cache-control"]
+    assert "X-API-Key" in response.headers["vary"] and "Authorization" in response.headers["vary"]
+
+
+def test_get_serves_bundles_built_from_batch_output(monkeypatch, tmp_path, make_buddy, fake_client):
+    """Test batch output compiled into a bundle is served without an upstream call"""
+    import json
+
+    from src.batch import BatchRunner
+    from src.bundle import ExplanationBundle, build_bundle
+
+    fake_client.text = ANSWER
+    output = tmp_path / "out.jsonl"
+    BatchRunner(make_buddy(max_history=1), str(output)).run(
+        iter([{"topic": "Gravity", "audience": "child", "tone": None, "length": None}])
+    )
+    path = str(tmp_path / "out.ssb")
+    build_bundle((json.loads(line) for line in output.read_text().splitlines()), path)
+
+    buddy = make_buddy(cache=ExplanationCache())
+    monkeypatch.setattr(api_server, "get_buddy", lambda provider="openai": buddy)
+    with ExplanationBundle(path) as bundle:
+        monkeypatch.setattr(api_server, "bundle", bundle)
+        calls = fake_client.calls
+        url = f"/explanations?topic=Gravity&audience=child&provider=openai&model=fake-model&v={PROMPT_VERSION}"
+        response = TestClient(api_server.app).get(url)
+    assert response.headers["x-explanation-source"] == "bundle"
+    assert response.json()["explanation"] == ANSWER
+    assert fake_client.calls == calls
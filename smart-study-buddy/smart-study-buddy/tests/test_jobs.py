@@ -0,0 +1,108 @@
+"""
+Smart Study Buddy - Batch Job Tests
+"""
+
+import sqlite3
+import time
+import pytest
+from src.jobs import JobManager
+
+
+def _wait_for(manager, job_id, status, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = manager.get(job_id)
+        if job["status"] == status:
+            return job
+        time.sleep(0.02)
+    pytest.fail(f"job stayed {manager.get(job_id)['status']}")
+
+
+def test_job_runs_in_background(tmp_path, make_buddy):
+    """Test submit, progress and results"""
+    buddy = make_buddy()
+    manager = JobManager(lambda provider: buddy, path=str(tmp_path / "jobs.db"), workers=2, poll_interval=0.05)
+    job_id = manager.submit(["gravity", "DNA", "atoms"], audience="child")
+
+    job = _wait_for(manager, job_id, "completed")
+    assert job["counts"]["done"] == 3
+    results = manager.results(job_id)
+    assert [r["topic"] for r in results] == ["gravity", "DNA", "atoms"]
+    assert results[0]["explanation"].strip() == buddy.client.text
+    manager.shutdown()
+
+
+def test_cancel_stops_remaining_items(tmp_path, make_buddy, fake_client):
+    """Test that cancelling skips pending items"""
+    original = fake_client.stream_explanation
+
+    def slow_stream(*args, **kwargs):
+        for chunk in original(*args, **kwargs):
+            time.sleep(0.02)
+            yield chunk
+
+    fake_client.stream_explanation = slow_stream
+    buddy = make_buddy()
+    manager = JobManager(lambda provider: buddy, path=str(tmp_path / "jobs.db"), workers=1, poll_interval=0.05)
+    job_id = manager.submit([f"topic {i}" for i in range(20)], audience="child")
+    time.sleep(0.1)
+    assert manager.cancel(job_id)
+
+    job = _wait_for(manager, job_id, "cancelled")
+    manager.shutdown()
+    job = manager.get(job_id)
+    assert job["counts"]["cancelled"] >= 18
+    assert fake_client.calls < 3
+
+
+def test_jobs_resume_after_restart(tmp_path, make_buddy):
+    """Test that items claimed by a dead process are picked up again"""
+    path = str(tmp_path / "jobs.db")
+    buddy = make_buddy()
+    first = JobManager(lambda provider: buddy, path=path, workers=0)
+    job_id = first.submit(["gravity", "DNA"], audience="child")
+
+    # Simulate a crash mid-item: claimed by a pid that no longer exists
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute(
+            "UPDATE job_items SET status = 'running', owner = ?, claimed_at = ? WHERE idx = 0",
+            (first.owner.rsplit(":", 1)[0] + ":999999999", time.time())
+        )
+
+    second = JobManager(lambda provider: buddy, path=path, workers=1, poll_interval=0.05)
+    assert _wait_for(second, job_id, "completed")["counts"]["done"] == 2
+    second.shutdown()
+
+
+def test_slot_wait_rechecks_cancel_and_lease(tmp_path, make_buddy, fake_client):
+    """Test an item that waited for a batch slot neither runs after cancel nor runs twice after its lease expired"""
+    from src.admission import AdmissionController
+
+    admission = AdmissionController(max_in_flight=1)
+    admission.acquire_sync()  # capacity is taken: workers block in slot_sync
+    buddy = make_buddy()
+    manager = JobManager(lambda provider: buddy, path=str(tmp_path / "jobs.db"), workers=1,
+                         poll_interval=0.05, admission=admission)
+    job_id = manager.submit(["gravity"], audience="child")
+    time.sleep(0.2)
+    assert manager.cancel(job_id)
+    admission.release()
+    deadline = time.monotonic() + 5
+    while manager.get(job_id)["counts"].get("cancelled") != 1 and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert manager.get(job_id)["counts"]["cancelled"] == 1
+    assert fake_client.calls == 0
+
+    admission.acquire_sync()
+    job_id = manager.submit(["tides"], audience="child")
+    time.sleep(0.2)
+    # The lease ran out and another process took the item over
+    conn = sqlite3.connect(str(tmp_path / "jobs.db"))
+    with conn:
+        conn.execute("UPDATE job_items SET owner = 'other:1', claimed_at = ? WHERE job_id = ?", (time.time(), job_id))
+    admission.release()
+    time.sleep(0.2)
+    manager.shutdown()
+    assert fake_client.calls == 0
+    assert manager.get(job_id)["counts"]["running"] == 1
@@ -0,0 +1,81 @@
+"""
+Smart Study Buddy - Structured Logging Tests
+"""
+
+import io
+import json
+import logging
+
+import pytest
+
+from src import logs
+from src.cache import ExplanationCache
+
+
+@pytest.fixture
+def log_stream():
+    """Capture the package's JSON events, restoring the logger afterwards"""
+    logger = logging.getLogger(logs.LOGGER_NAME)
+    handlers, level, propagate = list(logger.handlers), logger.level, logger.propagate
+    stream = io.StringIO()
+    listener = logs.configure_logging("INFO", stream=stream, sample_rates={"explanation.cached": 0.0})
+
+    def events():
+        listener.stop()  # drains the queue
+        listener.start()
+        return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+    yield events
+    listener.stop()
+    logs._listener = None
+    logs._sample_rates.clear()
+    logger.handlers, logger.level, logger.propagate = handlers, level, propagate
+
+
+def test_generation_events_are_json_with_request_id(log_stream, make_buddy):
+    """Test a generation logs provider, model, latency and tokens under the request id"""
+    buddy = make_buddy(cache=ExplanationCache())
+    token = logs.request_id_var.set("req-1")
+    try:
+        buddy.explain("gravity", "child")
+        buddy.explain("gravity", "child")  # cached; sampled out entirely
+        buddy.clear_history()  # debug, below the configured level
+    finally:
+        logs.request_id_var.reset(token)
+
+    events = [e for e in log_stream() if e["event"] != "client.initialized"]
+    assert [e["event"] for e in events] == ["explanation.generated"]
+    event = events[0]
+    assert event["request_id"] == "req-1"
+    assert event["provider"] == buddy.client.provider
+    assert event["output_tokens"] > 0 and event["latency_ms"] >= 0
+    assert "tier" not in event  # unset fields are omitted
+
+
+@pytest.fixture
+def api_server():
+    # Imported before log_stream, since the server configures logging on import
+    return pytest.importorskip("api_server")
+
+
+def test_api_requests_carry_request_id(api_server, log_stream, monkeypatch, make_buddy):
+    """Test the API echoes X-Request-Id and logs it on the request event"""
+    from fastapi.testclient import TestClient
+
+    buddy = make_buddy()
+    monkeypatch.setattr(api_server, "get_buddy", lambda provider="openai": buddy)
+    client = TestClient(api_server.app)
+    response = client.post("/explain", json={"topic": "DNA"}, headers={"X-Request-Id": "abc"})
+    assert response.headers["x-request-id"] == "abc"
+
+    events = {e["event"]: e for e in log_stream()}
+    assert events["request"]["request_id"] == "abc"
+    assert events["request"]["status"] == 200
+    assert events["explanation.generated"]["request_id"] == "abc"
+
+
+def test_parse_sample_rates():
+    assert logs.parse_sample_rates("request=0.5, explanation.cached=0.1") == {
+        "request": 0.5, "explanation.cached": 0.1
+    }
+    assert logs.parse_sample_rates(None) == {}
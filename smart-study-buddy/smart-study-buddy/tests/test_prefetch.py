@@ -0,0 +1,97 @@
+"""
+Smart Study Buddy - Speculative Prefetch Tests
+"""
+
+from src.admission import AdmissionController
+from src.cache import ExplanationCache
+from src.metrics import Metrics
+from src.prefetch import Prefetcher, transition, apply_transition
+from src.prompts import AUDIENCE_LEVELS
+
+CHILD = AUDIENCE_LEVELS["child"]
+ELEMENTARY = AUDIENCE_LEVELS["elementary"]
+EXPERT = AUDIENCE_LEVELS["expert"]
+
+
+def test_transitions():
+    """Test single changes are named and can be replayed"""
+    assert transition((CHILD, None, None), (ELEMENTARY, None, None)) == "level_up"
+    assert transition((ELEMENTARY, None, None), (CHILD, None, None)) == "level_down"
+    assert transition((CHILD, None, None), (CHILD, None, "short")) == "length:short"
+    assert transition((CHILD, None, None), (ELEMENTARY, None, "short")) is None
+    assert apply_transition("level_up", (CHILD, "playful", None)) == (ELEMENTARY, "playful", None)
+    assert apply_transition("level_up", (EXPERT, None, None)) is None
+    assert apply_transition("length:short", (CHILD, None, "short")) is None
+
+
+def test_learns_from_observed_requests():
+    """Test observed transitions outweigh the priors"""
+    prefetcher = Prefetcher(lambda *args: 0, max_candidates=1)
+    assert prefetcher.predict((ELEMENTARY, None, None))[0][0][0] in (CHILD, AUDIENCE_LEVELS["middle_school"])
+
+    for topic in ("gravity", "magnets", "tides", "volcanoes", "rain"):
+        prefetcher.observe(topic, (ELEMENTARY, None, None))
+        prefetcher.observe(topic, (ELEMENTARY, None, "detailed"))
+    [(target, probability)] = prefetcher.predict((ELEMENTARY, None, None))
+    assert target == (ELEMENTARY, None, "detailed")
+    assert probability > 0.4
+
+
+def test_prefetched_variant_is_served_from_cache(make_buddy, fake_client):
+    """Test follow-ups are generated in the background and hits are counted once"""
+    metrics = Metrics()
+    buddy = make_buddy(cache=ExplanationCache(), metrics=metrics)
+    prefetcher = buddy.enable_prefetch()
+
+    buddy.explain("gravity", "child")
+    assert prefetcher.drain()
+    assert fake_client.calls == 1 + prefetcher.max_candidates
+    assert len(buddy.get_history()) == 1
+
+    buddy.explain("gravity", "elementary")
+    buddy.explain("gravity", "elementary")
+    assert prefetcher.drain()
+    stats = prefetcher.stats()
+    assert stats["hits"] == 1
+    assert stats["generated"] >= 2
+    assert 0 < stats["hit_rate"] <= 1
+
+
+def test_budget_and_busy_capacity_stop_prefetching(make_buddy, fake_client):
+    """Test the spend budget and a busy admission controller both skip prefetches"""
+    buddy = make_buddy(cache=ExplanationCache(), metrics=Metrics())
+    prefetcher = buddy.enable_prefetch(tokens_per_hour=1)
+    buddy.explain("gravity", "child")
+    assert prefetcher.drain()
+    assert prefetcher.stats()["generated"] == 1
+    assert prefetcher.stats()["skipped_budget"] == 1
+
+    admission = AdmissionController(max_in_flight=2)
+    admission.acquire_sync()
+    admission.acquire_sync()
+    busy = make_buddy(cache=ExplanationCache(), metrics=Metrics())
+    prefetcher = busy.enable_prefetch(admission=admission)
+    busy.explain("tides", "child")
+    assert prefetcher.drain()
+    assert prefetcher.stats()["generated"] == 0
+    assert prefetcher.stats()["skipped_busy"] == 2
+
+
+def test_worker_survives_shared_state_errors():
+    """Test an error outside generation (e.g. a shared-state read) is counted and the worker keeps going"""
+    generated = []
+    prefetcher = Prefetcher(lambda topic, *variant: generated.append(topic) or 10, max_candidates=1)
+    predict = prefetcher.predict
+    failures = iter([OSError("database is locked")])
+
+    def flaky_predict(variant):
+        for error in failures:
+            raise error
+        return predict(variant)
+
+    prefetcher.predict = flaky_predict
+    prefetcher.schedule("gravity", (CHILD, None, None))
+    prefetcher.schedule("tides", (CHILD, None, None))
+    assert prefetcher.drain()
+    assert generated == ["tides"]
+    assert prefetcher.stats()["errors"] == 1
@@ -0,0 +1,66 @@
+"""
+Smart Study Buddy - Profiling Tests
+"""
+
+import pytest
+
+from src.profiling import Profiler, ProfilingMiddleware
+from src.prompts import create_user_prompt
+
+
+def test_capture_writes_profile_and_index(tmp_path):
+    """Test a capture records hot-path timings and allocation sites"""
+    profiler = Profiler(str(tmp_path), max_profiles=2)
+    for _ in range(3):
+        with profiler.capture("unit") as profile_id:
+            prompts = [create_user_prompt(f"topic {i}", "child") for i in range(200)]
+    assert len(prompts) == 200
+
+    index = profiler.index()
+    assert len(index) == 2  # oldest pruned
+    assert index[0]["id"] == profile_id
+    entry = profiler.get(profile_id)
+    assert any("create_user_prompt" in name for name in entry["hot_path"])
+    assert entry["top_allocations"] and entry["cpu_ms"] >= 0
+    assert entry["scope"] == "thread"
+    assert profiler.path(profile_id).endswith(".prof")
+    assert profiler.path("../" + profile_id) is None
+
+
+def test_only_one_capture_at_a_time(tmp_path):
+    """Test a capture started during another one is skipped"""
+    profiler = Profiler(str(tmp_path))
+    with profiler.capture("outer") as outer:
+        with profiler.capture("inner") as inner:
+            pass
+    assert outer is not None and inner is None
+    assert not profiler.wanted()
+
+
+def test_profiled_api_request(monkeypatch, make_buddy, tmp_path):
+    """Test X-Profile requests are captured and listed by the index endpoint"""
+    api_server = pytest.importorskip("api_server")
+    from fastapi.testclient import TestClient
+
+    buddy = make_buddy()
+    profiler = Profiler(str(tmp_path))
+    monkeypatch.setattr(api_server, "get_buddy", lambda provider="openai": buddy)
+    monkeypatch.setattr(api_server, "profiler", profiler)
+    client = TestClient(ProfilingMiddleware(api_server.app, profiler))
+
+    plain = client.post("/explain", json={"topic": "gravity", "audience": "child"})
+    assert "x-profile-id" not in plain.headers
+
+    response = client.post(
+        "/explain", json={"topic": "gravity", "audience": "child", "stream": True}, headers={"X-Profile": "1"}
+    )
+    profile_id = response.headers["x-profile-id"]
+    assert "event: done" in response.text
+
+    listed = client.get("/profiles").json()["profiles"]
+    assert [p["id"] for p in listed] == [profile_id]
+    assert listed[0]["label"] == "POST /explain"
+    assert listed[0]["scope"] == "event loop" and listed[0]["overlapping_requests"] == 0
+    assert client.get(f"/profiles/{profile_id}").json()["top_functions"]
+    assert client.get(f"/profiles/{profile_id}/download").status_code == 200
+    assert client.get("/profiles/missing").status_code == 404
@@ -0,0 +1,49 @@
+"""
+Smart Study Buddy - Section Streaming Tests
+"""
+
+from src.sections import SectionParser, stream_sections, render_sections
+
+TEXT = (
+    "Sure!\n"
+    "## Core Idea\nGravity pulls things together.\n\n"
+    "## Explanation\nMass bends *space*.\n"
+    "**Example:**\nAn apple falls.\n"
+    "## Deeper Insight\nGeneral relativity.\n"
+)
+
+
+def _split(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def test_parser_emits_sections_for_any_chunking():
+    """Test section boundaries regardless of how the text is chunked"""
+    for size in (1, 3, 7, len(TEXT)):
+        parser = SectionParser()
+        events = [e for chunk in _split(TEXT, size) for e in parser.feed(chunk)] + parser.close()
+
+        starts = [e["section"] for e in events if e["type"] == "section_start"]
+        assert starts == ["preamble", "core_idea", "explanation", "example", "deeper_insight"]
+        core = "".join(e["text"] for e in events if e["type"] == "delta" and e["section"] == "core_idea")
+        assert core.strip() == "Gravity pulls things together."
+        assert render_sections(events) == TEXT
+
+
+def test_max_sections_closes_upstream():
+    """Test that stopping after the core idea closes the source stream"""
+    state = {"sent": 0, "closed": False}
+
+    def upstream():
+        try:
+            for chunk in _split(TEXT, 4):
+                state["sent"] += 1
+                yield chunk
+        finally:
+            state["closed"] = True
+
+    events = list(stream_sections(upstream(), max_sections=1))
+
+    assert events[-1] == {"type": "section_end", "section": "core_idea"}
+    assert state["closed"]
+    assert state["sent"] < len(_split(TEXT, 4))
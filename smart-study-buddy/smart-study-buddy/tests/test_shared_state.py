@@ -0,0 +1,80 @@
+"""
+Smart Study Buddy - Shared State Tests
+"""
+
+import time
+
+import pytest
+
+from src.shared_state import SharedState, SQLiteSharedState
+from src.metrics import Metrics
+from src.cache import SharedExplanationCache
+from src.prompts import explanation_key
+
+
+def test_kv_roundtrip_and_ttl(tmp_path):
+    """Test values are shared between handles and expire"""
+    path = str(tmp_path / "state.db")
+    a, b = SQLiteSharedState(path), SQLiteSharedState(path)
+
+    a.set("greeting", {"text": "hello"})
+    a.set("short", 1, ttl=0.05)
+    assert b.get("greeting") == {"text": "hello"}
+    assert b.get("short") == 1
+    time.sleep(0.1)
+    assert b.get("short") is None
+    assert b.get("missing") is None
+
+
+def test_counters_and_buckets(tmp_path):
+    """Test atomic counters and the shared token bucket"""
+    path = str(tmp_path / "state.db")
+    a, b = SQLiteSharedState(path), SQLiteSharedState(path)
+
+    a.incr("requests.explain")
+    assert b.incr("requests.explain", 2) == 3
+    assert a.counters("requests.") == {"requests.explain": 3}
+    assert a.counters("requests_") == {}
+
+    assert a.take("rl:client", rate=60, per=60, burst=2) == 0
+    assert b.take("rl:client", rate=60, per=60, burst=2) == 0
+    wait = a.take("rl:client", rate=60, per=60, burst=2)
+    assert 0 < wait <= 1.0
+
+
+def test_metrics_flush(tmp_path):
+    """Test buffered increments reach shared state on flush"""
+    state = SQLiteSharedState(str(tmp_path / "state.db"))
+    metrics = Metrics(state, flush_interval=60)
+
+    metrics.incr("cache.hits")
+    metrics.incr("cache.hits")
+    assert state.counters() == {}
+    assert metrics.get("cache.hits") == 2
+
+    metrics.flush()
+    assert state.counters() == {"cache.hits": 2}
+    assert metrics.get("cache.hits") == 2
+
+
+def test_shared_cache_hit_across_processes(tmp_path):
+    """Test an entry set by one worker's cache is a hit in another's"""
+    path = str(tmp_path / "state.db")
+    first = SharedExplanationCache(SQLiteSharedState(path))
+    second = SharedExplanationCache(SQLiteSharedState(path))
+    key = explanation_key("Gravity", "child")
+
+    assert second.get(key) is None
+    first.set(key, {"explanation": "Things fall down."})
+    assert second.get(key) == {"explanation": "Things fall down."}
+    assert key in second.local
+
+
+def test_incomplete_backend_fails_at_construction():
+    """Test a backend missing part of the interface cannot be instantiated"""
+    class Partial(SharedState):
+        def get(self, key):
+            return None
+
+    with pytest.raises(TypeError):
+        Partial()
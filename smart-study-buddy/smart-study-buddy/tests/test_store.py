@@ -0,0 +1,65 @@
+"""
+Smart Study Buddy - Explanation Store Tests
+"""
+
+from src.store import ExplanationStore
+from src.prompts import explanation_key
+
+
+def test_store_search_ranks_topic_matches(tmp_path):
+    """Test that stored explanations are searchable once flushed"""
+    store = ExplanationStore(str(tmp_path / "store.db"), flush_interval=0.01)
+    store.add({
+        "topic": "photosynthesis",
+        "audience": "5-year-old child",
+        "explanation": "Plants eat sunlight to make food.",
+        "model": "gpt-4o",
+        "output_tokens": 12
+    })
+    store.add({
+        "topic": "the water cycle",
+        "audience": "beginner adult with no prior knowledge",
+        "explanation": "Water evaporates; photosynthesis also needs water."
+    })
+    assert store.flush(timeout=5)
+
+    results = store.search("photosynthesis")
+    assert [r["topic"] for r in results] == ["photosynthesis", "the water cycle"]
+    assert results[0]["output_tokens"] == 12
+
+    assert [r["topic"] for r in store.search("photosynthesis", audience="child")] == ["photosynthesis"]
+    assert store.search('"unbalanced OR') == []
+    assert store.get(explanation_key("Photosynthesis", "child"))["model"] == "gpt-4o"
+    store.close()
+
+
+def test_store_persists_across_reopen(tmp_path):
+    """Test that close() commits queued records"""
+    path = str(tmp_path / "store.db")
+    store = ExplanationStore(path, flush_interval=5)
+    store.add({"topic": "gravity", "audience": "expert", "explanation": "Curvature of spacetime."})
+    store.close()
+
+    reopened = ExplanationStore(path)
+    assert reopened.search("spacetime")[0]["topic"] == "gravity"
+    reopened.close()
+
+
+def test_writer_survives_bad_rows(tmp_path):
+    """Test a failing row is dropped and counted while the rest of its batch and later batches commit"""
+    from src.metrics import Metrics
+
+    metrics = Metrics()
+    store = ExplanationStore(str(tmp_path / "store.db"), flush_interval=0.01, metrics=metrics)
+    store.add({"topic": "gravity", "audience": "expert", "explanation": "Curvature of spacetime."})
+    store.add({"topic": "broken", "audience": "expert", "explanation": None})  # violates NOT NULL
+    assert store.flush(timeout=5)
+
+    store.add({"topic": "tides", "audience": "expert", "explanation": "The moon pulls the oceans."})
+    assert store.flush(timeout=5)
+    assert store._writer.is_alive()
+    assert store.get(explanation_key("gravity", "expert")) is not None
+    assert store.get(explanation_key("tides", "expert")) is not None
+    assert store.get(explanation_key("broken", "expert")) is None
+    assert metrics.get("store.write_errors") == 1 and metrics.get("store.rows_dropped") == 1
+    store.close()
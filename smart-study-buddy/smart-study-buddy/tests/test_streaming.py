@@ -0,0 +1,38 @@
+"""
+Smart Study Buddy - Streaming Pipeline Tests
+"""
+
+import asyncio
+from src.streaming import coalesce, acoalesce, StreamStats
+
+
+def test_coalesce_by_bytes():
+    """Test that deltas merge into frames and reassemble exactly"""
+    deltas = ["ab"] * 10
+    stats = StreamStats()
+    frames = list(coalesce(deltas, max_latency=60, max_bytes=6, stats=stats))
+
+    assert "".join(frames) == "ab" * 10
+    assert frames[0] == "ab"  # first delta is flushed immediately
+    assert frames[1] == "ababab"
+    assert stats.summary()["deltas"] == 10
+    assert stats.summary()["frames"] == len(frames)
+
+
+def test_acoalesce_flushes_on_timer():
+    """Test that a stalled provider does not hold back buffered text"""
+    async def deltas():
+        yield "first "
+        yield "second "
+        await asyncio.sleep(0.2)
+        yield "third"
+
+    async def run():
+        seen = []
+        async for frame in acoalesce(deltas(), max_latency=0.02, max_bytes=None):
+            seen.append((frame, asyncio.get_running_loop().time()))
+        return seen
+
+    frames = asyncio.run(run())
+    assert [f for f, _ in frames] == ["first ", "second ", "third"]
+    assert frames[2][1] - frames[1][1] > 0.1
@@ -0,0 +1,70 @@
+"""
+Smart Study Buddy - Tenant Tests
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from src.admission import AdmissionController
+from src.metrics import Metrics
+from src.shared_state import SQLiteSharedState
+from src.tenants import Tenant, TenantRegistry, QuotaExceeded, PUBLIC
+
+
+def test_anonymous_mode_and_key_lookup(tmp_path):
+    """Test keys are only required once tenants are configured"""
+    assert TenantRegistry().resolve(None).name == PUBLIC
+
+    path = tmp_path / "tenants.json"
+    path.write_text(json.dumps({"tenants": {"acme": {"api_keys": ["k1"], "weight": 3}}}))
+    registry = TenantRegistry.from_file(str(path))
+    assert registry.resolve("k1").weight == 3
+    assert registry.resolve("nope") is None
+    assert registry.resolve(None) is None
+
+
+def test_request_and_token_quotas(tmp_path):
+    """Test request-rate and daily token quotas"""
+    state = SQLiteSharedState(str(tmp_path / "state.db"))
+    tenant = Tenant("acme", requests_per_minute=2, tokens_per_day=100)
+    registry = TenantRegistry([tenant], state=state, metrics=Metrics(state))
+
+    registry.check(tenant)
+    registry.check(tenant)
+    with pytest.raises(QuotaExceeded):
+        registry.check(tenant)
+
+    other = Tenant("globex", tokens_per_day=100)
+    registry.record(other, requests=1, output_tokens=150)
+    with pytest.raises(QuotaExceeded) as raised:
+        registry.check(other)
+    assert raised.value.retry_after <= 86400
+
+    usage = registry.usage(other)
+    assert usage["requests"] == 1
+    assert usage["tokens_today"] == 150
+    assert usage["tokens_remaining_today"] == 0
+
+
+def test_fair_queueing_between_tenants():
+    """Test a light tenant is not stuck behind a heavy tenant's backlog"""
+    admission = AdmissionController(max_in_flight=1, slo=60, initial_service_time=0.01)
+    order = []
+
+    async def request(tenant):
+        async with admission.slot("batch", tenant=tenant):
+            order.append(tenant)
+
+    async def main():
+        held = await admission.hold("batch", tenant="heavy")
+        backlog = [asyncio.ensure_future(request("heavy")) for _ in range(5)]
+        await asyncio.sleep(0.01)
+        light = asyncio.ensure_future(request("light"))
+        await asyncio.sleep(0.01)
+        held.release()
+        await asyncio.gather(light, *backlog)
+
+    asyncio.run(main())
+    assert order.index("light") <= 1
@@ -0,0 +1,97 @@
+"""
+Smart Study Buddy - Model Tiering Tests
+"""
+
+import pytest
+
+from src.tiering import TieringPolicy, load_shadow_log, shadow_report
+from tests.conftest import FakeClient
+
+POLICY = {
+    "tiers": {
+        "small": {"provider": "openai", "model": "small-model", "max_tokens": 400,
+                  "cost_per_1k_input": 0.1, "cost_per_1k_output": 0.4},
+        "large": {"provider": "openai", "model": "large-model", "max_tokens": 2000,
+                  "daily_token_budget": 50, "fallback": "small",
+                  "cost_per_1k_input": 1.0, "cost_per_1k_output": 4.0}
+    },
+    "rules": [
+        {"when": {"audience": ["child"], "length": ["short", None]}, "tier": "small"},
+        {"when": {"topic": "(?i)quantum"}, "tier": "large"},
+        {"when": {"audience": ["expert"]}, "tier": "large"}
+    ],
+    "default": "small"
+}
+
+
+def test_rules_match_in_order():
+    """Test audience shorthand or description, unset fields and topic patterns"""
+    policy = TieringPolicy(**POLICY)
+    assert policy.route("gravity", "child").name == "small"
+    assert policy.route("quantum tunnelling", "child", length="short").name == "small"
+    assert policy.route("quantum tunnelling", "child", length="detailed").name == "large"
+    assert policy.route("gravity", "expert in the field").name == "large"
+    assert policy.route("gravity", "beginner").name == "small"
+
+    with pytest.raises(ValueError):
+        TieringPolicy(tiers=POLICY["tiers"], default="missing")
+
+
+def test_daily_budget_overflows_to_fallback():
+    """Test a tier that spent its daily budget routes to its fallback"""
+    policy = TieringPolicy(**POLICY)
+    policy.record("large", 60)
+    assert policy.route("gravity", "expert").name == "small"
+
+
+def test_buddy_routes_and_caps_tokens(make_buddy, tmp_path):
+    """Test the buddy uses the routed tier's client, model and max_tokens"""
+    clients = {}
+
+    class RecordingClient(FakeClient):
+        def generate_explanation(self, system_prompt, user_prompt, **kwargs):
+            self.kwargs = kwargs
+            return super().generate_explanation(system_prompt, user_prompt, **kwargs)
+
+    def factory(provider, model):
+        client = clients[model] = RecordingClient()
+        client.model = model
+        return client
+
+    buddy = make_buddy(policy=TieringPolicy(**POLICY), client_factory=factory)
+    buddy.explain("gravity", "expert")
+    buddy.explain("photosynthesis", "child")
+
+    assert clients["large-model"].kwargs["max_tokens"] == 2000
+    assert clients["small-model"].kwargs["max_tokens"] == 400
+    assert [(e["tier"], e["model"]) for e in buddy.get_history()] == [
+        ("large", "large-model"), ("small", "small-model")
+    ]
+    assert buddy.policy.used_today("large") == 20
+
+
+def test_shadow_tests_sampled_requests(make_buddy, tmp_path):
+    """Test sampled requests are replayed on the shadow tier and reported"""
+    log = tmp_path / "shadow.jsonl"
+    policy = TieringPolicy(**POLICY, shadow={"tier": "large", "sample": 1.0, "log": str(log)})
+
+    def factory(provider, model):
+        client = FakeClient()
+        client.model = model
+        return client
+
+    buddy = make_buddy(policy=policy, client_factory=factory)
+    assert buddy.explain("gravity", "child") == FakeClient().text
+    "".join(buddy.explain("magnets", "child", stream=True))
+    buddy.explain("relativity", "expert")  # already on the shadow tier
+    buddy._shadow_executor.shutdown(wait=True)
+
+    records = load_shadow_log(str(log))
+    assert len(records) == 2
+    assert records[0]["primary"]["model"] == "small-model"
+    assert records[0]["shadow"]["model"] == "large-model"
+
+    [row] = shadow_report(records)
+    assert (row["primary"], row["shadow"], row["samples"]) == ("small", "large", 2)
+    assert row["cost_ratio"] > 1
+    assert buddy.shadow_report()[0]["samples"] == 2
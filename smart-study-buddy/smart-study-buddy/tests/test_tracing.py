@@ -0,0 +1,127 @@
+"""
+Smart Study Buddy - Tracing Tests
+"""
+
+import asyncio
+import json
+import threading
+
+import pytest
+
+from src import tracing
+from src.cache import ExplanationCache
+
+api_server = pytest.importorskip("api_server")
+from fastapi.testclient import TestClient  # noqa: E402
+
+CALLER = "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"
+
+
+@pytest.fixture
+def trace_file(monkeypatch, tmp_path):
+    """Tracing configured for one test, then switched back off"""
+    monkeypatch.setattr(tracing, "_exporter", None)
+    monkeypatch.setattr(tracing, "_sample_rate", 0.0)
+    path = tmp_path / "traces.jsonl"
+
+    def configure(sample_rate=1.0):
+        return tracing.configure_tracing(str(path), sample_rate=sample_rate)
+
+    yield path, configure
+    if tracing._exporter is not None:
+        tracing._exporter.close()
+
+
+def _spans(path):
+    spans = []
+    for line in path.read_text().splitlines():
+        for resource in json.loads(line)["resourceSpans"]:
+            for scope in resource["scopeSpans"]:
+                spans.extend(scope["spans"])
+    return {s["name"]: s for s in spans}
+
+
+def test_context_follows_tasks_and_threads(trace_file):
+    """Test child spans find their parent across asyncio tasks and wrapped threads"""
+    path, configure = trace_file
+    exporter = configure()
+
+    async def task_work():
+        with tracing.span("in.task"):
+            await asyncio.sleep(0)
+
+    def thread_work():
+        with tracing.span("in.thread"):
+            pass
+
+    def stream():
+        tracing.add_event("upstream.connected")
+        yield from ["a", "b"]
+
+    with tracing.start_trace("root", traceparent=CALLER) as root:
+        asyncio.run(task_work())
+        thread = threading.Thread(target=tracing.in_context(thread_work))
+        thread.start()
+        thread.join()
+        assert list(tracing.traced_iter("stream", stream())) == ["a", "b"]
+        with pytest.raises(ValueError):
+            with tracing.span("failing"):
+                raise ValueError("boom")
+    exporter.flush()
+
+    spans = _spans(path)
+    assert spans["root"]["traceId"] == root.trace_id == "0af7651916cd43dd8448eb211c80319c"
+    assert spans["root"]["parentSpanId"] == "b7ad6b7169203331"
+    for name in ("in.task", "in.thread", "stream", "failing"):
+        assert spans[name]["parentSpanId"] == root.span_id
+    assert [e["name"] for e in spans["stream"]["events"]] == ["upstream.connected", "first_token"]
+    assert spans["failing"]["status"]["code"] == 2
+    assert spans["stream"]["kind"] == tracing.INTERNAL
+
+
+def test_explain_request_is_traced_end_to_end(trace_file, monkeypatch, make_buddy):
+    """Test /explain continues the caller's trace, returns it and records its stages"""
+    path, configure = trace_file
+    exporter = configure(sample_rate=0.0)
+    buddy = make_buddy(cache=ExplanationCache())
+    monkeypatch.setattr(api_server, "get_buddy", lambda provider="openai": buddy)
+    client = TestClient(tracing.TracingMiddleware(api_server.app))
+
+    response = client.post("/explain", json={"topic": "gravity", "audience": "child"},
+                           headers={"traceparent": CALLER})
+    assert response.status_code == 200
+    assert response.headers["x-trace-id"] == "0af7651916cd43dd8448eb211c80319c"
+    assert response.headers["traceparent"].endswith("-01")
+    exporter.flush()
+
+    spans = _spans(path)
+    assert {"POST /explain", "admission.queue", "buddy.astream", "cache.lookup", "cache.store"} <= set(spans)
+    ids = {s["spanId"] for s in spans.values()}
+    assert all(s.get("parentSpanId") in ids for name, s in spans.items() if name != "POST /explain")
+    assert spans["cache.lookup"]["parentSpanId"] == spans["buddy.astream"]["spanId"]
+    assert any(e["name"] == "request.validated" for e in spans["POST /explain"]["events"])
+
+    # Unsampled requests still get ids back but record nothing
+    before = path.read_text()
+    response = client.post("/explain", json={"topic": "tides", "audience": "child"})
+    assert response.headers["traceparent"].endswith("-00")
+    exporter.flush()
+    assert path.read_text() == before
+
+
+def test_streamed_explain_span_lasts_until_the_stream_ends(trace_file, make_buddy):
+    """Test explain(stream=True) keeps its span open while chunks are consumed"""
+    path, configure = trace_file
+    exporter = configure()
+    buddy = make_buddy(cache=ExplanationCache())
+
+    with tracing.start_trace("root") as root:
+        chunks = buddy.explain("gravity", "child", stream=True)
+        text = "".join(chunks)
+    exporter.flush()
+
+    spans = _spans(path)
+    explain = spans["buddy.explain"]
+    assert text and explain["parentSpanId"] == root.span_id
+    assert spans["cache.lookup"]["parentSpanId"] == spans["cache.store"]["parentSpanId"] == explain["spanId"]
+    assert int(explain["endTimeUnixNano"]) >= int(spans["cache.store"]["endTimeUnixNano"])
@@ -0,0 +1,31 @@
+"""
+Smart Study Buddy - Web App Tests
+"""
+
+import asyncio
+import pytest
+
+web_app = pytest.importorskip("web_app")
+
+
+async def _collect(agen):
+    return [update async for update in agen]
+
+
+@pytest.mark.parametrize("stream_output", [False, True])
+def test_generate_explanation_returns_text(monkeypatch, make_buddy, fake_client, stream_output):
+    """Test that both paths end with the full explanation"""
+    buddy = make_buddy()
+    monkeypatch.setattr(web_app, "get_buddy", lambda provider: buddy)
+    monkeypatch.setattr(web_app, "STREAM_INTERVAL", 0)
+
+    updates = asyncio.run(_collect(
+        web_app.generate_explanation("gravity", "child", "None", "None", "openai", stream_output)
+    ))
+
+    assert updates[-1].strip() == fake_client.text
+    assert all(fake_client.text.startswith(u.strip()) for u in updates)
+    if stream_output:
+        assert len(updates) > 1
+    else:
+        assert len(updates) == 1
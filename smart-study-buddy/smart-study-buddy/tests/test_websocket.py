@@ -0,0 +1,124 @@
+"""
+Smart Study Buddy - WebSocket Session Tests
+"""
+
+import asyncio
+
+import pytest
+
+from src.cache import ExplanationCache
+from src.metrics import Metrics
+
+api_server = pytest.importorskip("api_server")
+from fastapi.testclient import TestClient  # noqa: E402
+
+ANSWER = "## Core Idea\nGravity pulls things together.\n## Explanation\n" + "Mass attracts mass. " * 30
+
+
+@pytest.fixture
+def buddy(monkeypatch, make_buddy, fake_client):
+    fake_client.text = ANSWER
+    cache = ExplanationCache()
+    buddy = make_buddy(cache=cache, metrics=Metrics())
+    monkeypatch.setattr(api_server, "cache", cache)
+    monkeypatch.setattr(api_server, "get_buddy", lambda provider="openai": buddy)
+    return buddy
+
+
+def _until(ws, predicate):
+    """Messages received up to and including the first one matching predicate"""
+    messages = []
+    while True:
+        messages.append(ws.receive_json())
+        if predicate(messages[-1]):
+            return messages
+
+
+def test_concurrent_streams_share_a_session(buddy):
+    """Test two explanations multiplex on one connection and a follow-up sees both"""
+    client = TestClient(api_server.app)
+    with client.websocket_connect("/ws?push=false") as ws:
+        ws.send_json({"type": "explain", "id": "a", "topic": "gravity", "audience": "child"})
+        ws.send_json({"type": "explain", "id": "b", "topic": "gravity", "audience": "expert"})
+        messages, done = [], set()
+        while done != {"a", "b"}:
+            message = ws.receive_json()
+            messages.append(message)
+            if message["type"] == "done":
+                done.add(message["id"])
+        for stream_id in ("a", "b"):
+            text = "".join(m["text"] for m in messages if m["type"] == "frame" and m["id"] == stream_id)
+            assert text == ANSWER
+        [session] = [m for m in messages if m["type"] == "session"]
+
+        ws.send_json({"type": "follow_up", "id": "c", "question": "Why do apples fall?"})
+        done = _until(ws, lambda m: m["type"] == "done")[-1]
+        assert done["id"] == "c" and done["turn"] == 3
+
+    turns = client.get(f"/sessions/{session['session_id']}").json()["turns"]
+    assert [t["question"] for t in turns] == ["Explain gravity", "Explain gravity", "Why do apples fall?"]
+
+
+def test_flow_control_and_cancel(buddy, fake_client):
+    """Test a stream waits for credit, rejects oversized grants and can be cancelled"""
+    async def slow_stream(system_prompt, user_prompt, **kwargs):
+        for word in ANSWER.split(" "):
+            await asyncio.sleep(0.01)
+            yield word + " "
+
+    fake_client.astream_explanation = slow_stream
+    client = TestClient(api_server.app)
+    with client.websocket_connect("/ws?push=false") as ws:
+        ws.send_json({"type": "explain", "id": "slow", "topic": "tides", "window": 1})
+        assert ws.receive_json()["type"] == "frame"
+        ws.send_json({"type": "credit", "id": "slow", "frames": 1})
+        assert ws.receive_json()["type"] == "frame"
+        ws.send_json({"type": "credit", "id": "slow", "frames": 1e9})
+        assert ws.receive_json()["status"] == 400
+        ws.send_json({"type": "explain", "id": "wide", "topic": "tides", "window": 10 ** 9})
+        assert ws.receive_json() == {"type": "error", "id": "wide", "status": 400,
+                                     "detail": f"window must be an integer from 0 to {api_server.WS_MAX_CREDIT}"}
+        ws.send_json({"type": "cancel", "id": "slow"})
+        assert ws.receive_json() == {"type": "cancelled", "id": "slow"}
+
+        ws.send_json({"type": "explain", "id": "bad"})
+        error = ws.receive_json()
+        assert error["id"] == "bad" and error["status"] == 422
+        ws.send_json({"type": "follow_up", "id": "early", "question": "Why?"})
+        assert ws.receive_json()["status"] == 409
+
+
+def test_pushes_prefetched_variants(buddy):
+    """Test variants the prefetcher generates for this session's topics are pushed"""
+    buddy.enable_prefetch()
+    client = TestClient(api_server.app)
+    with client.websocket_connect("/ws") as ws:
+        ws.send_json({"type": "explain", "id": "a", "topic": "gravity", "audience": "child"})
+        pushed = _until(ws, lambda m: m["type"] == "prefetched")[-1]
+        assert pushed["topic"] == "gravity"
+        assert pushed["explanation"] == ANSWER
+        assert buddy.prefetcher.drain()
+
+
+def test_session_follows_the_requested_provider(monkeypatch, make_buddy, buddy):
+    """Test a session opened on another provider follows up and pushes from that provider's buddy"""
+    other = make_buddy(cache=buddy.cache, metrics=Metrics())
+    other.enable_prefetch()
+    monkeypatch.setattr(api_server, "get_buddy", {"openai": buddy, "anthropic": other}.__getitem__)
+    asked = []
+    follow_up = other.afollow_up
+    monkeypatch.setattr(other, "afollow_up", lambda conversation, question, **kwargs: (
+        asked.append(question), follow_up(conversation, question, **kwargs))[1])
+    client = TestClient(api_server.app)
+    with client.websocket_connect("/ws") as ws:
+        ws.send_json({"type": "explain", "id": "a", "topic": "gravity", "audience": "child",
+                      "provider": "anthropic"})
+        seen = set()
+        pushed = _until(ws, lambda m: seen.add(m["type"]) or {"done", "prefetched"} <= seen)
+        assert {m["topic"] for m in pushed if m["type"] == "prefetched"} == {"gravity"}
+        assert other.prefetcher.drain()
+
+        ws.send_json({"type": "follow_up", "id": "b", "question": "Why do apples fall?"})
+        done = _until(ws, lambda m: m["type"] == "done" and m["id"] == "b")[-1]
+        assert done["turn"] == 2
+    assert asked == ["Why do apples fall?"]
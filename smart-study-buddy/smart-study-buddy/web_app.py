@@ -2,37 +2,70 @@
 Smart Study Buddy - Gradio Web Interface
 """
 
+import os
+import threading
 import gradio as gr
 from src.study_buddy import SmartStudyBuddy
+from src.cache import ExplanationCache
+from src.streaming import acoalesce
 from src.prompts import AUDIENCE_LEVELS, TONES, LENGTHS
 
+# Request queue: concurrent generations per worker and waiting requests
+CONCURRENCY_LIMIT = int(os.getenv("WEB_CONCURRENCY_LIMIT", "16"))
+QUEUE_MAX_SIZE = int(os.getenv("WEB_QUEUE_MAX_SIZE", "64"))
+
+# Stream update batching. Updates go out at most every STREAM_INTERVAL seconds
+# while the answer is short; past STREAM_SCALE_CHARS the interval grows with
+# the text, so the characters re-rendered per second stay bounded and a long
+# answer costs O(n) rather than O(n²).
+STREAM_INTERVAL = float(os.getenv("WEB_STREAM_INTERVAL", "0.1"))
+STREAM_SCALE_CHARS = int(os.getenv("WEB_STREAM_SCALE_CHARS", "2000"))
+
+# Shared across sessions so HTTP connection pools and the cache are reused
+_cache = ExplanationCache(max_entries=int(os.getenv("CACHE_MAX_ENTRIES", "4096")))
+_buddies = {}
+_buddies_lock = threading.Lock()
+
+
+def get_buddy(provider: str) -> SmartStudyBuddy:
+    """Get or create the shared buddy for a provider"""
+    with _buddies_lock:
+        if provider not in _buddies:
+            _buddies[provider] = SmartStudyBuddy(provider=provider, cache=_cache, max_history=100)
+        return _buddies[provider]
+
+
+async def generate_explanation(topic, audience, tone, length, provider, stream_output):
+    """Generate explanation with given parameters"""
+    try:
+        buddy = get_buddy(provider)
+        
+        # Clean up empty values
+        tone = tone if tone != "None" else None
+        length = length if length != "None" else None
+        
+        chunks = buddy.astream(topic, audience, tone, length)
+        if not stream_output:
+            yield "".join([chunk async for chunk in chunks])
+            return
+        
+        shown = ""
+        async for frame in acoalesce(
+            chunks,
+            max_latency=STREAM_INTERVAL,
+            max_bytes=None,
+            scale_bytes=STREAM_SCALE_CHARS
+        ):
+            shown += frame
+            yield shown
+    
+    except Exception as e:
+        yield f"❌ Error: {str(e)}\n\nPlease check your API keys in the .env file."
+
 
 def create_web_interface():
     """Create Gradio web interface"""
     
-    # Initialize buddy (will be recreated per request)
-    def generate_explanation(topic, audience, tone, length, provider, stream_output):
-        """Generate explanation with given parameters"""
-        try:
-            buddy = SmartStudyBuddy(provider=provider)
-            
-            # Clean up empty values
-            tone = tone if tone != "None" else None
-            length = length if length != "None" else None
-            
-            if stream_output:
-                # For streaming, we'll collect and return
-                explanation = ""
-                for chunk in buddy.explain(topic, audience, tone, length, stream=True):
-                    explanation += chunk
-                    yield explanation
-            else:
-                explanation = buddy.explain(topic, audience, tone, length)
-                return explanation
-                
-        except Exception as e:
-            return f"❌ Error: {str(e)}\n\nPlease check your API keys in the .env file."
-    
     # Create interface
     with gr.Blocks(title="Smart Study Buddy", theme=gr.themes.Soft()) as app:
         gr.Markdown(
@@ -61,7 +94,7 @@ def create_web_interface():
                     )
                     
                     provider_dropdown = gr.Dropdown(
-                        choices=["openai", "anthropic"],
+                        choices=["openai", "anthropic", "openai_compatible"],
                         value="openai",
                         label="AI Provider",
                         info="Which AI to use"
@@ -147,9 +180,11 @@ def create_web_interface():
                 provider_dropdown,
                 stream_checkbox
             ],
-            outputs=output_text
+            outputs=output_text,
+            concurrency_limit=CONCURRENCY_LIMIT
         )
     
+    app.queue(default_concurrency_limit=CONCURRENCY_LIMIT, max_size=QUEUE_MAX_SIZE)
     return app
 
 